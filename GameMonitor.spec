@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['input_win32'],  # loaded via importlib by backend_legacy
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
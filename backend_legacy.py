@@ -1,258 +1,111 @@
 import datetime
+import importlib
 import json
+import sys
 import threading
 import time
 from pathlib import Path
 from typing import Optional
 
-import keyboard
-import ctypes
-from ctypes import wintypes
-
-# --- Timer Resolution Setup ---
-# This forces Windows to use 1ms timer precision, which is critical for 60Hz stability.
-winmm = ctypes.WinDLL("winmm")
-winmm.timeBeginPeriod(1)
-
-if not hasattr(wintypes, "HCURSOR"):
-    wintypes.HCURSOR = wintypes.HANDLE
-
-user32 = ctypes.WinDLL("user32", use_last_error=True)
-kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
-
-# Pointer-sized (works on 32-bit + 64-bit Windows)
-LRESULT = ctypes.c_ssize_t 
-
-# ---- Win32 constants ----
-WM_INPUT = 0x00FF
-PM_REMOVE = 0x0001
-RID_INPUT = 0x10000003
-RIM_TYPEMOUSE = 0
-RIDEV_INPUTSINK = 0x00000100
-MOUSE_MOVE_ABSOLUTE = 0x0001
-
-RI_MOUSE_LEFT_BUTTON_DOWN   = 0x0001
-RI_MOUSE_LEFT_BUTTON_UP     = 0x0002
-RI_MOUSE_RIGHT_BUTTON_DOWN  = 0x0004
-RI_MOUSE_RIGHT_BUTTON_UP    = 0x0008
-RI_MOUSE_MIDDLE_BUTTON_DOWN = 0x0010
-RI_MOUSE_MIDDLE_BUTTON_UP   = 0x0020
-RI_MOUSE_BUTTON_4_DOWN      = 0x0040
-RI_MOUSE_BUTTON_4_UP        = 0x0080
-RI_MOUSE_BUTTON_5_DOWN      = 0x0100
-RI_MOUSE_BUTTON_5_UP        = 0x0200
-RI_MOUSE_WHEEL               = 0x0400
-RI_MOUSE_HWHEEL              = 0x0800
-WHEEL_DELTA = 120
-
-# ---- Win32 structs ----
-class RAWINPUTDEVICE(ctypes.Structure):
-    _fields_ = [
-        ("usUsagePage", wintypes.USHORT),
-        ("usUsage", wintypes.USHORT),
-        ("dwFlags", wintypes.DWORD),
-        ("hwndTarget", wintypes.HWND),
-    ]
-
-class RAWINPUTHEADER(ctypes.Structure):
-    _fields_ = [
-        ("dwType", wintypes.DWORD),
-        ("dwSize", wintypes.DWORD),
-        ("hDevice", wintypes.HANDLE),
-        ("wParam", wintypes.WPARAM),
-    ]
-
-class _RAWMOUSE_BUTTONS(ctypes.Structure):
-    _fields_ = [
-        ("usButtonFlags", wintypes.USHORT),
-        ("usButtonData", wintypes.USHORT),
-    ]
-
-class _RAWMOUSE_BUTTONS_UNION(ctypes.Union):
-    _fields_ = [
-        ("ulButtons", wintypes.ULONG),
-        ("buttons", _RAWMOUSE_BUTTONS),
-    ]
-
-class RAWMOUSE(ctypes.Structure):
-    _anonymous_ = ("uButtons",)
-    _fields_ = [
-        ("usFlags", wintypes.USHORT),
-        ("uButtons", _RAWMOUSE_BUTTONS_UNION),
-        ("ulRawButtons", wintypes.ULONG),
-        ("lLastX", wintypes.LONG),
-        ("lLastY", wintypes.LONG),
-        ("ulExtraInformation", wintypes.ULONG),
-    ]
-
-class _RAWINPUT_DATA(ctypes.Union):
-    _fields_ = [("mouse", RAWMOUSE)]
-
-class RAWINPUT(ctypes.Structure):
-    _anonymous_ = ("data",)
-    _fields_ = [
-        ("header", RAWINPUTHEADER),
-        ("data", _RAWINPUT_DATA),
-    ]
-
-class POINT(ctypes.Structure):
-    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
-
-class MSG(ctypes.Structure):
-    _fields_ = [
-        ("hwnd", wintypes.HWND),
-        ("message", wintypes.UINT),
-        ("wParam", wintypes.WPARAM),
-        ("lParam", wintypes.LPARAM),
-        ("time", wintypes.DWORD),
-        ("pt", POINT),
-    ]
-
-WNDPROCTYPE = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
-
-user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
-user32.DefWindowProcW.restype = LRESULT
-user32.GetRawInputData.argtypes = [wintypes.HANDLE, wintypes.UINT, wintypes.LPVOID, ctypes.POINTER(wintypes.UINT), wintypes.UINT]
-user32.GetRawInputData.restype = wintypes.UINT
-user32.RegisterRawInputDevices.argtypes = [ctypes.POINTER(RAWINPUTDEVICE), wintypes.UINT, wintypes.UINT]
-user32.RegisterRawInputDevices.restype = wintypes.BOOL
-user32.GetCursorPos.argtypes = [ctypes.POINTER(POINT)]
-user32.GetCursorPos.restype = wintypes.BOOL
-user32.PeekMessageW.argtypes = [ctypes.POINTER(MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT, wintypes.UINT]
-user32.PeekMessageW.restype = wintypes.BOOL
-user32.TranslateMessage.argtypes = [ctypes.POINTER(MSG)]
-user32.TranslateMessage.restype = wintypes.BOOL
-user32.DispatchMessageW.argtypes = [ctypes.POINTER(MSG)]
-user32.DispatchMessageW.restype = LRESULT
-user32.CreateWindowExW.restype = wintypes.HWND
-user32.CreateWindowExW.argtypes = [
-    wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
-    ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
-    wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID
-]
-
-class WNDCLASS(ctypes.Structure):
-    _fields_ = [
-        ("style", wintypes.UINT),
-        ("lpfnWndProc", WNDPROCTYPE),
-        ("cbClsExtra", ctypes.c_int),
-        ("cbWndExtra", ctypes.c_int),
-        ("hInstance", wintypes.HINSTANCE),
-        ("hIcon", wintypes.HICON),
-        ("hCursor", wintypes.HCURSOR),
-        ("hbrBackground", wintypes.HBRUSH),
-        ("lpszMenuName", wintypes.LPCWSTR),
-        ("lpszClassName", wintypes.LPCWSTR),
-    ]
-
-user32.RegisterClassW.argtypes = [ctypes.POINTER(WNDCLASS)]
-user32.UnregisterClassW.argtypes = [wintypes.LPCWSTR, wintypes.HINSTANCE]
-user32.DestroyWindow.argtypes = [wintypes.HWND]
-
-class RawInputMouseThread(threading.Thread):
-    def __init__(self, on_delta, on_click, on_wheel, stop_event: threading.Event):
-        super().__init__(daemon=True)
-        self.on_delta = on_delta
-        self.on_click = on_click
-        self.on_wheel = on_wheel
-        self.stop_event = stop_event
-        self.hwnd = None
-        self._wndproc = None
-        self._class_name = "RawInputMouseSink"
-
-    def run(self):
-        hInstance = kernel32.GetModuleHandleW(None)
-
-        @WNDPROCTYPE
-        def wndproc(hwnd, msg, wParam, lParam):
-            if msg == WM_INPUT:
-                self._handle_wm_input(lParam)
-                return 0
-            return user32.DefWindowProcW(hwnd, msg, wParam, lParam)
-
-        self._wndproc = wndproc
-        wc = WNDCLASS()
-        wc.lpfnWndProc = self._wndproc
-        wc.hInstance = hInstance
-        wc.lpszClassName = self._class_name
-
-        atom = user32.RegisterClassW(ctypes.byref(wc))
-        HWND_MESSAGE = wintypes.HWND(-3)
-        self.hwnd = user32.CreateWindowExW(0, self._class_name, self._class_name, 0, 0, 0, 0, 0, HWND_MESSAGE, None, hInstance, None)
-
-        rid = RAWINPUTDEVICE()
-        rid.usUsagePage = 0x01
-        rid.usUsage = 0x02
-        rid.dwFlags = RIDEV_INPUTSINK
-        rid.hwndTarget = self.hwnd
-        user32.RegisterRawInputDevices(ctypes.byref(rid), 1, ctypes.sizeof(RAWINPUTDEVICE))
-
-        msg = MSG()
-        while not self.stop_event.is_set():
-            while user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
-                user32.TranslateMessage(ctypes.byref(msg))
-                user32.DispatchMessageW(ctypes.byref(msg))
-            time.sleep(0.001)
-
-        user32.DestroyWindow(self.hwnd)
-        user32.UnregisterClassW(self._class_name, hInstance)
-
-    def _handle_wm_input(self, hRawInput_lparam):
-        dwSize = wintypes.UINT(0)
-        user32.GetRawInputData(wintypes.HANDLE(hRawInput_lparam), RID_INPUT, None, ctypes.byref(dwSize), ctypes.sizeof(RAWINPUTHEADER))
-        
-        buf = ctypes.create_string_buffer(dwSize.value)
-        user32.GetRawInputData(wintypes.HANDLE(hRawInput_lparam), RID_INPUT, buf, ctypes.byref(dwSize), ctypes.sizeof(RAWINPUTHEADER))
-        
-        raw = ctypes.cast(buf, ctypes.POINTER(RAWINPUT)).contents
-        if raw.header.dwType != RIM_TYPEMOUSE: return
-        m = raw.mouse
-        dx, dy = int(m.lLastX), int(m.lLastY)
-
-        if m.usFlags & MOUSE_MOVE_ABSOLUTE:
-            dx, dy = 0, 0
-
-        if dx or dy:
-            self.on_delta(dx, dy)
-
-        bf = int(m.buttons.usButtonFlags)
-        bd = int(m.buttons.usButtonData)
-
-        def cursor_pos():
-            pt = POINT()
-            if user32.GetCursorPos(ctypes.byref(pt)): return int(pt.x), int(pt.y)
-            return 0, 0
-
-        def emit_click(name, action):
-            x, y = cursor_pos()
-            self.on_click(name, action, x, y)
-
-        if bf & RI_MOUSE_LEFT_BUTTON_DOWN:   emit_click("left", "press")
-        if bf & RI_MOUSE_LEFT_BUTTON_UP:     emit_click("left", "release")
-        if bf & RI_MOUSE_RIGHT_BUTTON_DOWN:  emit_click("right", "press")
-        if bf & RI_MOUSE_RIGHT_BUTTON_UP:    emit_click("right", "release")
-        if bf & RI_MOUSE_MIDDLE_BUTTON_DOWN: emit_click("middle", "press")
-        if bf & RI_MOUSE_MIDDLE_BUTTON_UP:   emit_click("middle", "release")
-        if bf & RI_MOUSE_WHEEL:
-            wheel = ctypes.c_short(bd).value
-            self.on_wheel("vertical", wheel / WHEEL_DELTA, wheel)
+import event_buffers as eb
+from event_buffers import DeltaAccumulator, KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer, SwapBuffer
+import live_stream as ls
+import log_segments
+import preroll as pr
+import spill
+from sampler import POLICIES, FrameScheduler
+from session_stats import SessionStats
+from telemetry import METRICS, MetricsSidecar
+
+# ---- Platform input backends ----
+# Loaded on first capture so importing the core (buffers, sampler, log
+# serialization) stays fast and works on any OS. A backend module provides
+# RawInputMouseThread, hook_keyboard/unhook_keyboard and
+# begin_timer_resolution/end_timer_resolution.
+INPUT_BACKENDS = {"win32": "input_win32"}
+_input_backend = None
+
+def input_backend():
+    global _input_backend
+    if _input_backend is None:
+        name = INPUT_BACKENDS.get(sys.platform)
+        if name is None:
+            raise RuntimeError(f"No input capture backend for platform {sys.platform!r}")
+        _input_backend = importlib.import_module(name)
+    return _input_backend
 
 # ---- Recording Logic ----
-mouse_accum_lock = threading.Lock()
-mouse_accum_dx = 0
-mouse_accum_dy = 0
+# Each capture thread owns exactly one of these; the writer swaps them out.
+mouse_accum = DeltaAccumulator()                      # raw input thread
+mouse_event_queue = SwapBuffer(MouseEventBuffer)      # raw input thread
+keyboard_queue = SwapBuffer(KeyboardEventBuffer)      # keyboard hook
+mouse_position_queue = SwapBuffer(MousePositionBuffer)  # 30Hz sampler
+# Drained batches waiting for the writer; bounded in RAM, spills to disk.
+pending = spill.SpillQueue()
+writer_busy = False  # set while _write_log runs; the drain ticker checks it
+_drain_lock = threading.Lock()  # the writer and the drain ticker both swap
+DRAIN_INTERVAL = 1.0
+
+LOG_FORMATS = ("jsonl", "binary")
+sample_rate_hz: float = 30.0
+sampler_policy = "precise"
+mouse_sampler: Optional[FrameScheduler] = None
 
-log_data = {"keyboard_events": [], "mouse_events": [], "mouse_positions": []}
-log_data_lock = threading.Lock()
 recording_start_time = None
 recording_start_perf = None
 log_file_path = None
 log_video_file = None
-currently_pressed = set()
+segment_log: Optional[log_segments.SegmentedLog] = None  # log_file_path is its manifest
+currently_pressed = 0  # bitset over eb.KEYS codes; keyboard hook thread only
+key_codes = {}  # raw event.name -> KEYS code, so the hook skips lower()/formatting
 raw_mouse_stop = threading.Event()
+sampler_stop = threading.Event()  # the sampler alone restarts when a pre-roll hands over
 raw_mouse_thread = None
 mouse_delta_thread = None
 keyboard_hook = None
+timer_resolution_held = False
+metrics_sidecar: Optional[MetricsSidecar] = None
+clock_model = None  # clock_sync.DriftModel set by OBSRecorder; its params go into each record
+session_stats = SessionStats()  # running totals, folded in by the writer (session_stats.py)
+# Pre-roll (preroll.py), set by arm_preroll. While armed, the callbacks stamp
+# events against capture_start_perf, fixed at arming, and drain moves them
+# onto the recording's clock. Sampler rows count from sampler_start_perf.
+preroll: Optional[pr.PreRoll] = None
+capture_start_perf = None
+sampler_start_perf = None
+# Shared-memory live stream (live_stream.py), set by open_live_stream; the
+# callbacks publish into it as well as into their buffers.
+live: Optional[ls.LiveStream] = None
+
+# ---- Telemetry ----
+# One histogram per producing thread; see telemetry.py.
+mouse_button_events = METRICS.counter("events.mouse_button")
+keyboard_events_seen = METRICS.counter("events.keyboard")
+mouse_callback_latency = METRICS.histogram("callback.mouse")        # raw input thread
+keyboard_callback_latency = METRICS.histogram("callback.keyboard")  # keyboard hook
+sampler_lateness = METRICS.histogram("sampler.lateness")            # sampler thread
+flush_latency = METRICS.histogram("flush.seconds")                  # writer thread
+flush_bytes = METRICS.counter("flush.bytes")
+last_flush_events = {"keyboard": 0, "mouse": 0, "positions": 0}
+last_flush_seconds = 0.0
+
+# Each DeltaAccumulator.add bumps seq twice, so deltas are counted for free.
+METRICS.gauge("events.mouse_delta", lambda: mouse_accum.seq // 2)
+METRICS.gauge("queue.keyboard", lambda: len(keyboard_queue))
+METRICS.gauge("queue.mouse", lambda: len(mouse_event_queue))
+METRICS.gauge("queue.positions", lambda: len(mouse_position_queue))
+METRICS.gauge("swap_wait.total", lambda: keyboard_queue.swap_wait_total + mouse_event_queue.swap_wait_total + mouse_position_queue.swap_wait_total)
+METRICS.gauge("sampler.frames", lambda: mouse_sampler.frames if mouse_sampler else 0)
+METRICS.gauge("sampler.skipped_frames", lambda: mouse_sampler.skipped_frames if mouse_sampler else 0)
+METRICS.gauge("sampler.target_hz", lambda: sample_rate_hz)
+METRICS.gauge("flush.last_events", lambda: sum(last_flush_events.values()))
+METRICS.gauge("flush.last_seconds", lambda: last_flush_seconds)
+METRICS.gauge("queue.pending_batches", lambda: len(pending))
+METRICS.gauge("queue.pending_bytes", lambda: pending.memory_used)
+METRICS.gauge("queue.spilled_bytes", lambda: pending.spill_used)
+METRICS.gauge("preroll.bytes", lambda: preroll.nbytes() if preroll else 0)
+METRICS.gauge("preroll.overwritten", lambda: preroll.overwritten if preroll else 0)
+METRICS.gauge("live.published", lambda: live.published if live else 0)
 
 def get_relative_timestamp() -> float:
     if recording_start_perf is not None:
@@ -260,149 +113,358 @@ def get_relative_timestamp() -> float:
     return time.time() - (recording_start_time or time.time())
 
 def set_recording_start(start_perf: Optional[float] = None, start_wall: Optional[float] = None) -> None:
-    global recording_start_time, recording_start_perf
+    global recording_start_time, recording_start_perf, capture_start_perf
     recording_start_perf = start_perf if start_perf is not None else time.perf_counter()
     recording_start_time = start_wall if start_wall is not None else time.time()
-
-def start_recording() -> None:
-    global log_file_path, log_video_file, mouse_accum_dx, mouse_accum_dy
+    if preroll is None:
+        capture_start_perf = recording_start_perf
+
+def start_recording(
+    sample_rate: float = 30.0,
+    policy: str = "precise",
+    memory_bytes: int = spill.MEMORY_BYTES,
+    spill_bytes: int = spill.SPILL_BYTES,
+    drop_policy: str = "oldest",
+    spill_dir: Optional[str] = None,
+) -> None:
+    """Reset session state. Call before the capture threads are started.
+
+    ``sample_rate``/``policy`` configure the mouse delta sampler (see sampler.py).
+    ``memory_bytes``, ``spill_bytes``, ``drop_policy`` and ``spill_dir`` bound
+    the events that wait while the writer is stalled (see spill.py).
+    A capturing pre-roll keeps its threads, buffers and held keys; the
+    sampler rate stays the one it was armed with.
+    """
+    global log_file_path, log_video_file, metrics_sidecar, sample_rate_hz, sampler_policy, currently_pressed, clock_model, pending, session_stats
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown sleep policy: {policy}")
+    queue = spill.SpillQueue(memory_bytes, spill_bytes, drop_policy, spill_dir)
     set_recording_start()
-    with mouse_accum_lock:
-        mouse_accum_dx = 0
-        mouse_accum_dy = 0
-    with log_data_lock:
-        log_data["keyboard_events"] = []
-        log_data["mouse_events"] = []
-        log_data["mouse_positions"] = []
-    currently_pressed.clear()
+    if preroll is None or not preroll.capturing:
+        sample_rate_hz = float(sample_rate)
+        sampler_policy = policy
+        mouse_accum.reset()
+        mouse_event_queue.swap()
+        keyboard_queue.swap()
+        mouse_position_queue.swap()
+        currently_pressed = 0
+    pending.close()
+    pending = queue
+    METRICS.reset()
+    close_log()
     log_file_path = None
     log_video_file = None
+    metrics_sidecar = None
+    clock_model = None
+    session_stats = SessionStats()
+
+def drain(keep_empty: bool = False) -> bool:
+    """Cut the producer buffers into a batch for the writer; False if they were empty.
+
+    Cheap: three swaps, plus a spill-file write only while the writer is
+    far behind. The writer keeps empty batches so idle sessions still log a
+    record per flush; the drain ticker skips them.
+    """
+    with _drain_lock:
+        keyboard_events = keyboard_queue.swap()
+        mouse_events = mouse_event_queue.swap()
+        mouse_positions = mouse_position_queue.swap()
+        if not (keep_empty or len(keyboard_events) or len(mouse_events) or len(mouse_positions)):
+            return False
+        if capture_start_perf != recording_start_perf:
+            shift = capture_start_perf - recording_start_perf
+            pr.shift_timestamps(keyboard_events, shift)
+            pr.shift_timestamps(mouse_events, shift)
+        timestamp = datetime.datetime.now().isoformat()
+        pending.put(spill.Batch(timestamp, get_relative_timestamp(), keyboard_events, mouse_events, mouse_positions))
+    return True
+
+def drain_if_behind() -> None:
+    """Drain ticker: while a write is stuck, keep the capture buffers small."""
+    if writer_busy:
+        drain()
+
+def _write_log() -> None:
+    """Drain the producer buffers and append every waiting batch, oldest first. Runs on the writer thread.
+
+    Each batch becomes one record. A batch is only dropped from ``pending``
+    once it is written, so a failed write is retried by the next flush.
+    """
+    global writer_busy, last_flush_seconds
+    if segment_log is None:
+        return
 
-def save_log(video_path: Optional[str] = None) -> None:
-    global log_file_path, log_video_file
+    started = time.perf_counter()
+    writer_busy = True
+    try:
+        drain(keep_empty=True)
+        counts = {"keyboard": 0, "mouse": 0, "positions": 0}
+        while True:
+            batch = pending.peek()
+            if batch is None:
+                break
+            written = _write_batch(batch, segment_log, log_video_file, session_stats)
+            pending.pop()
+            flush_bytes.add(written)
+            counts["keyboard"] += len(batch.keyboard)
+            counts["mouse"] += len(batch.mouse)
+            counts["positions"] += len(batch.positions)
+    finally:
+        writer_busy = False
+
+    last_flush_seconds = time.perf_counter() - started
+    flush_latency.record(last_flush_seconds)
+    last_flush_events.update(counts)
+    if metrics_sidecar is not None:
+        metrics_sidecar.write(get_relative_timestamp())
+
+def _write_batch(
+    batch: spill.Batch, log: log_segments.SegmentedLog, video_file: Optional[str], stats: SessionStats, final: bool = False
+) -> int:
+    """Append ``batch`` as one record, with the running totals (or, if ``final``, the session summary)."""
+    keyboard_events, mouse_events, mouse_positions = batch.keyboard, batch.mouse, batch.positions
+    duration = batch.relative_timestamp
+    clicks, scrolls = stats.add(batch)
+    counts = {
+        "keyboard_events_count": len(keyboard_events),
+        "mouse_clicks_count": clicks,
+        "mouse_scrolls_count": scrolls,
+        "mouse_positions_count": len(mouse_positions),
+    }
+    totals = {"summary": stats.summary()} if final else {"session": stats.snapshot()}
+    if log.log_format == "binary":
+        meta = {
+            "timestamp": batch.timestamp,
+            "relative_timestamp": duration,
+            "stats": counts,
+            "video_file": video_file,
+            "recording_duration": duration,
+        }
+        if clock_model is not None:
+            meta["clock"] = clock_model.params()
+        meta.update(totals)
+        return log.append_chunk(meta, mouse_positions, mouse_events, keyboard_events)
+    return _write_jsonl(log, video_file, batch.timestamp, duration, keyboard_events, mouse_events, mouse_positions, counts, totals)
+
+def _write_jsonl(
+    log: log_segments.SegmentedLog, video_file: Optional[str], timestamp: str, duration: float, keyboard_events, mouse_events, mouse_positions, counts: dict, totals: dict
+) -> int:
+    payload = {
+        "timestamp": timestamp,
+        "relative_timestamp": duration,
+        "keyboard_events": keyboard_events.to_dicts(),
+        "mouse_events": mouse_events.to_dicts(),
+        "mouse_positions": mouse_positions.to_dicts(),
+        "stats": counts,
+        "video_file": video_file,
+        "recording_duration": duration,
+    }
+    if clock_model is not None:
+        payload["clock"] = clock_model.params()
+    payload.update(totals)
+
+    return log.append_line(duration, json.dumps(payload) + "\n", log_segments.frame_range(mouse_positions))
+
+def save_log(
+    video_path: Optional[str] = None,
+    log_format: str = "jsonl",
+    compression: str = "auto",
+    segment_seconds: float = log_segments.MAX_SECONDS,
+    segment_bytes: int = log_segments.MAX_BYTES,
+) -> None:
+    """Bind the log to ``video_path`` (if given) and flush buffered events.
+
+    Binding starts a segmented log (see log_segments.py): a
+    ``*_log.manifest.json`` next to the video and rolling segments of
+    ``*_log.jsonl`` or binary ``*_log.gmlb`` records (see binlog.py),
+    compressed with ``compression``. A new segment starts every
+    ``segment_seconds`` of session time or ``segment_bytes`` of records. The
+    format and segment options only matter when binding a new path.
+
+    The flush runs inline; the recorder loop calls this from its executor,
+    one flush at a time. Each flush also appends a telemetry snapshot to ``*_metrics.jsonl``.
+    """
+    global log_file_path, log_video_file, segment_log, metrics_sidecar
     if video_path:
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        close_log()
         video_file = Path(video_path)
-        log_file_path = video_file.with_name(f"{video_file.stem}_log.jsonl")
         log_video_file = video_file.name
-    if not log_file_path:
+        log_file_path = log_segments.manifest_path_for(video_file)
+        header = {"video_file": log_video_file, "frame_interval": 1.0 / sample_rate_hz}
+        if log_format == "binary":
+            header.update({"start_perf": recording_start_perf, "start_wall": recording_start_time})
+        segment_log = log_segments.SegmentedLog(log_file_path, log_format, header, compression, segment_seconds, segment_bytes)
+        metrics_sidecar = MetricsSidecar(MetricsSidecar.path_for(log_file_path))
+    if segment_log is None:
         return
 
-    with log_data_lock:
-        keyboard_events = list(log_data["keyboard_events"])
-        mouse_events = list(log_data["mouse_events"])
-        mouse_positions = list(log_data["mouse_positions"])
-        log_data["keyboard_events"].clear()
-        log_data["mouse_events"].clear()
-        log_data["mouse_positions"].clear()
+    _write_log()
 
-    duration = get_relative_timestamp()
-    payload = {
-        "timestamp": datetime.datetime.now().isoformat(),
-        "relative_timestamp": duration,
-        "keyboard_events": keyboard_events,
-        "mouse_events": mouse_events,
-        "mouse_positions": mouse_positions,
-        "stats": {
-            "keyboard_events_count": len(keyboard_events),
-            "mouse_clicks_count": len([e for e in mouse_events if e.get("type") == "click"]),
-            "mouse_scrolls_count": len([e for e in mouse_events if e.get("type") == "scroll"]),
-            "mouse_positions_count": len(mouse_positions),
-        },
-        "video_file": log_video_file,
-        "recording_duration": duration,
-    }
+def close_log() -> None:
+    """Write the session summary record, finish the open segment and mark the manifest complete.
 
-    log_file_path.parent.mkdir(parents=True, exist_ok=True)
-    with log_file_path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload) + "\n")
+    Call after the final flush.
+    """
+    global segment_log
+    if segment_log is not None:
+        log, segment_log = segment_log, None
+        _close_with_summary(log, log_video_file, session_stats, get_relative_timestamp())
+
+def _close_with_summary(log: log_segments.SegmentedLog, video_file: Optional[str], stats: SessionStats, duration: float) -> None:
+    end = spill.Batch(datetime.datetime.now().isoformat(), duration, KeyboardEventBuffer(), MouseEventBuffer(), MousePositionBuffer())
+    try:
+        _write_batch(end, log, video_file, stats, final=True)
+    finally:
+        log.close(stats.summary())
 
 def raw_on_delta(dx: int, dy: int) -> None:
-    global mouse_accum_dx, mouse_accum_dy
-    with mouse_accum_lock:
-        mouse_accum_dx += dx
-        mouse_accum_dy += dy
+    mouse_accum.add(dx, dy)
+    stream = live
+    if stream is not None:
+        stream.delta(dx, dy)
 
 def raw_on_click(button: str, action: str, x: int, y: int) -> None:
-    event = {"type": "click", "action": action, "button": button, "position": {"x": x, "y": y}, "timestamp": get_relative_timestamp()}
-    with log_data_lock: log_data["mouse_events"].append(event)
+    entered = time.perf_counter()
+    start = capture_start_perf
+    ts = entered - start if start is not None else get_relative_timestamp()
+    button_code, action_code = eb.BUTTONS.code(button), eb.ACTIONS.code(action)
+    q = mouse_event_queue
+    q.seq += 1
+    q.front.append_click(button_code, action_code, x, y, ts)
+    q.seq += 1
+    stream = live
+    if stream is not None:
+        stream.click(entered, button_code, action_code, x, y)
+    mouse_button_events.value += 1
+    mouse_callback_latency.record(time.perf_counter() - entered)
 
 def raw_on_wheel(axis: str, steps: float, raw_delta: int) -> None:
-    event = {"type": "scroll", "axis": axis, "steps": steps, "raw_delta": raw_delta, "timestamp": get_relative_timestamp()}
-    with log_data_lock: log_data["mouse_events"].append(event)
-
-def on_keyboard_event(event: keyboard.KeyboardEvent) -> None:
-    key_str = (event.name or f"scan_{event.scan_code}").lower()
+    entered = time.perf_counter()
+    start = capture_start_perf
+    ts = entered - start if start is not None else get_relative_timestamp()
+    axis_code = eb.AXES.code(axis)
+    q = mouse_event_queue
+    q.seq += 1
+    q.front.append_scroll(axis_code, steps, raw_delta, ts)
+    q.seq += 1
+    stream = live
+    if stream is not None:
+        stream.scroll(entered, axis_code, steps, raw_delta)
+    mouse_button_events.value += 1
+    mouse_callback_latency.record(time.perf_counter() - entered)
+
+def on_keyboard_event(event) -> None:
+    """Keyboard hook callback; ``event`` is a ``keyboard.KeyboardEvent``."""
+    global currently_pressed
+    entered = time.perf_counter()
+    key = key_codes.get(event.name)
+    if key is None:
+        key = eb.KEYS.code((event.name or f"scan_{event.scan_code}").lower())
+        if event.name:
+            key_codes[event.name] = key
+    bit = 1 << key
+    start = capture_start_perf
+    ts = entered - start if start is not None else get_relative_timestamp()
+    q = keyboard_queue
     if event.event_type == "down":
-        if key_str in currently_pressed: return
-        currently_pressed.add(key_str)
-        evt = {"type": "press", "keys": sorted(list(currently_pressed)), "timestamp": get_relative_timestamp()}
+        if currently_pressed & bit: return
+        currently_pressed |= bit
+        q.seq += 1
+        q.front.append_press(key, currently_pressed, ts)
+        q.seq += 1
+        kind = ls.KEY_DOWN
     else:
-        if key_str in currently_pressed: currently_pressed.remove(key_str)
-        evt = {"type": "release", "key": key_str, "timestamp": get_relative_timestamp()}
-    with log_data_lock: log_data["keyboard_events"].append(evt)
-
-def record_mouse_delta_30hz(start_perf: float) -> None:
-    """High-precision 30Hz sampler aligned to a monotonic start time."""
-    global mouse_accum_dx, mouse_accum_dy
-    frame_interval = 1.0 / 30.0
-    frame_index = 0
-    next_time = start_perf
-
-    while not raw_mouse_stop.is_set():
-        # High-precision wait: sleep for most of the time, busy-wait for the last tiny bit
-        while True:
-            now = time.perf_counter()
-            remaining = next_time - now
-            if remaining <= 0:
-                break
-            if remaining > 0.002:
-                time.sleep(0.001)
-
-        now = time.perf_counter()
-        if now - next_time > frame_interval:
-            frame_index = int((now - start_perf) / frame_interval)
-            next_time = start_perf + (frame_index * frame_interval)
-
-        current_timestamp = frame_index * frame_interval
-        
-        with mouse_accum_lock:
-            dx, dy = mouse_accum_dx, mouse_accum_dy
-            mouse_accum_dx = 0
-            mouse_accum_dy = 0
-
-        entry = {"delta": {"dx": dx, "dy": dy}, "timestamp": current_timestamp, "frame_index": frame_index}
-        with log_data_lock:
-            log_data["mouse_positions"].append(entry)
+        currently_pressed &= ~bit
+        q.seq += 1
+        q.front.append_release(key, ts)
+        q.seq += 1
+        kind = ls.KEY_UP
+    stream = live
+    if stream is not None:
+        stream.key(entered, kind, key)
+    keyboard_events_seen.value += 1
+    keyboard_callback_latency.record(time.perf_counter() - entered)
+
+def on_sample_frame(frame_index: int, timestamp: float) -> None:
+    """Sampler callback: emit the mouse delta accumulated since the last frame."""
+    dx, dy = mouse_accum.take()
+    q = mouse_position_queue
+    q.seq += 1
+    q.front.append(frame_index, dx, dy, timestamp)
+    q.seq += 1
+    stream = live
+    if stream is not None:
+        stream.frame(frame_index, dx, dy)
+
+def record_mouse_delta_30hz(start_perf: float, stop_event: Optional[threading.Event] = None, first_frame: int = 0) -> None:
+    """High-precision sampler aligned to a monotonic start time (rate set by start_recording)."""
+    global mouse_sampler
+    stop_event = stop_event if stop_event is not None else raw_mouse_stop
+    mouse_sampler = FrameScheduler(on_sample_frame, sample_rate_hz, sampler_policy, stop_event=stop_event, lateness=sampler_lateness)
+    mouse_sampler.run(start_perf, first_frame=first_frame)
+
+def _start_sampler(start_perf: float, first_frame: int = 0) -> None:
+    global mouse_delta_thread, sampler_start_perf
+    sampler_stop.clear()
+    sampler_start_perf = start_perf
+    mouse_delta_thread = threading.Thread(target=record_mouse_delta_30hz, args=(start_perf, sampler_stop, first_frame), daemon=True)
+    mouse_delta_thread.start()
 
-        frame_index += 1
-        next_time = start_perf + (frame_index * frame_interval)
+def _stop_sampler() -> None:
+    global mouse_delta_thread
+    sampler_stop.set()
+    if mouse_delta_thread is not None:
+        mouse_delta_thread.join(timeout=1.0)
+        mouse_delta_thread = None
 
 def start_input_threads(start_perf: Optional[float] = None, start_wall: Optional[float] = None) -> None:
-    global keyboard_hook, raw_mouse_thread, mouse_delta_thread
+    """Start capturing for the recording that began at ``start_perf``.
+
+    With a capturing pre-roll the hooks are already running: its window is
+    queued as the session's first batch instead (see ``_hand_over_preroll``).
+    """
+    global keyboard_hook, raw_mouse_thread, timer_resolution_held
+    if preroll is not None and preroll.capturing:
+        _hand_over_preroll(start_perf, start_wall)
+        return
+    backend = input_backend()
     raw_mouse_stop.clear()
     set_recording_start(start_perf=start_perf, start_wall=start_wall)
+    if not timer_resolution_held:
+        backend.begin_timer_resolution()
+        timer_resolution_held = True
 
-    mouse_delta_thread = threading.Thread(
-        target=record_mouse_delta_30hz,
-        args=(recording_start_perf or time.perf_counter(),),
-        daemon=True,
-    )
-    mouse_delta_thread.start()
+    _start_sampler(recording_start_perf or time.perf_counter())
     
-    raw_mouse_thread = RawInputMouseThread(raw_on_delta, raw_on_click, raw_on_wheel, raw_mouse_stop)
+    raw_mouse_thread = backend.RawInputMouseThread(raw_on_delta, raw_on_click, raw_on_wheel, raw_mouse_stop)
     raw_mouse_thread.start()
-    keyboard_hook = keyboard.hook(on_keyboard_event)
+    keyboard_hook = backend.hook_keyboard(on_keyboard_event)
 
 
 def stop_input_threads() -> None:
-    """Stop background mouse/key capture threads and hooks."""
-    global keyboard_hook, raw_mouse_thread, mouse_delta_thread
+    """Stop background mouse/key capture threads and hooks.
+
+    With a pre-roll armed they keep running instead: the session's last
+    events are queued for the final flush and the pre-roll starts over.
+    """
+    global keyboard_hook, raw_mouse_thread, timer_resolution_held
+
+    if preroll is not None:
+        if not preroll.capturing:
+            drain()
+            with _drain_lock:
+                preroll.clear()
+                preroll.capturing = True
+        return
 
     raw_mouse_stop.set()
+    sampler_stop.set()
 
     if keyboard_hook is not None:
         try:
-            keyboard.unhook(keyboard_hook)
+            input_backend().unhook_keyboard(keyboard_hook)
         except Exception:
             pass
         keyboard_hook = None
@@ -411,22 +473,145 @@ def stop_input_threads() -> None:
         raw_mouse_thread.join(timeout=1.0)
         raw_mouse_thread = None
 
-    if mouse_delta_thread is not None:
-        mouse_delta_thread.join(timeout=1.0)
-        mouse_delta_thread = None
+    _stop_sampler()
+
+    if timer_resolution_held:
+        input_backend().end_timer_resolution()
+        timer_resolution_held = False
+
+# ---- Live stream ----
+def open_live_stream(name: str = ls.DEFAULT_NAME, slots: int = ls.SLOTS) -> ls.LiveStream:
+    """Publish captured input to shared memory block ``name`` (see live_stream.py) until closed."""
+    global live
+    close_live_stream()
+    live = ls.LiveStream(name, slots)
+    return live
+
+def close_live_stream() -> None:
+    global live
+    stream, live = live, None
+    if stream is not None:
+        stream.close()
+
+# ---- Pre-roll ----
+def arm_preroll(window: float = pr.WINDOW_SECONDS, sample_rate: float = 30.0, policy: str = "precise") -> None:
+    """Start capturing into a ``window``-second pre-roll ring (see preroll.py).
+
+    Call between recordings. The capture threads run from now until
+    ``disarm_preroll``; recordings started meanwhile begin with the window.
+    """
+    global preroll, sample_rate_hz, sampler_policy, currently_pressed
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown sleep policy: {policy}")
+    disarm_preroll()
+    sample_rate_hz = float(sample_rate)
+    sampler_policy = policy
+    mouse_accum.reset()
+    mouse_event_queue.swap()
+    keyboard_queue.swap()
+    mouse_position_queue.swap()
+    currently_pressed = 0
+    ring = pr.PreRoll(window, sample_rate_hz)
+    ring.capturing = True
+    start_input_threads()  # also fixes capture_start_perf for as long as it is armed
+    preroll = ring
+
+def disarm_preroll() -> None:
+    """Stop the pre-roll, and its capture threads unless a recording is using them."""
+    global preroll
+    if preroll is None:
+        return
+    ring, preroll = preroll, None
+    if ring.capturing:
+        stop_input_threads()
+    # Otherwise a recording owns the threads now; it stops them as usual.
+    ring.clear()
+
+def preroll_tick() -> None:
+    """Move captured events into the pre-roll ring. Call a few times a second while armed."""
+    ring = preroll
+    if ring is None or not ring.capturing:
+        return
+    with _drain_lock:
+        if ring.capturing:
+            ring.add(keyboard_queue.swap(), mouse_event_queue.swap(), mouse_position_queue.swap())
+
+def _preroll_batch(origin: float, cutoff: float) -> spill.Batch:
+    """The ring since perf time ``cutoff`` as one batch, timed relative to perf time ``origin``. Lock held."""
+    ring = preroll
+    ring.add(keyboard_queue.swap(), mouse_event_queue.swap(), mouse_position_queue.swap())
+    keyboard, mouse, positions = ring.window_buffers(cutoff - capture_start_perf, cutoff - sampler_start_perf)
+    pr.shift_timestamps(keyboard, capture_start_perf - origin)
+    pr.shift_timestamps(mouse, capture_start_perf - origin)
+    # Whole frames, so the rows stay on the grid of the sampler started at origin.
+    pr.shift_frames(positions, round((sampler_start_perf - origin) * sample_rate_hz), sample_rate_hz)
+    timestamp = datetime.datetime.now().isoformat()
+    return spill.Batch(timestamp, time.perf_counter() - origin, keyboard, mouse, positions)
+
+def _hand_over_preroll(start_perf: Optional[float], start_wall: Optional[float]) -> None:
+    """Queue the pre-roll window as the session's first batch and restart the sampler at ``start_perf``.
+
+    Events from before the recording get negative timestamps and sampler
+    frames; those captured since ``start_perf`` land on their session frames.
+    The new sampler carries on after the last of those frames, so no frame
+    is emitted twice.
+    """
+    _stop_sampler()
+    with _drain_lock:
+        set_recording_start(start_perf=start_perf, start_wall=start_wall)
+        batch = _preroll_batch(recording_start_perf, recording_start_perf - preroll.window)
+        pending.put(batch)
+        preroll.clear()
+        preroll.capturing = False
+    frames = batch.positions.frame_index
+    _start_sampler(recording_start_perf, max(0, frames[-1] + 1) if frames else 0)
+
+def save_preroll(
+    video_path: str,
+    log_format: str = "jsonl",
+    compression: str = "auto",
+    duration: Optional[float] = None,
+) -> Optional[Path]:
+    """Write the last ``duration`` seconds (default: the window) as a log for ``video_path``.
+
+    For replay-buffer saves: the clip ends now, so its events are timed from
+    ``duration`` seconds ago. Returns the manifest path, or None when no
+    pre-roll is capturing (a recording's own log already has the events).
+    """
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    ring = preroll
+    if ring is None:
+        return None
+    with _drain_lock:
+        if not ring.capturing:
+            return None
+        now, wall = time.perf_counter(), time.time()
+        origin = now - (duration or ring.window)
+        batch = _preroll_batch(origin, origin)
+    video_file = Path(video_path)
+    manifest = log_segments.manifest_path_for(video_file)
+    header = {"video_file": video_file.name, "preroll": True, "frame_interval": 1.0 / sample_rate_hz}
+    if log_format == "binary":
+        header.update({"start_perf": origin, "start_wall": wall - (now - origin)})
+    log = log_segments.SegmentedLog(manifest, log_format, header, compression)
+    stats = SessionStats()
+    try:
+        _write_batch(batch, log, video_file.name, stats)
+    finally:
+        _close_with_summary(log, video_file.name, stats, batch.relative_timestamp)
+    return manifest
 
 if __name__ == "__main__":
-    print("Recording at precise 30Hz. Press Ctrl+C to stop.")
+    print(f"Recording at precise {sample_rate_hz:g}Hz. Press Ctrl+C to stop.")
     set_recording_start()
     start_input_threads(recording_start_perf, recording_start_time)
     try:
         while True:
             time.sleep(1)
-            with log_data_lock:
-                count = len(log_data["mouse_positions"])
-                # Calculate effective frequency over the last second
-                print(f"Captured {count} mouse frames... (~{count/max(1, get_relative_timestamp()):.1f} Hz)")
+            count = len(mouse_position_queue)
+            # Calculate effective frequency over the last second
+            print(f"Captured {count} mouse frames... (~{count/max(1, get_relative_timestamp()):.1f} Hz)")
     except KeyboardInterrupt:
-        raw_mouse_stop.set()
-        winmm.timeEndPeriod(1) # Cleanup timer resolution
+        stop_input_threads()  # also releases the timer resolution
         print("Stopped.")
@@ -0,0 +1,268 @@
+"""
+Batch jobs over a recordings directory, fanned out over a process pool.
+
+Discovers every ``*_log.jsonl`` / ``*_log.gmlb`` / segmented
+``*_log.manifest.json`` (recursively) and pairs it with its video. Jobs:
+
+    validate   structural checks on every record (and that the video exists)
+    stats      per-session summary (duration, counts, key histogram, ...)
+    convert    JSONL -> binary (``--to binary``) or binary -> JSONL; a segmented
+               log becomes one flat log of the other format beside it
+    export     frame-aligned NumPy arrays (see dataset_export.py)
+
+Completed files are appended to a manifest (``.batch_manifest.jsonl`` in the
+directory by default) keyed by job, path, size and mtime, so re-running the
+same job skips files that have not changed since.
+
+Usage:
+    python batch.py validate recordings/ [--workers N] [--output results.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import binlog
+import log_segments
+import spill
+from session_stats import SessionStats
+
+JOBS = ("validate", "stats", "convert", "export")
+VIDEO_SUFFIXES = (".mkv", ".mp4", ".mov", ".flv", ".ts")
+MANIFEST_NAME = ".batch_manifest.jsonl"
+RECORD_FIELDS = ("timestamp", "relative_timestamp", "keyboard_events", "mouse_events", "mouse_positions", "stats")
+
+
+def discover(root: Path, prefer: str = binlog.SUFFIX) -> List[Tuple[Path, Optional[Path]]]:
+    """All session logs under ``root`` with the video next to each (or None).
+
+    A session converted earlier has both a JSONL and a binary log; only the
+    one with suffix ``prefer`` is returned. A segmented log's manifest stands
+    for the whole session and its segments are not listed.
+    """
+    sessions: Dict[Path, Path] = {}
+    for log in sorted(root.rglob("*_log*")):
+        segmented = log_segments.is_manifest(log)
+        if segmented:
+            key = log.with_name(log.name[: -len(log_segments.MANIFEST_SUFFIX)])
+        elif log.suffix in (".jsonl", binlog.SUFFIX) and log.stem.endswith("_log"):
+            key = log.with_suffix("")
+        else:
+            continue
+        if key not in sessions or log.suffix == prefer or segmented:
+            sessions[key] = log
+    pairs = []
+    for key, log in sorted(sessions.items()):
+        stem = key.name[: -len("_log")]
+        video = next((log.with_name(stem + ext) for ext in VIDEO_SUFFIXES if log.with_name(stem + ext).exists()), None)
+        pairs.append((log, video))
+    return pairs
+
+
+def validate_log(log: Path, video: Optional[Path]) -> Dict:
+    errors: List[str] = []
+    if video is None:
+        errors.append("no video file next to log")
+    last_frame = -1
+    last_rel = float("-inf")
+    records = 0
+    try:
+        for n, record in enumerate(binlog.iter_log_records(log), 1):
+            records += 1
+            missing = [field for field in RECORD_FIELDS if field not in record]
+            if missing:
+                errors.append(f"record {n}: missing {', '.join(missing)}")
+                continue
+            if record["relative_timestamp"] < last_rel:
+                errors.append(f"record {n}: relative_timestamp went backwards")
+            last_rel = record["relative_timestamp"]
+            for row in record["mouse_positions"]:
+                if row["frame_index"] <= last_frame:
+                    errors.append(f"record {n}: frame_index {row['frame_index']} not increasing")
+                    break
+                last_frame = row["frame_index"]
+            stats = record["stats"]
+            if stats.get("mouse_positions_count") != len(record["mouse_positions"]):
+                errors.append(f"record {n}: stats.mouse_positions_count mismatch")
+            if stats.get("keyboard_events_count") != len(record["keyboard_events"]):
+                errors.append(f"record {n}: stats.keyboard_events_count mismatch")
+    except (ValueError, KeyError, TypeError) as exc:
+        errors.append(f"unreadable: {exc}")
+    return {"records": records, "ok": not errors, "errors": errors[:20]}
+
+
+def summarize_log(log: Path, video: Optional[Path]) -> Dict:
+    """Session totals: the summary a closed segmented log keeps in its manifest, else a full scan.
+
+    The scan folds every record through ``SessionStats``, as the recorder
+    did, so both paths define every field the same way.
+    """
+    if log_segments.is_manifest(log):
+        summary = log_segments.read_manifest(log).get("summary")
+        if summary is not None:
+            return {"video": str(video) if video else None, **summary}
+    stats = SessionStats()
+    for record in binlog.iter_log_records(log):
+        positions, mouse, keyboard = binlog.buffers_from_record(record)
+        stats.add(spill.Batch(record.get("timestamp"), record.get("relative_timestamp") or 0.0, keyboard, mouse, positions))
+    return {"video": str(video) if video else None, **stats.summary()}
+
+
+def convert_log(log: Path, video: Optional[Path], to: str = "binary") -> Dict:
+    """Rewrite a log in the other format next to it.
+
+    A segmented log is streamed from its segments into a single
+    ``*_log.gmlb`` / ``*_log.jsonl`` beside the manifest; the segments stay.
+    """
+    if log_segments.is_manifest(log):
+        manifest = log_segments.read_manifest(log)
+        if manifest["format"] == to:
+            return {"skipped": f"already {to}"}
+        stem = log.name[: -len(log_segments.MANIFEST_SUFFIX)]
+        if to == "binary":
+            out = binlog.jsonl_to_binary(log, log.with_name(stem + binlog.SUFFIX))
+        else:
+            out = binlog.binary_to_jsonl(log, log.with_name(stem + ".jsonl"))
+        bytes_in = sum(segment["bytes"] for segment in manifest["segments"])
+        return {"output": str(out), "bytes_in": bytes_in, "bytes_out": out.stat().st_size}
+    if to == "binary":
+        if log.suffix == binlog.SUFFIX:
+            return {"skipped": "already binary"}
+        out = binlog.jsonl_to_binary(log, log.with_suffix(binlog.SUFFIX))
+    else:
+        if log.suffix != binlog.SUFFIX:
+            return {"skipped": "already jsonl"}
+        out = binlog.binary_to_jsonl(log, log.with_suffix(".jsonl"))
+    return {"output": str(out), "bytes_in": log.stat().st_size, "bytes_out": out.stat().st_size}
+
+
+def export_log(log: Path, video: Optional[Path], fmt: str = "npz") -> Dict:
+    # Imported here so the other jobs do not need numpy.
+    import dataset_export
+
+    out = dataset_export.export_session(log, fmt=fmt)
+    return {"output": str(out)}
+
+
+def run_job(job: str, log: str, video: Optional[str], options: Dict) -> Dict:
+    """Worker entry point; must stay picklable (module-level, plain args)."""
+    log_path, video_path = Path(log), Path(video) if video else None
+    start = time.perf_counter()
+    if job == "validate":
+        result = validate_log(log_path, video_path)
+    elif job == "stats":
+        result = summarize_log(log_path, video_path)
+    elif job == "convert":
+        result = convert_log(log_path, video_path, options.get("to", "binary"))
+    elif job == "export":
+        result = export_log(log_path, video_path, options.get("format", "npz"))
+    else:
+        raise ValueError(f"Unknown job: {job}")
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def file_key(path: Path) -> Tuple[int, int]:
+    """``(size, mtime_ns)``: what a re-run compares to decide that a log is unchanged."""
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_manifest(path: Path) -> Dict[Tuple[str, str], Dict]:
+    done: Dict[Tuple[str, str], Dict] = {}
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            done[(entry["job"], entry["log"])] = entry
+    return done
+
+
+def pending(pairs, job: str, manifest: Dict) -> Iterator[Tuple[Path, Optional[Path]]]:
+    for log, video in pairs:
+        entry = manifest.get((job, str(log)))
+        if entry and (entry["size"], entry["mtime_ns"]) == file_key(log):
+            continue
+        yield log, video
+
+
+def run_batch(
+    root: Path,
+    job: str,
+    workers: Optional[int] = None,
+    manifest_path: Optional[Path] = None,
+    options: Optional[Dict] = None,
+    progress: bool = True,
+) -> List[Dict]:
+    root = Path(root)
+    options = options or {}
+    manifest_path = manifest_path or root / MANIFEST_NAME
+    if job == "convert":
+        prefer = ".jsonl" if options.get("to", "binary") == "binary" else binlog.SUFFIX
+    else:
+        prefer = binlog.SUFFIX
+    pairs = discover(root, prefer)
+    todo = list(pending(pairs, job, load_manifest(manifest_path)))
+    results: List[Dict] = []
+    if progress:
+        print(f"{job}: {len(todo)} of {len(pairs)} sessions to process", file=sys.stderr)
+    if not todo:
+        return results
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool, manifest_path.open("a", encoding="utf-8") as manifest:
+        futures = {pool.submit(run_job, job, str(log), str(video) if video else None, options): log for log, video in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            log = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = {"error": f"{type(exc).__name__}: {exc}"}
+            result["log"] = str(log)
+            results.append(result)
+            if "error" not in result:
+                size, mtime_ns = file_key(log)
+                manifest.write(json.dumps({"job": job, "log": str(log), "size": size, "mtime_ns": mtime_ns}) + "\n")
+                manifest.flush()
+            if progress:
+                elapsed = time.perf_counter() - start
+                eta = elapsed / done * (len(todo) - done)
+                print(f"\r[{done}/{len(todo)}] {done / elapsed:5.1f} files/s  eta {eta:5.0f}s", end="", file=sys.stderr)
+    if progress:
+        print(file=sys.stderr)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a job over every session log in a recordings directory.")
+    parser.add_argument("job", choices=JOBS)
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--manifest", type=Path, help=f"default: <root>/{MANIFEST_NAME}")
+    parser.add_argument("--output", type=Path, help="write one JSON result per line here")
+    parser.add_argument("--to", choices=["binary", "jsonl"], default="binary", help="convert: target format")
+    parser.add_argument("--format", choices=["npz", "npy"], default="npz", help="export: array format")
+    args = parser.parse_args()
+
+    results = run_batch(args.root, args.job, args.workers, args.manifest, {"to": args.to, "format": args.format})
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as handle:
+            for result in results:
+                handle.write(json.dumps(result) + "\n")
+    failed = [r for r in results if "error" in r or r.get("ok") is False]
+    for result in failed:
+        print(f"{result['log']}: {result.get('error') or '; '.join(result.get('errors', []))}")
+    print(f"{len(results)} processed, {len(failed)} with problems")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Memory while the log writer stalls: bounded queue, spill file and drops.
+
+Floods the real backend_legacy callbacks with clicks and keys from the
+loadgen threads. After ``--stall-after`` seconds, every log write blocks for
+``--stall`` seconds, as on a slow or full disk. Then the writer catches up.
+Each configuration runs in a fresh interpreter, so RSS is its own:
+
+    before     no drain ticker, nothing bounded: events pile up in the capture
+               buffers, then one huge flush (the old behaviour)
+    memory     drain ticker, everything kept in RAM (``memory_bytes`` unbounded)
+    spill      RAM capped at ``--memory-mb``, the rest spilled to a temp file
+    drop       RAM and spill file both capped, oldest batches dropped
+
+It reports RSS growth over the baseline (peak and at the end of the stall),
+events produced and written (clicks, keys and sampler frames), spilled MB,
+dropped events, and callback p99.
+The callback p99 shows the capture threads never waited on the writer.
+
+Run from the repo root:  python -m benchmarks.bench_backpressure [--stall S] [--rate N]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+import backend_legacy as legacy
+import binlog
+import spill
+from benchmarks.loadgen import Profile, WriterThreads, _keyboard_thread, _raw_input_thread, key_schedule
+from telemetry import METRICS
+
+CONFIGS = {
+    # name: (drain ticker, memory bytes, spill bytes)
+    "before": (False, 1 << 62, 0),
+    "memory": (True, 1 << 62, 0),
+    "spill": (True, None, spill.SPILL_BYTES),
+    "drop": (True, None, None),
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc; 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as handle:
+            pages = int(handle.read().split()[1])
+    except OSError:
+        return 0.0
+    return pages * 4096 / 1e6
+
+
+def run_one(name: str, args) -> Dict:
+    ticker, memory_bytes, spill_bytes = CONFIGS[name]
+    memory_bytes = memory_bytes if memory_bytes is not None else int(args.memory_mb * 1e6)
+    spill_bytes = spill_bytes if spill_bytes is not None else int(args.memory_mb * 1e6)
+    if not ticker:
+        legacy.DRAIN_INTERVAL = 1e9
+    profile = Profile("flood", mouse_hz=1000, click_hz=args.rate / 2, key_apm=600)
+    seconds = args.stall_after + args.stall + args.after
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        legacy.start_recording(memory_bytes=memory_bytes, spill_bytes=spill_bytes, drop_policy="oldest")
+        legacy.set_recording_start()
+        legacy.save_log(str(Path(out_dir) / "backpressure.mkv"), "jsonl", compression="none")
+        log = legacy.segment_log
+        start = legacy.recording_start_perf
+        stall_start = start + args.stall_after
+        stall_end = stall_start + args.stall
+        append_line = log.append_line
+
+        def stalling_append(*a, **kw):
+            # The writer blocks here, as in a write() to a stalled disk.
+            while stall_start <= time.perf_counter() < stall_end:
+                time.sleep(0.05)
+            return append_line(*a, **kw)
+
+        log.append_line = stalling_append
+        legacy.raw_mouse_stop.clear()
+        sampler = threading.Thread(target=legacy.record_mouse_delta_30hz, args=(start,), daemon=True)
+        sampler.start()
+        writer = WriterThreads(1.0).start()
+
+        stop = threading.Event()
+        mouse_out: Dict = {}
+        key_out: Dict = {}
+        producers = [
+            threading.Thread(target=_raw_input_thread, args=(profile, start, seconds, stop, mouse_out), daemon=True),
+            threading.Thread(target=_keyboard_thread, args=(key_schedule(profile, seconds), start, stop, key_out), daemon=True),
+        ]
+        time.sleep(0.5)
+        baseline = rss_mb()
+        for thread in producers:
+            thread.start()
+        peak = stalled_rss = 0.0
+        while any(thread.is_alive() for thread in producers):
+            if not stalled_rss and time.perf_counter() >= stall_end - 0.3:
+                stalled_rss = rss_mb()
+            peak = max(peak, rss_mb())
+            time.sleep(0.1)
+
+        legacy.raw_mouse_stop.set()
+        sampler.join(timeout=1.0)
+        writer.stop(timeout=None)
+        peak = max(peak, rss_mb())
+        manifest = legacy.log_file_path
+        legacy.close_log()
+        written = sum(
+            len(r["mouse_events"]) + len(r["keyboard_events"]) + len(r["mouse_positions"]) for r in binlog.iter_log_records(manifest)
+        )
+        metrics = METRICS.snapshot()
+        return {
+            "config": name,
+            "rss_peak_mb": peak - baseline,
+            "rss_stalled_mb": stalled_rss - baseline,
+            "events": mouse_out["clicks"] + key_out["keys"] + legacy.mouse_sampler.stats()["frames"],
+            "written": written,
+            "spilled_mb": metrics["counters"]["spill.bytes"] / 1e6,
+            "dropped": metrics["counters"]["spill.dropped_events"],
+            "callback_p99_us": metrics["histograms"]["callback.mouse"]["p99"] * 1e6,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("configs", nargs="*", help=f"subset of {', '.join(CONFIGS)}")
+    parser.add_argument("--rate", type=float, default=20000.0, help="clicks per second")
+    parser.add_argument("--stall-after", type=float, default=2.0)
+    parser.add_argument("--stall", type=float, default=20.0, help="seconds every write blocks")
+    parser.add_argument("--after", type=float, default=3.0, help="seconds of input after the stall")
+    parser.add_argument("--memory-mb", type=float, default=4.0, help="RAM cap (spill, drop) and spill cap (drop)")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one, args)))
+        return
+    print(f"{args.rate:g} clicks/s, writes blocked for {args.stall:g} s, caps {args.memory_mb:g} MB\n")
+    print(f"{'config':8s} {'RSS peak':>9s} {'RSS stall':>10s} {'events':>8s} {'written':>8s} {'spilled MB':>11s} {'dropped':>8s} {'cb p99 us':>10s}")
+    for name in args.configs or CONFIGS:
+        cmd = [sys.executable, "-m", "benchmarks.bench_backpressure", "--one", name] + [
+            f"--{key.replace('_', '-')}={getattr(args, key)}" for key in ("rate", "stall_after", "stall", "after", "memory_mb")
+        ]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{r['config']:8s} {r['rss_peak_mb']:9.1f} {r['rss_stalled_mb']:10.1f} {r['events']:8d} {r['written']:8d}"
+            f" {r['spilled_mb']:11.1f} {r['dropped']:8d} {r['callback_p99_us']:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Scaling of batch.py over a directory of synthetic sessions.
+
+Run from the repo root:  python -m benchmarks.bench_batch [--sessions N] [--minutes M]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import batch
+from benchmarks.synthetic_log import write_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--job", choices=batch.JOBS, default="stats")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        for i in range(args.sessions):
+            write_session(root / f"game_recording_{i:04d}_log.jsonl", args.minutes * 60, seed=i)
+            (root / f"game_recording_{i:04d}.mkv").touch()
+
+        baseline = None
+        for workers in worker_counts:
+            manifest = root / f"manifest_{workers}.jsonl"
+            start = time.perf_counter()
+            results = batch.run_batch(root, args.job, workers, manifest, progress=False)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:2d}  {len(results)} sessions  {elapsed:6.2f}s  speedup {baseline / elapsed:4.2f}x")
+
+            # A second run with the same manifest is a no-op.
+            start = time.perf_counter()
+            assert not batch.run_batch(root, args.job, workers, manifest, progress=False)
+            print(f"            resume with manifest: {time.perf_counter() - start:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Size and parse-time comparison of JSONL vs binary session logs.
+
+Run from the repo root:  python -m benchmarks.bench_binlog [--minutes M]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import binlog
+from benchmarks.synthetic_log import write_session
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def parse_jsonl(path: Path) -> int:
+    rows = 0
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            rows += len(record["mouse_positions"]) + len(record["mouse_events"]) + len(record["keyboard_events"])
+    return rows
+
+
+def parse_binary_columns(path: Path) -> int:
+    rows = 0
+    with path.open("rb") as handle:
+        for chunk in binlog.BinaryLogReader(handle):
+            rows += len(chunk.positions) + len(chunk.mouse) + len(chunk.keyboard)
+    return rows
+
+
+def parse_binary_records(path: Path) -> int:
+    rows = 0
+    for record in binlog.iter_records(path):
+        rows += len(record["mouse_positions"]) + len(record["mouse_events"]) + len(record["keyboard_events"])
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = write_session(Path(tmp) / "session_log.jsonl", args.minutes * 60)
+        dst = binlog.jsonl_to_binary(src, Path(tmp) / "session_log.gmlb")
+        rows = parse_jsonl(src)
+        assert parse_binary_columns(dst) == rows == parse_binary_records(dst)
+
+        jsonl_size, bin_size = src.stat().st_size, dst.stat().st_size
+        t_json = min(_timed(lambda: parse_jsonl(src)) for _ in range(3))
+        t_cols = min(_timed(lambda: parse_binary_columns(dst)) for _ in range(3))
+        t_recs = min(_timed(lambda: parse_binary_records(dst)) for _ in range(3))
+
+    print(f"rows: {rows}")
+    print(f"size   jsonl {jsonl_size / 1e6:8.2f} MB   binary {bin_size / 1e6:8.2f} MB   ({jsonl_size / bin_size:.1f}x)")
+    print(f"parse  jsonl {t_json * 1e3:8.1f} ms   binary columns {t_cols * 1e3:8.1f} ms   ({t_json / t_cols:.1f}x)")
+    print(f"             binary -> dicts {t_recs * 1e3:8.1f} ms   ({t_json / t_recs:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
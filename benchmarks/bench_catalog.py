@@ -0,0 +1,143 @@
+"""
+Session catalog: backfill scan, incremental rescans, per-session update and query latency.
+
+Builds a recordings directory of ``--logs`` short synthetic ``*_log.jsonl``
+sessions (benchmarks/synthetic_log.py), each with an empty video, plus one
+60-minute segmented log closed with its summary, as the recorder writes it.
+Then it times:
+
+    scan           the first backfill (every log read on the process pool)
+    rescan         nothing changed: every log skipped by size and mtime
+    touched        a rescan after appending to a few logs
+    record         ``record_session`` for the 60-minute segmented log, which
+                   is what stopping a recording costs
+    queries        median over repeated runs against ``--sessions`` catalog
+                   rows (the scanned ones plus synthetic rows)
+
+Run from the repo root:  python -m benchmarks.bench_catalog [--logs N] [--sessions N]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import backend_legacy as legacy
+import binlog
+import catalog
+import log_segments
+import spill
+from benchmarks.synthetic_log import KEY_POOL, session_records, write_session
+from session_stats import SessionStats
+
+TOUCHED = 5
+QUERY_RUNS = 20
+
+
+def make_library(root: Path, logs: int) -> Path:
+    rng = random.Random(0)
+    for i in range(logs):
+        stem = f"game_recording_2024-01-{1 + i // 200:02d}_{i:05d}"
+        write_session(root / f"{stem}_log.jsonl", rng.uniform(20.0, 120.0), seed=i)
+        (root / f"{stem}.mkv").touch()
+    # One long session the way the recorder leaves it: segmented, with a summary.
+    stem = "game_recording_2024-02-01_long"
+    manifest = root / f"{stem}_log{log_segments.MANIFEST_SUFFIX}"
+    log = log_segments.SegmentedLog(manifest, "jsonl", {"video_file": f"{stem}.mkv"}, "gzip")
+    stats = SessionStats()
+    for record in session_records(3600.0):
+        positions, mouse, keyboard = binlog.buffers_from_record(record)
+        legacy._write_batch(spill.Batch(record["timestamp"], record["relative_timestamp"], keyboard, mouse, positions), log, f"{stem}.mkv", stats)
+    legacy._close_with_summary(log, f"{stem}.mkv", stats, stats.duration)
+    (root / f"{stem}.mkv").touch()
+    return manifest
+
+
+def synthetic_row(i: int, rng: random.Random) -> dict:
+    duration = rng.uniform(300.0, 3 * 3600.0)
+    apm = rng.uniform(50.0, 600.0)
+    keys = {key: rng.randint(0, int(apm * duration / 60 / 5)) for key in rng.sample(KEY_POOL, 8)}
+    return {
+        "log": f"/library/synthetic_{i:06d}_log.manifest.json",
+        "video": f"/library/synthetic_{i:06d}.mkv",
+        "format": "jsonl",
+        "size": 1,
+        "mtime_ns": 1,
+        "started": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00",
+        "duration": duration,
+        "frames": int(duration * 30),
+        "missing_frames": 0,
+        "key_presses": sum(keys.values()),
+        "clicks": int(duration),
+        "scrolls": int(duration / 10),
+        "apm": apm,
+        "mouse_travel": duration * 1000.0,
+        "idle_total": 0.0,
+        "key_histogram": keys,
+        "click_histogram": {"left": int(duration / 2), "right": int(duration / 8)},
+        "segments": None,
+        "index_path": None,
+        "index_entries": None,
+    }
+
+
+def timed(fn, runs: int = 1) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logs", type=int, default=300, help="synthetic session logs to scan")
+    parser.add_argument("--sessions", type=int, default=5000, help="catalog rows the queries run against")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        long_manifest = make_library(root, args.logs)
+        total = args.logs + 1
+
+        seconds = timed(lambda: catalog.scan(root, args.workers, progress=False))
+        print(f"scan           {total} logs in {seconds:.2f} s ({total / seconds:.0f} logs/s)")
+        seconds = timed(lambda: catalog.scan(root, args.workers, progress=False))
+        print(f"rescan         {seconds * 1e3:.1f} ms, nothing changed")
+        for log in sorted(root.glob("*_log.jsonl"))[:TOUCHED]:
+            with log.open("a", encoding="utf-8") as handle:
+                handle.write("\n")
+        result = {}
+        seconds = timed(lambda: result.update(catalog.scan(root, args.workers, progress=False)))
+        print(f"touched        {seconds * 1e3:.1f} ms, {result['read']} of {result['sessions']} re-read")
+        seconds = timed(lambda: catalog.record_session(root, long_manifest, root / "game_recording_2024-02-01_long.mkv"), 5)
+        print(f"record         {seconds * 1e3:.1f} ms for a 60-minute segmented session")
+
+        conn = catalog.connect(catalog.catalog_path_for(root))
+        rng = random.Random(1)
+        extra = max(0, args.sessions - total)
+        started = time.perf_counter()
+        for i in range(extra):
+            catalog.upsert(conn, synthetic_row(i, rng))
+        seconds = time.perf_counter() - started
+        print(f"upsert         {seconds / max(1, extra) * 1e3:.2f} ms per session ({extra} synthetic rows added)\n")
+
+        queries = {
+            "over an hour, apm > 300": dict(min_duration=3600, min_apm=300),
+            "'w' pressed >= 2000 times": dict(key="w", min_presses=2000),
+            "since 2024-06, top 20 by apm": dict(since="2024-06", order="apm", limit=20),
+            "everything": {},
+        }
+        for label, filters in queries.items():
+            rows = []
+            seconds = timed(lambda: rows.__setitem__(slice(None), catalog.find(conn, **filters)), QUERY_RUNS)
+            print(f"{label:30s} {len(rows):6d} rows  {seconds * 1e3:7.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
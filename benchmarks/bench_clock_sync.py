@@ -0,0 +1,127 @@
+"""
+Accuracy of the input-to-video clock model against a drifting OBS stand-in.
+
+The stand-in's first frame lands ``--latency`` seconds after it reports the
+output started, and its video clock runs ``--drift-ppm`` fast. Output
+duration is frame-quantized the way OBS reports it.
+
+    live       a real OBSRecorder session of ``--seconds`` over the websocket
+               (ClockSampler every 0.5 s), checked against the stand-in's
+               exact video clock on a 1 ms grid; the log's last record must
+               carry the model
+    simulated  the same stand-in clock and DriftModel over a 2 h session
+               sampled every 5 s with 0.5-3 ms round trips, reported at
+               checkpoints
+
+"naive" is what the log implied before: video time == input time.
+
+Run from the repo root:  python -m benchmarks.bench_clock_sync [--seconds S]
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import backend_legacy as legacy
+import binlog
+import clock_sync
+import recorder_core
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.obs_standin import StandInOBS
+from obs_control import OBSRecorder
+
+FPS = 30.0
+CHECKPOINTS = (60, 600, 1800, 3600, 7200)
+
+
+def errors(params, truth, xs):
+    """(max |error| ms, share of inputs mapped to the right frame) for model and naive."""
+    y = truth(xs)
+    out = []
+    for mapped in (clock_sync.to_video_seconds(xs, params), xs):
+        err = np.abs(mapped - y).max() * 1e3
+        same = (np.floor(mapped * FPS) == np.floor(y * FPS)).mean()
+        out.append((err, same))
+    return out
+
+
+def live(seconds: float, latency: float, drift_ppm: float):
+    legacy._input_backend = IdleInput
+    with tempfile.TemporaryDirectory() as out_dir, StandInOBS(start_delay=0.02, encoder_latency=latency, drift_ppm=drift_ppm) as server:
+        recorder = OBSRecorder(server.host, server.port, "", "", out_dir, log_format="binary", clock_interval=0.5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorder.connect()
+            recorder.start_recording()
+            start = legacy.recording_start_perf
+            time.sleep(seconds)
+            params = legacy.clock_model.params()
+            recorder.stop_recording()
+            recorder.disconnect()
+            recorder_core.shutdown()
+        logged = None
+        for record in binlog.iter_log_records(next(Path(out_dir).glob("*_log.manifest.json"))):
+            logged = record.get("clock", logged)
+    xs = np.arange(0.0, seconds, 0.001)
+    return params, errors(params, lambda x: server.video_seconds(start + x), xs), logged is not None
+
+
+def simulated(latency: float, drift_ppm: float, seed: int = 0):
+    rng = random.Random(seed)
+    server = StandInOBS(encoder_latency=latency, drift_ppm=drift_ppm)
+    server.close()  # only its video clock is used
+    server.active_since = 0.0
+    start = 0.002  # input zero: when the STARTED event arrived
+    model = clock_sync.DriftModel(1.0 / FPS)
+    results = []
+    t, samples, checkpoints = start, 0, list(CHECKPOINTS)
+    while checkpoints:
+        t += 0.25 if samples < 8 else 5.0
+        rtt = rng.uniform(0.0005, 0.003)
+        served = t + rng.uniform(0.0, rtt)
+        duration_ms = server.output_duration_ms(served)
+        if duration_ms:
+            model.add(t + rtt / 2 - start, duration_ms / 1e3, rtt)
+            samples += 1
+        if t - start >= checkpoints[0]:
+            span = checkpoints.pop(0)
+            params = model.params()
+            xs = np.linspace(0.0, span, 200_001)
+            results.append((span, params, errors(params, lambda x: server.video_seconds(start + x), xs)))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--latency", type=float, default=0.12, help="encoder start-up latency, s")
+    parser.add_argument("--drift-ppm", type=float, default=80.0)
+    args = parser.parse_args()
+
+    true_offset = -args.latency * (1 + args.drift_ppm * 1e-6)
+    print(f"truth: offset {true_offset * 1e3:.1f} ms (plus the zero-point lag), drift {args.drift_ppm:+.0f} ppm\n")
+    print(f"{'session':>10s} {'offset ms':>10s} {'drift ppm':>10s} {'max err ms':>11s} {'right frame':>12s} {'naive err ms':>13s} {'naive frame':>12s}")
+
+    params, ((err, same), (naive_err, naive_same)), logged = live(args.seconds, args.latency, args.drift_ppm)
+    print(
+        f"{'live ' + format(args.seconds, 'g') + 's':>10s} {params['offset'] * 1e3:10.1f} {params['drift_ppm']:10.1f}"
+        f" {err:11.2f} {same:11.1%} {naive_err:13.1f} {naive_same:11.1%}"
+    )
+    for span, params, ((err, same), (naive_err, naive_same)) in simulated(args.latency, args.drift_ppm):
+        label = f"sim {span // 60:g}min" if span < 3600 else f"sim {span / 3600:g}h"
+        print(
+            f"{label:>10s} {params['offset'] * 1e3:10.1f} {params['drift_ppm']:10.1f}"
+            f" {err:11.2f} {same:11.1%} {naive_err:13.1f} {naive_same:11.1%}"
+        )
+    print(f"\nlog records carry the model: {logged}")
+    assert logged and not math.isnan(params["offset"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Recorder daemon: command round trips and session start latency, warm against cold.
+
+Runs the real ``RecorderDaemon`` against the stand-in OBS server
+(benchmarks/obs_standin.py, no encoder delay) with loadgen's synthetic input
+threads calling the capture callbacks the whole time. It drives the daemon
+over its TCP control socket with ``ControlClient`` and reports:
+
+    start / stop     round trip of the command, p50/max over ``--cycles``
+    rotate           stop + start in one command
+    status, metrics  round trip of the read-only commands
+    unarmed start    start round trip for a daemon run without pre-roll
+                     (obs.py's default): input capture starts with the session
+    cold start       what each session cost before the daemon: a new
+                     controller, OBS connection and input start, then start
+
+It then checks that every session left a closed log with input in it and a
+row in the catalog.
+
+Run from the repo root:  python -m benchmarks.bench_daemon [--cycles N]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import backend_legacy as legacy
+import catalog
+import log_segments
+import recorder_core
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.loadgen import PROFILES, _keyboard_thread, _raw_input_thread, key_schedule
+from benchmarks.obs_standin import StandInOBS
+from daemon import ControlClient, RecorderDaemon
+from obs_control import PreRollService, RecorderController
+
+SESSION_SECONDS = 0.3
+
+
+def round_trips(client: ControlClient, command: str, runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        reply = client.command(command)
+        times.append(time.perf_counter() - started)
+        if not reply["ok"]:
+            raise RuntimeError(f"{command}: {reply['error']}")
+    return times
+
+
+def line(label: str, times: List[float]) -> str:
+    return f"{label:14s} p50 {statistics.median(times) * 1e3:7.2f} ms  max {max(times) * 1e3:7.2f} ms  (n={len(times)})"
+
+
+def warm(server: StandInOBS, out_dir: Path, cycles: int, armed: bool = True) -> Dict[str, List[float]]:
+    preroll = PreRollService(0.0) if armed else None
+    recorder = RecorderController(server.host, server.port, "", "", str(out_dir), log_interval_seconds=0.1, preroll=preroll)
+    daemon = RecorderDaemon(recorder, "127.0.0.1:0", preroll)
+    running = recorder_core.submit(daemon.run())
+    recorder_core.run(daemon.wait_ready())
+    results: Dict[str, List[float]] = {"start": [], "stop": [], "rotate": []}
+    try:
+        with ControlClient(daemon.address()) as client:
+            for _ in range(cycles):
+                results["start"] += round_trips(client, "start", 1)
+                time.sleep(SESSION_SECONDS)
+                results["rotate"] += round_trips(client, "rotate", 1)
+                time.sleep(SESSION_SECONDS)
+                results["stop"] += round_trips(client, "stop", 1)
+            results["status"] = round_trips(client, "status", 200)
+            results["metrics"] = round_trips(client, "metrics", 50)
+            status = client.command("status")
+            results["sessions"] = status["sessions"]
+            client.command("shutdown")
+        running.result(timeout=10)
+    finally:
+        recorder_core.run(daemon.shutdown())
+    return results
+
+
+def cold(server: StandInOBS, out_dir: Path, cycles: int) -> List[float]:
+    times = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        recorder = RecorderController(server.host, server.port, "", "", str(out_dir), catalog_sessions=False)
+        recorder_core.run(recorder.connect())
+        recorder_core.run(recorder.start_recording())
+        times.append(time.perf_counter() - started)
+        recorder_core.run(recorder.stop_recording())
+        recorder_core.run(recorder.disconnect())
+        recorder_core.shutdown()  # closes the pooled connection, as exiting obs.py did
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cycles", type=int, default=10)
+    args = parser.parse_args()
+
+    legacy._input_backend = IdleInput
+    stop = threading.Event()
+    profile = PROFILES["mixed"]
+    start = time.perf_counter()
+    forever = 1e9
+    for target, target_args in (
+        (_raw_input_thread, (profile, start, forever, stop, {})),
+        (_keyboard_thread, (key_schedule(profile, 600.0), start, stop, {})),
+    ):
+        threading.Thread(target=target, args=target_args, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp, StandInOBS(start_delay=0.0, stop_delay=0.0) as server:
+        out_dir = Path(tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = warm(server, out_dir / "warm", args.cycles)
+            unarmed = warm(server, out_dir / "unarmed", args.cycles, armed=False)
+            cold_times = cold(server, out_dir / "cold", args.cycles)
+        stop.set()
+
+        print(f"daemon, {results['sessions']} sessions with {profile.name} synthetic input\n")
+        for label in ("start", "stop", "rotate", "status", "metrics"):
+            print(line(label, results[label]))
+        print(line("unarmed start", unarmed["start"]))
+        print(line("cold start", cold_times))
+
+        manifests = sorted((out_dir / "warm").glob(f"*_log{log_segments.MANIFEST_SUFFIX}"))
+        summaries = [log_segments.read_manifest(m).get("summary") or {} for m in manifests]
+        with_input = sum(1 for s in summaries if s.get("clicks", 0) + s.get("key_presses", 0) + s.get("frames", 0) > 0)
+        conn = catalog.connect(catalog.catalog_path_for(out_dir / "warm"))
+        rows = len(catalog.find(conn))
+        conn.close()
+        print(
+            f"\nsessions: {len(manifests)} logs, {with_input} with input,"
+            f" {sum(log_segments.read_manifest(m)['complete'] for m in manifests)} closed, {rows} in the catalog"
+        )
+
+
+if __name__ == "__main__":
+    main()
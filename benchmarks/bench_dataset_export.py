@@ -0,0 +1,39 @@
+"""
+Throughput of frame-aligned dataset export, in video frames per second.
+
+Run from the repo root:  python -m benchmarks.bench_dataset_export [--minutes M]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import binlog
+import dataset_export
+from benchmarks.synthetic_log import write_session
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = write_session(Path(tmp) / "session_log.jsonl", args.minutes * 60)
+        sources = {"jsonl": src, "binary": binlog.jsonl_to_binary(src, Path(tmp) / "session_log.gmlb")}
+        for name, path in sources.items():
+            start = time.perf_counter()
+            cols = dataset_export.collect(path)
+            parsed = time.perf_counter()
+            arrays = dataset_export.build_arrays(cols, fill="spread")
+            done = time.perf_counter()
+            frames = len(arrays["mouse_dx"])
+            print(
+                f"{name:>7}: {frames} frames  parse {parsed - start:6.3f}s  bucket {done - parsed:6.3f}s  "
+                f"total {frames / (done - start):10.0f} frames/s  (bucketing alone {frames / (done - parsed):10.0f} frames/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Memory/GC benchmark: legacy list-of-dicts logging vs columnar event buffers.
+
+Run from the repo root:  python -m benchmarks.bench_event_buffers [--events N]
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import event_buffers as eb
+
+
+def _synthetic_rows(n: int):
+    rng = random.Random(1234)
+    rows = []
+    for i in range(n):
+        rows.append((i, rng.randint(-40, 40), rng.randint(-40, 40), i / 30.0))
+    return rows
+
+
+def legacy_fill(rows):
+    positions, mouse_events, keyboard_events = [], [], []
+    pressed = set()
+    for fi, dx, dy, ts in rows:
+        positions.append({"delta": {"dx": dx, "dy": dy}, "timestamp": ts, "frame_index": fi})
+        mouse_events.append({"type": "click", "action": "press", "button": "left", "position": {"x": dx, "y": dy}, "timestamp": ts})
+        key = "w" if fi & 1 else "shift"
+        pressed.add(key)
+        keyboard_events.append({"type": "press", "keys": sorted(list(pressed)), "timestamp": ts})
+    return positions, mouse_events, keyboard_events
+
+
+def columnar_fill(rows):
+    positions = eb.MousePositionBuffer()
+    mouse_events = eb.MouseEventBuffer()
+    keyboard_events = eb.KeyboardEventBuffer()
+    pressed = 0
+    left = eb.BUTTONS.code("left")
+    press = eb.ACTIONS.code("press")
+    for fi, dx, dy, ts in rows:
+        positions.append(fi, dx, dy, ts)
+        mouse_events.append_click(left, press, dx, dy, ts)
+        key = eb.KEYS.code("w" if fi & 1 else "shift")
+        pressed |= 1 << key
+        keyboard_events.append_press(key, pressed, ts)
+    return positions, mouse_events, keyboard_events
+
+
+def measure(fill, rows):
+    gc.collect()
+    collections_before = sum(stat["collections"] for stat in gc.get_stats())
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fill(rows)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = len(tracemalloc.take_snapshot().traces)
+    tracemalloc.stop()
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections_before
+    return result, elapsed, current, peak, blocks, collections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200_000, help="rows per stream")
+    args = parser.parse_args()
+
+    rows = _synthetic_rows(args.events)
+    events = args.events * 3
+
+    _, l_time, l_mem, l_peak, l_blocks, l_gc = measure(legacy_fill, rows)
+    _, c_time, c_mem, c_peak, c_blocks, c_gc = measure(columnar_fill, rows)
+
+    print(f"{'':>12} {'bytes/event':>12} {'live blocks':>12} {'gc runs':>8} {'appends/s':>12}")
+    print(f"{'dicts':>12} {l_mem / events:12.1f} {l_blocks:12d} {l_gc:8d} {events / l_time:12.0f}")
+    print(f"{'columnar':>12} {c_mem / events:12.1f} {c_blocks:12d} {c_gc:8d} {events / c_time:12.0f}")
+    print(f"memory reduction: {l_mem / max(c_mem, 1):.1f}x, gc runs {l_gc} -> {c_gc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Keyboard hook cost versus chord size: string set + sorted list vs bitset.
+
+With ``k`` keys already held, times a press/release of one more key through
+the original callback (lowercase name, ``set`` of strings,
+``sorted(list(...))`` into a dict per press) and through the current
+``backend_legacy.on_keyboard_event`` (interned code, bitset, one row append).
+The current callback also records its telemetry histogram (two clock reads
+and a bucket increment), which is most of its flat per-event cost.
+
+Run from the repo root:  python -m benchmarks.bench_keyboard_state [--events N]
+"""
+
+import argparse
+import threading
+import time
+import tracemalloc
+
+import backend_legacy as legacy
+from benchmarks.loadgen import KeyEvent
+
+CHORDS = (0, 1, 2, 4, 8, 16, 32, 63)
+
+
+class OriginalHook:
+    """The pre-interning callback, kept verbatim apart from the clock."""
+
+    def __init__(self) -> None:
+        self.currently_pressed = set()
+        self.log_data = {"keyboard_events": []}
+        self.log_data_lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def __call__(self, event) -> None:
+        key_str = (event.name or f"scan_{event.scan_code}").lower()
+        if event.event_type == "down":
+            if key_str in self.currently_pressed: return
+            self.currently_pressed.add(key_str)
+            evt = {"type": "press", "keys": sorted(list(self.currently_pressed)), "timestamp": time.perf_counter() - self.start}
+        else:
+            if key_str in self.currently_pressed: self.currently_pressed.remove(key_str)
+            evt = {"type": "release", "key": key_str, "timestamp": time.perf_counter() - self.start}
+        with self.log_data_lock: self.log_data["keyboard_events"].append(evt)
+
+
+def per_event_ns(hook, chord: int, events: int, repeat: int = 5) -> float:
+    held = [KeyEvent("down", f"Key{i}", i) for i in range(chord)]
+    down, up = KeyEvent("down", "Extra", 999), KeyEvent("up", "Extra", 999)
+    for event in held:
+        hook(event)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(events // 2):
+            hook(down)
+            hook(up)
+        best = min(best, (time.perf_counter() - started) / events)
+    for event in held:
+        hook(KeyEvent("up", event.name, event.scan_code))
+    return best * 1e9
+
+
+def retained_bytes(hook, chord: int, events: int) -> float:
+    """Bytes per event still allocated after ``events`` press/release pairs."""
+    held = [KeyEvent("down", f"Key{i}", i) for i in range(chord)]
+    for event in held:
+        hook(event)
+    down, up = KeyEvent("down", "Extra", 999), KeyEvent("up", "Extra", 999)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(events // 2):
+        hook(down)
+        hook(up)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for event in held:
+        hook(KeyEvent("up", event.name, event.scan_code))
+    return (after - before) / events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=20_000, help="events per timing run")
+    args = parser.parse_args()
+
+    legacy.start_recording()
+    print(f"{'held keys':>9s} {'original ns':>12s} {'bitset ns':>10s} {'speedup':>8s} {'original B':>11s} {'bitset B':>9s}")
+    for chord in CHORDS:
+        old = per_event_ns(OriginalHook(), chord, args.events)
+        old_bytes = retained_bytes(OriginalHook(), chord, args.events)
+        legacy.keyboard_queue.swap()
+        new = per_event_ns(legacy.on_keyboard_event, chord, args.events)
+        legacy.keyboard_queue.swap()
+        new_bytes = retained_bytes(legacy.on_keyboard_event, chord, args.events)
+        print(f"{chord:9d} {old:12.0f} {new:10.0f} {old / new:7.1f}x {old_bytes:11.0f} {new_bytes:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
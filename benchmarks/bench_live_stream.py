@@ -0,0 +1,153 @@
+"""
+Shared-memory live stream: producer overhead, end-to-end latency and overruns.
+
+Three parts:
+
+    overhead     ns per capture callback (raw_on_delta, raw_on_click,
+                 on_keyboard_event) with the live stream off and on, called
+                 back to back on one thread
+    end-to-end   the loadgen profile (default ``mixed``: 8 kHz polling, clicks,
+                 key bursts, scroll storms) through the real callbacks with the
+                 stream open, followed by ``--readers`` reader processes.
+                 Each reports events received, overruns and the latency
+                 ``perf_counter()`` at read minus the event's ``t``
+                 (p50/p99/max); that includes the reader's poll interval
+    overrun      a reader that falls more than a ring behind must skip to the
+                 oldest record left and count exactly what it missed
+
+Run from the repo root:  python -m benchmarks.bench_live_stream [--seconds S] [--readers N]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import backend_legacy as legacy
+import live_stream as ls
+from benchmarks.loadgen import PROFILES, KeyEvent, run_profile
+
+BENCH_NAME = "game_monitor_live_bench"
+
+
+def per_call_ns(fn, args_list: List[tuple]) -> float:
+    started = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1e9
+
+
+def overhead(calls: int) -> Dict[str, tuple]:
+    deltas = [(i % 7 - 3, i % 5 - 2) for i in range(calls)]
+    clicks = [("left", "press" if i % 2 else "release", 640, 360) for i in range(calls // 10)]
+    keys = [(KeyEvent("down" if i % 2 else "up", "w", 0),) for i in range(calls // 10)]
+    results = {}
+    for label, fn, args_list in (
+        ("raw_on_delta", legacy.raw_on_delta, deltas),
+        ("raw_on_click", legacy.raw_on_click, clicks),
+        ("on_keyboard_event", legacy.on_keyboard_event, keys),
+    ):
+        timings = []
+        for on in (False, True):
+            legacy.start_recording()
+            legacy.set_recording_start()
+            if on:
+                legacy.open_live_stream(BENCH_NAME)
+            per_call_ns(fn, args_list[: len(args_list) // 10])  # warm up
+            timings.append(min(per_call_ns(fn, args_list) for _ in range(3)))
+            legacy.close_live_stream()
+        results[label] = tuple(timings)
+    return results
+
+
+def reader(name: str, seconds: float, interval: float) -> None:
+    """Reader process: follow ``name`` and print a JSON report on stdout."""
+    latencies: List[float] = []
+    kinds: Dict[str, int] = {}
+    with ls.LiveReader(name) as live:
+        print("ready", flush=True)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            events = live.poll(timeout=0.1, interval=interval)
+            now = time.perf_counter()
+            for event in events:
+                latencies.append(now - event.t)
+                kinds[event.kind] = kinds.get(event.kind, 0) + 1
+        overruns = live.overruns
+    print(json.dumps({"latencies": latencies, "kinds": kinds, "overruns": overruns}), flush=True)
+
+
+def end_to_end(args) -> None:
+    legacy.open_live_stream(BENCH_NAME)
+    readers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_live_stream", "--reader", BENCH_NAME, "--seconds", str(args.seconds + 1.0), "--interval", str(args.interval)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(args.readers)
+    ]
+    for proc in readers:
+        proc.stdout.readline()  # "ready"
+    stats = run_profile(PROFILES[args.profile], args.seconds)
+    published = legacy.live.published
+    legacy.close_live_stream()
+
+    print(
+        f"{args.profile} for {args.seconds:g} s: {published} records published ({published / args.seconds:.0f}/s),"
+        f" mouse {stats['mouse_per_sec']:.0f} Hz, max backlog {stats['max_backlog']}, cpu {stats['cpu_percent']:.0f}%"
+    )
+    for i, proc in enumerate(readers):
+        report = json.loads(proc.communicate()[0].splitlines()[-1])
+        lat = sorted(report["latencies"])
+        q = statistics.quantiles(lat, n=100, method="inclusive") if len(lat) > 1 else [0.0] * 99
+        received = sum(report["kinds"].values())
+        print(
+            f"reader {i}:     {received} events ({', '.join(f'{k} {n}' for k, n in sorted(report['kinds'].items()))}),"
+            f" overruns {report['overruns']}, latency ms p50 {q[49] * 1e3:.2f} p99 {q[98] * 1e3:.2f} max {lat[-1] * 1e3 if lat else 0:.2f}"
+        )
+
+
+def overrun_check(slots: int) -> None:
+    stream = ls.LiveStream(BENCH_NAME, slots)
+    try:
+        with ls.LiveReader(BENCH_NAME) as live:
+            stream.delta(1, 1)
+            first = live.read()
+            for i in range(3 * slots):
+                stream.delta(i, 0)
+            events = live.read()
+            lost = live.overruns
+    finally:
+        stream.close()
+    expected_lost = 3 * slots - slots
+    ok = len(first) == 1 and len(events) == slots and lost == expected_lost and events[-1].a == 3 * slots - 1
+    print(f"overrun:      {slots}-slot ring, {3 * slots} records behind: got {len(events)}, overruns {lost} (expected {expected_lost}) {'ok' if ok else 'MISMATCH'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--profile", default="mixed", choices=sorted(PROFILES))
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.0005, help="reader poll interval in seconds")
+    parser.add_argument("--calls", type=int, default=200_000, help="callback calls per overhead timing")
+    parser.add_argument("--reader", metavar="NAME", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.reader:
+        reader(args.reader, args.seconds, args.interval)
+        return
+
+    print(f"{'callback':18s} {'off ns':>8s} {'on ns':>8s} {'added':>8s}")
+    for label, (off, on) in overhead(args.calls).items():
+        print(f"{label:18s} {off:8.0f} {on:8.0f} {on - off:+8.0f}")
+    print()
+    end_to_end(args)
+    overrun_check(1 << 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Contention benchmark: shared ``log_data_lock`` vs per-producer swap buffers.
+
+An 8 kHz synthetic mouse thread (deltas plus a click every 50 events), a
+30 Hz sampler and a writer that flushes JSON to a temp file run together.
+Reports producer call latency and how long anyone waited on a lock/swap.
+
+Run from the repo root:  python -m benchmarks.bench_lock_free [--seconds S]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import event_buffers as eb
+from benchmarks.log_writer import LogWriter
+
+RATE_HZ = 8000
+
+
+def _pace(rate_hz: float, seconds: float, fn) -> list:
+    """Call ``fn(i)`` at ``rate_hz``; return per-call latencies in seconds."""
+    interval = 1.0 / rate_hz
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    i = 0
+    while True:
+        target = start + i * interval
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        if target > now + 0.001:
+            time.sleep(target - now - 0.001)
+            continue
+        t0 = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+    return latencies
+
+
+class LockedPipeline:
+    """The pre-change shape: one lock around dict lists, flush under contention."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.accum_lock = threading.Lock()
+        self.dx = self.dy = 0
+        self.positions, self.mouse_events = [], []
+        self.lock_wait = 0.0
+
+    def on_delta(self, i: int) -> None:
+        with self.accum_lock:
+            self.dx += 1
+            self.dy -= 1
+        if i % 50 == 0:
+            evt = {"type": "click", "action": "press", "button": "left", "position": {"x": i, "y": i}, "timestamp": time.perf_counter()}
+            with self.lock:
+                self.mouse_events.append(evt)
+
+    def sample(self, frame: int) -> None:
+        with self.accum_lock:
+            dx, dy = self.dx, self.dy
+            self.dx = self.dy = 0
+        with self.lock:
+            self.positions.append({"delta": {"dx": dx, "dy": dy}, "timestamp": frame / 30.0, "frame_index": frame})
+
+    def flush(self) -> None:
+        t0 = time.perf_counter()
+        with self.lock:
+            self.lock_wait += time.perf_counter() - t0
+            positions, mouse_events = list(self.positions), list(self.mouse_events)
+            self.positions.clear()
+            self.mouse_events.clear()
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"mouse_events": mouse_events, "mouse_positions": positions}) + "\n")
+
+
+class SwapPipeline:
+    """Current shape: seqlock accumulator + SwapBuffer per producer."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.accum = eb.DeltaAccumulator()
+        self.mouse_events = eb.SwapBuffer(eb.MouseEventBuffer)
+        self.positions = eb.SwapBuffer(eb.MousePositionBuffer)
+        self.left = eb.BUTTONS.code("left")
+        self.press = eb.ACTIONS.code("press")
+
+    @property
+    def lock_wait(self) -> float:
+        return self.mouse_events.swap_wait_total + self.positions.swap_wait_total
+
+    def on_delta(self, i: int) -> None:
+        self.accum.add(1, -1)
+        if i % 50 == 0:
+            q = self.mouse_events
+            q.seq += 1
+            q.front.append_click(self.left, self.press, i, i, time.perf_counter())
+            q.seq += 1
+
+    def sample(self, frame: int) -> None:
+        dx, dy = self.accum.take()
+        q = self.positions
+        q.seq += 1
+        q.front.append(frame, dx, dy, frame / 30.0)
+        q.seq += 1
+
+    def flush(self) -> None:
+        mouse_events = self.mouse_events.swap().to_dicts()
+        positions = self.positions.swap().to_dicts()
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"mouse_events": mouse_events, "mouse_positions": positions}) + "\n")
+
+
+def run(pipeline, seconds: float, flush_interval: float) -> dict:
+    stop = threading.Event()
+    sampler_lat = []
+
+    def sampler() -> None:
+        frame = 0
+        start = time.perf_counter()
+        while not stop.is_set():
+            delay = start + frame / 30.0 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t0 = time.perf_counter()
+            pipeline.sample(frame)
+            sampler_lat.append(time.perf_counter() - t0)
+            frame += 1
+
+    writer = LogWriter(pipeline.flush, flush_interval, name="bench_writer")
+    sampler_thread = threading.Thread(target=sampler, daemon=True)
+    writer.start()
+    sampler_thread.start()
+    latencies = _pace(RATE_HZ, seconds, pipeline.on_delta)
+    stop.set()
+    sampler_thread.join()
+    writer.stop()
+
+    latencies.sort()
+    return {
+        "events": len(latencies),
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "sampler_max_us": max(sampler_lat) * 1e6,
+        "lock_wait_ms": pipeline.lock_wait * 1e3,
+        "flushes": writer.flush_count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--flush-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "locked": run(LockedPipeline(os.path.join(tmp, "locked.jsonl")), args.seconds, args.flush_interval),
+            "swap": run(SwapPipeline(os.path.join(tmp, "swap.jsonl")), args.seconds, args.flush_interval),
+        }
+
+    cols = ["events", "p50_us", "p99_us", "max_us", "sampler_max_us", "lock_wait_ms", "flushes"]
+    print(f"{'':>8} " + " ".join(f"{c:>14}" for c in cols))
+    for name, res in results.items():
+        print(f"{name:>8} " + " ".join(f"{res[c]:14.2f}" if isinstance(res[c], float) else f"{res[c]:14d}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Random-access query latency over growing session logs, via the time index.
+
+Writes one synthetic JSONL session through ``log_segments.SegmentedLog``,
+which writes the index as it goes, until the log reaches each of ``--sizes``
+(uncompressed GB). It repeats one hour of synthetic records, shifted in
+time and frames. At each size, with the recording still open, it reports:
+
+    index time    p50/p99 of ``LogIndex.query_time`` for random 10 s windows
+    index frames  p50/p99 of ``LogIndex.query_frames`` for random 300-frame ranges
+    scan          ``log_segments.iter_records`` for the same 10 s windows,
+                  which decompresses the covering segment from its start
+
+The index columns should stay flat as the log grows. The scan is bounded
+by the segment size. A single-file log without segments would instead
+scale with the whole log.
+
+Run from the repo root:  python -m benchmarks.bench_log_index [--sizes 0.1 1 4] [--codec gzip] [--dir D]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import log_index
+import log_segments
+from benchmarks.synthetic_log import FRAME_INTERVAL, session_records
+
+HOUR = 3600.0
+
+
+def shifted(record: dict, hours: int) -> dict:
+    dt = hours * HOUR
+    frames = round(dt / FRAME_INTERVAL)
+    out = dict(record, relative_timestamp=record["relative_timestamp"] + dt, recording_duration=record["recording_duration"] + dt)
+    out["keyboard_events"] = [dict(e, timestamp=e["timestamp"] + dt) for e in record["keyboard_events"]]
+    out["mouse_events"] = [dict(e, timestamp=e["timestamp"] + dt) for e in record["mouse_events"]]
+    out["mouse_positions"] = [
+        dict(p, timestamp=p["timestamp"] + dt, frame_index=p["frame_index"] + frames) for p in record["mouse_positions"]
+    ]
+    return out
+
+
+def percentiles(values) -> str:
+    q = statistics.quantiles(values, n=100)
+    return f"{q[49] * 1e3:6.2f}/{q[98] * 1e3:<6.2f}"
+
+
+def timed(fn, args_list):
+    times = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1.0, 4.0], help="uncompressed log sizes, GB")
+    parser.add_argument("--codec", choices=list(log_segments.CODECS), default="gzip")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dir", type=Path, help="where to write the log (default: a temporary directory)")
+    args = parser.parse_args()
+
+    hour = list(session_records(HOUR))
+    rng = random.Random(1)
+    print(f"synthetic JSONL session, codec {args.codec}, {args.queries} random queries per size\n")
+    print(f"{'raw GB':>7s} {'disk GB':>8s} {'hours':>6s} {'records':>8s} {'index time ms':>14s} {'index frames ms':>16s} {'scan ms':>8s}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        manifest = Path(tmp) / f"bench_log{log_segments.MANIFEST_SUFFIX}"
+        log = log_segments.SegmentedLog(manifest, "jsonl", {}, args.codec)
+        hours = 0
+        for size in sorted(args.sizes):
+            while sum(segment["raw_bytes"] for segment in log.segments) < size * 1e9:
+                for record in hour:
+                    record = shifted(record, hours)
+                    rows = record["mouse_positions"]
+                    log.append_line(record["relative_timestamp"], json.dumps(record) + "\n", (rows[0]["frame_index"], rows[-1]["frame_index"]))
+                hours += 1
+
+            duration = hours * HOUR
+            windows = [(start, start + 10.0) for start in (rng.uniform(0, duration - 10.0) for _ in range(args.queries))]
+            last_frame = round(duration / FRAME_INTERVAL)
+            frame_ranges = [(first, first + 299) for first in (rng.randrange(last_frame - 300) for _ in range(args.queries))]
+            with log_index.open_index(manifest, create=False) as index:
+                index_times = timed(index.query_time, windows)
+                frame_times = timed(index.query_frames, frame_ranges)
+                records = len(index)
+            scan_times = timed(lambda start, end: list(log_segments.iter_records(manifest, start, end)), windows[:10])
+            raw = sum(segment["raw_bytes"] for segment in log.segments)
+            print(
+                f"{raw / 1e9:7.2f} {log.total_bytes / 1e9:8.2f} {hours:6d} {records:8d} {percentiles(index_times):>14s}"
+                f" {percentiles(frame_times):>16s} {statistics.median(scan_times) * 1e3:8.1f}"
+            )
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Rolling compressed log segments: size, per-flush cost and windowed reads.
+
+Writes a synthetic session's records through ``log_segments.SegmentedLog``
+for each format and codec, the same way the writer does on every flush.
+The first rows are the old single append-only file, which was reopened on
+every flush. For each, this reports:
+
+    size       bytes on disk (all segments) vs uncompressed
+    flush      p50/p99 time to append one 10 s record, compression included
+    window     time to read one minute from the middle of the session,
+               which opens only the segments covering it
+    full       time to read every record back
+
+Run from the repo root:  python -m benchmarks.bench_log_segments [--minutes M]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import binlog
+import log_segments
+from benchmarks.synthetic_log import session_records
+
+
+def percentiles(values) -> str:
+    q = statistics.quantiles(values, n=100)
+    return f"{q[49] * 1e3:6.2f}/{q[98] * 1e3:<6.2f}"
+
+
+def single_file(records, path: Path, log_format: str):
+    """The pre-segment writer: reopen and append per flush."""
+    times = []
+    writer = binlog.BinaryLogWriter(path, {"frame_interval": 1.0 / 30.0}) if log_format == "binary" else None
+    for record in records:
+        started = time.perf_counter()
+        if writer is not None:
+            writer.append(binlog.record_meta(record), *binlog.buffers_from_record(record))
+        else:
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record) + "\n")
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def segmented(records, manifest: Path, log_format: str, codec: str, segment_seconds: float):
+    times = []
+    log = log_segments.SegmentedLog(manifest, log_format, {"frame_interval": 1.0 / 30.0}, codec, segment_seconds)
+    for record in records:
+        if log_format == "binary":
+            args = (binlog.record_meta(record), *binlog.buffers_from_record(record))
+            started = time.perf_counter()
+            log.append_chunk(*args)
+        else:
+            line = json.dumps(record) + "\n"
+            started = time.perf_counter()
+            log.append_line(record["relative_timestamp"], line)
+        times.append(time.perf_counter() - started)
+    log.close()
+    return times, log
+
+
+def read_all(path: Path, start=None, end=None) -> int:
+    if log_segments.is_manifest(path):
+        records = log_segments.iter_records(path, start, end)
+    else:
+        records = binlog.iter_log_records(path)
+        if start is not None:
+            records = (r for r in records if start <= r["relative_timestamp"] <= end + 10.0)
+    return sum(len(r["mouse_positions"]) for r in records)
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--segment-seconds", type=float, default=log_segments.MAX_SECONDS)
+    args = parser.parse_args()
+
+    seconds = args.minutes * 60
+    records = list(session_records(seconds))
+    middle = seconds / 2
+    window = (middle, middle + 60.0)
+    codecs = [codec for codec in log_segments.CODECS if codec != "zstd" or log_segments._zstd() is not None]
+
+    print(f"{args.minutes:g} min session, {len(records)} flushes, segments of {args.segment_seconds:g} s\n")
+    print(f"{'log':22s} {'files':>5s} {'MB':>8s} {'ratio':>6s} {'flush ms':>13s} {'window ms':>10s} {'full ms':>8s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for log_format in ("jsonl", "binary"):
+            path = tmp / f"single_log{log_segments.FORMATS[log_format]}"
+            times = single_file(records, path, log_format)
+            raw = path.stat().st_size
+            print(
+                f"{log_format + ' single file':22s} {1:5d} {raw / 1e6:8.2f} {1.0:6.2f} {percentiles(times):>13s}"
+                f" {timed(lambda: read_all(path, *window)) * 1e3:10.1f} {timed(lambda: read_all(path)) * 1e3:8.1f}"
+            )
+            expected = read_all(path)
+            for codec in codecs:
+                manifest = tmp / f"{log_format}_{codec}_log{log_segments.MANIFEST_SUFFIX}"
+                times, log = segmented(records, manifest, log_format, codec, args.segment_seconds)
+                assert read_all(manifest) == expected
+                print(
+                    f"{log_format + ' ' + codec:22s} {len(log.segments):5d} {log.total_bytes / 1e6:8.2f} {raw / log.total_bytes:6.2f}"
+                    f" {percentiles(times):>13s} {timed(lambda: read_all(manifest, *window)) * 1e3:10.1f}"
+                    f" {timed(lambda: read_all(manifest)) * 1e3:8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
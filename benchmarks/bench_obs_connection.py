@@ -0,0 +1,109 @@
+"""
+Pooled OBS connection: back-to-back start latency, status coalescing and a
+transient disconnect mid-session, against benchmarks.obs_standin.
+
+    fresh    a new OBSConnection (websocket + Identify handshake) per
+             session, torn down at stop: what the GUI did on every Start
+    pooled   obs_connection.shared(), kept warm between sessions
+
+Input capture uses the idle backend from bench_obs_events.
+
+Run from the repo root:  python -m benchmarks.bench_obs_connection [--sessions N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+
+import backend_legacy as legacy
+import obs_connection
+import recorder_core
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.obs_standin import StandInOBS
+from obs_connection import OBSConnection
+from obs_control import OBSRecorder
+
+
+def sessions(server: StandInOBS, out_dir: str, count: int, pooled: bool):
+    """Seconds spent in connect() + start_recording(), per session."""
+    took = []
+    for _ in range(count):
+        connection = None if pooled else OBSConnection(server.host, server.port, "")
+        recorder = OBSRecorder(server.host, server.port, "", "", out_dir, log_format="binary", connection=connection)
+        started = time.perf_counter()
+        recorder.connect()
+        recorder.start_recording()
+        took.append(time.perf_counter() - started)
+        recorder.stop_recording()
+        recorder.disconnect()
+        if connection is not None:
+            recorder_core.run(connection.close())
+    recorder_core.run(obs_connection.close_all())
+    return took
+
+
+def coalescing(server: StandInOBS, callers: int) -> int:
+    """Requests sent when ``callers`` tasks ask for record status at once."""
+
+    async def ask_together():
+        connection = obs_connection.shared(server.host, server.port, "")
+        await connection.open()
+        before = server.requests_made()
+        await asyncio.gather(*(connection.record_status(max_age=0) for _ in range(callers)))
+        sent = server.requests_made() - before
+        await obs_connection.close_all()
+        return sent
+
+    return recorder_core.run(ask_together())
+
+
+def disconnect_mid_session(server: StandInOBS, out_dir: str):
+    connection = OBSConnection(server.host, server.port, "", heartbeat_interval=0.25)
+    recorder = OBSRecorder(server.host, server.port, "", "", out_dir, log_format="binary", connection=connection)
+    recorder.connect()
+    recorder.start_recording()
+    expected = server.output_path
+    dropped = time.perf_counter()
+    server.drop_connections()
+    while connection.connected and time.perf_counter() - dropped < 5:
+        time.sleep(0.001)
+    while not connection.connected and time.perf_counter() - dropped < 10:
+        time.sleep(0.001)
+    recovered = time.perf_counter() - dropped
+    capturing = legacy.mouse_delta_thread is not None and legacy.mouse_delta_thread.is_alive() and recorder.recording_active
+    stopped = recorder.stop_recording()
+    recorder.disconnect()
+    recorder_core.run(connection.close())
+    return recovered, capturing, str(stopped) == expected, connection.reconnects
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    args = parser.parse_args()
+
+    legacy._input_backend = IdleInput
+    with tempfile.TemporaryDirectory() as out_dir, StandInOBS(start_delay=0.02, stop_delay=0.01) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fresh = sessions(server, out_dir, args.sessions, pooled=False)
+            pooled = sessions(server, out_dir, args.sessions, pooled=True)
+            requests = coalescing(server, 8)
+            recovered, capturing, path_ok, reconnects = disconnect_mid_session(server, out_dir)
+
+    # The first pooled session pays the connect; later ones reuse it.
+    print(f"{'connection':10s} {'first start ms':>15s} {'back-to-back p50 ms':>20s}")
+    for name, took in (("fresh", fresh), ("pooled", pooled)):
+        print(f"{name:10s} {took[0] * 1e3:15.1f} {statistics.median(took[1:]) * 1e3:20.1f}")
+    print(f"\n8 concurrent record_status() calls -> {requests} request(s)")
+    print(
+        f"dropped mid-session: reconnected in {recovered * 1e3:.0f} ms ({reconnects} reconnect),"
+        f" capture kept running: {capturing}, final path correct: {path_ok}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+OBS start/stop through RecordStateChanged events vs record-status polling.
+
+Runs real OBSRecorder start/stop cycles against benchmarks.obs_standin. The
+stand-in activates its output after a random 20-300 ms encoder spin-up. For
+each start this reports:
+
+    zero lag   recorder's input zero point minus the moment the stand-in
+               went active (what polling granularity costs the timeline)
+    requests   obs-websocket requests sent per start_recording()
+    path ok    the recorder picked up the output path OBS actually chose
+
+Input capture uses an idle backend, so this runs on any OS.
+
+Run from the repo root:  python -m benchmarks.bench_obs_events [--cycles N]
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import tempfile
+import threading
+
+import backend_legacy as legacy
+import recorder_core
+from benchmarks.obs_standin import StandInOBS
+from obs_control import OBSRecorder
+
+
+class IdleInput:
+    """Input backend with no devices: threads idle until stopped."""
+
+    class RawInputMouseThread(threading.Thread):
+        def __init__(self, on_delta, on_click, on_wheel, stop_event: threading.Event) -> None:
+            super().__init__(daemon=True)
+            self.stop_event = stop_event
+
+        def run(self) -> None:
+            self.stop_event.wait()
+
+    @staticmethod
+    def begin_timer_resolution() -> None:
+        pass
+
+    @staticmethod
+    def end_timer_resolution() -> None:
+        pass
+
+    @staticmethod
+    def hook_keyboard(callback):
+        return None
+
+    @staticmethod
+    def unhook_keyboard(hook) -> None:
+        pass
+
+
+def run_mode(server: StandInOBS, out_dir: str, use_events: bool, cycles: int):
+    recorder = OBSRecorder(server.host, server.port, "", "", out_dir, log_format="binary", use_events=use_events)
+    lags, requests, paths_ok = [], [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.connect()
+        try:
+            for _ in range(cycles):
+                before = server.requests_made()
+                full_path, _name = recorder.start_recording()
+                requests.append(server.requests_made() - before)
+                lags.append(legacy.recording_start_perf - server.started_perf[-1])
+                started_ok = full_path == server.output_path
+                stopped = recorder.stop_recording()
+                paths_ok += started_ok and str(stopped) == server.output_path
+        finally:
+            recorder.disconnect()
+            recorder_core.shutdown()
+    return lags, requests, paths_ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cycles", type=int, default=20)
+    args = parser.parse_args()
+
+    legacy._input_backend = IdleInput
+    rng = random.Random(0)
+    print(f"{'mode':8s} {'zero lag p50 ms':>15s} {'max ms':>7s} {'requests':>9s} {'path ok':>8s}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for mode, use_events in (("events", True), ("polling", False)):
+            with StandInOBS(start_delay=lambda: rng.uniform(0.02, 0.3), stop_delay=0.02) as server:
+                lags, requests, ok = run_mode(server, out_dir, use_events, args.cycles)
+            print(
+                f"{mode:8s} {statistics.median(lags) * 1e3:15.2f} {max(lags) * 1e3:7.2f}"
+                f" {statistics.mean(requests):9.1f} {ok:>4d}/{args.cycles}"
+            )
+
+
+if __name__ == "__main__":
+    main()
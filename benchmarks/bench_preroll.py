@@ -0,0 +1,153 @@
+"""
+Pre-roll ring: fixed memory under sustained input, tick cost and hand-over timestamps.
+
+Arms the real pre-roll (backend_legacy.arm_preroll, no input devices) and
+floods its callbacks from the loadgen threads for ``--seconds``, several
+windows long. A ticker thread calls ``preroll_tick`` every 0.25 s, like
+``PreRollService``. It reports:
+
+    ring MB        preallocated ring size, fixed at arming
+    RSS MB         growth over the baseline after one window and at the end;
+                   it should stay flat once the rings are warm
+    overwritten    rows the flood pushed out early (beyond the nominal rate)
+    tick ms        p50/p99/max of one ring move
+    callback us    p99 of the click and key callbacks, as in a recording
+
+Then it checks the hand-over. A marker click is sent ``--lead`` seconds
+before a recording "starts". The session log's first record must carry it
+at ``-lead`` seconds, with negative sampler frames on the recording's grid
+and nothing older than the window. A replay-buffer save must time the last
+window from 0.
+
+Run from the repo root:  python -m benchmarks.bench_preroll [--window S] [--seconds S]
+"""
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import backend_legacy as legacy
+import log_segments
+from benchmarks.bench_backpressure import rss_mb
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.loadgen import Profile, _keyboard_thread, _raw_input_thread, key_schedule
+from telemetry import METRICS
+
+TICK_INTERVAL = 0.25
+
+
+def ticker(stop: threading.Event, times: List[float]) -> None:
+    while not stop.wait(TICK_INTERVAL):
+        started = time.perf_counter()
+        legacy.preroll_tick()
+        times.append(time.perf_counter() - started)
+
+
+def flood(args) -> Dict:
+    profile = Profile("flood", mouse_hz=8000, click_hz=args.clicks / 2, key_apm=600, scroll_hz=500)
+    start = time.perf_counter()
+    stop = threading.Event()
+    mouse_out: Dict = {}
+    key_out: Dict = {}
+    producers = [
+        threading.Thread(target=_raw_input_thread, args=(profile, start, args.seconds, stop, mouse_out), daemon=True),
+        threading.Thread(target=_keyboard_thread, args=(key_schedule(profile, args.seconds), start, stop, key_out), daemon=True),
+    ]
+    baseline = rss_mb()
+    for thread in producers:
+        thread.start()
+    warm = 0.0
+    while any(thread.is_alive() for thread in producers):
+        if not warm and time.perf_counter() - start >= args.window + 1.0:
+            warm = rss_mb()
+        time.sleep(0.1)
+    return {
+        "rss_warm": warm - baseline,
+        "rss_end": rss_mb() - baseline,
+        "events": mouse_out["clicks"] + mouse_out["wheels"] + key_out["keys"],
+    }
+
+
+def check_handover(args, out_dir: Path) -> None:
+    # Let the flood's events age out of the window, so the marker stands alone.
+    time.sleep(args.window + 2 * TICK_INTERVAL)
+    marker = time.perf_counter()
+    legacy.raw_on_click("right", "press", 1, 2)
+    time.sleep(args.lead)
+
+    replay = legacy.save_preroll(str(out_dir / "replay.mkv"), "jsonl", "none")
+    record, _summary = log_segments.iter_records(replay)
+    times = [event["timestamp"] for event in record["mouse_events"] + record["keyboard_events"]]
+    frames = [row["frame_index"] for row in record["mouse_positions"]]
+    print(
+        f"replay save:  events {min(times, default=0):.3f}..{max(times, default=0):.3f} s,"
+        f" frames {frames[0]}..{frames[-1]} (window {args.window:g} s)"
+    )
+
+    legacy.start_recording()
+    start_perf = time.perf_counter()
+    legacy.start_input_threads(start_perf, time.time())
+    legacy.save_log(str(out_dir / "session.mkv"), "jsonl", "none")
+    time.sleep(0.5)
+    legacy.stop_input_threads()
+    legacy.save_log()
+    manifest = legacy.log_file_path
+    legacy.close_log()
+
+    first, *rest = log_segments.iter_records(manifest)
+    (click,) = [event for event in first["mouse_events"] if event.get("button") == "right"]
+    expected = marker - start_perf
+    rows = first["mouse_positions"]
+    interval = 1.0 / legacy.sample_rate_hz
+    on_grid = all(abs(row["timestamp"] - row["frame_index"] * interval) < 1e-9 for row in rows)
+    print(
+        f"hand-over:    marker at {click['timestamp']:+.4f} s (sent at {expected:+.4f}, error {abs(click['timestamp'] - expected) * 1e3:.3f} ms),"
+        f" pre-roll frames {rows[0]['frame_index']}..{rows[-1]['frame_index']} on grid: {on_grid},"
+        f" oldest row {min(r['timestamp'] for r in rows):+.3f} s"
+    )
+    later = [row["frame_index"] for record in rest for row in record["mouse_positions"]]
+    print(f"session:      {len(rest)} later records, frames {later[0] if later else '-'}..{later[-1] if later else '-'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--window", type=float, default=10.0, help="pre-roll seconds")
+    parser.add_argument("--seconds", type=float, default=30.0, help="flood duration")
+    parser.add_argument("--clicks", type=float, default=1000.0, help="click events per second")
+    parser.add_argument("--lead", type=float, default=1.5, help="seconds between the marker click and the start")
+    args = parser.parse_args()
+
+    legacy._input_backend = IdleInput
+    legacy.arm_preroll(args.window)
+    ring = legacy.preroll
+    stop = threading.Event()
+    tick_times: List[float] = []
+    tick_thread = threading.Thread(target=ticker, args=(stop, tick_times), daemon=True)
+    tick_thread.start()
+
+    r = flood(args)
+    metrics = METRICS.snapshot()
+    q = statistics.quantiles(tick_times, n=100, method="inclusive")
+    print(f"{args.seconds:g} s flood, window {args.window:g} s, {r['events'] / args.seconds:.0f} click/scroll/key events per second\n")
+    print(f"ring MB        {ring.nbytes() / 1e6:.2f}")
+    print(f"RSS MB         +{r['rss_warm']:.1f} after one window, +{r['rss_end']:.1f} at the end")
+    print(f"overwritten    {ring.overwritten} rows (ring holds {len(ring.mouse)} mouse, {len(ring.keyboard)} key, {len(ring.positions)} frames)")
+    print(f"tick ms        {q[49] * 1e3:.2f}/{q[98] * 1e3:.2f}/{max(tick_times) * 1e3:.2f}")
+    print(
+        f"callback us    mouse p99 {metrics['histograms']['callback.mouse']['p99'] * 1e6:.1f},"
+        f" keyboard p99 {metrics['histograms']['callback.keyboard']['p99'] * 1e6:.1f}\n"
+    )
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        check_handover(args, Path(out_dir))
+    stop.set()
+    tick_thread.join()
+    legacy.disarm_preroll()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Raw mouse input ingestion: per-message ctypes decoding vs batched decoding.
+
+Feeds packed RAWINPUT streams (8 kHz polling with occasional clicks and
+wheel notches) into the backend_legacy callbacks two ways. The Win32 calls
+are replaced by the memcpy they perform.
+
+    per-message  the old _handle_wm_input: a fresh create_string_buffer per
+                 record, cast to a RAWINPUT struct, on_delta per record,
+                 cursor position per button flag
+    batched      one preallocated buffer per GetRawInputBuffer-sized batch,
+                 rawinput.RawMouseDecoder, one summed on_delta per batch,
+                 cursor position once per batch
+
+GetCursorPos is a syscall on Windows and is modelled as free here, which
+understates what per-message pays on clicks.
+
+Run from the repo root:  python -m benchmarks.bench_rawinput [--records N]
+"""
+
+import argparse
+import ctypes
+import random
+import time
+
+import backend_legacy as legacy
+import rawinput
+
+BATCH_SIZES = (1, 4, 8, 16, 64, 256)
+
+
+class RAWINPUTHEADER(ctypes.Structure):
+    _fields_ = [("dwType", ctypes.c_uint32), ("dwSize", ctypes.c_uint32), ("hDevice", ctypes.c_void_p), ("wParam", ctypes.c_size_t)]
+
+
+class RAWMOUSE(ctypes.Structure):
+    # Windows LONG/ULONG are 32-bit; spelled out so the layout holds on Linux too.
+    _fields_ = [
+        ("usFlags", ctypes.c_uint16),
+        ("_pad", ctypes.c_uint16),  # the button union is 4-byte aligned
+        ("usButtonFlags", ctypes.c_uint16),
+        ("usButtonData", ctypes.c_uint16),
+        ("ulRawButtons", ctypes.c_uint32),
+        ("lLastX", ctypes.c_int32),
+        ("lLastY", ctypes.c_int32),
+        ("ulExtraInformation", ctypes.c_uint32),
+    ]
+
+
+class RAWINPUT(ctypes.Structure):
+    _fields_ = [("header", RAWINPUTHEADER), ("mouse", RAWMOUSE)]
+
+
+def make_rows(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        bf = bd = 0
+        if i % 400 == 0:
+            bf = rawinput.RI_MOUSE_LEFT_BUTTON_DOWN if (i // 400) & 1 else rawinput.RI_MOUSE_LEFT_BUTTON_UP
+        elif i % 1000 == 500:
+            bf, bd = rawinput.RI_MOUSE_WHEEL, (-120) & 0xFFFF
+        rows.append((0, bf, bd, rng.randint(-4, 4), rng.randint(-3, 3)))
+    return rows
+
+
+def cursor_pos():
+    return 640, 360
+
+
+def per_message(stream: bytes, record_size: int) -> None:
+    """The pre-batching handler, minus the two GetRawInputData syscalls."""
+    on_delta, on_click, on_wheel = legacy.raw_on_delta, legacy.raw_on_click, legacy.raw_on_wheel
+    for offset in range(0, len(stream), record_size):
+        buf = ctypes.create_string_buffer(record_size)
+        ctypes.memmove(buf, stream[offset:offset + record_size], record_size)
+        raw = ctypes.cast(buf, ctypes.POINTER(RAWINPUT)).contents
+        if raw.header.dwType != rawinput.RIM_TYPEMOUSE: continue
+        m = raw.mouse
+        dx, dy = int(m.lLastX), int(m.lLastY)
+        if m.usFlags & rawinput.MOUSE_MOVE_ABSOLUTE:
+            dx, dy = 0, 0
+        if dx or dy:
+            on_delta(dx, dy)
+        bf = int(m.usButtonFlags)
+        bd = int(m.usButtonData)
+        for flag, button, action in rawinput.BUTTON_FLAGS:
+            if bf & flag:
+                x, y = cursor_pos()
+                on_click(button, action, x, y)
+        if bf & rawinput.RI_MOUSE_WHEEL:
+            wheel = ctypes.c_short(bd).value
+            on_wheel("vertical", wheel / rawinput.WHEEL_DELTA, wheel)
+
+
+def batched(stream: bytes, record_size: int, batch: int, decoder, buf) -> None:
+    on_delta, on_click, on_wheel = legacy.raw_on_delta, legacy.raw_on_click, legacy.raw_on_wheel
+    step = batch * record_size
+    for offset in range(0, len(stream), step):
+        chunk = stream[offset:offset + step]
+        ctypes.memmove(buf, chunk, len(chunk))
+        rawinput.dispatch(decoder.decode(buf, len(chunk) // record_size), on_delta, on_click, on_wheel, cursor_pos)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        legacy.start_recording()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=80_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    decoder = rawinput.RawMouseDecoder()
+    assert ctypes.sizeof(RAWINPUT) == decoder.record_size
+    stream = bytes(rawinput.pack_mouse_records(make_rows(args.records)))
+    buf = ctypes.create_string_buffer(64 * 1024)
+
+    # Both paths must leave the same totals and event rows behind.
+    legacy.start_recording()
+    per_message(stream, decoder.record_size)
+    expected = (legacy.mouse_accum.take(), len(legacy.mouse_event_queue))
+    legacy.start_recording()
+    batched(stream, decoder.record_size, 16, decoder, buf)
+    assert (legacy.mouse_accum.take(), len(legacy.mouse_event_queue)) == expected, "decoders disagree"
+
+    base = best_of(lambda: per_message(stream, decoder.record_size), args.repeat)
+    print(f"{'path':14s} {'records/s':>12s} {'us/record':>10s} {'speedup':>8s}")
+    print(f"{'per-message':14s} {args.records / base:12,.0f} {base / args.records * 1e6:10.2f} {1.0:7.1f}x")
+    for size in BATCH_SIZES:
+        took = best_of(lambda: batched(stream, decoder.record_size, size, decoder, buf), args.repeat)
+        print(f"{'batch ' + str(size):14s} {args.records / took:12,.0f} {took / args.records * 1e6:10.2f} {base / took:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
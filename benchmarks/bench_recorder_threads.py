@@ -0,0 +1,76 @@
+"""
+Threads and context switches of a steady-state recording session.
+
+Runs a real OBSRecorder session of ``--seconds`` against
+benchmarks.obs_standin with the idle input backend. It flushes the log every
+second and samples the clock every 0.5 s, to exaggerate background work.
+While the recording runs, this reports every thread the recorder added, with
+its context switches per second. Those come from
+/proc/self/task/*/status, so the per-thread columns are Linux-only. The
+stand-in's own threads are left out.
+
+Run from the repo root:  python -m benchmarks.bench_recorder_threads [--seconds S]
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+import backend_legacy as legacy
+import recorder_core
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.obs_standin import StandInOBS
+from obs_control import OBSRecorder
+
+
+def switches() -> Dict[int, int]:
+    """Voluntary + involuntary context switches per native thread id (empty off Linux)."""
+    counts = {}
+    for task in Path("/proc/self/task").glob("*"):
+        try:
+            lines = (task / "status").read_text().splitlines()
+        except OSError:
+            continue
+        counts[int(task.name)] = sum(int(line.split()[1]) for line in lines if "ctxt_switches:" in line)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    legacy._input_backend = IdleInput
+    with tempfile.TemporaryDirectory() as out_dir, StandInOBS(start_delay=0.02) as server:
+        baseline = {thread.native_id for thread in threading.enumerate()}
+        recorder = OBSRecorder(server.host, server.port, "", "", out_dir, log_format="binary", log_interval_seconds=1.0, clock_interval=0.5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorder.connect()
+            recorder.start_recording()
+            time.sleep(1.0)  # past the clock sampler's warm-up
+            # Stand-in threads serve the connection; they are not the recorder's.
+            standin = {thread.native_id for thread in threading.enumerate() if "_serve" in thread.name or "_accept" in thread.name}
+            added = [thread for thread in threading.enumerate() if thread.native_id not in baseline | standin]
+            before = switches()
+            time.sleep(args.seconds)
+            after = switches()
+            recorder.stop_recording()
+            recorder.disconnect()
+        recorder_core.shutdown()
+
+    print(f"{'recorder thread':34s} {'switches/s':>11s}")
+    total = 0.0
+    for thread in sorted(added, key=lambda t: t.name):
+        rate = (after.get(thread.native_id, 0) - before.get(thread.native_id, 0)) / args.seconds
+        total += rate
+        print(f"{thread.name:34s} {rate:11.1f}")
+    print(f"{'total (' + str(len(added)) + ' threads)':34s} {total:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Replay engine: merge throughput, memory against log length, scheduling jitter.
+
+Writes synthetic sessions (benchmarks/synthetic_log.py) of ``--minutes`` and
+four times that, then:
+
+    fast         as-fast-as-possible replay into a no-op sink: events/s and the
+                 tracemalloc peak, which should not grow with the log
+    order        every event comes out in timestamp order
+    timed        ``--seconds`` of log at 1x and the same number of wall
+                 seconds at 10x; jitter p50/p99/max and events later than 1 ms
+    recorder     the short log replayed fast through RecorderSink into the
+                 real capture buffers; drained counts must match the log
+
+Run from the repo root:  python -m benchmarks.bench_replay [--minutes M] [--seconds S]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import backend_legacy as legacy
+import replay
+from benchmarks.synthetic_log import write_session
+
+
+def fast(path: Path) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    events = 0
+    in_order = True
+    last = float("-inf")
+    for event in replay.merged_events(path):
+        events += 1
+        in_order = in_order and event.t >= last
+        last = event.t
+    seconds = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"events": events, "seconds": seconds, "peak_mb": peak / 1e6, "in_order": in_order}
+
+
+def timed(path: Path, speed: float, seconds: float, policy: str) -> dict:
+    replayer = replay.Replayer(path, [lambda event: None], speed, start=0.0, end=seconds * speed, policy=policy)
+    return replayer.run()
+
+
+def recorder(path: Path) -> str:
+    legacy.start_recording()
+    legacy.set_recording_start()
+    stats = replay.Replayer(path, [replay.RecorderSink()], None).run()
+    legacy.drain()
+    drained = {"keyboard": 0, "mouse": 0}
+    while True:
+        batch = legacy.pending.peek()
+        if batch is None:
+            break
+        drained["keyboard"] += len(batch.keyboard)
+        drained["mouse"] += len(batch.mouse)
+        legacy.pending.pop()
+    ok = drained["keyboard"] == stats["counts"]["keyboard"] and drained["mouse"] == stats["counts"]["mouse"]
+    return (
+        f"recorder:  replayed {stats['counts']['keyboard']} key / {stats['counts']['mouse']} mouse events,"
+        f" drained {drained['keyboard']} / {drained['mouse']} {'ok' if ok else 'MISMATCH'}"
+        f" ({stats['events_per_sec']:,.0f} events/s with {stats['counts']['positions']} deltas)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=15.0, help="short log length; the long one is 4x")
+    parser.add_argument("--seconds", type=float, default=5.0, help="wall seconds of each timed replay")
+    parser.add_argument("--policy", default="balanced", help="sampler SleepPolicy used to wait")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        short = write_session(Path(tmp) / "short_log.jsonl", args.minutes * 60.0)
+        long = write_session(Path(tmp) / "long_log.jsonl", args.minutes * 240.0, seed=1)
+        for label, path in (("short", short), ("long", long)):
+            r = fast(path)
+            print(
+                f"fast {label:5s} {r['events']:8d} events in {r['seconds']:.2f} s ({r['events'] / r['seconds']:,.0f}/s),"
+                f" peak {r['peak_mb']:.2f} MB, in order: {r['in_order']}"
+            )
+        print()
+        for speed in (1.0, 10.0):
+            s = timed(long, speed, args.seconds, args.policy)
+            print(
+                f"timed {speed:4g}x  {s['events']:6d} events over {s['log_seconds']:.1f} s of log in {s['wall_seconds']:.2f} s:"
+                f" jitter ms p50 {s['jitter_p50_ms']:.3f} p99 {s['jitter_p99_ms']:.3f} max {s['jitter_max_ms']:.3f},"
+                f" {s['late_events']} late"
+            )
+        print()
+        print(recorder(short))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Sampler lateness and CPU cost per sleep policy and rate.
+
+Real clock (default) reports thread CPU %, p50/p99/max lateness per policy.
+``--fake`` drives the scheduler with FakeClock instead: deterministic, fast,
+and includes an injected stall to show skipped-frame accounting (CPU % is
+then the modelled non-sleeping fraction of simulated time).
+
+Run from the repo root:  python -m benchmarks.bench_sampler [--seconds S] [--fake]
+"""
+
+import argparse
+import threading
+import time
+
+from sampler import POLICIES, SAMPLE_RATES, FakeClock, FrameScheduler
+
+
+def run_real(rate: float, policy: str, seconds: float) -> dict:
+    result = {}
+
+    def target() -> None:
+        sched = FrameScheduler(lambda i, ts: None, rate, policy)
+        cpu0, wall0 = time.thread_time(), time.perf_counter()
+        sched.run(time.perf_counter(), max_frames=int(rate * seconds))
+        result.update(sched.stats())
+        result["cpu_pct"] = 100.0 * (time.thread_time() - cpu0) / (time.perf_counter() - wall0)
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    return result
+
+
+def run_fake(rate: float, policy: str, seconds: float) -> dict:
+    clock = FakeClock(oversleep=0.0005, poll_cost=2e-6)
+    stall_at = int(rate * seconds / 2)
+
+    def on_frame(index: int, ts: float) -> None:
+        if index == stall_at:
+            clock.stall(0.25)
+
+    sched = FrameScheduler(on_frame, rate, policy, clock=clock)
+    sched.run(clock.now(), max_frames=int(rate * seconds))
+    result = sched.stats()
+    result["cpu_pct"] = 100.0 * (1 - clock.slept / max(clock.t, 1e-9))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--fake", action="store_true")
+    parser.add_argument("--rates", type=float, nargs="*", default=list(SAMPLE_RATES))
+    args = parser.parse_args()
+
+    run = run_fake if args.fake else run_real
+    print(f"{'rate':>6} {'policy':>9} {'cpu%':>6} {'p50 us':>8} {'p99 us':>8} {'max us':>9} {'frames':>7} {'skipped':>8}")
+    for rate in args.rates:
+        for policy in POLICIES:
+            r = run(rate, policy, args.seconds)
+            print(
+                f"{rate:6g} {policy:>9} {r['cpu_pct']:6.1f} {r['lateness_p50'] * 1e6:8.1f} {r['lateness_p99'] * 1e6:8.1f} "
+                f"{r['lateness_max'] * 1e6:9.1f} {r['frames']:7d} {r['skipped_frames']:8d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
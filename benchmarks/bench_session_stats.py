@@ -0,0 +1,98 @@
+"""
+Cost of the running session aggregates against a post-hoc summary scan.
+
+Replays a synthetic session (benchmarks/synthetic_log.py) as drained
+batches through the real writer path (``backend_legacy._write_batch``) into
+a segmented JSONL log, with the summary record written at close. Reports:
+
+    add            ``SessionStats.add`` per event (keys, clicks, scrolls, frames)
+    snapshot       the running totals put into each record, per record
+    write          the whole record write, per record, for scale
+    summary read   ``batch.summarize_log`` with the manifest's summary
+    full scan      ``batch.summarize_log`` re-reading every record (logs
+                   without a summary)
+
+It then checks that every field of the summary matches the full scan.
+
+Run from the repo root:  python -m benchmarks.bench_session_stats [--minutes M]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import backend_legacy as legacy
+import batch
+import binlog
+import log_segments
+import spill
+from benchmarks.synthetic_log import session_records
+from session_stats import SessionStats
+
+CHECKED = (
+    "duration", "frames", "missing_frames", "key_presses", "clicks", "scrolls", "scroll_steps", "apm", "mouse_travel",
+    "idle_periods", "idle_total", "longest_idle", "key_histogram", "click_histogram",
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", type=float, default=60.0)
+    args = parser.parse_args()
+
+    batches = []
+    for record in session_records(args.minutes * 60.0):
+        positions, mouse, keyboard = binlog.buffers_from_record(record)
+        batches.append(spill.Batch(record["timestamp"], record["relative_timestamp"], keyboard, mouse, positions))
+    events = sum(b.events() for b in batches)
+
+    stats = SessionStats()
+    started = time.perf_counter()
+    for b in batches:
+        stats.add(b)
+    add_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in batches:
+        stats.snapshot()
+    snapshot_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = Path(tmp) / f"bench_log{log_segments.MANIFEST_SUFFIX}"
+        log = log_segments.SegmentedLog(manifest, "jsonl", {}, "gzip")
+        stats = SessionStats()
+        started = time.perf_counter()
+        for b in batches:
+            legacy._write_batch(b, log, "bench.mkv", stats)
+        write_seconds = time.perf_counter() - started
+        legacy._close_with_summary(log, "bench.mkv", stats, stats.duration)
+
+        # The same segments under a manifest without the summary: the old full scan.
+        unsummarized = Path(tmp) / f"scan_log{log_segments.MANIFEST_SUFFIX}"
+        plain = log_segments.read_manifest(manifest)
+        del plain["summary"]
+        unsummarized.write_text(json.dumps(plain), encoding="utf-8")
+
+        started = time.perf_counter()
+        summary = batch.summarize_log(manifest, None)
+        read_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        scanned = batch.summarize_log(unsummarized, None)
+        scan_seconds = time.perf_counter() - started
+
+    per_record = len(batches)
+    print(f"{args.minutes:g} min session: {len(batches)} records, {events} events (incl. sampler frames)\n")
+    print(f"add            {add_seconds / events * 1e9:8.0f} ns/event")
+    print(f"snapshot       {snapshot_seconds / per_record * 1e6:8.1f} us/record")
+    print(f"write          {write_seconds / per_record * 1e6:8.1f} us/record  (aggregates {(add_seconds + snapshot_seconds) / write_seconds:.1%} of it)")
+    print(f"summary read   {read_seconds * 1e3:8.2f} ms")
+    print(f"full scan      {scan_seconds * 1e3:8.0f} ms\n")
+    for field in CHECKED:
+        a, b = summary[field], scanned[field]
+        same = abs(a - b) <= 1e-6 * max(1.0, abs(b)) if isinstance(a, float) else a == b
+        print(f"{field:16s} {'ok' if same else 'MISMATCH'}  summary {a}  scan {b}")
+
+
+if __name__ == "__main__":
+    main()
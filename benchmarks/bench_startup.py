@@ -0,0 +1,51 @@
+"""
+Cold-start import time of the entry points and of what they now defer.
+
+Each measurement imports the module in a fresh interpreter, so nothing is
+cached in ``sys.modules``. The platform input backend is loaded on the first
+``start_input_threads()``. The OBS client is plain asyncio, so it is part of
+``obs_control``.
+
+Run from the repo root:  python -m benchmarks.bench_startup [--runs N]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (label, module, loaded at start-up?)
+MODULES = [
+    ("recorder core", "backend_legacy", True),
+    ("obs.py / OBSRecorder", "obs_control", True),
+    ("GUI (main.py)", "main", True),
+    ("input backend", "input_win32", False),
+]
+
+
+def import_ms(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode:
+        return float("nan")
+    return float(out.stdout.strip()) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'':22s} {'module':16s} {'median ms':>10s}")
+    for label, module, eager in MODULES:
+        ms = statistics.median(import_ms(module) for _ in range(args.runs))
+        note = "" if eager else "  (deferred)"
+        shown = "n/a" if ms != ms else f"{ms:.1f}"
+        print(f"{label:22s} {module:16s} {shown:>10s}{note}")
+
+
+if __name__ == "__main__":
+    main()
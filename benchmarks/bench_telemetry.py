@@ -0,0 +1,186 @@
+"""
+Instrumentation overhead: the capture callbacks with and without telemetry.
+
+Times plain and instrumented copies of the backend_legacy callbacks and
+weights them by a capture workload (8 kHz mouse deltas, 20 clicks/s,
+10 key events/s and the 30 Hz sampler), reporting the extra CPU time per
+second of capture as a share of the capture threads' own time. Also checks the
+histogram's percentiles against exact ones.
+
+Run from the repo root:  python -m benchmarks.bench_telemetry [--calls N]
+"""
+
+import argparse
+import random
+import time
+
+import event_buffers as eb
+from telemetry import Telemetry
+
+DELTA_HZ = 8000
+CLICK_HZ = 20
+KEY_HZ = 10
+SAMPLE_HZ = 30
+
+
+class Pipeline:
+    def __init__(self, instrumented: bool) -> None:
+        self.accum = eb.DeltaAccumulator()
+        self.mouse = eb.SwapBuffer(eb.MouseEventBuffer)
+        self.keys = eb.SwapBuffer(eb.KeyboardEventBuffer)
+        self.positions = eb.SwapBuffer(eb.MousePositionBuffer)
+        self.pressed = 0
+        self.start = time.perf_counter()
+        metrics = Telemetry()
+        metrics.gauge("events.mouse_delta", lambda: self.accum.seq // 2)
+        self.clicks = metrics.counter("events.mouse_button")
+        self.key_count = metrics.counter("events.keyboard")
+        self.mouse_latency = metrics.histogram("callback.mouse")
+        self.key_latency = metrics.histogram("callback.keyboard")
+        self.lateness = metrics.histogram("sampler.lateness")
+        self.metrics = metrics
+        # Deltas are counted from the accumulator's seq, so on_delta is shared.
+        self.on_delta = self._on_delta
+        if instrumented:
+            self.on_click = self._on_click_timed
+            self.on_key = self._on_key_timed
+            self.on_frame = self._on_frame_timed
+        else:
+            self.on_click = self._on_click
+            self.on_key = self._on_key
+            self.on_frame = self._on_frame
+
+    def _ts(self) -> float:
+        return time.perf_counter() - self.start
+
+    def _on_delta(self, dx: int, dy: int) -> None:
+        self.accum.add(dx, dy)
+
+    def _on_click(self, button: int, action: int) -> None:
+        ts = self._ts()
+        q = self.mouse
+        q.seq += 1
+        q.front.append_click(button, action, 100, 200, ts)
+        q.seq += 1
+
+    def _on_click_timed(self, button: int, action: int) -> None:
+        entered = time.perf_counter()
+        ts = self._ts()
+        q = self.mouse
+        q.seq += 1
+        q.front.append_click(button, action, 100, 200, ts)
+        q.seq += 1
+        self.clicks.value += 1
+        self.mouse_latency.record(time.perf_counter() - entered)
+
+    def _on_key(self, key: int, down: bool) -> None:
+        q = self.keys
+        if down:
+            self.pressed |= 1 << key
+            ts = self._ts()
+            q.seq += 1
+            q.front.append_press(key, self.pressed, ts)
+            q.seq += 1
+        else:
+            self.pressed &= ~(1 << key)
+            ts = self._ts()
+            q.seq += 1
+            q.front.append_release(key, ts)
+            q.seq += 1
+
+    def _on_key_timed(self, key: int, down: bool) -> None:
+        entered = time.perf_counter()
+        q = self.keys
+        if down:
+            self.pressed |= 1 << key
+            ts = self._ts()
+            q.seq += 1
+            q.front.append_press(key, self.pressed, ts)
+            q.seq += 1
+        else:
+            self.pressed &= ~(1 << key)
+            ts = self._ts()
+            q.seq += 1
+            q.front.append_release(key, ts)
+            q.seq += 1
+        self.key_count.value += 1
+        self.key_latency.record(time.perf_counter() - entered)
+
+    def _on_frame(self, frame_index: int, late: float) -> None:
+        dx, dy = self.accum.take()
+        q = self.positions
+        q.seq += 1
+        q.front.append(frame_index, dx, dy, frame_index / SAMPLE_HZ)
+        q.seq += 1
+
+    def _on_frame_timed(self, frame_index: int, late: float) -> None:
+        self.lateness.record(late)
+        dx, dy = self.accum.take()
+        q = self.positions
+        q.seq += 1
+        q.front.append(frame_index, dx, dy, frame_index / SAMPLE_HZ)
+        q.seq += 1
+
+
+def per_call(fn, args_for, calls: int, repeat: int) -> float:
+    """Best-of-``repeat`` mean CPU seconds per ``fn`` call."""
+    best = float("inf")
+    for _ in range(repeat):
+        argv = [args_for(i) for i in range(calls)]
+        started = time.process_time()
+        for args in argv:
+            fn(*args)
+        best = min(best, (time.process_time() - started) / calls)
+    return best
+
+
+def capture_cost(pipeline: Pipeline, calls: int, repeat: int) -> dict:
+    """CPU seconds per simulated second of capture, by timed callback.
+
+    ``on_delta`` is the same function in both pipelines and is timed once in
+    ``main``; at 8 kHz its run-to-run noise would swamp the difference.
+    """
+    key = eb.KEYS.code("w")
+    return {
+        "click": CLICK_HZ * per_call(pipeline.on_click, lambda i: (0, i & 1), calls, repeat),
+        "key": KEY_HZ * per_call(pipeline.on_key, lambda i: (key, not i & 1), calls, repeat),
+        "frame": SAMPLE_HZ * per_call(pipeline.on_frame, lambda i: (i, 1e-4), calls, repeat),
+    }
+
+
+def check_accuracy(samples: int = 200_000) -> None:
+    rng = random.Random(1)
+    values = sorted(rng.lognormvariate(-10, 1.0) for _ in range(samples))
+    hist = Telemetry().histogram("x")
+    for v in values:
+        hist.record(v)
+    print("  pct      exact us   histogram us   error")
+    for pct in (50, 90, 99, 99.9):
+        exact = values[min(samples - 1, int(samples * pct / 100.0))]
+        approx = hist.percentile(pct)
+        print(f"{pct:5g}  {exact * 1e6:12.2f}  {approx * 1e6:13.2f}  {(approx - exact) / exact:+7.2%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=100_000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    plain = capture_cost(Pipeline(False), args.calls, args.repeat)
+    timed = capture_cost(Pipeline(True), args.calls, args.repeat)
+    delta = Pipeline(False)
+    plain["delta"] = timed["delta"] = DELTA_HZ * per_call(delta.on_delta, lambda i: (1, -1), args.calls * 4, args.repeat)
+    print(f"workload: {DELTA_HZ} deltas/s, {CLICK_HZ} clicks/s, {KEY_HZ} keys/s, {SAMPLE_HZ} Hz sampler")
+    print("callback   plain ms/s   instrumented ms/s")
+    for name in plain:
+        print(f"{name:8s} {plain[name] * 1e3:12.3f} {timed[name] * 1e3:19.3f}")
+    base, inst = sum(plain.values()), sum(timed.values())
+    print(f"{'total':8s} {base * 1e3:12.3f} {inst * 1e3:19.3f}")
+    print(f"overhead: {(inst - base) * 1e3:.3f} ms/s = {(inst - base) / base:.2%} of capture-thread time")
+    print()
+    check_accuracy()
+
+
+if __name__ == "__main__":
+    main()
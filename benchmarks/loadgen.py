@@ -0,0 +1,280 @@
+"""
+Synthetic input load generator that drives the real backend_legacy callbacks.
+
+A profile sets mouse polling rate, clicks, APM-style key bursts and scroll
+storms. ``run_profile`` replays it on two threads shaped like the real ones:
+a raw-input thread (``raw_on_delta``/``raw_on_click``/``raw_on_wheel``) and
+a keyboard hook thread (``on_keyboard_event``). Alongside them it runs the
+real sampler thread (``record_mouse_delta_30hz``) and the recorder's
+flush and drain (``WriterThreads``), writing into a temporary directory.
+
+Run from the repo root:  python -m benchmarks.loadgen poll8k [--seconds S] [--json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import backend_legacy as legacy
+from benchmarks.log_writer import LogWriter
+from telemetry import METRICS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+KEY_POOL = ["w", "a", "s", "d", "shift", "space", "ctrl", "e", "q", "r", "1", "2", "3", "tab"]
+
+# Matches the attributes on_keyboard_event reads from keyboard.KeyboardEvent.
+KeyEvent = namedtuple("KeyEvent", "event_type name scan_code")
+
+
+class Profile:
+    def __init__(
+        self,
+        name: str,
+        mouse_hz: float,
+        click_hz: float = 2.0,
+        key_apm: float = 0.0,
+        burst_keys: Tuple[int, int] = (2, 5),
+        scroll_hz: float = 0.0,
+        scroll_duty: float = 0.25,
+    ) -> None:
+        self.name = name
+        self.mouse_hz = mouse_hz
+        self.click_hz = click_hz
+        self.key_apm = key_apm
+        self.burst_keys = burst_keys
+        self.scroll_hz = scroll_hz
+        # Fraction of each second the scroll storm is active.
+        self.scroll_duty = scroll_duty
+
+
+PROFILES: Dict[str, Profile] = {
+    "poll1k": Profile("poll1k", mouse_hz=1000),
+    "poll4k": Profile("poll4k", mouse_hz=4000),
+    "poll8k": Profile("poll8k", mouse_hz=8000),
+    "apm": Profile("apm", mouse_hz=1000, key_apm=600, burst_keys=(3, 8)),
+    "scroll": Profile("scroll", mouse_hz=1000, scroll_hz=1000, scroll_duty=0.3),
+    "mixed": Profile("mixed", mouse_hz=8000, click_hz=6, key_apm=400, scroll_hz=500),
+}
+
+
+def key_schedule(profile: Profile, seconds: float, seed: int = 0) -> List[Tuple[float, KeyEvent]]:
+    """APM-style bursts: a chord of keys pressed ~15 ms apart, then released."""
+    events: List[Tuple[float, KeyEvent]] = []
+    if not profile.key_apm:
+        return events
+    rng = random.Random(seed)
+    lo, hi = profile.burst_keys
+    burst_rate = profile.key_apm / 60.0 / ((lo + hi) / 2.0)
+    t = rng.expovariate(burst_rate)
+    while t < seconds:
+        keys = rng.sample(KEY_POOL, rng.randint(lo, hi))
+        at = t
+        for key in keys:
+            events.append((at, KeyEvent("down", key, 0)))
+            at += rng.uniform(0.008, 0.02)
+        for key in keys:
+            at += rng.uniform(0.01, 0.04)
+            events.append((at, KeyEvent("up", key, 0)))
+        t = at + rng.expovariate(burst_rate)
+    events.sort(key=lambda item: item[0])
+    return [item for item in events if item[0] < seconds]
+
+
+def _raw_input_thread(profile: Profile, start: float, seconds: float, stop: threading.Event, out: Dict) -> None:
+    """Emit every delta/click/wheel event that is due, then nap ~0.5 ms.
+
+    Like a real raw-input thread draining its message queue, events that
+    came due during a nap are delivered back to back on wake.
+    """
+    on_delta, on_click, on_wheel = legacy.raw_on_delta, legacy.raw_on_click, legacy.raw_on_wheel
+    rng = random.Random(1)
+    deltas = clicks = wheels = 0
+    max_backlog = 0
+    pressed = False
+    storm = profile.scroll_duty
+    while not stop.is_set():
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+        due = int(elapsed * profile.mouse_hz)
+        max_backlog = max(max_backlog, due - deltas)
+        while deltas < due:
+            on_delta(rng.randint(-3, 3), rng.randint(-2, 2))
+            deltas += 1
+        while clicks < int(elapsed * profile.click_hz * 2):
+            pressed = not pressed
+            on_click("left", "press" if pressed else "release", 640, 360)
+            clicks += 1
+        if profile.scroll_hz:
+            # Storms fill the first ``scroll_duty`` of every second.
+            whole, frac = divmod(elapsed, 1.0)
+            due_wheels = int((whole * storm + min(frac, storm)) * profile.scroll_hz)
+            while wheels < due_wheels:
+                on_wheel("vertical", -1.0, -120)
+                wheels += 1
+        time.sleep(0.0005)
+    out.update(deltas=deltas, clicks=clicks, wheels=wheels, max_backlog=max_backlog)
+
+
+def _keyboard_thread(events: List[Tuple[float, KeyEvent]], start: float, stop: threading.Event, out: Dict) -> None:
+    on_keyboard_event = legacy.on_keyboard_event
+    sent = 0
+    for at, event in events:
+        while not stop.is_set():
+            wait = at - (time.perf_counter() - start)
+            if wait <= 0:
+                break
+            time.sleep(min(wait, 0.002))
+        if stop.is_set():
+            break
+        on_keyboard_event(event)
+        sent += 1
+    out.update(keys=sent)
+
+
+class WriterThreads:
+    """The recorder loop's periodic flush and drain tasks (obs_control.py) as threads.
+
+    The benchmarks run the capture pipeline without the asyncio loop; these
+    stand in for it: ``LogWriter`` flushes every ``interval`` and a ticker
+    drains the capture buffers while a flush is stuck.
+    """
+
+    def __init__(self, interval: float = 10.0) -> None:
+        self.writer = LogWriter(legacy._write_log, interval)
+        self._stop = threading.Event()
+        self._drainer = threading.Thread(target=self._drain, name="bench_drain", daemon=True)
+
+    def start(self) -> "WriterThreads":
+        self.writer.start()
+        self._drainer.start()
+        return self
+
+    def _drain(self) -> None:
+        while not self._stop.wait(legacy.DRAIN_INTERVAL):
+            legacy.drain_if_behind()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Final flush on the writer thread, then shut both down."""
+        self.writer.stop(timeout)
+        self._stop.set()
+        self._drainer.join(timeout)
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def run_profile(
+    profile: Profile,
+    seconds: float = 5.0,
+    log_format: str = "jsonl",
+    flush_interval: float = 1.0,
+    sample_rate: float = 30.0,
+    out_dir: Path = None,
+) -> Dict:
+    tmp = None
+    if out_dir is None:
+        tmp = tempfile.TemporaryDirectory()
+        out_dir = Path(tmp.name)
+    try:
+        legacy.start_recording(sample_rate)
+        legacy.set_recording_start()
+        legacy.save_log(str(Path(out_dir) / "loadgen.mkv"), log_format)
+        start = legacy.recording_start_perf
+
+        # start_input_threads minus the platform input backend.
+        legacy.raw_mouse_stop.clear()
+        sampler = threading.Thread(target=legacy.record_mouse_delta_30hz, args=(start,), daemon=True)
+        sampler.start()
+        writer = WriterThreads(flush_interval).start()
+
+        stop = threading.Event()
+        mouse_out: Dict = {}
+        key_out: Dict = {}
+        producers = [
+            threading.Thread(target=_raw_input_thread, args=(profile, start, seconds, stop, mouse_out), daemon=True),
+            threading.Thread(target=_keyboard_thread, args=(key_schedule(profile, seconds), start, stop, key_out), daemon=True),
+        ]
+        cpu_start = time.process_time()
+        for thread in producers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        legacy.raw_mouse_stop.set()
+        sampler.join(timeout=1.0)
+        stop_started = time.perf_counter()
+        writer.stop()
+        segments = legacy.segment_log
+        legacy.close_log()
+        final_flush = time.perf_counter() - stop_started
+        cpu = time.process_time() - cpu_start
+
+        sampler_stats = legacy.mouse_sampler.stats()
+        lateness = legacy.sampler_lateness
+        flush = METRICS.histograms["flush.seconds"].snapshot()
+        events = mouse_out["deltas"] + mouse_out["clicks"] + mouse_out["wheels"] + key_out["keys"]
+        return {
+            "profile": profile.name,
+            "seconds": elapsed,
+            "events": events,
+            "events_per_sec": events / elapsed,
+            "target_mouse_hz": profile.mouse_hz,
+            "mouse_per_sec": mouse_out["deltas"] / elapsed,
+            "max_backlog": mouse_out["max_backlog"],
+            "frames": sampler_stats["frames"],
+            "dropped_frames": sampler_stats["skipped_frames"],
+            # Late by more than half a frame interval.
+            "late_frames": lateness.count_above(0.5 / sample_rate),
+            "lateness_p99_ms": sampler_stats["lateness_p99"] * 1e3,
+            "flushes": flush["count"],
+            "flush_p50_ms": flush["p50"] * 1e3,
+            "flush_p99_ms": flush["p99"] * 1e3,
+            "flush_max_ms": flush["max"] * 1e3,
+            "final_flush_ms": final_flush * 1e3,
+            "log_bytes": segments.total_bytes,
+            "log_raw_bytes": sum(segment["raw_bytes"] for segment in segments.segments),
+            "cpu_percent": 100.0 * cpu / elapsed,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive the recorder callbacks with synthetic input.")
+    parser.add_argument("profile", choices=sorted(PROFILES))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--format", choices=["jsonl", "binary"], default="jsonl")
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--sample-rate", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="print one JSON result line")
+    args = parser.parse_args()
+
+    result = run_profile(PROFILES[args.profile], args.seconds, args.format, args.flush_interval, args.sample_rate)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for key, value in result.items():
+        print(f"{key:16s} {value:.3f}" if isinstance(value, float) else f"{key:16s} {value}")
+
+
+if __name__ == "__main__":
+    main()
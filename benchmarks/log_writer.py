@@ -0,0 +1,79 @@
+"""
+Background writer thread for the benchmark pipelines.
+
+Capture threads only append into their own ``SwapBuffer``; everything that
+can be slow (swapping buffers out, building dicts, JSON encoding, file I/O)
+runs here, either on the periodic interval or when a flush is requested.
+The recorder itself flushes from its asyncio loop (obs_control.py).
+
+A failed flush does not stop the thread, since the next flush retries with
+fresh data. ``stop`` raises the last error, so a run whose flushes failed
+does not report numbers.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class LogWriter(threading.Thread):
+    def __init__(
+        self,
+        flush_fn: Callable[[], None],
+        interval: float = 10.0,
+        name: str = "legacy_log_writer",
+    ) -> None:
+        super().__init__(name=name, daemon=True)
+        self._flush_fn = flush_fn
+        self.interval = interval
+        self._wake = threading.Event()
+        self._cond = threading.Condition()
+        self._requested = 0
+        self._completed = 0
+        self._stopping = False
+
+        self.flush_count = 0
+        self.last_flush_seconds = 0.0
+        self.last_error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._cond:
+                ticket = self._requested
+                stopping = self._stopping
+
+            start = time.perf_counter()
+            try:
+                self._flush_fn()
+            except Exception as exc:
+                self.last_error = exc
+            self.last_flush_seconds = time.perf_counter() - start
+            self.flush_count += 1
+
+            with self._cond:
+                self._completed = ticket
+                self._cond.notify_all()
+            if stopping:
+                return
+
+    def flush(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """Ask the writer to flush now; optionally block until it has."""
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+        self._wake.set()
+        if not wait:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: self._completed >= ticket, timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Run one final flush on the writer thread, then exit; re-raises a failed flush."""
+        with self._cond:
+            self._stopping = True
+        self.flush(wait=False)
+        self.join(timeout)
+        if self.last_error is not None:
+            raise self.last_error
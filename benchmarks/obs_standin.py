@@ -0,0 +1,325 @@
+"""
+Stand-in obs-websocket v5 server for exercising OBSRecorder without OBS.
+
+It implements only what OBSRecorder uses:
+- from RFC 6455: the upgrade handshake, unfragmented text frames, ping and close
+- from obs-websocket: Hello/Identify, requests and events
+
+StartRecord activates the output ``start_delay`` seconds later, like an
+encoder spinning up, and broadcasts RecordStateChanged STARTING and STARTED.
+StopRecord does the same for STOPPING and STOPPED. ``started_perf`` stores
+the ``perf_counter()`` of each activation, so a client in the same process
+can measure how late its own zero point was.
+
+GetRecordStatus reports ``outputDuration`` the way OBS computes it: frames
+encoded times the frame interval, floored to milliseconds. The first frame
+lands ``encoder_latency`` seconds after activation, and the video clock runs
+``drift_ppm`` fast relative to ``perf_counter``. ``video_seconds(perf)`` is
+the unquantized ground truth.
+
+Run from the repo root:  python -m benchmarks.obs_standin [--port 4455]
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+EVENT_OUTPUTS = 1 << 6  # obs-websocket EventSubscription.Outputs
+
+
+class RequestFailed(Exception):
+    def __init__(self, code: int, comment: str) -> None:
+        super().__init__(comment)
+        self.code = code
+        self.comment = comment
+
+
+class Connection:
+    """Server side of one websocket: client frames are masked, ours are not."""
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        self.subscriptions = 0
+        self._send_lock = threading.Lock()
+
+    def handshake(self) -> None:
+        self.rfile.readline()  # GET / HTTP/1.1
+        headers = {}
+        while True:
+            line = self.rfile.readline()
+            if line in (b"", b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise ConnectionError("not a websocket upgrade")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.sock.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+
+    def _read(self, n: int) -> bytes:
+        data = self.rfile.read(n)
+        if len(data) != n:
+            raise ConnectionError("client went away")
+        return data
+
+    def recv(self) -> Optional[str]:
+        """Next text message, or None once the client closes."""
+        while True:
+            b0, b1 = self._read(2)
+            opcode, length = b0 & 0x0F, b1 & 0x7F
+            if length == 126:
+                (length,) = struct.unpack(">H", self._read(2))
+            elif length == 127:
+                (length,) = struct.unpack(">Q", self._read(8))
+            mask = self._read(4) if b1 & 0x80 else b""
+            payload = self._read(length)
+            if mask:
+                payload = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+            if opcode == OP_CLOSE:
+                self.send(OP_CLOSE, payload[:2])
+                return None
+            if opcode == OP_PING:
+                self.send(OP_PONG, payload)
+            elif opcode == OP_TEXT:
+                return payload.decode()
+
+    def send(self, opcode: int, payload: bytes) -> None:
+        n = len(payload)
+        if n < 126:
+            head = struct.pack(">BB", 0x80 | opcode, n)
+        elif n < 1 << 16:
+            head = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            head = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        with self._send_lock:
+            self.sock.sendall(head + payload)
+
+    def send_json(self, op: int, d: Dict) -> None:
+        self.send(OP_TEXT, json.dumps({"op": op, "d": d}).encode())
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class StandInOBS:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        start_delay: Union[float, Callable[[], float]] = 0.05,
+        stop_delay: float = 0.05,
+        fps: int = 30,
+        encoder_latency: float = 0.0,
+        drift_ppm: float = 0.0,
+    ) -> None:
+        self.listener = socket.create_server((host, port))
+        self.host, self.port = self.listener.getsockname()[:2]
+        # Seconds from StartRecord to active, or a callable drawing one per start.
+        self.start_delay = start_delay
+        self.stop_delay = stop_delay
+        self.encoder_latency = encoder_latency
+        self.drift_ppm = drift_ppm
+        self.video = {"fpsNumerator": fps, "fpsDenominator": 1, "baseWidth": 1920, "baseHeight": 1080, "outputWidth": 1920, "outputHeight": 1080}
+        self.record_directory = str(Path.cwd())
+        self.scene = None
+        self.active = False
+        self.pending = False
+        self.output_path: Optional[str] = None
+        self.started_perf: List[float] = []
+        self.request_counts: Dict[str, int] = {}
+        self.connections: List[Connection] = []
+        self._lock = threading.Lock()
+        self._recordings = 0
+        self.active_since = 0.0
+
+    # Lifecycle --------------------------------------------------------------
+    def start(self) -> "StandInOBS":
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self.listener.close()
+        for conn in list(self.connections):
+            conn.close()
+
+    def __enter__(self) -> "StandInOBS":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def drop_connections(self) -> None:
+        """Cut every client off, as a websocket restart or network blip would."""
+        for conn in list(self.connections):
+            conn.close()
+
+    def video_seconds(self, perf: float) -> float:
+        """Exact position in the current recording's video at ``perf``."""
+        return (perf - self.active_since - self.encoder_latency) * (1.0 + self.drift_ppm * 1e-6)
+
+    def output_duration_ms(self, perf: float) -> int:
+        """``outputDuration`` at ``perf``: whole frames, floored to ms."""
+        fps = self.video["fpsNumerator"] / self.video["fpsDenominator"]
+        frames = max(int(self.video_seconds(perf) * fps), 0)
+        return frames * round(1e9 / fps) // 1_000_000
+
+    def requests_made(self) -> int:
+        return sum(self.request_counts.values())
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, _addr = self.listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(Connection(sock),), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        try:
+            conn.handshake()
+            conn.send_json(0, {"obsWebSocketVersion": "5.4.2", "rpcVersion": 1})
+            identify = json.loads(conn.recv() or "{}")
+            conn.subscriptions = int(identify.get("d", {}).get("eventSubscriptions", 0))
+            conn.send_json(2, {"negotiatedRpcVersion": 1})
+            self.connections.append(conn)
+            while (message := conn.recv()) is not None:
+                msg = json.loads(message)
+                if msg.get("op") == 6:
+                    conn.send_json(7, self._request(msg["d"]))
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            if conn in self.connections:
+                self.connections.remove(conn)
+            conn.close()
+
+    # Protocol ---------------------------------------------------------------
+    def _request(self, d: Dict) -> Dict:
+        kind = d["requestType"]
+        self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+        response = {"requestType": kind, "requestId": d.get("requestId")}
+        handler = getattr(self, "_req_" + kind, None)
+        try:
+            if handler is None:
+                raise RequestFailed(204, f"unknown request type {kind}")
+            data = handler(d.get("requestData") or {})
+        except RequestFailed as exc:
+            response["requestStatus"] = {"result": False, "code": exc.code, "comment": exc.comment}
+            return response
+        response["requestStatus"] = {"result": True, "code": 100}
+        if data is not None:
+            response["responseData"] = data
+        return response
+
+    def _emit(self, event_type: str, intent: int, data: Dict) -> None:
+        for conn in list(self.connections):
+            if conn.subscriptions & intent:
+                try:
+                    conn.send_json(5, {"eventType": event_type, "eventIntent": intent, "eventData": data})
+                except OSError:
+                    pass
+
+    def _record_state(self, state: str, active: bool, path: Optional[str]) -> None:
+        self._emit("RecordStateChanged", EVENT_OUTPUTS, {"outputActive": active, "outputState": f"OBS_WEBSOCKET_OUTPUT_{state}", "outputPath": path})
+
+    def _activate(self, path: str) -> None:
+        with self._lock:
+            self.active, self.pending = True, False
+            self.output_path = path
+            self.active_since = time.perf_counter()
+            self.started_perf.append(self.active_since)
+        self._record_state("STARTED", True, path)
+
+    def _deactivate(self, path: str) -> None:
+        with self._lock:
+            self.active, self.pending = False, False
+        self._record_state("STOPPED", False, path)
+
+    # Requests ---------------------------------------------------------------
+    def _req_GetRecordStatus(self, _data: Dict) -> Dict:
+        duration = self.output_duration_ms(time.perf_counter()) if self.active else 0
+        minutes, ms = divmod(duration, 60_000)
+        timecode = f"{minutes // 60:02d}:{minutes % 60:02d}:{ms / 1e3:06.3f}"
+        return {"outputActive": self.active, "outputPaused": False, "outputTimecode": timecode, "outputDuration": duration, "outputBytes": 0}
+
+    def _req_StartRecord(self, _data: Dict) -> None:
+        with self._lock:
+            if self.active or self.pending:
+                raise RequestFailed(500, "recording is already active")
+            self.pending = True
+            self._recordings += 1
+            path = str(Path(self.record_directory) / f"standin_{self._recordings:03d}.mkv")
+        delay = self.start_delay() if callable(self.start_delay) else self.start_delay
+        self._record_state("STARTING", False, None)
+        threading.Timer(delay, self._activate, (path,)).start()
+
+    def _req_StopRecord(self, _data: Dict) -> Dict:
+        with self._lock:
+            if not self.active or self.pending:
+                raise RequestFailed(501, "recording is not active")
+            self.pending = True
+            path = self.output_path
+        self._record_state("STOPPING", True, None)
+        threading.Timer(self.stop_delay, self._deactivate, (path,)).start()
+        return {"outputPath": path}
+
+    def _req_GetRecordDirectory(self, _data: Dict) -> Dict:
+        return {"recordDirectory": self.record_directory}
+
+    def _req_SetRecordDirectory(self, data: Dict) -> None:
+        self.record_directory = data["recordDirectory"]
+
+    def _req_SetCurrentProgramScene(self, data: Dict) -> None:
+        self.scene = data["sceneName"]
+
+    def _req_GetVideoSettings(self, _data: Dict) -> Dict:
+        return dict(self.video)
+
+    def _req_SetVideoSettings(self, data: Dict) -> None:
+        self.video.update({k: v for k, v in data.items() if k in self.video})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4455)
+    parser.add_argument("--start-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StandInOBS(args.host, args.port, start_delay=args.start_delay).start()
+    print(f"stand-in obs-websocket on ws://{server.host}:{server.port} (Ctrl+C to stop)")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            while seen < len(server.started_perf):
+                seen += 1
+                print(f"recording {seen} active: {server.output_path}")
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+End-to-end capture benchmark suite with stored baselines.
+
+Runs each load-generator scenario in a fresh interpreter (so peak RSS is per
+scenario) and compares the results with ``benchmarks/baselines.json``.
+Each scenario runs ``--runs`` times and every metric takes its median, so
+one flush stalled by the filesystem or a GIL switch does not flag (or get
+recorded). Exits non-zero if any metric regressed past its tolerance.
+
+Run from the repo root:
+    python -m benchmarks.suite                 # compare against baselines
+    python -m benchmarks.suite --update        # record new baselines
+    python -m benchmarks.suite poll8k mixed    # a subset
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BASELINES = Path(__file__).with_name("baselines.json")
+
+# (name, profile, log format)
+SCENARIOS = [
+    ("poll1k", "poll1k", "jsonl"),
+    ("poll4k", "poll4k", "jsonl"),
+    ("poll8k", "poll8k", "jsonl"),
+    ("poll8k_binary", "poll8k", "binary"),
+    ("apm", "apm", "jsonl"),
+    ("scroll", "scroll", "jsonl"),
+    ("mixed", "mixed", "jsonl"),
+]
+
+# metric -> (direction, relative tolerance, absolute slack). "higher" means
+# bigger is better. The slack keeps near-zero baselines from flagging noise.
+CHECKS: Dict[str, Tuple[str, float, float]] = {
+    "events_per_sec": ("higher", 0.05, 0.0),
+    "dropped_frames": ("lower", 0.0, 2),
+    "late_frames": ("lower", 0.0, 3),
+    "flush_p99_ms": ("lower", 0.5, 5.0),
+    "final_flush_ms": ("lower", 0.5, 5.0),
+    "peak_rss_mb": ("lower", 0.2, 4.0),
+}
+
+
+def run_scenario(profile: str, log_format: str, seconds: float) -> Dict:
+    cmd = [sys.executable, "-m", "benchmarks.loadgen", profile, "--seconds", str(seconds), "--format", log_format, "--json"]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_median(profile: str, log_format: str, seconds: float, runs: int) -> Dict:
+    """Per-metric median of ``runs`` runs (the upper one for an even count, so counts stay ints)."""
+    results = [run_scenario(profile, log_format, seconds) for _ in range(runs)]
+    return {key: sorted(r[key] for r in results)[runs // 2] for key in results[0]}
+
+
+def compare(result: Dict, baseline: Dict) -> List[str]:
+    problems = []
+    for metric, (direction, rel, slack) in CHECKS.items():
+        if metric not in baseline:
+            continue
+        was, now = baseline[metric], result[metric]
+        if direction == "higher":
+            limit = was * (1.0 - rel) - slack
+            if now < limit:
+                problems.append(f"{metric} {now:.2f} < {limit:.2f} (baseline {was:.2f})")
+        else:
+            limit = was * (1.0 + rel) + slack
+            if now > limit:
+                problems.append(f"{metric} {now:.2f} > {limit:.2f} (baseline {was:.2f})")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the capture benchmark suite.")
+    parser.add_argument("scenarios", nargs="*", help="subset of scenario names (default: all)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--runs", type=int, default=3, help="runs per scenario; metrics are medians")
+    parser.add_argument("--update", action="store_true", help=f"write results to {BASELINES.name}")
+    args = parser.parse_args()
+
+    selected = [s for s in SCENARIOS if not args.scenarios or s[0] in args.scenarios]
+    stored = json.loads(BASELINES.read_text(encoding="utf-8")) if BASELINES.exists() else {"scenarios": {}}
+    baselines = stored["scenarios"]
+
+    print(f"{'scenario':14s} {'events/s':>9s} {'dropped':>7s} {'late':>5s} {'flush p99':>9s} {'final':>7s} {'rss MB':>7s}  status")
+    failed = 0
+    for name, profile, log_format in selected:
+        result = run_median(profile, log_format, args.seconds, args.runs)
+        problems = [] if args.update or name not in baselines else compare(result, baselines[name])
+        status = "new" if name not in baselines else ("REGRESSED" if problems else "ok")
+        if args.update:
+            baselines[name] = {metric: result[metric] for metric in CHECKS}
+            status = "updated"
+        failed += bool(problems)
+        print(
+            f"{name:14s} {result['events_per_sec']:9.0f} {result['dropped_frames']:7d} {result['late_frames']:5d}"
+            f" {result['flush_p99_ms']:8.2f}ms {result['final_flush_ms']:5.1f}ms {result['peak_rss_mb']:7.1f}  {status}"
+        )
+        for problem in problems:
+            print(f"    {problem}")
+
+    if args.update:
+        stored["machine"] = {"python": platform.python_version(), "platform": platform.platform(), "seconds": args.seconds, "runs": args.runs}
+        BASELINES.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Synthetic ``*_log.jsonl`` sessions shaped like real recorder output.
+
+Run from the repo root:  python -m benchmarks.synthetic_log out_dir [--minutes M] [--count N]
+"""
+
+import argparse
+import datetime
+import json
+import random
+from pathlib import Path
+
+FRAME_INTERVAL = 1.0 / 30.0
+KEY_POOL = ["w", "a", "s", "d", "shift", "space", "ctrl", "e", "q", "r", "1", "2", "3", "tab"]
+
+
+def session_records(seconds: float, flush_interval: float = 10.0, seed: int = 0, video_file: str = "game_recording.mkv"):
+    """Yield JSONL records for a session of ``seconds`` length."""
+    rng = random.Random(seed)
+    frame = 0
+    t = 0.0
+    held = set()
+    wall = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    while t < seconds:
+        end = min(t + flush_interval, seconds)
+        positions, mouse_events, keyboard_events = [], [], []
+        while frame * FRAME_INTERVAL < end:
+            positions.append({"delta": {"dx": rng.randint(-60, 60), "dy": rng.randint(-30, 30)}, "timestamp": frame * FRAME_INTERVAL, "frame_index": frame})
+            frame += 1
+        ts = t
+        while True:
+            ts += rng.expovariate(6.0)
+            if ts >= end:
+                break
+            roll = rng.random()
+            if roll < 0.55:
+                key = rng.choice(KEY_POOL)
+                if key in held:
+                    held.discard(key)
+                    keyboard_events.append({"type": "release", "key": key, "timestamp": ts})
+                else:
+                    held.add(key)
+                    keyboard_events.append({"type": "press", "keys": sorted(held), "timestamp": ts})
+            elif roll < 0.9:
+                action = "press" if rng.random() < 0.5 else "release"
+                mouse_events.append({"type": "click", "action": action, "button": rng.choice(["left", "left", "right"]), "position": {"x": rng.randint(0, 2559), "y": rng.randint(0, 1439)}, "timestamp": ts})
+            else:
+                raw = rng.choice([120, -120, 240])
+                mouse_events.append({"type": "scroll", "axis": "vertical", "steps": raw / 120, "raw_delta": raw, "timestamp": ts})
+        t = end
+        yield {
+            "timestamp": (wall + datetime.timedelta(seconds=t)).isoformat(),
+            "relative_timestamp": t,
+            "keyboard_events": keyboard_events,
+            "mouse_events": mouse_events,
+            "mouse_positions": positions,
+            "stats": {
+                "keyboard_events_count": len(keyboard_events),
+                "mouse_clicks_count": len([e for e in mouse_events if e.get("type") == "click"]),
+                "mouse_scrolls_count": len([e for e in mouse_events if e.get("type") == "scroll"]),
+                "mouse_positions_count": len(positions),
+            },
+            "video_file": video_file,
+            "recording_duration": t,
+        }
+
+
+def write_session(path: Path, seconds: float, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    video_file = path.name.replace("_log.jsonl", ".mkv")
+    with path.open("w", encoding="utf-8") as handle:
+        for record in session_records(seconds, seed=seed, video_file=video_file):
+            handle.write(json.dumps(record) + "\n")
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--count", type=int, default=1)
+    args = parser.parse_args()
+    for i in range(args.count):
+        stamp = (datetime.datetime(2024, 1, 1) + datetime.timedelta(hours=i)).strftime("%Y-%m-%d_%H-%M-%S")
+        log = args.out_dir / f"game_recording_{stamp}_log.jsonl"
+        write_session(log, args.minutes * 60, seed=i)
+        (args.out_dir / f"game_recording_{stamp}.mkv").touch()
+        print(log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+"""
+Compact binary session log (``*_log.gmlb``) and JSONL <-> binary conversion.
+
+Layout (all integers little-endian)::
+
+    file   := b"GMLB" u16 version u16 flags u32 header_len header_json chunk*
+    chunk  := b"CHNK" u32 meta_len u32 n_pos u32 n_mouse u32 n_key u32 n_held
+              i64 frame_base i64 ts_base_us meta_json
+              pos_rows mouse_rows key_rows held_codes exact_ts*
+
+    pos_rows   n_pos   x (i32 frame_delta, i32 dx, i32 dy[, i32 ts_off_us])
+    mouse_rows n_mouse x (i32 kind|action<<8|label<<16, i32 a, i32 b, i32 ts_off_us)
+    key_rows   n_key   x (i32 kind|key<<8, i32 held_end, i32 ts_off_us)
+    held_codes n_held  x u16
+    exact_ts   one row count x f64 per stream named in the meta's "exact"
+
+One chunk corresponds to one JSONL flush record; ``meta_json`` carries the
+record's scalar fields (timestamp, relative_timestamp, stats, ...) plus any
+button/key names first used in that chunk. Timestamps are integer
+microseconds relative to ``ts_base_us``; sampler rows that sit exactly on the
+``frame_interval`` grid are flagged (meta ``on_grid``) and drop their
+``ts_off_us`` column: they decode to the identical float from the frame index.
+A stream with sub-microsecond timestamp digits also stores its timestamps
+as float64 (``exact_ts``), and scroll steps other than raw_delta / 120
+(high-resolution wheels) are kept in the meta's "steps" as ``[row, steps]``.
+So every record round-trips exactly.
+
+CLI:
+    python binlog.py to-bin  session_log.jsonl [out.gmlb]
+    python binlog.py to-jsonl session_log.gmlb [out.jsonl]
+"""
+
+import argparse
+import json
+import statistics
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain, repeat
+from operator import mul, truediv
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import event_buffers as eb
+from event_buffers import KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer
+
+MAGIC = b"GMLB"
+CHUNK_TAG = b"CHNK"
+VERSION = 1
+SUFFIX = ".gmlb"
+
+FILE_HEADER = struct.Struct("<4sHHI")
+CHUNK_HEADER = struct.Struct("<4sIIIIIqq")
+POS_FIELDS = 4
+MOUSE_FIELDS = 4
+KEY_FIELDS = 3
+INT32_MAX = 2**31 - 1
+WHEEL_DELTA = 120
+
+# Record keys in the order save_log writes them.
+RECORD_KEYS = (
+    "timestamp",
+    "relative_timestamp",
+    "keyboard_events",
+    "mouse_events",
+    "mouse_positions",
+    "stats",
+    "video_file",
+    "recording_duration",
+)
+EVENT_KEYS = ("keyboard_events", "mouse_events", "mouse_positions")
+STREAMS = ("positions", "mouse", "keyboard")
+# Meta keys that describe the chunk's encoding rather than the record.
+CHUNK_META = ("names", "on_grid", "exact", "steps")
+INTERNERS = {"keys": eb.KEYS, "buttons": eb.BUTTONS, "actions": eb.ACTIONS, "axes": eb.AXES}
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def log_path_for(video_path: Path) -> Path:
+    return video_path.with_name(f"{video_path.stem}_log{SUFFIX}")
+
+
+def _to_le(arr: array) -> bytes:
+    if _BIG_ENDIAN:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _from_le(typecode: str, data) -> array:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if _BIG_ENDIAN:
+        arr.byteswap()
+    return arr
+
+
+def _interleave(columns: List[array], typecode: str = "i") -> array:
+    n = len(columns[0])
+    out = array(typecode, bytes(array(typecode).itemsize * n * len(columns)))
+    stride = len(columns)
+    for i, col in enumerate(columns):
+        out[i::stride] = col if col.typecode == typecode else array(typecode, col)
+    return out
+
+
+def _us(ts: float) -> int:
+    return round(ts * 1_000_000)
+
+
+def _u16_at(raw: bytes, offset: int, stride: int) -> bytes:
+    """Little-endian u16 bytes found at ``offset`` within each ``stride``-byte row."""
+    out = bytearray(2 * (len(raw) // stride))
+    out[0::2] = raw[offset::stride]
+    out[1::2] = raw[offset + 1::stride]
+    return bytes(out)
+
+
+def _seconds(ts_base: int, offsets: array) -> array:
+    return array("d", map(truediv, map(ts_base.__add__, offsets), repeat(1_000_000)))
+
+
+def _whole_us(timestamps: array) -> bool:
+    """Whether every timestamp decodes back from its integer microseconds."""
+    return all(_us(t) / 1_000_000 == t for t in timestamps)
+
+
+class BinaryLogWriter:
+    """Appends chunks to a ``.gmlb`` file; writes the header on first use.
+
+    Keeps track of how many interned names have already been written so each
+    chunk only carries names first used since the previous chunk.
+    """
+
+    def __init__(self, path: Path, header: Optional[dict] = None) -> None:
+        self.path = Path(path)
+        self.header = dict(header or {})
+        self._names_written: Dict[str, int] = {}
+        if self.path.exists() and self.path.stat().st_size:
+            with self.path.open("rb") as handle:
+                reader = BinaryLogReader(handle)
+                for _ in reader.iter_raw_chunks():
+                    pass
+                self.header = reader.header
+                self._names_written = {table: len(names) for table, names in reader.names.items()}
+
+    def _new_names(self) -> Dict[str, List[str]]:
+        out = {}
+        for table, interner in INTERNERS.items():
+            done = self._names_written.get(table, 0)
+            if len(interner) > done:
+                out[table] = interner.names[done:]
+                self._names_written[table] = len(interner)
+        return out
+
+    def names_written(self) -> Dict[str, List[str]]:
+        """The name tables a reader holds after the last encoded chunk."""
+        return {table: INTERNERS[table].names[:count] for table, count in self._names_written.items()}
+
+    def encode_header(self) -> bytes:
+        body = json.dumps(self.header).encode("utf-8")
+        return FILE_HEADER.pack(MAGIC, VERSION, 0, len(body)) + body
+
+    def encode_chunk(
+        self,
+        meta: dict,
+        positions: MousePositionBuffer,
+        mouse: MouseEventBuffer,
+        keyboard: KeyboardEventBuffer,
+    ) -> bytes:
+        all_ts = list(positions.timestamp) + list(mouse.timestamp) + list(keyboard.timestamp)
+        ts_base = min(_us(t) for t in all_ts) if all_ts else 0
+        frame_base = positions.frame_index[0] if len(positions) else 0
+
+        meta = dict(meta)
+        interval = self.header.get("frame_interval")
+        on_grid = False
+        if interval and len(positions):
+            on_grid = meta["on_grid"] = all(t == fi * interval for fi, t in zip(positions.frame_index, positions.timestamp))
+        exact = [
+            name
+            for name, buffer in (("positions", positions), ("mouse", mouse), ("keyboard", keyboard))
+            if not (name == "positions" and on_grid) and not _whole_us(buffer.timestamp)
+        ]
+        if exact:
+            meta["exact"] = exact
+        names = self._new_names()
+        if names:
+            meta["names"] = names
+
+        def offsets(timestamps: array) -> array:
+            out = array("i", (_us(t) - ts_base for t in timestamps))
+            if out and max(out) > INT32_MAX:
+                raise ValueError("chunk spans more than ~35 minutes; flush more often")
+            return out
+
+        if len(positions):
+            fi = positions.frame_index
+            frame_deltas = array("i", [0]) + array("i", (b - a for a, b in zip(fi, fi[1:])))
+            columns = [frame_deltas, positions.dx, positions.dy]
+            pos_rows = _interleave(columns if on_grid else columns + [offsets(positions.timestamp)])
+        else:
+            pos_rows = array("i")
+
+        if len(mouse):
+            packed = array("i", (k | (act << 8) | (lab << 16) for k, act, lab in zip(mouse.kind, mouse.action, mouse.label)))
+            steps = [
+                [row, value]
+                for row, (kind, value, raw) in enumerate(zip(mouse.kind, mouse.steps, mouse.a))
+                if kind == eb.SCROLL and value != raw / WHEEL_DELTA
+            ]
+            if steps:
+                meta["steps"] = steps
+            mouse_rows = _interleave([packed, mouse.a, mouse.b, offsets(mouse.timestamp)])
+        else:
+            mouse_rows = array("i")
+
+        held_end, held = keyboard.flat_held()
+        if len(keyboard):
+            packed = array("i", (k | (key << 8) for k, key in zip(keyboard.kind, keyboard.key)))
+            key_rows = _interleave([packed, held_end, offsets(keyboard.timestamp)])
+        else:
+            key_rows = array("i")
+
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        head = CHUNK_HEADER.pack(
+            CHUNK_TAG, len(meta_bytes), len(positions), len(mouse), len(keyboard), len(held), frame_base, ts_base
+        )
+        buffers = {"positions": positions, "mouse": mouse, "keyboard": keyboard}
+        exact_ts = [_to_le(array("d", buffers[name].timestamp)) for name in exact]
+        return b"".join((head, meta_bytes, _to_le(pos_rows), _to_le(mouse_rows), _to_le(key_rows), _to_le(held), *exact_ts))
+
+    def append(
+        self,
+        meta: dict,
+        positions: MousePositionBuffer,
+        mouse: MouseEventBuffer,
+        keyboard: KeyboardEventBuffer,
+    ) -> int:
+        """Append one chunk; returns the number of bytes written."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as handle:
+            data = b""
+            if handle.tell() == 0:
+                data = self.encode_header()
+            data += self.encode_chunk(meta, positions, mouse, keyboard)
+            handle.write(data)
+        return len(data)
+
+
+class Chunk:
+    """One decoded chunk: record metadata plus columnar event buffers."""
+
+    __slots__ = ("meta", "positions", "mouse", "keyboard", "names")
+
+    def __init__(self, meta, positions, mouse, keyboard, names) -> None:
+        self.meta = meta
+        self.positions = positions
+        self.mouse = mouse
+        self.keyboard = keyboard
+        self.names = names
+
+    def to_record(self) -> dict:
+        """The JSONL record this chunk was written from."""
+        # Codes in a decoded chunk index the file's own name tables, not the
+        # process-wide interners.
+        events = {
+            "keyboard_events": self.keyboard.to_dicts(self.names),
+            "mouse_events": self.mouse.to_dicts(self.names),
+            "mouse_positions": self.positions.to_dicts(),
+        }
+        record = {}
+        for key in RECORD_KEYS:
+            if key in events:
+                record[key] = events[key]
+            elif key in self.meta:
+                record[key] = self.meta[key]
+        for key, value in self.meta.items():
+            if key not in record and key not in CHUNK_META:
+                record[key] = value
+        return record
+
+
+class BinaryLogReader:
+    """Streaming reader over a ``.gmlb`` file object; one chunk in memory at a time."""
+
+    def __init__(self, handle: BinaryIO) -> None:
+        self.handle = handle
+        raw = handle.read(FILE_HEADER.size)
+        if len(raw) < FILE_HEADER.size:
+            raise ValueError("truncated binary log header")
+        magic, version, _flags, header_len = FILE_HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError("not a binary session log")
+        if version > VERSION:
+            raise ValueError(f"unsupported binary log version {version}")
+        self.header = json.loads(handle.read(header_len).decode("utf-8"))
+        self.names: Dict[str, List[str]] = {table: [] for table in INTERNERS}
+
+    def iter_raw_chunks(self) -> Iterator[Tuple[tuple, dict, bytes]]:
+        while True:
+            raw = self.handle.read(CHUNK_HEADER.size)
+            if not raw:
+                return
+            if len(raw) < CHUNK_HEADER.size:
+                raise ValueError("truncated chunk header")
+            head = CHUNK_HEADER.unpack(raw)
+            tag, meta_len, n_pos, n_mouse, n_key, n_held, _frame_base, _ts_base = head
+            if tag != CHUNK_TAG:
+                raise ValueError("corrupt chunk tag")
+            meta = json.loads(self.handle.read(meta_len).decode("utf-8"))
+            for table, new in meta.get("names", {}).items():
+                self.names.setdefault(table, []).extend(new)
+            pos_fields = POS_FIELDS - 1 if meta.get("on_grid") else POS_FIELDS
+            size = 4 * (n_pos * pos_fields + n_mouse * MOUSE_FIELDS + n_key * KEY_FIELDS) + 2 * n_held
+            counts = {"positions": n_pos, "mouse": n_mouse, "keyboard": n_key}
+            size += 8 * sum(counts[name] for name in meta.get("exact", ()))
+            body = self.handle.read(size)
+            if len(body) < size:
+                raise ValueError("truncated chunk body")
+            yield head, meta, body
+
+    def __iter__(self) -> Iterator[Chunk]:
+        interval = self.header.get("frame_interval")
+        for head, meta, body in self.iter_raw_chunks():
+            yield decode_chunk(head, meta, body, self.names, interval)
+
+
+def split_chunk(data) -> Tuple[tuple, dict, memoryview]:
+    """Header, metadata and body of one encoded chunk held in memory."""
+    head = CHUNK_HEADER.unpack_from(data)
+    tag, meta_len = head[0], head[1]
+    if tag != CHUNK_TAG:
+        raise ValueError("corrupt chunk tag")
+    view = memoryview(data)
+    meta = json.loads(bytes(view[CHUNK_HEADER.size:CHUNK_HEADER.size + meta_len]).decode("utf-8"))
+    return head, meta, view[CHUNK_HEADER.size + meta_len:]
+
+
+def decode_chunk(head: tuple, meta: dict, body, names: Dict[str, List[str]], interval: Optional[float] = None) -> Chunk:
+    """Columnar buffers for one chunk; ``names`` are the file's name tables up to and including it."""
+    _tag, _meta_len, n_pos, n_mouse, n_key, n_held, frame_base, ts_base = head
+    view = memoryview(body)
+    off = 0
+
+    positions = MousePositionBuffer()
+    if n_pos:
+        on_grid = meta.get("on_grid")
+        if on_grid and not interval:
+            raise ValueError("on-grid sampler rows need the log's frame_interval")
+        fields = POS_FIELDS - 1 if on_grid else POS_FIELDS
+        rows = _from_le("i", view[off:off + 4 * fields * n_pos])
+        off += 4 * fields * n_pos
+        deltas = rows[0::fields]
+        if deltas[0] == 0 and deltas.count(1) == n_pos - 1:
+            # Sampler never fell behind in this chunk: frames are contiguous.
+            positions.frame_index = array("q", range(frame_base, frame_base + n_pos))
+        else:
+            positions.frame_index = array("q", accumulate(deltas, initial=frame_base))[1:]
+        # Decoded columns stay int32; only appends need the wider type.
+        positions.dx = rows[1::fields]
+        positions.dy = rows[2::fields]
+        if on_grid:
+            positions.timestamp = array("d", map(mul, positions.frame_index, repeat(interval)))
+        else:
+            positions.timestamp = _seconds(ts_base, rows[3::4])
+
+    mouse = MouseEventBuffer()
+    if n_mouse:
+        raw = view[off:off + 16 * n_mouse].tobytes()
+        off += 16 * n_mouse
+        rows = _from_le("i", raw)
+        # The packed first field is sliced straight out of the
+        # little-endian bytes: kind, action, then a u16 label.
+        mouse.kind = array("B", raw[0::16])
+        mouse.action = array("B", raw[1::16])
+        mouse.label = _from_le("H", _u16_at(raw, 2, 16))
+        mouse.a = rows[1::4]
+        mouse.b = rows[2::4]
+        mouse.steps = array("d", (a / WHEEL_DELTA if k == eb.SCROLL else 0.0 for k, a in zip(mouse.kind, mouse.a)))
+        for row, steps in meta.get("steps", ()):
+            mouse.steps[row] = steps
+        mouse.timestamp = _seconds(ts_base, rows[3::4])
+
+    keyboard = KeyboardEventBuffer()
+    if n_key:
+        raw = view[off:off + 12 * n_key].tobytes()
+        off += 12 * n_key
+        rows = _from_le("i", raw)
+        keyboard.kind = array("B", raw[0::12])
+        keyboard.key = _from_le("H", _u16_at(raw, 1, 12))
+        keyboard.timestamp = _seconds(ts_base, rows[2::3])
+        held = _from_le("H", view[off:off + 2 * n_held]) if n_held else array("H")
+        off += 2 * n_held
+        keyboard.set_flat_held(rows[1::3], held)
+
+    buffers = {"positions": positions, "mouse": mouse, "keyboard": keyboard}
+    for name in sorted(meta.get("exact", ()), key=STREAMS.index):
+        n = len(buffers[name])
+        buffers[name].timestamp = _from_le("d", view[off:off + 8 * n])
+        off += 8 * n
+
+    return Chunk(meta, positions, mouse, keyboard, names)
+
+
+def iter_records(path: Path) -> Iterator[dict]:
+    """Yield one JSONL-shaped record per chunk, streaming."""
+    with Path(path).open("rb") as handle:
+        for chunk in BinaryLogReader(handle):
+            yield chunk.to_record()
+
+
+def iter_log_records(path: Path) -> Iterator[dict]:
+    """Records from a ``*_log.jsonl``, a binary log or a segmented log's manifest."""
+    path = Path(path)
+    if path.name.endswith(".manifest.json"):
+        # Imported here: log_segments builds on this module.
+        import log_segments
+
+        yield from log_segments.iter_records(path)
+        return
+    if path.suffix == SUFFIX:
+        yield from iter_records(path)
+        return
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def buffers_from_record(record: dict) -> Tuple[MousePositionBuffer, MouseEventBuffer, KeyboardEventBuffer]:
+    """Rebuild columnar buffers from a JSONL record (codes via the global interners)."""
+    positions = MousePositionBuffer()
+    for row in record.get("mouse_positions", ()):
+        delta = row["delta"]
+        positions.append(row["frame_index"], delta["dx"], delta["dy"], row["timestamp"])
+
+    mouse = MouseEventBuffer()
+    for evt in record.get("mouse_events", ()):
+        if evt.get("type") == "click":
+            pos = evt.get("position", {})
+            mouse.append_click(eb.BUTTONS.code(evt["button"]), eb.ACTIONS.code(evt["action"]), pos.get("x", 0), pos.get("y", 0), evt["timestamp"])
+        else:
+            mouse.append_scroll(eb.AXES.code(evt["axis"]), evt["steps"], evt["raw_delta"], evt["timestamp"])
+
+    keyboard = KeyboardEventBuffer()
+    for evt in record.get("keyboard_events", ()):
+        if evt.get("type") == "press":
+            codes = [eb.KEYS.code(k) for k in evt["keys"]]
+            keyboard.append_press(codes[-1] if codes else 0, eb.codes_mask(codes), evt["timestamp"])
+        else:
+            keyboard.append_release(eb.KEYS.code(evt["key"]), evt["timestamp"])
+    return positions, mouse, keyboard
+
+
+def record_meta(record: dict) -> dict:
+    return {key: value for key, value in record.items() if key not in EVENT_KEYS}
+
+
+def frame_interval_of(rows: List[dict]) -> Optional[float]:
+    """The sampler interval of JSONL ``mouse_positions`` rows, which sit at ``frame_index * interval``."""
+    ratios = [row["timestamp"] / row["frame_index"] for row in rows if row["frame_index"]]
+    if not ratios:
+        return None
+    estimate = statistics.median(ratios)
+    # The sampler used exactly 1 / rate; recover that float when the rate is a round number.
+    for digits in (0, 3):
+        interval = 1.0 / round(1.0 / estimate, digits)
+        if all(row["timestamp"] == row["frame_index"] * interval for row in rows):
+            return interval
+    return estimate
+
+
+def jsonl_to_binary(src: Path, dst: Path, frame_interval: Optional[float] = None) -> Path:
+    """Write ``src`` (a ``*_log.jsonl`` or a JSONL segmented log's manifest) as one binary log.
+
+    ``frame_interval`` defaults to the one in the manifest's header, or else
+    the one the first sampler rows were taken at.
+    """
+    src, dst = Path(src), Path(dst)
+    if dst.exists():
+        dst.unlink()
+    records = iter_log_records(src)
+    if frame_interval is None and src.name.endswith(".manifest.json"):
+        with src.open("r", encoding="utf-8") as handle:
+            frame_interval = json.load(handle)["header"].get("frame_interval")
+    if frame_interval is None:
+        seen = []
+        for record in records:
+            seen.append(record)
+            if len(record.get("mouse_positions") or ()) > 1:
+                frame_interval = frame_interval_of(record["mouse_positions"])
+                break
+        records = chain(seen, records)
+    writer = None
+    for record in records:
+        if writer is None:
+            writer = BinaryLogWriter(dst, {"video_file": record.get("video_file"), "frame_interval": frame_interval})
+        writer.append(record_meta(record), *buffers_from_record(record))
+    if writer is None:
+        dst.write_bytes(BinaryLogWriter(dst, {"frame_interval": frame_interval}).encode_header())
+    return dst
+
+
+def binary_to_jsonl(src: Path, dst: Path) -> Path:
+    """Write ``src`` (a binary log or a binary segmented log's manifest) as one ``*_log.jsonl``."""
+    src, dst = Path(src), Path(dst)
+    with Path(dst).open("w", encoding="utf-8") as out:
+        for record in iter_log_records(src):
+            out.write(json.dumps(record) + "\n")
+    return dst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert session logs between JSONL and the binary format.")
+    parser.add_argument("command", choices=["to-bin", "to-jsonl"])
+    parser.add_argument("src", type=Path)
+    parser.add_argument("dst", type=Path, nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "to-bin":
+        dst = args.dst or args.src.with_suffix(SUFFIX)
+        jsonl_to_binary(args.src, dst)
+    else:
+        dst = args.dst or args.src.with_suffix(".jsonl")
+        binary_to_jsonl(args.src, dst)
+    print(f"Wrote {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+SQLite catalog of recorded sessions, for searching a recordings library.
+
+``catalog.sqlite3`` in the recordings directory holds one row per session
+log, keyed by the log's path. Each row has the video path, the session
+totals from ``batch.summarize_log`` (the manifest's summary, or the same
+totals recomputed by a full scan) and the key and click histograms
+(JSON, and one row per key/button in ``histograms`` for queries by key).
+It also has where the log's time index is (``log_index.py``), how many
+entries it has, and the manifest's segment table (file, start/end seconds,
+records, bytes), so a reader can seek without opening the log.
+
+OBSRecorder adds each session as it stops. ``scan`` backfills a directory.
+Like ``batch.py`` it skips logs whose size and mtime match their row,
+summarizes the rest on a process pool, and drops rows whose log is gone.
+A closed segmented log keeps its summary in the manifest, so cataloguing
+one reads a few KB. An older ``*_log.jsonl`` is read in full once.
+
+The database runs in WAL mode, so queries never wait for the recorder.
+
+CLI:
+    python catalog.py scan recordings/ [--workers N]
+    python catalog.py find recordings/ --min-duration 3600 --min-apm 300 [--key w --min-presses 500]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import batch
+import binlog
+import log_segments
+
+CATALOG_NAME = "catalog.sqlite3"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    log TEXT NOT NULL UNIQUE,
+    video TEXT,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    started TEXT,
+    duration REAL NOT NULL,
+    frames INTEGER NOT NULL,
+    missing_frames INTEGER NOT NULL,
+    key_presses INTEGER NOT NULL,
+    clicks INTEGER NOT NULL,
+    scrolls INTEGER NOT NULL,
+    apm REAL NOT NULL,
+    mouse_travel REAL NOT NULL,
+    idle_total REAL,
+    key_histogram TEXT NOT NULL,
+    click_histogram TEXT NOT NULL,
+    index_path TEXT,
+    index_entries INTEGER,
+    segments TEXT,
+    cataloged_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_duration ON sessions (duration);
+CREATE INDEX IF NOT EXISTS sessions_apm ON sessions (apm);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started);
+CREATE TABLE IF NOT EXISTS histograms (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (session_id, kind, name)
+);
+CREATE INDEX IF NOT EXISTS histograms_by_name ON histograms (kind, name, count);
+"""
+
+COLUMNS = (
+    "log", "video", "format", "size", "mtime_ns", "started", "duration", "frames", "missing_frames", "key_presses",
+    "clicks", "scrolls", "apm", "mouse_travel", "idle_total", "key_histogram", "click_histogram", "index_path",
+    "index_entries", "segments", "cataloged_at",
+)
+
+
+def catalog_path_for(root: Path) -> Path:
+    return Path(root) / CATALOG_NAME
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open (creating if needed) the catalog at ``path``."""
+    conn = sqlite3.connect(str(path), timeout=10.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"{path} is a newer catalog (schema {version})")
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    return conn
+
+
+def _log_format(log: Path) -> str:
+    if log_segments.is_manifest(log):
+        return log_segments.read_manifest(log)["format"]
+    return "binary" if log.suffix == binlog.SUFFIX else "jsonl"
+
+
+def _index_info(log: Path) -> Dict:
+    index_path = log_segments.index_path_for(log)
+    if not index_path.exists():
+        return {"index_path": None, "index_entries": None}
+    # Entry count from the file size; a torn last entry is not counted.
+    with index_path.open("rb") as handle:
+        head = handle.read(log_segments.INDEX_HEADER.size)
+    if len(head) < log_segments.INDEX_HEADER.size:
+        return {"index_path": None, "index_entries": None}
+    _magic, _version, entry_size, header_len = log_segments.INDEX_HEADER.unpack(head)
+    entries = (index_path.stat().st_size - log_segments.INDEX_HEADER.size - header_len) // entry_size
+    return {"index_path": index_path.name, "index_entries": max(0, entries)}
+
+
+def _started(record: Optional[dict]) -> Optional[str]:
+    """Wall time the session started: the first flush's time minus its session seconds."""
+    if not record or not record.get("timestamp"):
+        return None
+    try:
+        flushed = datetime.datetime.fromisoformat(record["timestamp"])
+    except ValueError:
+        return None
+    return (flushed - datetime.timedelta(seconds=record.get("relative_timestamp") or 0.0)).isoformat()
+
+
+def describe(log: str, video: Optional[str]) -> Dict:
+    """A catalog row for one session log (runs in a worker process during scans)."""
+    log_path = Path(log).resolve()
+    video = str(Path(video).resolve()) if video else None
+    size, mtime_ns = batch.file_key(log_path)
+    summary = batch.summarize_log(log_path, Path(video) if video else None)
+    first = next(binlog.iter_log_records(log_path), None)
+    segments = None
+    if log_segments.is_manifest(log_path):
+        segments = [
+            {key: segment.get(key) for key in ("file", "start", "end", "records", "bytes")}
+            for segment in log_segments.read_manifest(log_path)["segments"]
+        ]
+    return {
+        "log": str(log_path),
+        "video": video,
+        "format": _log_format(log_path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "started": _started(first),
+        "duration": summary["duration"],
+        "frames": summary["frames"],
+        "missing_frames": summary["missing_frames"],
+        "key_presses": summary["key_presses"],
+        "clicks": summary["clicks"],
+        "scrolls": summary["scrolls"],
+        "apm": summary["apm"],
+        "mouse_travel": summary["mouse_travel"],
+        "idle_total": summary.get("idle_total"),
+        "key_histogram": summary["key_histogram"],
+        "click_histogram": summary["click_histogram"],
+        "segments": segments,
+        **_index_info(log_path),
+    }
+
+
+def upsert(conn: sqlite3.Connection, row: Dict) -> int:
+    """Insert or replace a session row (and its histogram rows); returns its id."""
+    values = dict(row, cataloged_at=datetime.datetime.now().isoformat())
+    values["key_histogram"] = json.dumps(row["key_histogram"])
+    values["click_histogram"] = json.dumps(row["click_histogram"])
+    values["segments"] = json.dumps(row["segments"]) if row.get("segments") is not None else None
+    with conn:
+        conn.execute(
+            f"INSERT INTO sessions ({', '.join(COLUMNS)}) VALUES ({', '.join(':' + c for c in COLUMNS)})"
+            f" ON CONFLICT (log) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUMNS[1:])}",
+            values,
+        )
+        session_id = conn.execute("SELECT id FROM sessions WHERE log = ?", (values["log"],)).fetchone()[0]
+        conn.execute("DELETE FROM histograms WHERE session_id = ?", (session_id,))
+        conn.executemany(
+            "INSERT INTO histograms (session_id, kind, name, count) VALUES (?, ?, ?, ?)",
+            [(session_id, "key", name, n) for name, n in row["key_histogram"].items()]
+            + [(session_id, "click", name, n) for name, n in row["click_histogram"].items()],
+        )
+    return session_id
+
+
+def record_session(root: Path, log: Path, video: Optional[Path] = None) -> int:
+    """Catalog one finished session; OBSRecorder calls this when a recording stops."""
+    conn = connect(catalog_path_for(root))
+    try:
+        return upsert(conn, describe(str(log), str(video) if video else None))
+    finally:
+        conn.close()
+
+
+def scan(root: Path, workers: Optional[int] = None, catalog: Optional[Path] = None, progress: bool = True) -> Dict[str, int]:
+    """Bring the catalog up to date with every session log under ``root``."""
+    root = Path(root).resolve()  # rows are keyed by absolute path
+    conn = connect(catalog or catalog_path_for(root))
+    try:
+        known = {row["log"]: (row["size"], row["mtime_ns"]) for row in conn.execute("SELECT log, size, mtime_ns FROM sessions")}
+        pairs = batch.discover(root)
+        found = {str(log) for log, _ in pairs}
+        todo = [(log, video) for log, video in pairs if known.get(str(log)) != batch.file_key(log)]
+        gone = [log for log in known if log not in found and Path(log).is_relative_to(root)]
+        with conn:
+            conn.executemany("DELETE FROM sessions WHERE log = ?", [(log,) for log in gone])
+        if progress:
+            print(f"catalog: {len(todo)} of {len(pairs)} sessions to read, {len(gone)} removed", file=sys.stderr)
+        failed = 0
+        if todo:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(describe, str(log), str(video) if video else None): log for log, video in todo}
+                for future in as_completed(futures):
+                    try:
+                        upsert(conn, future.result())
+                    except Exception as exc:
+                        failed += 1
+                        print(f"{futures[future]}: {type(exc).__name__}: {exc}", file=sys.stderr)
+        return {"sessions": len(pairs), "read": len(todo) - failed, "failed": failed, "removed": len(gone)}
+    finally:
+        conn.close()
+
+
+def find(
+    conn: sqlite3.Connection,
+    min_duration: Optional[float] = None,
+    max_duration: Optional[float] = None,
+    min_apm: Optional[float] = None,
+    since: Optional[str] = None,
+    key: Optional[str] = None,
+    min_presses: int = 1,
+    order: str = "started",
+    limit: Optional[int] = None,
+) -> List[sqlite3.Row]:
+    """Sessions matching every given filter; ``key`` keeps those with ``min_presses`` of it."""
+    if order not in ("started", "duration", "apm", "key_presses"):
+        raise ValueError(f"cannot order by {order}")
+    where, params = [], []
+    for clause, value in (
+        ("s.duration >= ?", min_duration),
+        ("s.duration <= ?", max_duration),
+        ("s.apm >= ?", min_apm),
+        ("s.started >= ?", since),
+    ):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    if key is not None:
+        where.append("s.id IN (SELECT session_id FROM histograms WHERE kind = 'key' AND name = ? AND count >= ?)")
+        params += [key, min_presses]
+    sql = "SELECT s.* FROM sessions s"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY s.{order} DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    scan_cmd = sub.add_parser("scan", help="catalog new and changed session logs under a directory")
+    scan_cmd.add_argument("root", type=Path)
+    scan_cmd.add_argument("--workers", type=int, default=os.cpu_count())
+    find_cmd = sub.add_parser("find", help="list cataloged sessions")
+    find_cmd.add_argument("root", type=Path)
+    find_cmd.add_argument("--min-duration", type=float, help="seconds")
+    find_cmd.add_argument("--max-duration", type=float, help="seconds")
+    find_cmd.add_argument("--min-apm", type=float)
+    find_cmd.add_argument("--since", help="ISO date or time the session started at or after")
+    find_cmd.add_argument("--key", help="only sessions where this key was pressed ...")
+    find_cmd.add_argument("--min-presses", type=int, default=1, help="... at least this many times")
+    find_cmd.add_argument("--order", default="started", choices=["started", "duration", "apm", "key_presses"])
+    find_cmd.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    if args.command == "scan":
+        started = time.perf_counter()
+        result = scan(args.root, args.workers)
+        print(f"{result['sessions']} sessions: {result['read']} read, {result['failed']} failed, {result['removed']} removed in {time.perf_counter() - started:.1f} s")
+        return
+    conn = connect(catalog_path_for(args.root))
+    try:
+        started = time.perf_counter()
+        rows = find(conn, args.min_duration, args.max_duration, args.min_apm, args.since, args.key, args.min_presses, args.order, args.limit)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    for row in rows:
+        print(f"{row['started'] or '-':26s} {row['duration'] / 60:7.1f} min {row['apm']:6.0f} apm {row['key_presses']:7d} keys  {row['video'] or row['log']}")
+    print(f"{len(rows)} sessions ({elapsed * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Input-clock to video-clock model fitted from OBS record status.
+
+Input timestamps are ``perf_counter`` seconds since the recording start. OBS
+reports ``outputDuration``, which is the frames written times the frame
+interval, so it is quantized to whole frames and then floored to
+milliseconds. ``ClockSampler`` polls it as a task on the recorder loop. It
+stamps each reply at the midpoint of its round trip, and ``DriftModel`` fits
+
+    video_seconds = offset + (1 + drift_ppm * 1e-6) * input_seconds
+
+by online least squares, with a prior pulling the drift toward zero that
+long sessions outweigh. ``offset`` absorbs encoder start-up latency and
+``drift_ppm`` absorbs the rate mismatch between the two clocks. The model's
+``params()`` is written into every session-log record under ``"clock"``.
+``to_video_seconds`` (floats or NumPy arrays) and ``frame_for`` apply it to
+input timestamps.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from telemetry import METRICS
+
+
+def to_video_seconds(ts, params: Dict[str, float]):
+    return params["offset"] + ts * (1.0 + params["drift_ppm"] * 1e-6)
+
+
+def frame_for(ts: float, params: Dict[str, float], fps: float) -> int:
+    """Video frame showing input time ``ts`` (negative before the first frame)."""
+    return math.floor(to_video_seconds(ts, params) * fps)
+
+
+def status_video_seconds(status: object) -> Optional[float]:
+    """Recorded video length from a GetRecordStatus reply, or None if unusable."""
+    duration = getattr(status, "output_duration", None)
+    if duration is not None:
+        return duration / 1e3
+    timecode = getattr(status, "output_timecode", None)
+    if timecode:
+        hours, minutes, seconds = timecode.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return None
+
+
+class DriftModel:
+    """Online least-squares fit of video time against input time."""
+
+    def __init__(self, quantum: float = 1.0 / 30.0, drift_prior_ppm: float = 50.0) -> None:
+        # outputDuration is floored to a frame then to a ms; shifting each
+        # sample by half of that removes the mean bias.
+        self.bias = quantum / 2.0 + 0.0005
+        # Ridge weight (s^2) for a drift prior of ``drift_prior_ppm`` against
+        # the uniform quantization noise; needs ~minutes of samples to move.
+        self.ridge = (quantum * quantum / 12.0) / (drift_prior_ppm * 1e-6) ** 2
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.rejected = 0
+        self.best_rtt = float("inf")
+        self._x0 = self._y0 = 0.0
+        # Welford-style running moments, centred on the first sample.
+        self._mx = self._my = self._cxx = self._cxy = self._cyy = 0.0
+        self._last_x = 0.0
+
+    def add(self, input_seconds: float, video_seconds: float, rtt: float = 0.0) -> bool:
+        """Fold in one observation; replies much slower than the best are dropped."""
+        with self._lock:
+            if rtt > max(2.0 * self.best_rtt, self.best_rtt + 0.002):
+                self.rejected += 1
+                return False
+            self.best_rtt = min(self.best_rtt, rtt)
+            y = video_seconds + self.bias
+            if not self.samples:
+                self._x0, self._y0 = input_seconds, y
+            x, y = input_seconds - self._x0, y - self._y0
+            self.samples += 1
+            n = self.samples
+            dx, dy = x - self._mx, y - self._my
+            self._mx += dx / n
+            self._my += dy / n
+            self._cxx += dx * (x - self._mx)
+            self._cxy += dx * (y - self._my)
+            self._cyy += dy * (y - self._my)
+            self._last_x = input_seconds
+            return True
+
+    def params(self) -> Dict[str, float]:
+        with self._lock:
+            n = self.samples
+            slope = (self._cxy + self.ridge) / (self._cxx + self.ridge)
+            offset = self._y0 + self._my - slope * (self._x0 + self._mx)
+            sse = max(self._cyy - 2.0 * slope * self._cxy + slope * slope * self._cxx, 0.0)
+            return {
+                "offset": offset,
+                "drift_ppm": (slope - 1.0) * 1e6,
+                "samples": n,
+                "rejected": self.rejected,
+                "rms_ms": (sse / max(n - 2, 1)) ** 0.5 * 1e3,
+                "span": self._last_x - self._x0 if n else 0.0,
+                "best_rtt_ms": self.best_rtt * 1e3 if n else None,
+            }
+
+
+class ClockSampler:
+    """Samples ``query()`` (GetRecordStatus) into a ``DriftModel`` as a recorder-loop task.
+
+    Samples every ``warmup_interval`` until ``warmup`` are in, to pin the
+    offset quickly, then every ``interval``. Cancel the ``run()`` task to stop.
+    """
+
+    def __init__(
+        self,
+        query: Callable[[], Awaitable[object]],
+        model: DriftModel,
+        start_perf: float,
+        interval: float = 5.0,
+        warmup: int = 8,
+        warmup_interval: float = 0.25,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.query = query
+        self.model = model
+        self.start_perf = start_perf
+        self.interval = interval
+        self.warmup = warmup
+        self.warmup_interval = warmup_interval
+        self.clock = clock
+        self._rtt = METRICS.histogram("obs.clock_rtt")
+
+    def observe(self, before: float, status: object, after: float) -> bool:
+        """Fold in a status that was requested at ``before`` and answered at ``after``."""
+        video = status_video_seconds(status)
+        # Nothing encoded yet (or not recording): no information about the offset.
+        if not video or not getattr(status, "output_active", True):
+            return False
+        self._rtt.record(after - before)
+        return self.model.add((before + after) / 2.0 - self.start_perf, video, after - before)
+
+    async def sample_once(self) -> bool:
+        before = self.clock()
+        status = await self.query()
+        return self.observe(before, status, self.clock())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.warmup_interval if self.model.samples < self.warmup else self.interval)
+            try:
+                await self.sample_once()
+            except Exception:
+                # OBS unreachable for now; the connection reconnects on its own.
+                pass
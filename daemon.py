@@ -0,0 +1,247 @@
+"""
+Long-running headless recorder, driven over a local control socket.
+
+``RecorderDaemon`` stays up across sessions. It connects to OBS once and
+keeps that connection (obs_connection.py reconnects it if it drops), so a
+``start`` command never connects. Given a ``PreRollService``, the input
+hooks and threads also keep running between sessions and each ``start``
+hands the running capture to the new session. Without one, capture starts
+and stops with each session, and nothing is hooked while idle.
+
+The control socket takes newline-delimited JSON requests ``{"cmd": ...}``
+on a Unix socket (an address containing "/") or on TCP ``host:port``
+(localhost only by default; there is no authentication). Each request gets
+one JSON line back, ``{"ok": true, ...}`` or ``{"ok": false, "error": ...}``.
+A client may keep its connection open for many commands. Commands:
+
+    start      start a session; replies with the video path
+    stop       stop the session; replies with the final video path
+    rotate     stop and immediately start the next session
+    status     session state, OBS link, uptime and session count
+    metrics    the telemetry snapshot
+    shutdown   stop any session and exit
+
+Start and stop requests are handled one at a time. A second start while
+recording is an error, not a no-op.
+
+CLI (the daemon itself is started by obs.py):
+    python daemon.py start|stop|rotate|status|metrics|shutdown [--control ADDR]
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+import telemetry
+from obs_control import PreRollService, RecorderController
+
+DEFAULT_CONTROL = "127.0.0.1:4460"
+COMMANDS = ("start", "stop", "rotate", "status", "metrics", "shutdown")
+
+
+def parse_address(address: str) -> Tuple[str, Optional[int]]:
+    """``(path, None)`` for a Unix socket, ``(host, port)`` for TCP."""
+    if "/" in address:
+        return address, None
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class RecorderDaemon:
+    def __init__(self, recorder: RecorderController, control: str = DEFAULT_CONTROL, preroll: Optional[PreRollService] = None) -> None:
+        self.recorder = recorder
+        self.control = control
+        # Optional: keeps the capture warm between sessions. Pass the same
+        # service to the recorder, which hands its capture over at each start.
+        self.preroll = preroll
+        self.sessions = 0
+        self.started_at = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+        self._session_lock = asyncio.Lock()
+        self._ready = asyncio.Event()  # listening, or run() gave up
+        self._stop_requested = asyncio.Event()
+        self._finished = asyncio.Event()
+
+    async def run(self) -> None:
+        """Connect, serve the control socket until ``shutdown``, then stop everything."""
+        try:
+            if self.preroll is not None:
+                await self.preroll.start()
+            await self.recorder.connect()
+            path, port = parse_address(self.control)
+            if port is None:
+                self._server = await asyncio.start_unix_server(self._serve, path)
+            else:
+                self._server = await asyncio.start_server(self._serve, path, port)
+            print(f"Recorder daemon listening on {self.address()}")
+            self._ready.set()
+            await self._stop_requested.wait()
+        finally:
+            self._ready.set()
+            await self._close()
+            self._finished.set()
+
+    async def wait_ready(self) -> None:
+        await self._ready.wait()
+
+    async def shutdown(self) -> None:
+        """Ask ``run`` to finish and wait until it has."""
+        self._stop_requested.set()
+        await self._finished.wait()
+
+    def address(self) -> str:
+        """The bound control address (with the real port when 0 was asked for)."""
+        if self._server is None or not self._server.sockets:
+            return self.control
+        bound = self._server.sockets[0].getsockname()
+        return bound if isinstance(bound, str) else f"{bound[0]}:{bound[1]}"
+
+    async def _close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            path, port = parse_address(self.control)
+            if port is None:
+                Path(path).unlink(missing_ok=True)
+        # Open clients read EOF and their handlers return.
+        for writer in list(self._clients):
+            writer.close()
+        try:
+            if self.recorder.recording_active:
+                await self.recorder.stop_recording()
+        finally:
+            if self.preroll is not None:
+                await self.preroll.stop()
+            await self.recorder.disconnect()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((json.dumps(await self.handle(line), default=str) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def handle(self, line: bytes) -> Dict[str, object]:
+        try:
+            request = json.loads(line)
+            command = request.get("cmd") if isinstance(request, dict) else None
+            if command not in COMMANDS:
+                raise ValueError(f"unknown command {command!r}; expected one of {', '.join(COMMANDS)}")
+            reply = await getattr(self, f"_cmd_{command}")()
+        except (ValueError, RuntimeError) as exc:
+            return {"ok": False, "error": str(exc)}
+        except Exception as exc:
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        return {"ok": True, **reply}
+
+    # Commands ---------------------------------------------------------------
+    async def _cmd_start(self) -> Dict[str, object]:
+        async with self._session_lock:
+            return await self._start()
+
+    async def _cmd_stop(self) -> Dict[str, object]:
+        async with self._session_lock:
+            return await self._stop()
+
+    async def _cmd_rotate(self) -> Dict[str, object]:
+        async with self._session_lock:
+            stopped = await self._stop()
+            started = await self._start()
+        return {"stopped": stopped["path"], **started}
+
+    async def _cmd_status(self) -> Dict[str, object]:
+        status = self.recorder.status()
+        del status["metrics"]
+        status.update(sessions=self.sessions, uptime=time.monotonic() - self.started_at, warm=self.preroll is not None)
+        return status
+
+    async def _cmd_metrics(self) -> Dict[str, object]:
+        return {"metrics": telemetry.snapshot()}
+
+    async def _cmd_shutdown(self) -> Dict[str, object]:
+        # After this reply goes out: run() stops the session and the server.
+        asyncio.get_running_loop().call_soon(self._stop_requested.set)
+        return {}
+
+    async def _start(self) -> Dict[str, object]:
+        if self.recorder.recording_active:
+            raise RuntimeError("already recording")
+        started = time.perf_counter()
+        path, _name = await self.recorder.start_recording()
+        if not path:
+            raise RuntimeError("OBS is already recording")
+        self.sessions += 1
+        return {"path": path, "seconds": time.perf_counter() - started}
+
+    async def _stop(self) -> Dict[str, object]:
+        if not self.recorder.recording_active:
+            raise RuntimeError("not recording")
+        started = time.perf_counter()
+        path = await self.recorder.stop_recording()
+        return {"path": str(path) if path else None, "seconds": time.perf_counter() - started}
+
+
+class ControlClient:
+    """Blocking client for the control socket; keeps one connection for many commands."""
+
+    def __init__(self, control: str = DEFAULT_CONTROL, timeout: Optional[float] = 30.0) -> None:
+        path, port = parse_address(control)
+        if port is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((path, port), timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile("rb")
+
+    def command(self, cmd: str) -> Dict[str, object]:
+        self.sock.sendall((json.dumps({"cmd": cmd}) + "\n").encode("utf-8"))
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("recorder daemon closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.sock.close()
+
+    def __enter__(self) -> "ControlClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send a command to a running recorder daemon.")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--control", default=DEFAULT_CONTROL, help="Unix socket path or host:port")
+    args = parser.parse_args()
+
+    try:
+        with ControlClient(args.control) as client:
+            reply = client.command(args.command)
+    except OSError as exc:
+        sys.exit(f"Recorder daemon not reachable at {args.control}: {exc}")
+    print(json.dumps(reply, indent=2, default=str))
+    if not reply.get("ok"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Export a recorded session as per-video-frame NumPy arrays for training.
+
+Every array's first axis is the video frame index (``fps``, 30 by default,
+matching the CFR that ``OBSRecorder._ensure_cfr_30`` enforces):
+
+    mouse_dx, mouse_dy   int32  [N]      accumulated raw deltas per frame
+    frame_valid          bool   [N]      False where the sampler missed a frame
+    keys_down            uint8  [N, K/8] packed bitmask (little bit order) of keys
+                                         held at any point during the frame
+    key_names            str    [K]      bit i of keys_down <-> key_names[i]
+    click_press          int16  [N, B]   presses per button (see button_names)
+    click_release        int16  [N, B]
+    buttons_down         uint8  [N]      bit b set if button b was held during the frame
+    button_names         str    [B]
+    scroll_steps         float32[N, 2]   wheel steps (vertical, horizontal)
+
+When the log carries a ``"clock"`` model (clock_sync.py, written by
+OBSRecorder), input timestamps are mapped onto the video clock first, so
+encoder start-up latency and clock drift do not shift events off their
+frames. Inputs less than a frame before the first video frame land on
+frame 0. Older ones (a pre-roll, see preroll.py, is logged at negative
+times) have no frame: their sampler rows, clicks and scrolls are dropped,
+and their key and button states only carry into frame 0.
+``clock_offset``/``clock_drift_ppm`` record the model applied (0 if none).
+
+Missing sampler frames are filled explicitly according to ``fill``:
+``zero`` leaves dx/dy at 0; ``spread`` divides the delta of the first frame
+after a gap evenly over the gap, since the sampler's accumulator carries the
+motion of the frames it missed. Either way ``frame_valid`` marks them.
+
+CLI:
+    python dataset_export.py session_log.manifest.json [-o out.npz] [--format npz|npy]
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import binlog
+import clock_sync
+import event_buffers as eb
+import log_segments
+
+FILL_POLICIES = ("zero", "spread")
+AXIS_NAMES = ("vertical", "horizontal")
+
+
+class _Columns:
+    """Per-stream columns gathered while streaming the log, one NumPy piece per chunk."""
+
+    def __init__(self) -> None:
+        self.pos_frame: List[np.ndarray] = []
+        self.pos_dx: List[np.ndarray] = []
+        self.pos_dy: List[np.ndarray] = []
+        self.pos_ts: List[np.ndarray] = []
+        self.click_ts: List[np.ndarray] = []
+        self.click_button: List[np.ndarray] = []
+        self.click_press: List[np.ndarray] = []
+        self.scroll_ts: List[np.ndarray] = []
+        self.scroll_axis: List[np.ndarray] = []
+        self.scroll_steps: List[np.ndarray] = []
+        # Keyboard assertions: at key_ts[i], key key_code[i] is held (1) or not (0).
+        self.key_ts: List[np.ndarray] = []
+        self.key_code: List[np.ndarray] = []
+        self.key_value: List[np.ndarray] = []
+        self.key_names: Dict[str, int] = {}
+        self.button_names: List[str] = list(eb.BUTTONS.names)
+        # Mouse sampler rate, inferred from the first sample's frame_index/timestamp.
+        self.sample_rate: Optional[float] = None
+        # Latest clock model in the log; each flush refines the previous one.
+        self.clock: Optional[Dict[str, float]] = None
+
+    def column(self, name: str, dtype) -> np.ndarray:
+        pieces = getattr(self, name)
+        return np.concatenate(pieces).astype(dtype, copy=False) if pieces else np.zeros(0, dtype=dtype)
+
+    def _infer_rate(self, frame_index: int, timestamp: float) -> None:
+        if self.sample_rate is None and frame_index > 0 and timestamp > 0:
+            self.sample_rate = round(frame_index / timestamp, 3)
+
+    def _key(self, name: str) -> int:
+        code = self.key_names.get(name)
+        if code is None:
+            code = self.key_names[name] = len(self.key_names)
+        return code
+
+    def _button(self, name: str) -> int:
+        if name not in self.button_names:
+            self.button_names.append(name)
+        return self.button_names.index(name)
+
+    def add_record(self, record: dict) -> None:
+        self.clock = record.get("clock", self.clock)
+        rows = record.get("mouse_positions", ())
+        if rows:
+            self._add_positions(
+                np.array([row["frame_index"] for row in rows], dtype=np.int64),
+                np.array([row["delta"]["dx"] for row in rows], dtype=np.int64),
+                np.array([row["delta"]["dy"] for row in rows], dtype=np.int64),
+                np.array([row["timestamp"] for row in rows], dtype=np.float64),
+            )
+        events = {"mouse_events": record.get("mouse_events", ()), "keyboard_events": record.get("keyboard_events", ())}
+        _, mouse, keyboard = binlog.buffers_from_record(events)
+        self._add_events(mouse, keyboard, eb.NAME_TABLES)
+
+    def add_chunk(self, chunk: "binlog.Chunk") -> None:
+        self.clock = chunk.meta.get("clock", self.clock)
+        positions = chunk.positions
+        if len(positions):
+            self._add_positions(_np(positions.frame_index), _np(positions.dx), _np(positions.dy), _np(positions.timestamp))
+        self._add_events(chunk.mouse, chunk.keyboard, chunk.names)
+
+    def _add_positions(self, frame: np.ndarray, dx: np.ndarray, dy: np.ndarray, ts: np.ndarray) -> None:
+        self._infer_rate(int(frame[-1]), float(ts[-1]))
+        self.pos_frame.append(frame)
+        self.pos_dx.append(dx)
+        self.pos_dy.append(dy)
+        self.pos_ts.append(ts)
+
+    def _add_events(self, mouse: eb.MouseEventBuffer, keyboard: eb.KeyboardEventBuffer, names: Dict[str, List[str]]) -> None:
+        # Only the name tables are walked in Python; codes are remapped through them.
+        if len(mouse):
+            kind, label, ts = _np(mouse.kind), _np(mouse.label), _np(mouse.timestamp)
+            click = kind == eb.CLICK
+            buttons = np.array([self._button(name) for name in names["buttons"]], dtype=np.int64)
+            presses = np.array([name == "press" for name in names["actions"]], dtype=bool)
+            axes = np.array([AXIS_NAMES.index(name) for name in names["axes"]], dtype=np.int64)
+            self.click_ts.append(ts[click])
+            self.click_button.append(buttons[label[click]])
+            self.click_press.append(presses[_np(mouse.action)[click]])
+            self.scroll_ts.append(ts[~click])
+            self.scroll_axis.append(axes[label[~click]])
+            self.scroll_steps.append(_np(mouse.steps)[~click])
+
+        if len(keyboard):
+            kind, ts = _np(keyboard.kind), _np(keyboard.timestamp)
+            keys = np.array([self._key(name) for name in names["keys"]], dtype=np.int64)
+            # A press lists every key held after it, so it asserts all of them.
+            press_rows, bits = np.nonzero((_np(keyboard.mask)[:, None] >> np.arange(eb.MASK_BITS, dtype=np.uint64)) & 1)
+            keep = kind[press_rows] == eb.PRESS
+            press_rows, bits = press_rows[keep], bits[keep]
+            release_rows = np.flatnonzero(kind != eb.PRESS)
+            rows = [press_rows, release_rows]
+            codes = [bits, _np(keyboard.key)[release_rows]]
+            for row, mask in keyboard.wide.items():
+                wide = [code for code in eb.mask_codes(mask) if code >= eb.MASK_BITS]
+                rows.append(np.full(len(wide), row))
+                codes.append(np.array(wide, dtype=np.int64))
+            rows = np.concatenate(rows)
+            order = np.argsort(rows, kind="stable")
+            self.key_ts.append(ts[rows[order]])
+            self.key_code.append(keys[np.concatenate(codes)[order]])
+            self.key_value.append((kind[rows[order]] == eb.PRESS).astype(np.int8))
+
+
+def _np(column) -> np.ndarray:
+    """Zero-copy view of an ``array`` column."""
+    return np.frombuffer(column, dtype=column.typecode)
+
+
+def _frames_of(ts: np.ndarray, fps: float) -> np.ndarray:
+    return np.floor(ts * fps).astype(np.int64)
+
+
+def _held_during_frame(ts: np.ndarray, codes: np.ndarray, values: np.ndarray, n_codes: int, n_frames: int, fps: float) -> np.ndarray:
+    """bool [N, n_codes]: held at the start of the frame or asserted held within it."""
+    held = np.zeros((n_frames, n_codes), dtype=bool)
+    if not len(ts):
+        return held
+    order = np.lexsort((ts, codes))
+    ts, codes, values = ts[order], codes[order], values[order]
+    frame_starts = np.arange(n_frames, dtype=np.float64) / fps
+    bounds = np.searchsorted(codes, np.arange(n_codes + 1))
+    frames = np.minimum(_frames_of(ts, fps), n_frames - 1)
+    for code in range(n_codes):
+        lo, hi = bounds[code], bounds[code + 1]
+        if lo == hi:
+            continue
+        # State at each frame start = last assertion strictly before it.
+        idx = np.searchsorted(ts[lo:hi], frame_starts, side="left") - 1
+        state = np.where(idx >= 0, values[lo:hi][np.maximum(idx, 0)], 0).astype(bool)
+        pressed = frames[lo:hi][(values[lo:hi] == 1) & (frames[lo:hi] >= 0)]
+        state[pressed] = True
+        held[:, code] = state
+    return held
+
+
+def build_arrays(
+    cols: _Columns,
+    fps: float = 30.0,
+    sample_rate: Optional[float] = None,
+    fill: str = "zero",
+    clock: bool = True,
+) -> Dict[str, np.ndarray]:
+    if fill not in FILL_POLICIES:
+        raise ValueError(f"Unknown fill policy: {fill}")
+    sample_rate = sample_rate or cols.sample_rate or fps
+
+    pos_frame = cols.column("pos_frame", np.int64)
+    if sample_rate != fps:
+        pos_frame = (pos_frame * fps // sample_rate).astype(np.int64)
+    pos_dx = cols.column("pos_dx", np.int64)
+    pos_dy = cols.column("pos_dy", np.int64)
+    click_ts = cols.column("click_ts", np.float64)
+    scroll_ts = cols.column("scroll_ts", np.float64)
+    key_ts = cols.column("key_ts", np.float64)
+
+    params = cols.clock if clock else None
+    if params:
+        # Monotonic, so per-stream ordering (and _held_during_frame) is preserved.
+        click_ts, scroll_ts, key_ts = (clock_sync.to_video_seconds(ts, params) for ts in (click_ts, scroll_ts, key_ts))
+        # Sampler rows keep their grid spacing and move by the model's whole-frame shift.
+        pos_ts = cols.column("pos_ts", np.float64)
+        shift = np.rint((clock_sync.to_video_seconds(pos_ts, params) - pos_ts) * fps).astype(np.int64)
+        pos_frame = pos_frame + shift
+    # Less than a frame early lands on frame 0; anything older predates the video.
+    click_ts, scroll_ts, key_ts = (np.where(ts >= -1.0 / fps, np.maximum(ts, 0.0), ts) for ts in (click_ts, scroll_ts, key_ts))
+    pos_frame = np.where(pos_frame == -1, 0, pos_frame)
+    on_video = pos_frame >= 0
+    pos_frame, pos_dx, pos_dy = pos_frame[on_video], pos_dx[on_video], pos_dy[on_video]
+
+    last = [pos_frame.max() if len(pos_frame) else -1]
+    for ts in (click_ts, scroll_ts, key_ts):
+        if len(ts):
+            last.append(_frames_of(ts, fps).max())
+    n_frames = int(max(last)) + 1
+
+    mouse_dx = np.zeros(n_frames, dtype=np.int64)
+    mouse_dy = np.zeros(n_frames, dtype=np.int64)
+    frame_valid = np.zeros(n_frames, dtype=bool)
+    if len(pos_frame):
+        np.add.at(mouse_dx, pos_frame, pos_dx)
+        np.add.at(mouse_dy, pos_frame, pos_dy)
+        frame_valid[pos_frame] = True
+        if fill == "spread":
+            # For every sampled frame, how many missing frames directly precede it.
+            sampled = np.flatnonzero(frame_valid)
+            gaps = np.diff(np.concatenate(([-1], sampled))) - 1
+            spread = gaps > 0
+            if spread.any():
+                targets = sampled[spread]
+                widths = gaps[spread] + 1
+                starts = targets - widths + 1
+                total_dx, total_dy = mouse_dx[targets], mouse_dy[targets]
+                owner = np.repeat(np.arange(len(targets)), widths)
+                frame = np.repeat(starts, widths) + (np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths))
+                mouse_dx[frame] = total_dx[owner] // widths[owner]
+                mouse_dy[frame] = total_dy[owner] // widths[owner]
+                # Integer division remainder stays on the sampled frame so sums are preserved.
+                mouse_dx[targets] += total_dx - (total_dx // widths) * widths
+                mouse_dy[targets] += total_dy - (total_dy // widths) * widths
+
+    n_buttons = len(cols.button_names)
+    click_press = np.zeros((n_frames, n_buttons), dtype=np.int16)
+    click_release = np.zeros((n_frames, n_buttons), dtype=np.int16)
+    buttons_down = np.zeros(n_frames, dtype=np.uint8)
+    if len(click_ts):
+        frames = _frames_of(click_ts, fps)
+        buttons = cols.column("click_button", np.int64)
+        is_press = cols.column("click_press", bool)
+        on_video = frames >= 0
+        np.add.at(click_press, (frames[is_press & on_video], buttons[is_press & on_video]), 1)
+        np.add.at(click_release, (frames[~is_press & on_video], buttons[~is_press & on_video]), 1)
+        held = _held_during_frame(click_ts, buttons, is_press.astype(np.int8), n_buttons, n_frames, fps)
+        buttons_down = np.packbits(held[:, :8], axis=1, bitorder="little")[:, 0]
+
+    scroll_steps = np.zeros((n_frames, len(AXIS_NAMES)), dtype=np.float32)
+    if len(scroll_ts):
+        frames = _frames_of(scroll_ts, fps)
+        on_video = frames >= 0
+        np.add.at(
+            scroll_steps,
+            (frames[on_video], cols.column("scroll_axis", np.int64)[on_video]),
+            cols.column("scroll_steps", np.float32)[on_video],
+        )
+
+    key_names = sorted(cols.key_names, key=cols.key_names.get)
+    keys_held = _held_during_frame(
+        key_ts,
+        cols.column("key_code", np.int64),
+        cols.column("key_value", np.int8),
+        len(key_names),
+        n_frames,
+        fps,
+    )
+
+    return {
+        "mouse_dx": mouse_dx.astype(np.int32),
+        "mouse_dy": mouse_dy.astype(np.int32),
+        "frame_valid": frame_valid,
+        "keys_down": np.packbits(keys_held, axis=1, bitorder="little"),
+        "key_names": np.asarray(key_names, dtype=str),
+        "click_press": click_press,
+        "click_release": click_release,
+        "buttons_down": buttons_down,
+        "button_names": np.asarray(cols.button_names, dtype=str),
+        "scroll_steps": scroll_steps,
+        "fps": np.asarray(fps),
+        "clock_offset": np.asarray(params["offset"] if params else 0.0),
+        "clock_drift_ppm": np.asarray(params["drift_ppm"] if params else 0.0),
+    }
+
+
+def collect(log_path: Path) -> _Columns:
+    """Stream a JSONL, binary or segmented session log into flat columns."""
+    cols = _Columns()
+    log_path = Path(log_path)
+    if log_segments.is_manifest(log_path):
+        if log_segments.read_manifest(log_path)["format"] == "binary":
+            for chunk in log_segments.iter_chunks(log_path):
+                cols.add_chunk(chunk)
+        else:
+            for record in log_segments.iter_records(log_path):
+                cols.add_record(record)
+    elif log_path.suffix == binlog.SUFFIX:
+        with log_path.open("rb") as handle:
+            for chunk in binlog.BinaryLogReader(handle):
+                cols.add_chunk(chunk)
+    else:
+        with log_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.strip():
+                    cols.add_record(json.loads(line))
+    return cols
+
+
+def export_session(
+    log_path: Path,
+    out_path: Optional[Path] = None,
+    fmt: str = "npz",
+    fps: float = 30.0,
+    fill: str = "zero",
+    sample_rate: Optional[float] = None,
+    clock: bool = True,
+) -> Path:
+    log_path = Path(log_path)
+    arrays = build_arrays(collect(log_path), fps=fps, sample_rate=sample_rate, fill=fill, clock=clock)
+    stem = log_path.name.rsplit("_log", 1)[0]
+    if fmt == "npz":
+        out_path = Path(out_path or log_path.with_name(f"{stem}_frames.npz"))
+        np.savez(out_path, **arrays)
+    elif fmt == "npy":
+        out_path = Path(out_path or log_path.with_name(f"{stem}_frames"))
+        out_path.mkdir(parents=True, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(out_path / f"{name}.npy", arr)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return out_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a session log as frame-aligned NumPy arrays.")
+    parser.add_argument("log", type=Path, help="*_log.jsonl, *_log.gmlb or *_log.manifest.json")
+    parser.add_argument("-o", "--output", type=Path)
+    parser.add_argument("--format", choices=["npz", "npy"], default="npz")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--sample-rate", type=float, help="mouse sampler rate (default: inferred from the log)")
+    parser.add_argument("--fill", choices=FILL_POLICIES, default="zero")
+    parser.add_argument("--no-clock", action="store_true", help="ignore the log's video clock model")
+    args = parser.parse_args()
+    out = export_session(args.log, args.output, args.format, args.fps, args.fill, args.sample_rate, clock=not args.no_clock)
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
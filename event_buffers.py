@@ -0,0 +1,345 @@
+"""
+Typed columnar buffers for captured input events.
+
+The capture callbacks append plain numbers into ``array`` columns instead of
+building a dict per event; the dict/JSON shape used by ``*_log.jsonl`` is only
+materialized when a flush drains the buffers.
+"""
+
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Interner:
+    """Maps short strings (buttons, actions, key names) to small integer codes."""
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self._codes: Dict[str, int] = {}
+        self.names: List[str] = []
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self._codes[name] = code
+        return code
+
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+BUTTONS = Interner(("left", "right", "middle", "x1", "x2"))
+ACTIONS = Interner(("press", "release"))
+AXES = Interner(("vertical", "horizontal"))
+KEYS = Interner()
+# Name lists by table, as stored in binary logs; to_dicts() resolves codes here by default.
+NAME_TABLES = {"keys": KEYS.names, "buttons": BUTTONS.names, "actions": ACTIONS.names, "axes": AXES.names}
+
+CLICK = 0
+SCROLL = 1
+PRESS = 0
+RELEASE = 1
+
+MASK_BITS = 64
+MASK_LOW = (1 << MASK_BITS) - 1
+
+
+def mask_codes(mask: int) -> List[int]:
+    """Key codes set in a held-key bitset, ascending."""
+    codes = []
+    while mask:
+        low = mask & -mask
+        codes.append(low.bit_length() - 1)
+        mask ^= low
+    return codes
+
+
+def codes_mask(codes: Iterable[int]) -> int:
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+
+class ColumnBuffer:
+    """Base class: a fixed set of typed ``array`` columns that grow together."""
+
+    COLUMNS: Tuple[Tuple[str, str], ...] = ()
+
+    def __init__(self) -> None:
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self) -> int:
+        return len(getattr(self, self.COLUMNS[0][0]))
+
+    def clear(self) -> None:
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def nbytes(self) -> int:
+        total = 0
+        for name, _ in self.COLUMNS:
+            col = getattr(self, name)
+            total += col.buffer_info()[1] * col.itemsize
+        return total
+
+    def to_dicts(self, names: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        raise NotImplementedError
+
+
+class MousePositionBuffer(ColumnBuffer):
+    """30 Hz sampler output: one row per frame."""
+
+    COLUMNS = (
+        ("frame_index", "q"),
+        ("dx", "q"),
+        ("dy", "q"),
+        ("timestamp", "d"),
+    )
+
+    def append(self, frame_index: int, dx: int, dy: int, timestamp: float) -> None:
+        self.frame_index.append(frame_index)
+        self.dx.append(dx)
+        self.dy.append(dy)
+        self.timestamp.append(timestamp)
+
+    def to_dicts(self, names: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        return [
+            {"delta": {"dx": dx, "dy": dy}, "timestamp": ts, "frame_index": fi}
+            for fi, dx, dy, ts in zip(self.frame_index, self.dx, self.dy, self.timestamp)
+        ]
+
+
+class MouseEventBuffer(ColumnBuffer):
+    """Clicks and scrolls interleaved in arrival order.
+
+    ``a``/``b`` hold the cursor x/y for clicks and raw_delta for scrolls;
+    ``label`` is a BUTTONS code for clicks and an AXES code for scrolls.
+    """
+
+    COLUMNS = (
+        ("kind", "B"),
+        ("label", "H"),
+        ("action", "B"),
+        ("a", "q"),
+        ("b", "q"),
+        ("steps", "d"),
+        ("timestamp", "d"),
+    )
+
+    def append_click(self, button: int, action: int, x: int, y: int, timestamp: float) -> None:
+        self.kind.append(CLICK)
+        self.label.append(button)
+        self.action.append(action)
+        self.a.append(x)
+        self.b.append(y)
+        self.steps.append(0.0)
+        self.timestamp.append(timestamp)
+
+    def append_scroll(self, axis: int, steps: float, raw_delta: int, timestamp: float) -> None:
+        self.kind.append(SCROLL)
+        self.label.append(axis)
+        self.action.append(0)
+        self.a.append(raw_delta)
+        self.b.append(0)
+        self.steps.append(steps)
+        self.timestamp.append(timestamp)
+
+    def count(self, kind: int) -> int:
+        return self.kind.count(kind)
+
+    def to_dicts(self, names: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        names = names or NAME_TABLES
+        buttons = names["buttons"]
+        actions = names["actions"]
+        axes = names["axes"]
+        out = []
+        for kind, label, action, a, b, steps, ts in zip(
+            self.kind, self.label, self.action, self.a, self.b, self.steps, self.timestamp
+        ):
+            if kind == CLICK:
+                out.append({
+                    "type": "click",
+                    "action": actions[action],
+                    "button": buttons[label],
+                    "position": {"x": a, "y": b},
+                    "timestamp": ts,
+                })
+            else:
+                out.append({
+                    "type": "scroll",
+                    "axis": axes[label],
+                    "steps": steps,
+                    "raw_delta": a,
+                    "timestamp": ts,
+                })
+        return out
+
+
+class KeyboardEventBuffer(ColumnBuffer):
+    """Key presses/releases.
+
+    A press carries the set of held keys as a bitset over ``KEYS`` codes.
+    The low 64 bits live in the ``mask`` column; the rare row whose mask is
+    wider keeps the full int in ``wide`` (row -> mask). Sorted key-name lists
+    are only built by ``to_dicts``.
+    """
+
+    COLUMNS = (
+        ("kind", "B"),
+        ("key", "H"),
+        ("mask", "Q"),
+        ("timestamp", "d"),
+    )
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.wide: Dict[int, int] = {}
+
+    def clear(self) -> None:
+        super().clear()
+        self.wide = {}
+
+    def append_press(self, key: int, mask: int, timestamp: float) -> None:
+        if mask > MASK_LOW:
+            self.wide[len(self.kind)] = mask
+            mask &= MASK_LOW
+        self.kind.append(PRESS)
+        self.key.append(key)
+        self.mask.append(mask)
+        self.timestamp.append(timestamp)
+
+    def append_release(self, key: int, timestamp: float) -> None:
+        self.kind.append(RELEASE)
+        self.key.append(key)
+        self.mask.append(0)
+        self.timestamp.append(timestamp)
+
+    def held_mask(self, row: int) -> int:
+        return self.wide.get(row, self.mask[row])
+
+    def flat_held(self) -> Tuple[array, array]:
+        """``(held_end, held)``: every press's codes stored flat, ``held_end[i]``
+        marking where row ``i`` stops (the binary log layout)."""
+        held = array("H")
+        held_end = array("I")
+        wide = self.wide
+        for row, (kind, mask) in enumerate(zip(self.kind, self.mask)):
+            if kind == PRESS:
+                held.extend(mask_codes(wide.get(row, mask)))
+            held_end.append(len(held))
+        return held_end, held
+
+    def set_flat_held(self, held_end: Iterable[int], held: array) -> None:
+        """Inverse of ``flat_held`` for rows already loaded into ``kind``."""
+        self.mask = array("Q")
+        self.wide = {}
+        start = 0
+        for row, end in enumerate(held_end):
+            mask = codes_mask(held[start:end])
+            if mask > MASK_LOW:
+                self.wide[row] = mask
+                mask &= MASK_LOW
+            self.mask.append(mask)
+            start = end
+
+    def to_dicts(self, names: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+        keys = (names or NAME_TABLES)["keys"]
+        wide = self.wide
+        out = []
+        for row, (kind, key, mask, ts) in enumerate(zip(self.kind, self.key, self.mask, self.timestamp)):
+            if kind == PRESS:
+                pressed = sorted(keys[code] for code in mask_codes(wide.get(row, mask)))
+                out.append({"type": "press", "keys": pressed, "timestamp": ts})
+            else:
+                out.append({"type": "release", "key": keys[key], "timestamp": ts})
+        return out
+
+
+class SwapBuffer:
+    """Single-producer double buffer handed to the writer by an atomic swap.
+
+    The owning capture thread brackets every append with ``seq += 1`` so the
+    counter is odd while a row is half written::
+
+        q.seq += 1
+        q.front.append(...)
+        q.seq += 1
+
+    ``swap`` publishes a fresh front buffer and, only if the producer was
+    mid-append at that instant, waits for that single row to finish. The
+    producer itself never blocks.
+    """
+
+    def __init__(self, factory) -> None:
+        self._factory = factory
+        self.front = factory()
+        self.seq = 0
+        self.swaps = 0
+        self.swap_wait_total = 0.0
+        self.swap_wait_max = 0.0
+
+    def swap(self) -> ColumnBuffer:
+        back = self.front
+        self.front = self._factory()
+        seq = self.seq
+        if seq & 1:
+            start = time.perf_counter()
+            while self.seq == seq:
+                time.sleep(0)
+            waited = time.perf_counter() - start
+            self.swap_wait_total += waited
+            self.swap_wait_max = max(self.swap_wait_max, waited)
+        self.swaps += 1
+        return back
+
+    def __len__(self) -> int:
+        return len(self.front)
+
+
+class DeltaAccumulator:
+    """Running mouse dx/dy totals written by the raw-input thread only.
+
+    The sampler reads the totals with a seqlock-style retry and keeps its own
+    high-water mark, so neither side ever resets the other's state.
+    """
+
+    def __init__(self) -> None:
+        self.seq = 0
+        self.total_dx = 0
+        self.total_dy = 0
+        self._taken_dx = 0
+        self._taken_dy = 0
+
+    def add(self, dx: int, dy: int) -> None:
+        self.seq += 1
+        self.total_dx += dx
+        self.total_dy += dy
+        self.seq += 1
+
+    def take(self) -> Tuple[int, int]:
+        """Return the delta accumulated since the previous ``take``."""
+        while True:
+            seq = self.seq
+            if not seq & 1:
+                tx, ty = self.total_dx, self.total_dy
+                if self.seq == seq:
+                    break
+            time.sleep(0)
+        dx, dy = tx - self._taken_dx, ty - self._taken_dy
+        self._taken_dx, self._taken_dy = tx, ty
+        return dx, dy
+
+    def reset(self) -> None:
+        """Only call while the producer is stopped."""
+        self.seq = 0
+        self.total_dx = self.total_dy = 0
+        self._taken_dx = self._taken_dy = 0
@@ -0,0 +1,268 @@
+"""
+Windows input backend: raw-input mouse thread, keyboard hook and timer resolution.
+
+Loaded lazily by backend_legacy when capture starts, so importing the
+recorder core never touches winmm/user32 or the ``keyboard`` package.
+"""
+
+import ctypes
+import threading
+import time
+from ctypes import wintypes
+
+import keyboard
+
+import rawinput
+from telemetry import METRICS
+
+winmm = ctypes.WinDLL("winmm")
+
+if not hasattr(wintypes, "HCURSOR"):
+    wintypes.HCURSOR = wintypes.HANDLE
+
+user32 = ctypes.WinDLL("user32", use_last_error=True)
+kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+# Pointer-sized (works on 32-bit + 64-bit Windows)
+LRESULT = ctypes.c_ssize_t 
+
+# ---- Win32 constants ----
+WM_INPUT = 0x00FF
+PM_REMOVE = 0x0001
+RID_INPUT = 0x10000003
+RIM_TYPEMOUSE = 0
+RIDEV_INPUTSINK = 0x00000100
+MOUSE_MOVE_ABSOLUTE = 0x0001
+
+RI_MOUSE_LEFT_BUTTON_DOWN   = 0x0001
+RI_MOUSE_LEFT_BUTTON_UP     = 0x0002
+RI_MOUSE_RIGHT_BUTTON_DOWN  = 0x0004
+RI_MOUSE_RIGHT_BUTTON_UP    = 0x0008
+RI_MOUSE_MIDDLE_BUTTON_DOWN = 0x0010
+RI_MOUSE_MIDDLE_BUTTON_UP   = 0x0020
+RI_MOUSE_BUTTON_4_DOWN      = 0x0040
+RI_MOUSE_BUTTON_4_UP        = 0x0080
+RI_MOUSE_BUTTON_5_DOWN      = 0x0100
+RI_MOUSE_BUTTON_5_UP        = 0x0200
+RI_MOUSE_WHEEL               = 0x0400
+RI_MOUSE_HWHEEL              = 0x0800
+WHEEL_DELTA = 120
+
+# ---- Win32 structs ----
+class RAWINPUTDEVICE(ctypes.Structure):
+    _fields_ = [
+        ("usUsagePage", wintypes.USHORT),
+        ("usUsage", wintypes.USHORT),
+        ("dwFlags", wintypes.DWORD),
+        ("hwndTarget", wintypes.HWND),
+    ]
+
+class RAWINPUTHEADER(ctypes.Structure):
+    _fields_ = [
+        ("dwType", wintypes.DWORD),
+        ("dwSize", wintypes.DWORD),
+        ("hDevice", wintypes.HANDLE),
+        ("wParam", wintypes.WPARAM),
+    ]
+
+class _RAWMOUSE_BUTTONS(ctypes.Structure):
+    _fields_ = [
+        ("usButtonFlags", wintypes.USHORT),
+        ("usButtonData", wintypes.USHORT),
+    ]
+
+class _RAWMOUSE_BUTTONS_UNION(ctypes.Union):
+    _fields_ = [
+        ("ulButtons", wintypes.ULONG),
+        ("buttons", _RAWMOUSE_BUTTONS),
+    ]
+
+class RAWMOUSE(ctypes.Structure):
+    _anonymous_ = ("uButtons",)
+    _fields_ = [
+        ("usFlags", wintypes.USHORT),
+        ("uButtons", _RAWMOUSE_BUTTONS_UNION),
+        ("ulRawButtons", wintypes.ULONG),
+        ("lLastX", wintypes.LONG),
+        ("lLastY", wintypes.LONG),
+        ("ulExtraInformation", wintypes.ULONG),
+    ]
+
+class _RAWINPUT_DATA(ctypes.Union):
+    _fields_ = [("mouse", RAWMOUSE)]
+
+class RAWINPUT(ctypes.Structure):
+    _anonymous_ = ("data",)
+    _fields_ = [
+        ("header", RAWINPUTHEADER),
+        ("data", _RAWINPUT_DATA),
+    ]
+
+class POINT(ctypes.Structure):
+    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
+
+class MSG(ctypes.Structure):
+    _fields_ = [
+        ("hwnd", wintypes.HWND),
+        ("message", wintypes.UINT),
+        ("wParam", wintypes.WPARAM),
+        ("lParam", wintypes.LPARAM),
+        ("time", wintypes.DWORD),
+        ("pt", POINT),
+    ]
+
+WNDPROCTYPE = ctypes.WINFUNCTYPE(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+user32.DefWindowProcW.restype = LRESULT
+user32.GetRawInputData.argtypes = [wintypes.HANDLE, wintypes.UINT, wintypes.LPVOID, ctypes.POINTER(wintypes.UINT), wintypes.UINT]
+user32.GetRawInputData.restype = wintypes.UINT
+user32.GetRawInputBuffer.argtypes = [wintypes.LPVOID, ctypes.POINTER(wintypes.UINT), wintypes.UINT]
+user32.GetRawInputBuffer.restype = wintypes.UINT
+user32.RegisterRawInputDevices.argtypes = [ctypes.POINTER(RAWINPUTDEVICE), wintypes.UINT, wintypes.UINT]
+user32.RegisterRawInputDevices.restype = wintypes.BOOL
+user32.GetCursorPos.argtypes = [ctypes.POINTER(POINT)]
+user32.GetCursorPos.restype = wintypes.BOOL
+user32.PeekMessageW.argtypes = [ctypes.POINTER(MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT, wintypes.UINT]
+user32.PeekMessageW.restype = wintypes.BOOL
+user32.TranslateMessage.argtypes = [ctypes.POINTER(MSG)]
+user32.TranslateMessage.restype = wintypes.BOOL
+user32.DispatchMessageW.argtypes = [ctypes.POINTER(MSG)]
+user32.DispatchMessageW.restype = LRESULT
+user32.CreateWindowExW.restype = wintypes.HWND
+user32.CreateWindowExW.argtypes = [
+    wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+    ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+    wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID
+]
+
+class WNDCLASS(ctypes.Structure):
+    _fields_ = [
+        ("style", wintypes.UINT),
+        ("lpfnWndProc", WNDPROCTYPE),
+        ("cbClsExtra", ctypes.c_int),
+        ("cbWndExtra", ctypes.c_int),
+        ("hInstance", wintypes.HINSTANCE),
+        ("hIcon", wintypes.HICON),
+        ("hCursor", wintypes.HCURSOR),
+        ("hbrBackground", wintypes.HBRUSH),
+        ("lpszMenuName", wintypes.LPCWSTR),
+        ("lpszClassName", wintypes.LPCWSTR),
+    ]
+
+user32.RegisterClassW.argtypes = [ctypes.POINTER(WNDCLASS)]
+user32.UnregisterClassW.argtypes = [wintypes.LPCWSTR, wintypes.HINSTANCE]
+user32.DestroyWindow.argtypes = [wintypes.HWND]
+
+RAW_BUFFER_BYTES = 64 * 1024  # ~1300 mouse records per GetRawInputBuffer call
+
+def _is_wow64() -> bool:
+    flag = wintypes.BOOL(False)
+    fn = getattr(kernel32, "IsWow64Process", None)
+    return bool(fn and fn(kernel32.GetCurrentProcess(), ctypes.byref(flag)) and flag.value)
+
+class RawInputMouseThread(threading.Thread):
+    """Drains queued raw mouse input in batches each wake (see rawinput.py).
+
+    One preallocated buffer is reused for every read, and the cursor position
+    is queried at most once per batch.
+    """
+
+    def __init__(self, on_delta, on_click, on_wheel, stop_event: threading.Event):
+        super().__init__(daemon=True)
+        self.on_delta = on_delta
+        self.on_click = on_click
+        self.on_wheel = on_wheel
+        self.stop_event = stop_event
+        self.hwnd = None
+        self._wndproc = None
+        self._class_name = "RawInputMouseSink"
+        # GetRawInputBuffer pads headers to 64-bit under WOW64; GetRawInputData does not.
+        self.decoder = rawinput.RawMouseDecoder(wow64=_is_wow64())
+        self.single_decoder = rawinput.RawMouseDecoder()
+        self._buf = ctypes.create_string_buffer(RAW_BUFFER_BYTES)
+        self._buf_size = wintypes.UINT(0)
+        self._header_size = ctypes.sizeof(RAWINPUTHEADER)
+        self._records = METRICS.counter("rawinput.records")
+        self._batches = METRICS.counter("rawinput.batches")
+
+    def run(self):
+        hInstance = kernel32.GetModuleHandleW(None)
+
+        @WNDPROCTYPE
+        def wndproc(hwnd, msg, wParam, lParam):
+            if msg == WM_INPUT:
+                self._handle_wm_input(lParam)
+                return 0
+            return user32.DefWindowProcW(hwnd, msg, wParam, lParam)
+
+        self._wndproc = wndproc
+        wc = WNDCLASS()
+        wc.lpfnWndProc = self._wndproc
+        wc.hInstance = hInstance
+        wc.lpszClassName = self._class_name
+
+        atom = user32.RegisterClassW(ctypes.byref(wc))
+        HWND_MESSAGE = wintypes.HWND(-3)
+        self.hwnd = user32.CreateWindowExW(0, self._class_name, self._class_name, 0, 0, 0, 0, 0, HWND_MESSAGE, None, hInstance, None)
+
+        rid = RAWINPUTDEVICE()
+        rid.usUsagePage = 0x01
+        rid.usUsage = 0x02
+        rid.dwFlags = RIDEV_INPUTSINK
+        rid.hwndTarget = self.hwnd
+        user32.RegisterRawInputDevices(ctypes.byref(rid), 1, ctypes.sizeof(RAWINPUTDEVICE))
+
+        msg = MSG()
+        while not self.stop_event.is_set():
+            # Buffered read first; any WM_INPUT still queued after it goes
+            # through the wndproc's single-record path.
+            self._drain()
+            while user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+            time.sleep(0.001)
+
+        user32.DestroyWindow(self.hwnd)
+        user32.UnregisterClassW(self._class_name, hInstance)
+
+    def _cursor_pos(self):
+        pt = POINT()
+        if user32.GetCursorPos(ctypes.byref(pt)): return int(pt.x), int(pt.y)
+        return 0, 0
+
+    def _dispatch(self, batch: rawinput.MouseBatch) -> None:
+        rawinput.dispatch(batch, self.on_delta, self.on_click, self.on_wheel, self._cursor_pos)
+        self._records.value += batch.records
+        self._batches.value += 1
+
+    def _drain(self) -> None:
+        while True:
+            self._buf_size.value = RAW_BUFFER_BYTES
+            count = user32.GetRawInputBuffer(self._buf, ctypes.byref(self._buf_size), self._header_size)
+            if count == 0 or count == 0xFFFFFFFF:
+                return
+            self._dispatch(self.decoder.decode(self._buf, count))
+
+    def _handle_wm_input(self, hRawInput_lparam):
+        self._buf_size.value = RAW_BUFFER_BYTES
+        got = user32.GetRawInputData(wintypes.HANDLE(hRawInput_lparam), RID_INPUT, self._buf, ctypes.byref(self._buf_size), self._header_size)
+        if got == 0xFFFFFFFF or got < self.single_decoder.header_size:
+            return
+        self._dispatch(self.single_decoder.decode_one(self._buf))
+
+# ---- Timer resolution ----
+# 1 ms timer precision is critical for sampler stability, but it raises the
+# system-wide interrupt rate, so it is only held while a recording is active.
+def begin_timer_resolution() -> None:
+    winmm.timeBeginPeriod(1)
+
+def end_timer_resolution() -> None:
+    winmm.timeEndPeriod(1)
+
+# ---- Keyboard hook ----
+def hook_keyboard(callback):
+    return keyboard.hook(callback)
+
+def unhook_keyboard(hook) -> None:
+    keyboard.unhook(hook)
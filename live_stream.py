@@ -0,0 +1,345 @@
+"""
+Live input stream in shared memory, for overlays and analytics that cannot wait for a flush.
+
+While a ``LiveStream`` is open, the capture callbacks publish every raw
+mouse delta, sampler frame, click, scroll and key press/release into a
+``multiprocessing.shared_memory`` block (``DEFAULT_NAME`` unless
+configured). Any number of local processes can follow it with a
+``LiveReader``. Each reader keeps its own cursors, and readers never slow
+the recorder down.
+
+Layout (little-endian)::
+
+    header      HEADER: magic b"GMLS", version, record size, slots per channel,
+                channel count; padded to HEADER_BYTES
+    names       NAMES_HEAD (version, length) + JSON name tables
+                {"keys", "buttons", "actions", "axes"}; the version is odd
+                while the producer rewrites them
+    channels    one ring of ``slots`` RECORDs per producing thread, in
+                CHANNELS order: raw input (deltas, clicks, scrolls), keyboard
+                hook, sampler
+
+Each channel has exactly one writer, like the SwapBuffers. Record n of a
+channel goes to slot ``n % slots`` (n counts from 1). The writer first
+stores the record with ``seq`` 0, then sets ``seq`` to n. A reader takes
+slot n only if it reads ``seq == n`` both before and after copying the
+record. A larger ``seq`` means the writer lapped the reader. The reader then
+skips to the oldest record still there and counts the skipped records in
+``overruns``.
+
+Record fields (RECORD):
+
+    seq     record number within its channel
+    t       ``time.perf_counter()`` when the callback ran; monotonic and
+            shared by every process on the machine
+    n       sampler frame index (FRAME)
+    a, b    dx, dy (DELTA, FRAME); x, y (CLICK); raw wheel delta (SCROLL)
+    code    button (CLICK), axis (SCROLL) or key (KEY_DOWN/UP) in the name tables
+    kind    DELTA, FRAME, CLICK, SCROLL, KEY_DOWN, KEY_UP
+    action  ACTIONS code (CLICK)
+    value   wheel steps (SCROLL)
+
+Client:
+    python live_stream.py [--name N] [--from-start]    # print events as they arrive
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import event_buffers as eb
+
+DEFAULT_NAME = "game_monitor_live"
+MAGIC = b"GMLS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+HEADER_BYTES = 64
+NAMES_HEAD = struct.Struct("<QI")
+NAMES_BYTES = 64 << 10
+RECORD = struct.Struct("<QdqiiHBBf")
+RECORD_BYTES = RECORD.size
+SEQ = struct.Struct("<Q")
+SLOTS = 1 << 16  # per channel: ~8 s of 8 kHz mouse deltas
+CHANNELS = ("mouse", "keyboard", "frames")
+
+DELTA, FRAME, CLICK, SCROLL, KEY_DOWN, KEY_UP = range(6)
+KIND_NAMES = ("delta", "frame", "click", "scroll", "key_down", "key_up")
+
+_pack = RECORD.pack_into
+_set_seq = SEQ.pack_into
+_perf = time.perf_counter
+_created = set()  # names of streams this process produces
+
+
+def _size(slots: int) -> int:
+    return HEADER_BYTES + NAMES_BYTES + len(CHANNELS) * slots * RECORD_BYTES
+
+
+class _Channel:
+    __slots__ = ("base", "mask", "seq")
+
+    def __init__(self, base: int, slots: int) -> None:
+        self.base = base
+        self.mask = slots - 1
+        self.seq = 0
+
+
+class LiveStream:
+    """The producer side. Each channel's methods must be called from that channel's thread only."""
+
+    def __init__(self, name: str = DEFAULT_NAME, slots: int = SLOTS) -> None:
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        # Imported here: multiprocessing adds ~5 MB to every recorder that never opens a stream.
+        from multiprocessing import shared_memory
+
+        self.name = name
+        self.slots = slots
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=_size(slots))
+        except FileExistsError:
+            # Left behind by a recorder that crashed (POSIX only).
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=_size(slots))
+        _created.add(name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, RECORD_BYTES, slots, len(CHANNELS))
+        base = HEADER_BYTES + NAMES_BYTES
+        self.mouse, self.keyboard, self.frames = (_Channel(base + i * slots * RECORD_BYTES, slots) for i in range(len(CHANNELS)))
+        self._names_lock = threading.Lock()
+        self._names_version = 0
+        self._keys_known = self._buttons_known = self._axes_known = 0
+        self._sync_names()
+
+    @property
+    def published(self) -> int:
+        return self.mouse.seq + self.keyboard.seq + self.frames.seq
+
+    def close(self) -> None:
+        """Unpublish: attached readers keep their mapping, new ones cannot attach.
+
+        The producer's own mapping goes with the last reference, so a
+        callback still holding this stream never writes to freed memory.
+        """
+        _created.discard(self.name)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    # Producers ------------------------------------------------------------
+    def delta(self, dx: int, dy: int) -> None:
+        ch = self.mouse
+        n = ch.seq = ch.seq + 1
+        off = ch.base + (n & ch.mask) * RECORD_BYTES
+        _pack(self.buf, off, 0, _perf(), 0, dx, dy, 0, DELTA, 0, 0.0)
+        _set_seq(self.buf, off, n)
+
+    def click(self, t: float, button: int, action: int, x: int, y: int) -> None:
+        if button >= self._buttons_known:
+            self._sync_names()
+        ch = self.mouse
+        n = ch.seq = ch.seq + 1
+        off = ch.base + (n & ch.mask) * RECORD_BYTES
+        _pack(self.buf, off, 0, t, 0, x, y, button, CLICK, action, 0.0)
+        _set_seq(self.buf, off, n)
+
+    def scroll(self, t: float, axis: int, steps: float, raw_delta: int) -> None:
+        if axis >= self._axes_known:
+            self._sync_names()
+        ch = self.mouse
+        n = ch.seq = ch.seq + 1
+        off = ch.base + (n & ch.mask) * RECORD_BYTES
+        _pack(self.buf, off, 0, t, 0, raw_delta, 0, axis, SCROLL, 0, steps)
+        _set_seq(self.buf, off, n)
+
+    def key(self, t: float, kind: int, key: int) -> None:
+        if key >= self._keys_known:
+            self._sync_names()
+        ch = self.keyboard
+        n = ch.seq = ch.seq + 1
+        off = ch.base + (n & ch.mask) * RECORD_BYTES
+        _pack(self.buf, off, 0, t, 0, 0, 0, key, kind, 0, 0.0)
+        _set_seq(self.buf, off, n)
+
+    def frame(self, frame_index: int, dx: int, dy: int) -> None:
+        ch = self.frames
+        n = ch.seq = ch.seq + 1
+        off = ch.base + (n & ch.mask) * RECORD_BYTES
+        _pack(self.buf, off, 0, _perf(), frame_index, dx, dy, 0, FRAME, 0, 0.0)
+        _set_seq(self.buf, off, n)
+
+    def _sync_names(self) -> None:
+        # Rare (a key or button seen for the first time), so a lock is fine here.
+        with self._names_lock:
+            tables = {"keys": list(eb.KEYS.names), "buttons": list(eb.BUTTONS.names), "actions": list(eb.ACTIONS.names), "axes": list(eb.AXES.names)}
+            data = json.dumps(tables).encode("utf-8")
+            if NAMES_HEAD.size + len(data) > NAMES_BYTES:
+                raise ValueError("live stream name tables are full")
+            self._names_version += 1  # odd: rewriting
+            NAMES_HEAD.pack_into(self.buf, HEADER_BYTES, self._names_version, len(data))
+            self.buf[HEADER_BYTES + NAMES_HEAD.size:HEADER_BYTES + NAMES_HEAD.size + len(data)] = data
+            self._names_version += 1
+            NAMES_HEAD.pack_into(self.buf, HEADER_BYTES, self._names_version, len(data))
+            self._keys_known, self._buttons_known, self._axes_known = len(tables["keys"]), len(tables["buttons"]), len(tables["axes"])
+
+
+class LiveEvent(NamedTuple):
+    kind: str  # one of KIND_NAMES
+    t: float  # perf_counter seconds
+    label: str  # key, button or axis name ("" for deltas and frames)
+    action: str  # "press"/"release" for clicks
+    a: int
+    b: int
+    n: int
+    value: float
+
+
+def _attach(name: str):
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name)
+    if os.name == "posix" and name not in _created:
+        # Before 3.13 attaching also registers the block with this process's
+        # resource tracker, which would unlink it when the reader exits. In
+        # the producer's own process it is the same registration, so it stays.
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class LiveReader:
+    """Follows a live stream from any local process; cursors are private to this reader.
+
+    Starts at the newest record, or at the oldest still in the rings with
+    ``from_start``.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, from_start: bool = False) -> None:
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, record_size, slots, channels = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_BYTES:
+            raise ValueError(f"{name} is not a version {VERSION} live stream")
+        self.slots = slots
+        self.bases = [HEADER_BYTES + NAMES_BYTES + i * slots * RECORD_BYTES for i in range(channels)]
+        self.cursors = []
+        for base in self.bases:
+            view = self.buf[base:base + slots * RECORD_BYTES].cast("Q")
+            seqs = view[:: RECORD_BYTES // SEQ.size]
+            newest = max(seqs)
+            seqs.release()
+            view.release()
+            self.cursors.append(max(1, newest - slots + 1) if from_start else newest + 1)
+        self.overruns = 0
+        self.names: Dict[str, List[str]] = {}
+        self._names_version = -1
+
+    def close(self) -> None:
+        self.buf = None
+        self.shm.close()
+
+    def __enter__(self) -> "LiveReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def read(self) -> List[LiveEvent]:
+        """Every record published since the last call, in time order."""
+        raw = []
+        size = RECORD_BYTES
+        for channel, base in enumerate(self.bases):
+            want = self.cursors[channel]
+            while True:
+                off = base + (want % self.slots) * size
+                (seq,) = SEQ.unpack_from(self.buf, off)
+                if seq == want:
+                    record = RECORD.unpack_from(self.buf, off)
+                    (seq,) = SEQ.unpack_from(self.buf, off)
+                    if seq == want:
+                        raw.append(record)
+                        want += 1
+                        continue
+                if seq <= want:
+                    break  # not written yet, or being written right now
+                # Lapped: that slot already holds a newer record; jump to the oldest one left.
+                oldest = seq - self.slots + 1
+                self.overruns += oldest - want
+                want = oldest
+            self.cursors[channel] = want
+        if raw:
+            self._refresh_names()
+        raw.sort(key=lambda record: record[1])
+        return [self._event(record) for record in raw]
+
+    def poll(self, timeout: Optional[float] = None, interval: float = 0.0005) -> List[LiveEvent]:
+        """``read``, waiting up to ``timeout`` seconds (forever if None) for at least one event."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            events = self.read()
+            if events or (deadline is not None and time.perf_counter() >= deadline):
+                return events
+            time.sleep(interval)
+
+    def _event(self, record: tuple) -> LiveEvent:
+        _seq, t, n, a, b, code, kind, action, value = record
+        label = ""
+        if kind == CLICK:
+            label = self._name("buttons", code)
+        elif kind == SCROLL:
+            label = self._name("axes", code)
+        elif kind >= KEY_DOWN:
+            label = self._name("keys", code)
+        return LiveEvent(KIND_NAMES[kind], t, label, self._name("actions", action) if kind == CLICK else "", a, b, n, value)
+
+    def _name(self, table: str, code: int) -> str:
+        names = self.names.get(table, ())
+        return names[code] if code < len(names) else f"#{code}"
+
+    def _refresh_names(self) -> None:
+        while True:
+            version, length = NAMES_HEAD.unpack_from(self.buf, HEADER_BYTES)
+            if version == self._names_version:
+                return
+            if version & 1:
+                time.sleep(0)
+                continue
+            start = HEADER_BYTES + NAMES_HEAD.size
+            data = bytes(self.buf[start:start + length])
+            if NAMES_HEAD.unpack_from(self.buf, HEADER_BYTES)[0] == version:
+                self.names = json.loads(data)
+                self._names_version = version
+                return
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--name", default=DEFAULT_NAME)
+    parser.add_argument("--from-start", action="store_true", help="begin with the oldest records still in the rings")
+    parser.add_argument("--deltas", action="store_true", help="also print raw mouse deltas")
+    args = parser.parse_args()
+
+    with LiveReader(args.name, args.from_start) as reader:
+        overruns = 0
+        try:
+            while True:
+                for event in reader.poll(interval=0.001):
+                    if event.kind != "delta" or args.deltas:
+                        print(f"{event.t:.6f} {event.kind:8s} {event.label:10s} {event.action:8s} {event.a:6d} {event.b:6d} {event.n:8d} {event.value:g}")
+                if reader.overruns != overruns:
+                    print(f"overrun: {reader.overruns - overruns} records lost")
+                    overruns = reader.overruns
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+Sparse time index and random-access queries over session logs.
+
+An index (``*.idx``, see ``log_segments.index_path_for``) holds one
+fixed-size entry per flush record::
+
+    t            relative_timestamp of the flush (seconds)
+    frame_min    first / last sampler frame_index in the record; records
+    frame_max    without sampler rows repeat the previous record's last frame
+    block_offset compressed offset of the block holding the record
+    raw_offset   offset of the record within the block, uncompressed
+    raw_length   uncompressed length of the record
+    segment      0-based segment number (0 for a single-file log)
+    flags        NO_FRAMES when the record has no sampler rows
+
+Both ``t`` and the frame columns only grow, so a query binary-searches the
+memory-mapped entries. It then decompresses one block of the segment from
+``block_offset``, which is memory-mapped too. The cost depends on the size
+of the window, not on the length of the log.
+
+``SegmentedLog`` writes the index as it records. ``build`` creates one after
+the fact, for single ``*_log.jsonl`` / ``*_log.gmlb`` files and for
+segmented logs that lost theirs. Segments written before the block format
+were compressed as one stream, so their index entries point at the segment
+start. They are still readable, but a seek into them is no longer cheap.
+
+CLI:
+    python log_index.py build session_log.manifest.json
+    python log_index.py query session_log.manifest.json --start 60 --end 90
+    python log_index.py query session_log.jsonl --frames 1800 2700
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import binlog
+import log_segments
+from log_segments import INDEX_ENTRY, INDEX_HEADER, INDEX_MAGIC, INDEX_VERSION
+
+# Compressed bytes fed to a decompressor per step while seeking within a block.
+READ_STEP = 64 << 10
+EVENT_KEYS = ("keyboard_events", "mouse_events", "mouse_positions")
+
+
+class IndexEntry(NamedTuple):
+    t: float
+    frame_min: int
+    frame_max: int
+    block_offset: int
+    raw_offset: int
+    raw_length: int
+    segment: int
+    flags: int
+
+
+class _Block:
+    """Decompressed prefix of one block, extended on demand."""
+
+    __slots__ = ("key", "decompressor", "consumed", "data")
+
+    def __init__(self, key: Tuple[int, int], decompressor) -> None:
+        self.key = key
+        self.decompressor = decompressor
+        self.consumed = 0
+        self.data = bytearray()
+
+
+class LogIndex:
+    """Random access to a session log through its index.
+
+    The entries are a snapshot taken when the index is opened. Reopen it
+    to see records a live recording has added since.
+    """
+
+    def __init__(self, index_path: Path) -> None:
+        self.path = Path(index_path)
+        self._handle = self.path.open("rb")
+        raw = self._handle.read(INDEX_HEADER.size)
+        if len(raw) < INDEX_HEADER.size:
+            raise ValueError("truncated log index header")
+        magic, version, entry_size, header_len = INDEX_HEADER.unpack(raw)
+        if magic != INDEX_MAGIC:
+            raise ValueError("not a session log index")
+        if version > INDEX_VERSION or entry_size != INDEX_ENTRY.size:
+            raise ValueError(f"unsupported log index version {version}")
+        self.header = json.loads(self._handle.read(header_len).decode("utf-8"))
+        self._base = INDEX_HEADER.size + header_len
+        size = self.path.stat().st_size
+        # A torn last entry (crash mid-write) is ignored.
+        self._count = (size - self._base) // INDEX_ENTRY.size
+        self._entries = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) if self._count else b""
+
+        self.log_path = self.path.with_name(self.header["log"])
+        self.log_format = self.header["format"]
+        self.codec = self.header["codec"]
+        if log_segments.is_manifest(self.log_path):
+            manifest = log_segments.read_manifest(self.log_path)
+            self.files = [self.log_path.with_name(segment["file"]) for segment in manifest["segments"]]
+            self._names = [segment.get("names") for segment in manifest["segments"]]
+            self.frame_interval = manifest["header"].get("frame_interval")
+        else:
+            self.files = [self.log_path]
+            self._names = [None]
+            self.frame_interval = self.header.get("frame_interval")
+        # Written by ``build`` where the manifest has no name tables.
+        for segment, names in enumerate(self.header.get("names", ())):
+            if names is not None and self._names[segment] is None:
+                self._names[segment] = names
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._block: Optional[_Block] = None
+
+    def __enter__(self) -> "LogIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for segment_map in self._maps.values():
+            segment_map.close()
+        self._maps.clear()
+        self._block = None
+        if self._count:
+            self._entries.close()
+        self._handle.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def entry(self, i: int) -> IndexEntry:
+        return IndexEntry._make(INDEX_ENTRY.unpack_from(self._entries, self._base + i * INDEX_ENTRY.size))
+
+    def _field(self, offset: int, fmt: str):
+        unpack = struct.Struct(fmt).unpack_from
+        base, size, entries = self._base + offset, INDEX_ENTRY.size, self._entries
+        return lambda i: unpack(entries, base + i * size)[0]
+
+    # Lookups ----------------------------------------------------------------
+    def find_time(self, start: float, end: float) -> range:
+        """Records holding events in ``[start, end]`` session seconds.
+
+        A record holds the events since the previous flush. An event stamped
+        exactly at a flush can land on either side, so this is the first
+        record flushed at or after ``start`` through the first one flushed
+        after ``end``.
+        """
+        t = self._field(0, "<d")
+        first = bisect.bisect_left(range(self._count), start, key=t)
+        last = bisect.bisect_right(range(first, self._count), end, key=t) + first
+        return range(first, min(last + 1, self._count))
+
+    def find_frames(self, first_frame: int, last_frame: int) -> range:
+        """Records whose sampler rows can fall in ``[first_frame, last_frame]``."""
+        frame_min = self._field(8, "<q")
+        frame_max = self._field(16, "<q")
+        first = bisect.bisect_left(range(self._count), first_frame, key=frame_max)
+        last = bisect.bisect_right(range(first, self._count), last_frame, key=frame_min) + first
+        return range(first, last)
+
+    # Reading ----------------------------------------------------------------
+    def _segment_map(self, segment: int, needed: int):
+        segment_map = self._maps.get(segment)
+        if segment_map is None or len(segment_map) < needed:
+            # Missing, or mapped before a live segment grew past ``needed``.
+            if segment_map is not None:
+                self._maps.pop(segment).close()
+            with self.files[segment].open("rb") as handle:
+                if not handle.seek(0, 2):
+                    return b""
+                segment_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def read(self, i: int) -> bytes:
+        """Uncompressed bytes of record ``i`` (one JSONL line or one binary chunk)."""
+        entry = self.entry(i)
+        end = entry.raw_offset + entry.raw_length
+        if self.codec == "none":
+            segment_map = self._segment_map(entry.segment, entry.block_offset + end)
+            data = segment_map[entry.block_offset + entry.raw_offset:entry.block_offset + end]
+        else:
+            data = self._decompressed(entry, end)[entry.raw_offset:end]
+        if len(data) < entry.raw_length:
+            # Still buffered by the writer: an unfinished xz block, say.
+            raise EOFError(f"record {i} is not readable yet")
+        return bytes(data)
+
+    def _decompressed(self, entry: IndexEntry, end: int) -> bytearray:
+        key = (entry.segment, entry.block_offset)
+        block = self._block
+        if block is None or block.key != key:
+            block = self._block = _Block(key, log_segments.block_decompressor(self.codec))
+        segment_map = self._segment_map(entry.segment, 0)
+        while len(block.data) < end:
+            position = entry.block_offset + block.consumed
+            if len(segment_map) <= position:
+                segment_map = self._segment_map(entry.segment, position + 1)
+                if len(segment_map) <= position:
+                    break
+            step = segment_map[position:position + READ_STEP]
+            block.consumed += len(step)
+            block.data += block.decompressor.decompress(step)
+            while block.decompressor.eof:
+                # Next block: only reached by indexes ``build`` wrote, whose
+                # offsets run across a whole segment.
+                rest = block.decompressor.unused_data
+                block.decompressor = log_segments.block_decompressor(self.codec)
+                block.data += block.decompressor.decompress(rest)
+        return block.data
+
+    def record(self, i: int) -> dict:
+        """Record ``i`` as the JSONL-shaped dict."""
+        data = self.read(i)
+        if self.log_format != "binary":
+            return json.loads(data)
+        entry = self.entry(i)
+        names = self._names[entry.segment] or {table: [] for table in binlog.INTERNERS}
+        return binlog.decode_chunk(*binlog.split_chunk(data), names, self.frame_interval).to_record()
+
+    def records(self, indices: range) -> Iterator[dict]:
+        for i in indices:
+            try:
+                yield self.record(i)
+            except EOFError:
+                return
+
+    # Queries ----------------------------------------------------------------
+    def query_time(self, start: float, end: float) -> Dict[str, List[dict]]:
+        """Every event with a timestamp in ``[start, end]`` session seconds."""
+        return _collect(self.records(self.find_time(start, end)), lambda event: start <= event["timestamp"] <= end)
+
+    def query_frames(self, first_frame: int, last_frame: int) -> Dict[str, List[dict]]:
+        """Sampler rows with ``frame_index`` in ``[first_frame, last_frame]``, with the clicks and keys between them.
+
+        Clicks and keys are selected by time: the frames' span on the sampler
+        grid when the log knows its frame interval, otherwise the span of the
+        sampler rows that matched.
+        """
+        records = list(self.records(self.find_frames(first_frame, last_frame)))
+        positions = [
+            row for record in records for row in record["mouse_positions"] if first_frame <= row["frame_index"] <= last_frame
+        ]
+        if self.frame_interval:
+            start, end = first_frame * self.frame_interval, (last_frame + 1) * self.frame_interval
+        elif positions:
+            start, end = positions[0]["timestamp"], positions[-1]["timestamp"]
+        else:
+            start, end = 0.0, -1.0
+        out = _collect(records, lambda event: start <= event["timestamp"] < end, ("keyboard_events", "mouse_events"))
+        out["mouse_positions"] = positions
+        return out
+
+
+def _collect(records, keep, keys=EVENT_KEYS) -> Dict[str, List[dict]]:
+    out = {key: [] for key in keys}
+    for record in records:
+        for key in keys:
+            out[key].extend(event for event in record.get(key, ()) if keep(event))
+    return out
+
+
+# Building after the fact ----------------------------------------------------
+def _jsonl_entries(handle) -> Iterator[Tuple[float, Optional[Tuple[int, int]], int, int]]:
+    offset = 0
+    for line in handle:
+        length = len(line)
+        if line.strip():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return  # torn last line
+            rows = record.get("mouse_positions") or ()
+            frames = (rows[0]["frame_index"], rows[-1]["frame_index"]) if rows else None
+            yield record.get("relative_timestamp", 0.0), frames, offset, length
+        offset += length
+
+
+def _binary_entries(handle, reader: binlog.BinaryLogReader) -> Iterator[Tuple[float, Optional[Tuple[int, int]], int, int]]:
+    offset = handle.tell()
+    for head, meta, body in reader.iter_raw_chunks():
+        end = handle.tell()
+        chunk = binlog.decode_chunk(head, meta, body, reader.names, reader.header.get("frame_interval"))
+        yield meta.get("relative_timestamp", 0.0), log_segments.frame_range(chunk.positions), offset, end - offset
+        offset = end
+
+
+def _file_entries(handle, log_format: str, names: List):
+    if log_format != "binary":
+        yield from _jsonl_entries(handle)
+        return
+    reader = binlog.BinaryLogReader(handle)
+    yield from _binary_entries(handle, reader)
+    # Tables only grow, so the final ones decode every chunk of the file.
+    names.append(reader.names)
+
+
+def build(log_path: Path, index_path: Optional[Path] = None) -> Path:
+    """Write the index for an existing log: a manifest, ``*_log.jsonl`` or ``*_log.gmlb``."""
+    log_path = Path(log_path)
+    index_path = Path(index_path) if index_path else log_segments.index_path_for(log_path)
+    names: List = []
+    if log_segments.is_manifest(log_path):
+        manifest = log_segments.read_manifest(log_path)
+        log_format, codec = manifest["format"], manifest["codec"]
+        sources = [(log_path.with_name(segment["file"]), segment) for segment in manifest["segments"]]
+        header = {"log": log_path.name, "format": log_format, "codec": codec}
+    else:
+        log_format = "binary" if log_path.suffix == binlog.SUFFIX else "jsonl"
+        codec = "none"
+        sources = [(log_path, None)]
+        header = {"log": log_path.name, "format": log_format, "codec": codec}
+        if log_format == "binary":
+            with log_path.open("rb") as handle:
+                header["frame_interval"] = binlog.BinaryLogReader(handle).header.get("frame_interval")
+
+    # The header goes first but the name tables are only known at the end,
+    # so entries are collected before the index is written.
+    entries = []
+    for segment, (path, meta) in enumerate(sources):
+        found: List = []
+        with log_segments.open_segment(path) as handle:
+            # One block from the segment start: the whole stream decompresses
+            # from offset 0, whichever writer produced it.
+            try:
+                for t, frames, raw_offset, raw_length in _file_entries(handle, log_format, found):
+                    entries.append((t, frames, segment, 0, raw_offset, raw_length))
+            except EOFError:
+                pass  # open or crash-truncated tail segment
+        names.append(None if meta is not None and "names" in meta else (found[0] if found else None))
+    if log_format == "binary":
+        header["names"] = names
+
+    writer = log_segments.IndexWriter(index_path, header)
+    try:
+        for t, frames, segment, block_offset, raw_offset, raw_length in entries:
+            writer.add(t, frames, segment, block_offset, raw_offset, raw_length)
+    finally:
+        writer.close()
+    return index_path
+
+
+def open_index(log_path: Path, create: bool = True) -> LogIndex:
+    """The index of a log, building it first if it is missing and ``create`` is set."""
+    log_path = Path(log_path)
+    if log_path.suffix == ".idx":
+        return LogIndex(log_path)
+    index_path = log_segments.index_path_for(log_path)
+    if not index_path.exists():
+        if not create:
+            raise FileNotFoundError(index_path)
+        build(log_path, index_path)
+    return LogIndex(index_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a session log's time index or query it.")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("log", type=Path, help="*_log.jsonl, *_log.gmlb, *_log.manifest.json or *.idx")
+    parser.add_argument("--start", type=float, help="window start, session seconds")
+    parser.add_argument("--end", type=float, help="window end, session seconds")
+    parser.add_argument("--frames", type=int, nargs=2, metavar=("FIRST", "LAST"), help="sampler frame range instead of times")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"Wrote {build(args.log)}")
+        return
+    with open_index(args.log) as index:
+        if args.frames:
+            events = index.query_frames(*args.frames)
+        else:
+            events = index.query_time(args.start if args.start is not None else 0.0, args.end if args.end is not None else float("inf"))
+    print(json.dumps(events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Rolling, compressed session-log segments with a manifest and a time index.
+
+A session's log is written as a series of segment files next to a small
+manifest and an index. For ``game_recording_X.mkv`` they are::
+
+    game_recording_X_log.manifest.json
+    game_recording_X_log.idx              (see log_index.py)
+    game_recording_X_log.0001.jsonl.gz    (or .gmlb.gz / .xz / .zst)
+    game_recording_X_log.0002.jsonl.gz
+    ...
+
+Each segment is self-contained: a plain ``*_log.jsonl`` or ``*_log.gmlb``
+stream, compressed as it is written. Binary segments start with their own
+header, and the manifest carries each segment's name tables. The writer keeps
+the current segment open and rotates it after ``max_seconds`` of session
+time or ``max_bytes`` of uncompressed records.
+
+Inside a segment, compression restarts every ``block_bytes`` of records.
+Each block is a new gzip member, zstd frame or xz stream, so the file is
+still one valid compressed stream. A reader can also start decompressing at
+any block's offset. gzip and zstd blocks are sync-flushed after every record,
+so a crash loses at most the record being written. An xz block becomes
+readable only once it is finished.
+
+The manifest is replaced atomically when a segment gets its first record,
+when a binary segment's name tables grow, and on close. For each segment it
+stores the file name and the session-time range ``[start, end]`` its records
+cover; while a log is open, the tail segment's ``end`` and counts lag behind
+the file, and readers treat that segment as open-ended. ``iter_records(manifest, start, end)`` therefore opens only the
+segments that overlap the window. The index adds one fixed-size entry per
+record: its block, its offset in the block, its time and its frames.
+``log_index.LogIndex`` seeks straight to a record with it. A closed log's
+manifest also keeps the session summary (see session_stats.py).
+"""
+
+import gzip
+import json
+import lzma
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import binlog
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_VERSION = 1
+FORMATS = {"jsonl": ".jsonl", "binary": binlog.SUFFIX}
+CODECS = {"gzip": ".gz", "xz": ".xz", "zstd": ".zst", "none": ""}
+MAX_SECONDS = 600.0
+MAX_BYTES = 64 << 20
+# Uncompressed bytes per independently decompressible block; bounds the
+# work of one random-access read.
+BLOCK_BYTES = 1 << 20
+
+# Index file: header, then one entry per record:
+#   t, frame_min, frame_max, block_offset, raw_offset, raw_length, segment, flags
+# ``segment`` is 0-based into the manifest's segments (0 for a single-file log).
+INDEX_MAGIC = b"GMLI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHHI")
+INDEX_ENTRY = struct.Struct("<dqqQIIHH")
+NO_FRAMES = 1  # flags: the record has no sampler rows; frame_min/max repeat the last seen
+
+
+def manifest_path_for(video_path: Path) -> Path:
+    video_path = Path(video_path)
+    return video_path.with_name(f"{video_path.stem}_log{MANIFEST_SUFFIX}")
+
+
+def is_manifest(path: Path) -> bool:
+    return Path(path).name.endswith("_log" + MANIFEST_SUFFIX)
+
+
+def index_path_for(log_path: Path) -> Path:
+    """``X_log.idx`` for a manifest; ``X_log.jsonl.idx`` / ``X_log.gmlb.idx`` for a single-file log."""
+    log_path = Path(log_path)
+    if is_manifest(log_path):
+        return log_path.with_name(log_path.name[: -len(MANIFEST_SUFFIX)] + ".idx")
+    return log_path.with_name(log_path.name + ".idx")
+
+
+def _zstd():
+    # Optional: zstandard is not a requirement; gzip covers the default.
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def resolve_codec(codec: str = "auto") -> str:
+    """``auto`` is zstd when the ``zstandard`` package is installed, else gzip."""
+    if codec == "auto":
+        return "zstd" if _zstd() is not None else "gzip"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown log compression: {codec}")
+    if codec == "zstd" and _zstd() is None:
+        raise ValueError("zstd log compression needs the zstandard package")
+    return codec
+
+
+class BlockCompressor:
+    """One block: a gzip member, zstd frame or xz stream, written record by record."""
+
+    def __init__(self, codec: str) -> None:
+        self.codec = codec
+        if codec == "gzip":
+            # wbits 31: gzip container, mtime 0, so identical input gives identical bytes.
+            self._c = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif codec == "xz":
+            self._c = lzma.LZMACompressor(preset=6)
+        elif codec == "zstd":
+            self._zstd = _zstd()
+            self._c = self._zstd.ZstdCompressor(level=3).compressobj()
+        else:
+            self._c = None
+
+    def compress(self, data: bytes) -> bytes:
+        """Compressed bytes for ``data``, sync-flushed so far as the codec allows."""
+        if self._c is None:
+            return data
+        out = self._c.compress(data)
+        if self.codec == "gzip":
+            out += self._c.flush(zlib.Z_SYNC_FLUSH)
+        elif self.codec == "zstd":
+            out += self._c.flush(self._zstd.COMPRESSOBJ_FLUSH_BLOCK)
+        return out
+
+    def finish(self) -> bytes:
+        return self._c.flush() if self._c is not None else b""
+
+
+def block_decompressor(codec: str):
+    """Decompressor for one block, fed from its first compressed byte (None for ``none``)."""
+    if codec == "gzip":
+        return zlib.decompressobj(31)
+    if codec == "xz":
+        return lzma.LZMADecompressor()
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ValueError("zstd-compressed log; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def open_segment(path: Path) -> BinaryIO:
+    """Decompressing binary reader for one segment file, picked by suffix."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".xz":
+        return lzma.open(path, "rb")
+    if path.suffix == ".zst":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ValueError(f"{path.name} is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True, read_across_frames=True)
+    return path.open("rb")
+
+
+class IndexWriter:
+    """Appends fixed-size entries to a ``*.idx`` file (see log_index.py for queries)."""
+
+    def __init__(self, path: Path, header: dict) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = self.path.open("wb")
+        body = json.dumps(header).encode("utf-8")
+        self._handle.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, INDEX_ENTRY.size, len(body)) + body)
+        self._last_frame = -1
+
+    def add(self, t: float, frames: Optional[Tuple[int, int]], segment: int, block_offset: int, raw_offset: int, raw_length: int) -> None:
+        if frames is None:
+            flags, frame_min, frame_max = NO_FRAMES, self._last_frame, self._last_frame
+        else:
+            flags, (frame_min, frame_max) = 0, frames
+            self._last_frame = frame_max
+        self._handle.write(INDEX_ENTRY.pack(t, frame_min, frame_max, block_offset, raw_offset, raw_length, segment, flags))
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def frame_range(positions) -> Optional[Tuple[int, int]]:
+    """First and last sampler ``frame_index`` of a flush, or None if it has no rows."""
+    return (positions.frame_index[0], positions.frame_index[-1]) if len(positions) else None
+
+
+class SegmentedLog:
+    """Writer side: one open compressed segment at a time, plus the manifest and index.
+
+    ``append_line`` takes a JSONL record and ``append_chunk`` a binary chunk,
+    depending on ``log_format``. Both return the compressed bytes that reached
+    the file. Not thread-safe: the log writer (thread or recorder loop
+    executor) is the only caller.
+    """
+
+    def __init__(
+        self,
+        manifest_path: Path,
+        log_format: str = "jsonl",
+        header: Optional[dict] = None,
+        codec: str = "auto",
+        max_seconds: float = MAX_SECONDS,
+        max_bytes: int = MAX_BYTES,
+        block_bytes: int = BLOCK_BYTES,
+    ) -> None:
+        if log_format not in FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.path = Path(manifest_path)
+        self.log_format = log_format
+        self.header = dict(header or {})
+        self.codec = resolve_codec(codec)
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.block_bytes = block_bytes
+        self.segments: List[Dict] = []
+        self.closed = False
+        self.summary: Optional[Dict] = None
+        self._raw: Optional[BinaryIO] = None
+        self._block: Optional[BlockCompressor] = None
+        self._block_offset = 0
+        self._block_raw = 0
+        self._encoder: Optional[binlog.BinaryLogWriter] = None
+        self._stem = self.path.name[: -len(MANIFEST_SUFFIX)]
+        self.index = IndexWriter(index_path_for(self.path), {"log": self.path.name, "format": log_format, "codec": self.codec})
+
+    def append_line(self, relative_timestamp: float, line: str, frames: Optional[Tuple[int, int]] = None) -> int:
+        """Append one JSONL record; ``frames`` is its (first, last) sampler ``frame_index``."""
+        self._roll(relative_timestamp)
+        return self._write(relative_timestamp, line.encode("utf-8"), frames)
+
+    def append_chunk(self, meta: dict, positions, mouse, keyboard) -> int:
+        relative_timestamp = meta["relative_timestamp"]
+        self._roll(relative_timestamp)
+        data = self._encoder.encode_chunk(meta, positions, mouse, keyboard)
+        return self._write(relative_timestamp, data, frame_range(positions))
+
+    def close(self, summary: Optional[Dict] = None) -> None:
+        """Finish the open segment (writing its trailer) and mark the manifest complete.
+
+        ``summary`` (session_stats.py) is stored in the manifest.
+        """
+        if self.closed:
+            return
+        self.summary = summary
+        self._close_segment()
+        self.closed = True
+        self.index.close()
+        self._write_manifest()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(segment["bytes"] for segment in self.segments)
+
+    # Internals ------------------------------------------------------------
+    def _roll(self, relative_timestamp: float) -> None:
+        if self.closed:
+            raise ValueError("log is closed")
+        current = self.segments[-1] if self._raw is not None else None
+        if current is not None and current["records"] and (
+            relative_timestamp - current["start"] >= self.max_seconds or current["raw_bytes"] >= self.max_bytes
+        ):
+            self._close_segment()
+            current = None
+        if current is None:
+            self._open_segment(self.segments[-1]["end"] if self.segments else 0.0)
+        elif self._block_raw >= self.block_bytes:
+            self._raw.write(self._block.finish())
+            self._start_block()
+
+    def _start_block(self) -> None:
+        self._block = BlockCompressor(self.codec)
+        self._block_offset = self._raw.tell()
+        self._block_raw = 0
+
+    def _open_segment(self, start: float) -> None:
+        index = len(self.segments) + 1
+        name = f"{self._stem}.{index:04d}{FORMATS[self.log_format]}{CODECS[self.codec]}"
+        path = self.path.with_name(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._raw = path.open("wb")
+        self._start_block()
+        self.segments.append({"file": name, "start": start, "end": start, "records": 0, "raw_bytes": 0, "bytes": 0, "complete": False})
+        if self.log_format == "binary":
+            # A fresh encoder per segment re-sends every interned name, so
+            # each segment decodes on its own.
+            self._encoder = binlog.BinaryLogWriter(path, self.header)
+            self._write_raw(self._encoder.encode_header())
+
+    def _write_raw(self, data: bytes) -> int:
+        """Compress ``data`` into the current block; returns its offset within the block."""
+        raw_offset = self._block_raw
+        self._raw.write(self._block.compress(data))
+        self._raw.flush()
+        self._block_raw += len(data)
+        return raw_offset
+
+    def _write(self, relative_timestamp: float, data: bytes, frames: Optional[Tuple[int, int]]) -> int:
+        before = self._raw.tell()
+        raw_offset = self._write_raw(data)
+        segment = self.segments[-1]
+        segment["end"] = max(segment["end"], relative_timestamp)
+        segment["records"] += 1
+        segment["raw_bytes"] += len(data)
+        segment["bytes"] = self._raw.tell()
+        # Rewriting the manifest costs more than the record itself, so only
+        # do it when a reader would otherwise miss a segment or a name.
+        changed = segment["records"] == 1
+        if self._encoder is not None:
+            names = self._encoder.names_written()
+            changed = changed or names != segment.get("names")
+            segment["names"] = names
+        self.index.add(relative_timestamp, frames, len(self.segments) - 1, self._block_offset, raw_offset, len(data))
+        if changed:
+            self._write_manifest()
+        return segment["bytes"] - before
+
+    def _close_segment(self) -> None:
+        if self._raw is None:
+            return
+        self._raw.write(self._block.finish())
+        segment = self.segments[-1]
+        segment["bytes"] = self._raw.tell()
+        segment["complete"] = True
+        self._raw.close()
+        self._raw = self._block = self._encoder = None
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "format": self.log_format,
+            "codec": self.codec,
+            "complete": self.closed,
+            "header": self.header,
+            "segments": self.segments,
+        }
+        if self.summary is not None:
+            manifest["summary"] = self.summary
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def read_manifest(path: Path) -> Dict:
+    with Path(path).open("r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    if manifest.get("version", 0) > MANIFEST_VERSION:
+        raise ValueError(f"unsupported log manifest version {manifest['version']}")
+    return manifest
+
+
+def segments_for(manifest: Dict, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+    """Segments whose records can hold events in ``[start, end]`` session seconds."""
+    chosen = []
+    segments = manifest["segments"]
+    for i, segment in enumerate(segments):
+        # The open tail segment may already hold records newer than its "end".
+        last_open = i == len(segments) - 1 and not manifest.get("complete")
+        if start is not None and segment["end"] < start and not last_open:
+            continue
+        if end is not None and segment["start"] > end:
+            continue
+        chosen.append(segment)
+    return chosen
+
+
+def _tolerate_open_tail(items: Iterator):
+    # A segment still being written (or cut off by a crash) has no trailer;
+    # everything before the last sync flush is intact.
+    try:
+        yield from items
+    except EOFError:
+        return
+
+
+def _jsonl_records(handle: BinaryIO) -> Iterator[dict]:
+    for line in handle:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return  # torn last line
+
+
+def _binary_chunks(handle: BinaryIO) -> Iterator["binlog.Chunk"]:
+    # The header read sits inside the generator, so an open xz tail whose
+    # first block is still buffered reads as empty.
+    yield from binlog.BinaryLogReader(handle)
+
+
+def iter_chunks(path: Path, start: Optional[float] = None, end: Optional[float] = None) -> Iterator["binlog.Chunk"]:
+    """Decoded chunks of a binary segmented log, limited to the segments covering the window."""
+    path = Path(path)
+    manifest = read_manifest(path)
+    if manifest["format"] != "binary":
+        raise ValueError(f"{path.name} is a {manifest['format']} log, not binary")
+    for segment in segments_for(manifest, start, end):
+        with open_segment(path.with_name(segment["file"])) as handle:
+            chunks = _tolerate_open_tail(_binary_chunks(handle))
+            yield from _window(chunks, segment["start"], start, end, lambda chunk: chunk.meta.get("relative_timestamp"))
+
+
+def iter_records(path: Path, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[dict]:
+    """JSONL-shaped records from a segmented log.
+
+    With ``start``/``end`` (session seconds), only the segments covering the
+    window are opened. Only the records whose flush interval overlaps the
+    window are yielded, so events a few seconds either side come along.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    if manifest["format"] == "binary":
+        for chunk in iter_chunks(path, start, end):
+            yield chunk.to_record()
+        return
+    for segment in segments_for(manifest, start, end):
+        with open_segment(path.with_name(segment["file"])) as handle:
+            records = _tolerate_open_tail(_jsonl_records(handle))
+            yield from _window(records, segment["start"], start, end, lambda record: record.get("relative_timestamp"))
+
+
+def _window(items: Iterator, first_start: float, start: Optional[float], end: Optional[float], flushed_at) -> Iterator:
+    """Items whose flush interval ``(previous flush, this flush]`` overlaps ``[start, end]``."""
+    previous = first_start
+    for item in items:
+        at = flushed_at(item)
+        if at is None:
+            at = previous
+        if end is not None and previous > end:
+            return
+        if start is None or at >= start:
+            yield item
+        previous = at
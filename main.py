@@ -1,11 +1,19 @@
-import threading
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, ttk
 
-from obs_control import OBSRecorder
+import recorder_core
+import telemetry
+from obs_control import OBSRecorder, PreRollService
 
 LOG_INTERVAL_SECONDS = 10
+# Seconds of input kept from before Start is pressed (preroll.py); 0 turns it off.
+PREROLL_SECONDS = 0.0
+# Shared-memory block that overlays can follow while recording (live_stream.py); None turns it off.
+LIVE_STREAM_NAME = None
+# How often the stats panel redraws from the recorder's latest status snapshot.
+STATS_REFRESH_MS = 1000
+STATS_ROWS = ("Mouse", "Keyboard", "Sampler", "Buffered", "Last flush", "Disk free", "OBS")
 
 
 class GameMonitorUI:
@@ -65,11 +73,23 @@ class GameMonitorUI:
         self.scene_var = tk.StringVar(value="screen")
         self.output_dir_var = tk.StringVar(value=str(Path("recordings").resolve()))
         self.status_var = tk.StringVar(value="Ready")
+        self.stats_vars = {row: tk.StringVar(value="-") for row in STATS_ROWS}
 
         self.recorder: OBSRecorder | None = None
         self.recording_active = False
+        self.recording_status = ""
+        # Latest recorder status, replaced whole by the recorder loop; the Tk
+        # side only reads the reference, so neither waits on the other.
+        self.latest_status = None
+        self._shown_status = None
+        self.preroll: PreRollService | None = None
+        if PREROLL_SECONDS > 0:
+            self.preroll = PreRollService(PREROLL_SECONDS)
+            recorder_core.submit(self.preroll.start())
 
         self._build_ui()
+        self._fit_height(620)
+        self.root.after(STATS_REFRESH_MS, self._refresh_stats)
 
     def _build_ui(self) -> None:
         # Main Layout
@@ -120,11 +140,28 @@ class GameMonitorUI:
         self.stop_btn = ttk.Button(card, text="Stop Recording", command=self._stop, state="disabled", style="Danger.TButton", cursor="hand2")
         self.stop_btn.pack(fill="x", ipady=4)
 
+        # Live Stats Group
+        stats_group = ttk.LabelFrame(card, text=" Live Stats ", padding=16)
+        stats_group.pack(fill="x", pady=(24, 0))
+        for row, name in enumerate(STATS_ROWS):
+            ttk.Label(stats_group, text=name, style="Card.TLabel").grid(row=row, column=0, sticky="w", padx=(0, 12), pady=1)
+            ttk.Label(stats_group, textvariable=self.stats_vars[name], style="Status.TLabel").grid(row=row, column=1, sticky="w", pady=1)
+        stats_group.columnconfigure(1, weight=1)
+
         # Status Bar
         status_bar = ttk.Frame(self.root, style="Card.TFrame", padding=(12, 8))
         status_bar.pack(fill="x", side="bottom")
         ttk.Label(status_bar, textvariable=self.status_var, style="Status.TLabel").pack(side="left")
 
+    def _fit_height(self, height: int) -> None:
+        # Grow past the default only if fonts or DPI scaling need it for the stats panel.
+        self.root.update_idletasks()
+        needed = self.root.winfo_reqheight()
+        if needed > height:
+            x = (self.root.winfo_screenwidth() - 480) // 2
+            y = max(0, (self.root.winfo_screenheight() - needed) // 2)
+            self.root.geometry(f"480x{needed}+{x}+{y}")
+
     def _add_field(self, parent, label, var, row, **kwargs):
         ttk.Label(parent, text=label, style="Card.TLabel").grid(row=row, column=0, sticky="w", padx=(0, 12), pady=6)
         ttk.Entry(parent, textvariable=var, **kwargs).grid(row=row, column=1, sticky="ew", pady=6)
@@ -140,28 +177,38 @@ class GameMonitorUI:
         self.start_btn.state(["disabled"])
         self.stop_btn.state(["!disabled"])
         self.status_var.set("Starting...")
-        threading.Thread(target=self._start_worker, daemon=True).start()
-
-    def _start_worker(self) -> None:
-        try:
-            self.recorder = OBSRecorder(
-                host=self.host_var.get(),
-                port=int(self.port_var.get()),
-                password=self.password_var.get(),
-                scene=self.scene_var.get(),
-                output_dir=self.output_dir_var.get(),
-                log_interval_seconds=LOG_INTERVAL_SECONDS,
-            )
-            self.recorder.connect()
-            full_path, _ = self.recorder.start_recording()
-            if not full_path:
-                raise RuntimeError("OBS is already recording.")
-            self.recording_active = True
-            self._set_status(f"Recording -> {full_path} | Log every {LOG_INTERVAL_SECONDS}s")
-        except Exception as exc:
-            self._set_status(f"Failed to start: {exc}")
-            self.root.after(0, lambda: self.start_btn.state(["!disabled"]))
-            self.root.after(0, lambda: self.stop_btn.state(["disabled"]))
+        self.recorder = OBSRecorder(
+            host=self.host_var.get(),
+            port=int(self.port_var.get()),
+            password=self.password_var.get(),
+            scene=self.scene_var.get(),
+            output_dir=self.output_dir_var.get(),
+            log_interval_seconds=LOG_INTERVAL_SECONDS,
+            on_update=self._on_update,
+            preroll=self.preroll,
+            live_stream=LIVE_STREAM_NAME,
+        )
+        recorder_core.submit(self._start_session(self.recorder.core)).add_done_callback(
+            lambda done: self.root.after(0, self._started, done)
+        )
+
+    @staticmethod
+    async def _start_session(core) -> str:
+        await core.connect()
+        full_path, _ = await core.start_recording()
+        if not full_path:
+            raise RuntimeError("OBS is already recording.")
+        return full_path
+
+    def _started(self, done) -> None:
+        if done.exception() is not None:
+            self.status_var.set(f"Failed to start: {done.exception()}")
+            self.start_btn.state(["!disabled"])
+            self.stop_btn.state(["disabled"])
+            return
+        self.recording_active = True
+        self.recording_status = f"Recording -> {done.result()} | Log every {LOG_INTERVAL_SECONDS}s"
+        self.status_var.set(self.recording_status)
 
     def _stop(self) -> None:
         if not self.recording_active:
@@ -169,31 +216,94 @@ class GameMonitorUI:
         self.start_btn.state(["disabled"])
         self.stop_btn.state(["disabled"])
         self.status_var.set("Stopping...")
-        threading.Thread(target=self._stop_worker, daemon=True).start()
-
-    def _stop_worker(self) -> None:
-        final_path = None
-        try:
-            if self.recorder:
-                final_path = self.recorder.stop_recording()
-                self.recorder.disconnect()
-        finally:
-            self.recording_active = False
-            if final_path:
-                self._set_status(f"Stopped. Saved: {final_path}")
-            else:
-                self._set_status("Stopped.")
-            self.root.after(0, lambda: self.start_btn.state(["!disabled"]))
-            self.root.after(0, lambda: self.stop_btn.state(["disabled"]))
+        recorder_core.submit(self._stop_session(self.recorder.core)).add_done_callback(
+            lambda done: self.root.after(0, self._stopped, done)
+        )
+
+    @staticmethod
+    async def _stop_session(core):
+        final_path = await core.stop_recording()
+        await core.disconnect()
+        return final_path
+
+    def _stopped(self, done) -> None:
+        self.recording_active = False
+        if done.exception() is not None:
+            self.status_var.set(f"Failed to stop: {done.exception()}")
+            self.start_btn.state(["!disabled"])
+            self.stop_btn.state(["disabled"])
+            return
+        final_path = done.result()
+        if final_path:
+            self.status_var.set(f"Stopped. Saved: {final_path}")
+        else:
+            self.status_var.set("Stopped.")
+        self.start_btn.state(["!disabled"])
+        self.stop_btn.state(["disabled"])
+
+    def _on_update(self, status) -> None:
+        # Recorder loop; input capture keeps running while OBS reconnects.
+        self.latest_status = status
+        if not self.recording_active or not status["recording"]:
+            return
+        if status["connected"]:
+            self._set_status(self.recording_status)
+        else:
+            self._set_status("OBS connection lost - still capturing input, reconnecting...")
 
     def _set_status(self, text: str) -> None:
         self.root.after(0, lambda: self.status_var.set(text))
 
+    def _refresh_stats(self) -> None:
+        status, shown = self.latest_status, self._shown_status
+        if status is not shown:
+            if status is None or not status["recording"]:
+                for var in self.stats_vars.values():
+                    var.set("-")
+            else:
+                seconds = status["sampled_at"] - shown["sampled_at"] if shown else 0.0
+                rates = telemetry.rates(shown["metrics"], status["metrics"], seconds) if shown else {}
+                for name, text in self._stats_text(status, rates).items():
+                    self.stats_vars[name].set(text)
+            self._shown_status = status
+        self.root.after(STATS_REFRESH_MS, self._refresh_stats)
+
+    @staticmethod
+    def _stats_text(status, rates) -> dict:
+        gauges = status["metrics"]["gauges"]
+        histograms = status["metrics"]["histograms"]
+
+        def rate(name: str, unit: str, scale: float = 1.0) -> str:
+            value = rates.get(name)
+            return f"{value / scale:,.0f} {unit}" if value is not None else f"- {unit}"
+
+        buffered = sum(gauges.get(name) or 0 for name in ("queue.keyboard", "queue.mouse", "queue.positions"))
+        pending_mb = ((gauges.get("queue.pending_bytes") or 0) + (gauges.get("queue.spilled_bytes") or 0)) / 1e6
+        frames_hz = rates.get("sampler.frames")
+        disk_free = status["disk_free"]
+        return {
+            "Mouse": f"{rate('events.mouse_delta', 'deltas/s')} · {rate('events.mouse_button', 'clicks+wheel/s')}",
+            "Keyboard": rate("events.keyboard", "events/s"),
+            "Sampler": (
+                f"{frames_hz:.1f} Hz" if frames_hz is not None else "- Hz"
+            ) + f" of {gauges.get('sampler.target_hz') or 0:g} · {gauges.get('sampler.skipped_frames') or 0} skipped",
+            "Buffered": f"{buffered:,} events · {gauges.get('queue.pending_batches') or 0} batches ({pending_mb:.1f} MB) waiting to write",
+            "Last flush": (
+                f"{(gauges.get('flush.last_seconds') or 0) * 1e3:.1f} ms"
+                f" (p99 {histograms.get('flush.seconds', {}).get('p99', 0) * 1e3:.1f}) · {rate('flush.bytes', 'KB/s', 1e3)}"
+            ),
+            "Disk free": f"{disk_free / 1e9:,.1f} GB" if disk_free is not None else "unknown",
+            "OBS": ("connected" if status["connected"] else "reconnecting...") + f" · {status['reconnects']} reconnects",
+        }
+
 
 def main() -> None:
     root = tk.Tk()
-    GameMonitorUI(root)
+    ui = GameMonitorUI(root)
     root.mainloop()
+    if ui.preroll is not None:
+        recorder_core.run(ui.preroll.stop())
+    recorder_core.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,22 @@
 """
-Headless entrypoint that reuses the legacy recorder logic (backend_legacy) plus OBS control.
+Headless entrypoint: the recorder daemon (daemon.py) on top of the legacy recorder logic and OBS control.
+
+Stays connected to OBS and records whenever a ``start`` arrives on the
+control socket (``python daemon.py start``). With ``--preroll S`` the input
+capture also keeps running between sessions and each session starts with
+the last S seconds of input; without it, hooks are only installed while
+a session records. ``--start`` begins a session straight away, like this script used
+to; Ctrl+C stops it and exits.
+
+    python obs.py [--host H] [--port P] [--scene S] [--output-dir D] [--control ADDR] [--preroll S] [--start]
 """
 
-import time
+import argparse
 from pathlib import Path
 
-from obs_control import OBSRecorder
+import recorder_core
+from daemon import DEFAULT_CONTROL, RecorderDaemon
+from obs_control import PreRollService, RecorderController
 
 HOST = "localhost"
 PORT = 4455
@@ -16,31 +27,51 @@ INTERVAL = 10
 
 
 def main() -> None:
-    recorder = OBSRecorder(
-        host=HOST,
-        port=PORT,
-        password=PASSWORD,
-        scene=SCENE,
-        output_dir=str(OUTPUT_DIR),
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--scene", default=SCENE)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--interval", type=float, default=INTERVAL, help="seconds between log flushes")
+    parser.add_argument("--log-format", choices=["jsonl", "binary"], default="jsonl")
+    parser.add_argument("--sample-rate", type=float, default=30.0)
+    parser.add_argument("--control", default=DEFAULT_CONTROL, help="Unix socket path or host:port to listen on")
+    parser.add_argument("--preroll", type=float, default=0.0, help="seconds of input kept from before each start")
+    parser.add_argument("--start", action="store_true", help="start a session right away")
+    args = parser.parse_args()
+
+    preroll = PreRollService(args.preroll, args.sample_rate, log_format=args.log_format) if args.preroll > 0 else None
+    recorder = RecorderController(
+        host=args.host,
+        port=args.port,
+        password=args.password,
+        scene=args.scene,
+        output_dir=str(args.output_dir),
+        log_interval_seconds=args.interval,
+        log_format=args.log_format,
+        sample_rate=args.sample_rate,
+        preroll=preroll,
     )
+    daemon = RecorderDaemon(recorder, args.control, preroll)
+    running = recorder_core.submit(daemon.run())
     try:
-        recorder.connect()
-        full_path, video_filename = recorder.start_recording()
-        if not full_path:
-            return
-        while True:
-            time.sleep(INTERVAL)
-            # backend_legacy handles periodic logging via save_log in obs_control paths
-            from backend_legacy import save_log
-
-            save_log()
+        if args.start:
+            reply = recorder_core.run(_start_when_ready(daemon))
+            print(reply.get("error") or f"Recording to {reply['path']}")
+        running.result()
     except KeyboardInterrupt:
         print("\nRecording stopped by user")
     except Exception as exc:
         print(f"Error: {exc}")
     finally:
-        recorder.stop_recording()
-        recorder.disconnect()
+        recorder_core.run(daemon.shutdown())
+        recorder_core.shutdown()
+
+
+async def _start_when_ready(daemon: RecorderDaemon):
+    await daemon.wait_ready()
+    return await daemon.handle(b'{"cmd": "start"}')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,408 @@
+"""
+Long-lived asyncio obs-websocket v5 connection shared by the recorder core.
+
+``shared(host, port, password)`` returns one ``OBSConnection`` per endpoint.
+It lives on the recorder loop (recorder_core.py). One socket carries both the
+requests, which are pipelined and matched by ``requestId``, and the output
+events: ``RecordStateChanged`` feeds a ``RecordStateWatcher``, and any type
+can be handled through ``event_handlers``. There is no per-client reader
+thread and no request lock. The WebSocket itself (handshake, framing, pings,
+the closing handshake and send backpressure) is the ``websockets`` package;
+this module only speaks obs-websocket v5 over it.
+
+The connection stays open between recording sessions. A heartbeat task checks
+it and reconnects with exponential backoff when it drops. ``record_status()``
+returns recent results from a cache. A caller that arrives while a query is in
+flight awaits that query instead of sending another.
+"""
+
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import re
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from websockets.asyncio.client import ClientConnection, connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from websockets.typing import Subprotocol
+
+from telemetry import METRICS
+
+SUBPROTOCOL = Subprotocol("obswebsocket.json")
+OP_HELLO, OP_IDENTIFY, OP_IDENTIFIED, OP_EVENT, OP_REQUEST, OP_RESPONSE = 0, 1, 2, 5, 6, 7
+EVENT_OUTPUTS = 1 << 6  # obs-websocket EventSubscription.Outputs
+RPC_VERSION = 1
+
+
+class OBSRequestError(Exception):
+    """OBS answered a request with ``requestStatus.result == false``."""
+
+    def __init__(self, request_type: str, code: Optional[int], comment: Optional[str]) -> None:
+        super().__init__(f"{request_type} failed ({code}): {comment}")
+        self.request_type = request_type
+        self.code = code
+
+
+def _snake(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def as_record(data: Dict) -> SimpleNamespace:
+    """Response or event data with snake_case attributes (``outputActive`` -> ``output_active``)."""
+    return SimpleNamespace(**{_snake(key): value for key, value in data.items()})
+
+
+class RecordState(NamedTuple):
+    output_state: Optional[str]
+    output_active: bool
+    output_path: Optional[str]
+    perf: float  # perf_counter() when the event reached us
+    wall: float
+
+
+class RecordStateWatcher:
+    """Collects ``RecordStateChanged`` events for start/stop to await.
+
+    Events are stamped as soon as the reader task decodes them, so the
+    STARTED stamp, not the next status poll, is the input timeline's zero.
+    """
+
+    def __init__(self, history: int = 16, on_change: Optional[Callable[[RecordState], None]] = None) -> None:
+        self._history: Deque[Tuple[int, RecordState]] = deque(maxlen=history)
+        self._changed = asyncio.Event()
+        self.seq = 0
+        self.on_change = on_change
+
+    def on_record_state_changed(self, data) -> None:
+        state = RecordState(
+            getattr(data, "output_state", None),
+            bool(getattr(data, "output_active", False)),
+            getattr(data, "output_path", None),
+            time.perf_counter(),
+            time.time(),
+        )
+        self.seq += 1
+        self._history.append((self.seq, state))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        if self.on_change:
+            self.on_change(state)
+
+    def mark(self) -> int:
+        """Sequence number to pass to ``wait_for`` before issuing a request."""
+        return self.seq
+
+    async def wait_for(self, output_state: str, after: int, timeout: float) -> Optional[RecordState]:
+        """First ``output_state`` event newer than ``after``, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = self._changed
+            for seq, state in self._history:
+                if seq > after and state.output_state == output_state:
+                    return state
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+
+class OBSConnection:
+    HEARTBEAT_INTERVAL = 2.0
+    BACKOFF_INITIAL = 0.25
+    BACKOFF_MAX = 8.0
+    # Per request; a hung OBS counts as a dropped connection.
+    REQUEST_TIMEOUT = 5.0
+    # How long a request waits for a reconnect before raising ConnectionError.
+    RECONNECT_WAIT = 5.0
+    # How long a closing handshake may take before the socket is dropped.
+    CLOSE_TIMEOUT = 1.0
+    STATUS_MAX_AGE = 0.5
+    # Requests after which a cached record status is stale.
+    STATUS_CHANGING = frozenset({"StartRecord", "StopRecord", "ToggleRecord", "PauseRecord", "ResumeRecord", "ToggleRecordPause"})
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        use_events: bool = True,
+        heartbeat_interval: Optional[float] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.password = password
+        self.use_events = use_events
+        self.heartbeat_interval = heartbeat_interval or self.HEARTBEAT_INTERVAL
+        self.record_state = RecordStateWatcher(on_change=lambda _state: self.invalidate_status())
+        self.connected = False
+        self.closed = False
+        self.reconnects = 0
+        self.last_error: Optional[BaseException] = None
+        # Called with True/False on the recorder loop as the link comes and goes.
+        self.listeners: List[Callable[[bool], None]] = []
+        # Other Outputs events (e.g. "ReplayBufferSaved") by type, called on the
+        # recorder loop with the event data as a record.
+        self.event_handlers: Dict[str, List[Callable[[SimpleNamespace], None]]] = {}
+
+        self._ws: Optional[ClientConnection] = None
+        self._closing: Set[asyncio.Task] = set()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._up = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._latency = METRICS.histogram("obs.request")
+
+        self._status = None
+        self._status_at = float("-inf")
+        self._status_query: Optional[asyncio.Task] = None
+
+    # Lifecycle --------------------------------------------------------------
+    async def open(self) -> None:
+        """Connect now if not connected (raising on failure) and start the heartbeat."""
+        self.closed = False
+        if not self.connected:
+            await self._connect()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._run(), name="obs-heartbeat")
+
+    async def close(self) -> None:
+        self.closed = True
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self._drop(self._ws, ConnectionError("connection closed"))
+        if self._closing:
+            await asyncio.wait(set(self._closing))
+
+    def events_alive(self) -> bool:
+        # Events arrive on the request socket, so they live and die with it.
+        return self.connected and self.use_events
+
+    async def _connect(self) -> None:
+        try:
+            ws = await connect(
+                f"ws://{self.host}:{self.port}",
+                subprotocols=[SUBPROTOCOL],
+                open_timeout=self.REQUEST_TIMEOUT,
+                close_timeout=self.CLOSE_TIMEOUT,
+                compression=None,  # OBS messages are small; deflate only adds latency
+            )
+        except InvalidHandshake as exc:
+            raise ConnectionError(f"websocket upgrade refused: {exc}") from None
+        try:
+            hello = json.loads(await asyncio.wait_for(ws.recv(), self.REQUEST_TIMEOUT) or "{}")
+            identify = {"rpcVersion": RPC_VERSION, "eventSubscriptions": EVENT_OUTPUTS if self.use_events else 0}
+            auth = hello.get("d", {}).get("authentication")
+            if auth:
+                secret = base64.b64encode(hashlib.sha256((self.password + auth["salt"]).encode()).digest())
+                identify["authentication"] = base64.b64encode(hashlib.sha256(secret + auth["challenge"].encode()).digest()).decode()
+            await ws.send(json.dumps({"op": OP_IDENTIFY, "d": identify}))
+            reply = json.loads(await asyncio.wait_for(ws.recv(), self.REQUEST_TIMEOUT) or "{}")
+            if reply.get("op") != OP_IDENTIFIED:
+                raise ConnectionError("OBS refused to identify us (wrong password?)")
+        except ConnectionClosed as exc:
+            raise ConnectionError(f"OBS closed the connection during Identify: {exc}") from None
+        except BaseException:
+            self._discard(ws)
+            raise
+        if self.connected or self.closed:
+            self._discard(ws)
+            return
+        self._ws = ws
+        self.connected = True
+        asyncio.get_running_loop().create_task(self._read(ws), name="obs-reader")
+        self._up.set()
+        self.invalidate_status()
+
+    async def _read(self, ws: ClientConnection) -> None:
+        error: BaseException = ConnectionError("OBS closed the connection")
+        try:
+            async for message in ws:
+                msg = json.loads(message)
+                d = msg.get("d", {})
+                if msg.get("op") == OP_RESPONSE:
+                    future = self._pending.pop(d.get("requestId"), None)
+                    if future is not None and not future.done():
+                        future.set_result(d)
+                elif msg.get("op") == OP_EVENT:
+                    self._dispatch(d.get("eventType"), as_record(d.get("eventData") or {}))
+        except (ConnectionClosed, OSError, ValueError) as exc:
+            error = exc
+        finally:
+            self._drop(ws, error)
+
+    def _drop(self, ws: Optional[ClientConnection], exc: BaseException) -> None:
+        """Mark ``ws`` dead (if still current), fail its requests and wake the heartbeat."""
+        if ws is None or ws is not self._ws:
+            return
+        self._ws = None
+        self.connected = False
+        self.last_error = exc
+        self._up.clear()
+        self._discard(ws)
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"OBS connection lost: {exc}"))
+        self.invalidate_status()
+        self._wake.set()
+
+    def _discard(self, ws: ClientConnection) -> None:
+        """Close ``ws`` in the background: a close handshake, cut short after ``CLOSE_TIMEOUT``."""
+        task = asyncio.get_running_loop().create_task(ws.close(), name="obs-close")
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _dispatch(self, event_type: Optional[str], data: SimpleNamespace) -> None:
+        if event_type == "RecordStateChanged":
+            self.record_state.on_record_state_changed(data)
+        for handler in list(self.event_handlers.get(event_type, ())):
+            try:
+                handler(data)
+            except Exception:
+                pass
+
+    def _notify(self, connected: bool) -> None:
+        for listener in list(self.listeners):
+            try:
+                listener(connected)
+            except Exception:
+                pass
+
+    async def _nap(self, seconds: float) -> None:
+        """Sleep that a drop cuts short."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _run(self) -> None:
+        backoff = self.BACKOFF_INITIAL
+        was_connected = True
+        while not self.closed:
+            if self.connected:
+                if not was_connected:
+                    was_connected = True
+                    self._notify(True)
+                backoff = self.BACKOFF_INITIAL
+                await self._nap(self.heartbeat_interval)
+                # Any recent request already proved the link; otherwise ask.
+                if self.connected and time.monotonic() - self._status_at >= self.heartbeat_interval:
+                    try:
+                        await self.record_status(max_age=0)
+                    except Exception:
+                        pass
+                continue
+            if was_connected:
+                was_connected = False
+                self._notify(False)
+            try:
+                await self._connect()
+                self.reconnects += 1
+                METRICS.counter("obs.reconnects").add()
+            except (OSError, ConnectionError, asyncio.TimeoutError, ValueError) as exc:
+                self.last_error = exc
+                await self._nap(backoff)
+                backoff = min(backoff * 2, self.BACKOFF_MAX)
+
+    # Requests ---------------------------------------------------------------
+    async def _live_socket(self) -> ClientConnection:
+        if not self.connected:
+            if self.closed:
+                raise ConnectionError(f"Not connected to OBS: {self.last_error}")
+            try:
+                await asyncio.wait_for(self._up.wait(), self.RECONNECT_WAIT)
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"Not connected to OBS: {self.last_error}") from None
+        return self._ws
+
+    async def request(self, request_type: str, data: Optional[Dict] = None):
+        """Send one request and await its response data, with snake_case attributes.
+
+        Raises ``OBSRequestError`` if OBS rejects the request, and
+        ``ConnectionError`` if the link is down or the reply does not arrive in
+        time. A timeout also drops the link so that the heartbeat reconnects.
+        """
+        ws = await self._live_socket()
+        request_id = str(next(self._ids))
+        reply = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        d = {"requestType": request_type, "requestId": request_id}
+        if data:
+            d["requestData"] = data
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._exchange(ws, json.dumps({"op": OP_REQUEST, "d": d}), reply), self.REQUEST_TIMEOUT)
+        except asyncio.TimeoutError as exc:
+            self._drop(ws, exc)
+            raise ConnectionError(f"OBS did not answer {request_type}") from None
+        except ConnectionClosed as exc:
+            self._drop(ws, exc)
+            raise ConnectionError(f"OBS connection lost: {exc}") from None
+        finally:
+            self._pending.pop(request_id, None)
+            self._latency.record(time.perf_counter() - started)
+            if request_type in self.STATUS_CHANGING:
+                self.invalidate_status()
+        status = response.get("requestStatus", {})
+        if not status.get("result"):
+            raise OBSRequestError(request_type, status.get("code"), status.get("comment"))
+        return as_record(response.get("responseData") or {})
+
+    @staticmethod
+    async def _exchange(ws: ClientConnection, message: str, reply: asyncio.Future):
+        # send() waits while the socket's write buffer is full.
+        await ws.send(message)
+        return await reply
+
+    def invalidate_status(self) -> None:
+        self._status_at = float("-inf")
+
+    async def record_status(self, max_age: Optional[float] = None):
+        """``GetRecordStatus``, at most ``max_age`` seconds old.
+
+        A caller that finds a query already in flight awaits it and shares its
+        answer rather than sending another, even with ``max_age=0``.
+        RecordStateChanged events invalidate the cache.
+        """
+        max_age = self.STATUS_MAX_AGE if max_age is None else max_age
+        if self._status is not None and time.monotonic() - self._status_at <= max_age:
+            METRICS.counter("obs.status_cached").add()
+            return self._status
+        query = self._status_query
+        if query is not None and not query.done():
+            METRICS.counter("obs.status_coalesced").add()
+            return await asyncio.shield(query)
+        query = self._status_query = asyncio.get_running_loop().create_task(self.request("GetRecordStatus"))
+        # Shielded: a cancelled caller must not cancel the query others share.
+        status = await asyncio.shield(query)
+        self._status, self._status_at = status, time.monotonic()
+        return status
+
+
+_pool: Dict[Tuple[str, int, str, bool], OBSConnection] = {}
+
+
+def shared(host: str, port: int, password: str, use_events: bool = True) -> OBSConnection:
+    """The pooled connection for this endpoint (not yet opened if new). Call on the recorder loop."""
+    key = (host, int(port), password, use_events)
+    conn = _pool.get(key)
+    if conn is None or conn.closed:
+        conn = _pool[key] = OBSConnection(host, int(port), password, use_events)
+    return conn
+
+
+async def close_all() -> None:
+    conns = list(_pool.values())
+    _pool.clear()
+    for conn in conns:
+        await conn.close()
@@ -1,16 +1,34 @@
+import asyncio
 import datetime
-import threading
+import shutil
 import time
 from pathlib import Path
-from typing import Optional, Tuple
-
-import obsws_python as obs
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
 # Legacy input recorder logic lifted from the original working script.
 import backend_legacy as legacy
+import catalog
+import clock_sync
+import log_segments
+import obs_connection
+import preroll
+import recorder_core
+import spill
+import telemetry
+from obs_connection import OBSConnection
+from telemetry import METRICS
 
 
-class OBSRecorder:
+class RecorderController:
+    """Start/stop, log flushing, clock sampling and UI updates, as recorder-loop coroutines."""
+
+    OUTPUT_STARTED = "OBS_WEBSOCKET_OUTPUT_STARTED"
+    OUTPUT_STOPPED = "OBS_WEBSOCKET_OUTPUT_STOPPED"
+    START_TIMEOUT = 3.0
+    # Stopping waits for the muxer to finalize the file.
+    STOP_TIMEOUT = 10.0
+    UPDATE_INTERVAL = 1.0
+
     def __init__(
         self,
         host: str,
@@ -19,6 +37,22 @@ class OBSRecorder:
         scene: str,
         output_dir: str,
         log_interval_seconds: float = 10.0,
+        log_format: str = "jsonl",
+        sample_rate: Union[float, str] = 30.0,
+        sampler_policy: str = "precise",
+        use_events: bool = True,
+        connection: Optional[OBSConnection] = None,
+        clock_interval: float = 5.0,
+        log_compression: str = "auto",
+        log_segment_seconds: float = log_segments.MAX_SECONDS,
+        on_update: Optional[Callable[[Dict[str, object]], None]] = None,
+        max_pending_bytes: int = spill.MEMORY_BYTES,
+        max_spill_bytes: int = spill.SPILL_BYTES,
+        drop_policy: str = "oldest",
+        spill_dir: Optional[str] = None,
+        preroll: Optional["PreRollService"] = None,
+        live_stream: Optional[str] = None,
+        catalog_sessions: bool = True,
     ) -> None:
         self.host = host
         self.port = port
@@ -27,23 +61,62 @@ class OBSRecorder:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.log_interval_seconds = log_interval_seconds
+        self.log_format = log_format
+        # Rolling log segments (log_segments.py): gzip/xz/zstd/none, rotated every N session seconds.
+        self.log_compression = log_compression
+        self.log_segment_seconds = log_segment_seconds
+        # Bounds on events waiting for a stalled writer (spill.py): RAM, then a
+        # temporary spill file, then ``drop_policy`` ("oldest"/"newest").
+        self.max_pending_bytes = max_pending_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.drop_policy = drop_policy
+        self.spill_dir = spill_dir
+        # Armed pre-roll, if any; recordings start with its window and it hears
+        # about replay-buffer saves on this controller's connection.
+        self.preroll = preroll
+        # Shared-memory block to publish input to while recording (live_stream.py); None: off.
+        self.live_stream = live_stream
+        # Add each finished session to output_dir's catalog (catalog.py).
+        self.catalog_sessions = catalog_sessions
+        # Mouse sampler rate in Hz, or "video" to sample at the OBS output fps
+        # as configured (then it is not forced to 30 fps CFR).
+        self.sample_rate = sample_rate
+        self.sampler_policy = sampler_policy
+        self.video_fps: Optional[float] = None
+
+        # Resolve start/stop on RecordStateChanged; status polling is the fallback.
+        self.use_events = use_events
 
-        self.client: Optional[obs.ReqClient] = None
+        # Defaults to the pooled connection for host/port, kept warm between sessions.
+        self.connection = connection
+        self.client: Optional[OBSConnection] = None
+        # Seconds between GetRecordStatus samples for the clock-drift model.
+        self.clock_interval = clock_interval
+        self.clock_sampler: Optional[clock_sync.ClockSampler] = None
         self.recording_active = False
-        self._log_thread: Optional[threading.Thread] = None
-        self._stop_event: Optional[threading.Event] = None
         self.current_output_path: Optional[Path] = None
 
-    def connect(self) -> None:
+        # Called on the recorder loop with status() every UPDATE_INTERVAL while
+        # recording, and whenever the OBS link drops or returns.
+        self.on_update = on_update
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    async def connect(self) -> None:
+        if self.connection is None:
+            self.connection = obs_connection.shared(self.host, self.port, self.password, self.use_events)
         try:
-            self.client = obs.ReqClient(host=self.host, port=self.port, password=self.password)
+            await self.connection.open()
         except Exception as exc:
             raise RuntimeError(f"Failed to connect to OBS: {exc}") from exc
+        self.client = self.connection
+        if self.preroll is not None:
+            self.preroll.watch(self.client)
 
-    def start_recording(self) -> Tuple[Optional[str], Optional[str]]:
+    async def start_recording(self) -> Tuple[Optional[str], Optional[str]]:
         if not self.client:
             raise RuntimeError("Not connected to OBS")
-        status = self.client.get_record_status()
+        status = await self.client.record_status()
         if status.output_active:
             print("Recording is already active")
             return None, None
@@ -51,78 +124,177 @@ class OBSRecorder:
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         filename_hint = f"game_recording_{timestamp}"
         # Configure OBS
-        self.client.set_record_directory(str(self.output_dir))
+        await self.client.request("SetRecordDirectory", {"recordDirectory": str(self.output_dir)})
         if self.scene:
             try:
-                self.client.set_current_program_scene(self.scene)
+                await self.client.request("SetCurrentProgramScene", {"sceneName": self.scene})
             except Exception:
                 pass
-        self._ensure_cfr_30()
-        self.client.start_record()
+        if self.sample_rate == "video":
+            await self._read_video_fps()
+        else:
+            await self._ensure_cfr_30()
+        # Resets session state and telemetry, so OBS timings below are kept.
+        legacy.start_recording(
+            self._sampler_rate(), self.sampler_policy, self.max_pending_bytes, self.max_spill_bytes, self.drop_policy, self.spill_dir
+        )
+        mark = self.client.record_state.mark()
+        await self.client.request("StartRecord")
         self.recording_active = True
 
-        start_perf, start_wall, status = self._wait_for_recording_active()
+        start_perf, start_wall, status = await self._wait_for_record_state(self.OUTPUT_STARTED, mark, self.START_TIMEOUT)
         resolved_path = self._resolve_output_path(status, filename_hint)
         filename = Path(resolved_path).name
         full_path = str(resolved_path)
 
-        # Start input capture with legacy logic
-        legacy.start_recording()
-        legacy.save_log(full_path)  # initialize log file bound to this video path
+        if self.live_stream:
+            legacy.open_live_stream(self.live_stream)
+        # Start input capture with legacy logic. An armed pre-roll queues its
+        # window here, so the first flush writes it as the log's first record.
         legacy.start_input_threads(start_perf=start_perf, start_wall=start_wall)
+        await self._flush(full_path)  # initialize log file bound to this video path
+        legacy.clock_model = clock_sync.DriftModel(1.0 / (self.video_fps or 30.0))
+        client = self.client
+        self.clock_sampler = clock_sync.ClockSampler(lambda: client.request("GetRecordStatus"), legacy.clock_model, start_perf, self.clock_interval)
 
         self.current_output_path = Path(full_path)
-        self._start_log_thread()
+        self._spawn("clock", self.clock_sampler.run())
+        self._spawn("flush", self._flush_periodically())
+        self._spawn("drain", self._drain_periodically())
+        self._spawn("updates", self._publish_periodically())
+        self.client.listeners.append(self._on_link)
         print(f"Started recording to {full_path}")
         return full_path, filename
 
-    def stop_recording(self) -> Optional[Path]:
+    async def stop_recording(self) -> Optional[Path]:
         if not self.client:
             return None
         try:
-            status = self.client.get_record_status()
+            # Before StopRecord: a stopping output's duration no longer tracks the clock.
+            await self._cancel("clock")
+            self.clock_sampler = None
+            status = await self.client.record_status()
             if not status.output_active:
                 print("Recording is not active")
             else:
-                self.client.stop_record()
-                # Update final path after stop
-                status = self.client.get_record_status()
-                self.current_output_path = self._resolve_output_path(status, None)
+                mark = self.client.record_state.mark()
+                response = await self.client.request("StopRecord")
+                _perf, _wall, stopped = await self._wait_for_record_state(self.OUTPUT_STOPPED, mark, self.STOP_TIMEOUT)
+                # The STOPPED event and StopRecord both carry the final path;
+                # a status re-query only has one on older servers.
+                for source in (stopped, response):
+                    if getattr(source, "output_path", None):
+                        self.current_output_path = Path(source.output_path)
+                        break
+                else:
+                    status = await self.client.record_status(max_age=0)
+                    self.current_output_path = self._resolve_output_path(status, None)
         finally:
-            self._stop_log_thread()
-            legacy.stop_input_threads()
-            legacy.save_log()
+            await self._cancel("flush")
+            await self._cancel("updates")
+            if self._on_link in self.client.listeners:
+                self.client.listeners.remove(self._on_link)
+            # Stop producers first so the final flush sees every event.
+            await asyncio.to_thread(legacy.stop_input_threads)
+            legacy.close_live_stream()
+            await self._cancel("drain")
+            await self._flush(close=True)
             self.recording_active = False
+            self._publish()
             print("Stopped recording")
+            if self.catalog_sessions and legacy.log_file_path is not None:
+                try:
+                    await asyncio.to_thread(catalog.record_session, self.output_dir, legacy.log_file_path, self.current_output_path)
+                except Exception as exc:
+                    print(f"Catalog update failed: {exc}")
             return self.current_output_path
 
-    def disconnect(self) -> None:
-        if self.client:
-            try:
-                if self.recording_active:
-                    self.stop_recording()
-            finally:
-                self.client.disconnect()
+    async def disconnect(self) -> None:
+        """Stop any recording and let go of the connection, which stays warm in the pool."""
+        if self.client and self.recording_active:
+            await self.stop_recording()
         self.client = None
 
-    # Background log persistence -----------------------------------------
-    def _start_log_thread(self) -> None:
-        self._stop_event = threading.Event()
+    def status(self) -> Dict[str, object]:
+        """What the UI shows: session state, OBS link and the telemetry snapshot.
+
+        Only reads counters and gauges, which no capture thread locks, so it
+        is safe to call from the recorder loop while capturing.
+        """
+        try:
+            disk_free = shutil.disk_usage(self.output_dir).free
+        except OSError:
+            disk_free = None
+        return {
+            "sampled_at": time.monotonic(),
+            "recording": self.recording_active,
+            "connected": bool(self.client and self.client.connected),
+            "elapsed": legacy.get_relative_timestamp() if self.recording_active else 0.0,
+            "output_path": str(self.current_output_path) if self.current_output_path else None,
+            "reconnects": self.client.reconnects if self.client else 0,
+            "disk_free": disk_free,
+            "metrics": telemetry.snapshot(),
+        }
+
+    # Recorder-loop tasks ------------------------------------------------
+    def _spawn(self, name: str, coro) -> None:
+        self._tasks[name] = asyncio.get_running_loop().create_task(coro, name=f"recorder-{name}")
 
-        def worker() -> None:
-            while self._stop_event and not self._stop_event.wait(self.log_interval_seconds):
-                legacy.save_log()
+    async def _cancel(self, name: str) -> None:
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _flush(self, video_path: Optional[str] = None, close: bool = False) -> None:
+        """``legacy.save_log`` in the loop's executor; flushes never overlap.
+
+        ``close`` finishes the log's last segment after flushing.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            await asyncio.to_thread(
+                legacy.save_log, video_path, self.log_format, self.log_compression, self.log_segment_seconds
+            )
+            if close:
+                await asyncio.to_thread(legacy.close_log)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.log_interval_seconds)
+            try:
+                await self._flush()
+            except Exception as exc:
+                # Keep flushing; the next flush retries with fresh data.
+                print(f"Log flush failed: {exc}")
 
-        self._log_thread = threading.Thread(target=worker, name="legacy_log_writer", daemon=True)
-        self._log_thread.start()
+    async def _drain_periodically(self) -> None:
+        # A flush stuck in the executor holds _flush_lock, not the loop, so
+        # this keeps the capture buffers small meanwhile.
+        while True:
+            await asyncio.sleep(legacy.DRAIN_INTERVAL)
+            if legacy.writer_busy:
+                try:
+                    await asyncio.to_thread(legacy.drain_if_behind)
+                except Exception as exc:
+                    print(f"Log drain failed: {exc}")
 
-    def _stop_log_thread(self) -> None:
-        if self._stop_event:
-            self._stop_event.set()
-        if self._log_thread:
-            self._log_thread.join(timeout=1.0)
-        self._log_thread = None
-        self._stop_event = None
+    async def _publish_periodically(self) -> None:
+        while True:
+            self._publish()
+            await asyncio.sleep(self.UPDATE_INTERVAL)
+
+    def _publish(self) -> None:
+        if self.on_update is not None:
+            try:
+                self.on_update(self.status())
+            except Exception:
+                pass
+
+    def _on_link(self, _connected: bool) -> None:
+        # Input capture keeps running either way; just tell the UI now.
+        self._publish()
 
     def _resolve_output_path(self, status: object, fallback_stem: Optional[str]) -> Path:
         candidates = [
@@ -140,33 +312,176 @@ class OBSRecorder:
             return self.output_dir / f"{fallback_stem}.mkv"
         return self.output_dir / "recording.mkv"
 
-    def _wait_for_recording_active(self) -> Tuple[float, float, object]:
+    async def _wait_for_record_state(self, output_state: str, mark: int, timeout: float) -> Tuple[float, float, object]:
+        """``(perf, wall, state)`` once OBS reports ``output_state``.
+
+        Uses the RecordStateChanged event stamp while events are subscribed,
+        otherwise (or if the event never arrives) polls record status.
+        """
+        if self.client.events_alive():
+            started = time.monotonic()
+            state = await self.client.record_state.wait_for(output_state, mark, timeout)
+            if state is not None:
+                name = "obs.start_wait" if output_state == self.OUTPUT_STARTED else "obs.stop_wait"
+                METRICS.histogram(name).record(time.monotonic() - started)
+                return state.perf, state.wall, state
+            METRICS.counter("obs.event_timeouts").add()
+        if output_state == self.OUTPUT_STARTED:
+            return await self._wait_for_recording_active()
+        return time.perf_counter(), time.time(), None
+
+    async def _wait_for_recording_active(self) -> Tuple[float, float, object]:
         start = time.monotonic()
-        last_status = self.client.get_record_status() if self.client else None
-        while time.monotonic() - start < 3.0:
-            status = self.client.get_record_status() if self.client else None
-            last_status = status
-            if status and getattr(status, "output_active", False):
-                return time.perf_counter(), time.time(), status
-            time.sleep(0.02)
+        last_status = None
+
+        async def poll() -> None:
+            nonlocal last_status
+            while True:
+                last_status = await self.client.record_status(max_age=0)
+                if getattr(last_status, "output_active", False):
+                    return
+                await asyncio.sleep(0.02)
+
+        try:
+            await asyncio.wait_for(poll(), self.START_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        METRICS.histogram("obs.start_wait").record(time.monotonic() - start)
         return time.perf_counter(), time.time(), last_status
 
-    def _ensure_cfr_30(self) -> None:
-        if not self.client:
-            return
-        set_fn = getattr(self.client, "set_video_settings", None)
-        get_fn = getattr(self.client, "get_video_settings", None)
-        if not set_fn or not get_fn:
+    def _sampler_rate(self) -> float:
+        if self.sample_rate == "video":
+            return self.video_fps or 30.0
+        return float(self.sample_rate)
+
+    async def _read_video_fps(self) -> Tuple[Optional[int], Optional[int]]:
+        try:
+            settings = await self.client.request("GetVideoSettings")
+        except Exception:
+            return None, None
+        fps_num = getattr(settings, "fps_numerator", None)
+        fps_den = getattr(settings, "fps_denominator", None)
+        if fps_num:
+            self.video_fps = fps_num / (fps_den or 1)
+        return fps_num, fps_den
+
+    async def _ensure_cfr_30(self) -> None:
+        fps_num, fps_den = await self._read_video_fps()
+        if fps_num == 30 and fps_den in (1, None):
             return
         try:
-            settings = get_fn()
-            fps_num = getattr(settings, "fps_numerator", None) or getattr(settings, "fpsNumerator", None)
-            fps_den = getattr(settings, "fps_denominator", None) or getattr(settings, "fpsDenominator", None)
-            if fps_num == 30 and fps_den in (1, None):
-                return
-            try:
-                set_fn(fps_numerator=30, fps_denominator=1)
-            except TypeError:
-                set_fn(fpsNumerator=30, fpsDenominator=1)
+            await self.client.request("SetVideoSettings", {"fpsNumerator": 30, "fpsDenominator": 1})
+            self.video_fps = 30.0
         except Exception:
             return
+
+
+class PreRollService:
+    """Always-on pre-roll (preroll.py) on the recorder loop: arming, ring ticks and replay-buffer logs.
+
+    ``start`` captures into a ``window``-second ring until ``stop``. A
+    recording started meanwhile begins with that window. While no recording
+    runs, each ``ReplayBufferSaved`` event on a watched connection writes the
+    window as a log next to the saved clip.
+    """
+
+    TICK_INTERVAL = 0.25
+
+    def __init__(
+        self,
+        window: float = preroll.WINDOW_SECONDS,
+        sample_rate: float = 30.0,
+        sampler_policy: str = "precise",
+        log_format: str = "jsonl",
+        log_compression: str = "auto",
+    ) -> None:
+        self.window = window
+        self.sample_rate = sample_rate
+        self.sampler_policy = sampler_policy
+        self.log_format = log_format
+        self.log_compression = log_compression
+        self._ticker: Optional[asyncio.Task] = None
+        self._watched: List[OBSConnection] = []
+        self._saves: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        await asyncio.to_thread(legacy.arm_preroll, self.window, self.sample_rate, self.sampler_policy)
+        self._ticker = asyncio.get_running_loop().create_task(self._tick(), name="recorder-preroll")
+
+    async def stop(self) -> None:
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        for connection in self._watched:
+            connection.event_handlers.get("ReplayBufferSaved", []).remove(self._on_replay_saved)
+        self._watched = []
+        await asyncio.gather(*self._saves, return_exceptions=True)
+        await asyncio.to_thread(legacy.disarm_preroll)
+
+    def watch(self, connection: OBSConnection) -> None:
+        if connection not in self._watched:
+            connection.event_handlers.setdefault("ReplayBufferSaved", []).append(self._on_replay_saved)
+            self._watched.append(connection)
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.TICK_INTERVAL)
+            try:
+                await asyncio.to_thread(legacy.preroll_tick)
+            except Exception as exc:
+                print(f"Pre-roll tick failed: {exc}")
+
+    def _on_replay_saved(self, data) -> None:
+        path = getattr(data, "saved_replay_path", None)
+        # A 0 s window only keeps the capture warm (daemon.py); there is nothing to save.
+        if path and self.window > 0:
+            task = asyncio.get_running_loop().create_task(self._save(path), name="recorder-replay-log")
+            self._saves.add(task)
+            task.add_done_callback(self._saves.discard)
+
+    async def _save(self, video_path: str) -> None:
+        try:
+            manifest = await asyncio.to_thread(legacy.save_preroll, video_path, self.log_format, self.log_compression)
+        except Exception as exc:
+            print(f"Replay log failed: {exc}")
+            return
+        if manifest is not None:
+            print(f"Saved replay log to {manifest}")
+
+
+class OBSRecorder:
+    """Blocking facade over ``RecorderController``; each call runs on the recorder loop.
+
+    Takes the same arguments as the controller. Its attributes
+    (``recording_active``, ``current_output_path``, ``connection``, ...) are
+    read through from ``self.core``.
+    """
+
+    OUTPUT_STARTED = RecorderController.OUTPUT_STARTED
+    OUTPUT_STOPPED = RecorderController.OUTPUT_STOPPED
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.core = RecorderController(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name == "core":
+            raise AttributeError(name)
+        return getattr(self.core, name)
+
+    def connect(self) -> None:
+        recorder_core.run(self.core.connect())
+
+    def start_recording(self) -> Tuple[Optional[str], Optional[str]]:
+        return recorder_core.run(self.core.start_recording())
+
+    def stop_recording(self) -> Optional[Path]:
+        return recorder_core.run(self.core.stop_recording())
+
+    def metrics(self) -> Dict[str, object]:
+        """Current telemetry snapshot (capture pipeline and OBS round trips)."""
+        return telemetry.snapshot()
+
+    def disconnect(self) -> None:
+        """Stop any recording and let go of the connection, which stays warm in the pool."""
+        recorder_core.run(self.core.disconnect())
@@ -0,0 +1,161 @@
+"""
+Always-on pre-roll: the last few seconds of input, kept before recording starts.
+
+While armed and not recording, the capture threads keep running.
+``backend_legacy.preroll_tick`` regularly moves their buffers into the fixed
+rings of a ``PreRoll``, so the callbacks do exactly the work they do during a
+recording. Each ring is a set of preallocated ``array`` columns sized for
+``window`` seconds at a nominal rate:
+
+    positions   window x sample rate (one row per sampler frame)
+    mouse       window x ``MOUSE_EVENTS_PER_SECOND`` clicks and scrolls
+    keyboard    window x ``KEYS_PER_SECOND`` presses and releases
+
+Memory is therefore fixed when the pre-roll is armed. A burst beyond the
+nominal rate overwrites the oldest rows and is counted in ``overwritten``;
+the window is then shorter. When a recording starts, or OBS saves its
+replay buffer, ``window_buffers`` hands out the rows from the last
+``window`` seconds. backend_legacy shifts their timestamps onto the new
+clock.
+"""
+
+import bisect
+import math
+from array import array
+from typing import Dict, Tuple
+
+from event_buffers import ColumnBuffer, KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer
+
+WINDOW_SECONDS = 10.0
+MOUSE_EVENTS_PER_SECOND = 1000
+KEYS_PER_SECOND = 100
+
+
+class ColumnRing:
+    """Fixed-capacity ring over a ``ColumnBuffer``'s columns; the oldest rows are overwritten."""
+
+    def __init__(self, factory, capacity: int) -> None:
+        self.factory = factory
+        self.capacity = max(1, int(capacity))
+        self.columns: Dict[str, array] = {
+            name: array(typecode, bytes(self.capacity * array(typecode).itemsize)) for name, typecode in factory.COLUMNS
+        }
+        self.written = 0  # rows ever added; row r lives at r % capacity
+        self.overwritten = 0
+        self.wide: Dict[int, int] = {}  # keyboard only: row number -> full held mask
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def nbytes(self) -> int:
+        return sum(col.itemsize * len(col) for col in self.columns.values())
+
+    def clear(self) -> None:
+        self.written = 0
+        self.wide = {}
+
+    def extend(self, buffer: ColumnBuffer) -> None:
+        n = len(buffer)
+        if not n:
+            return
+        skip = max(0, n - self.capacity)  # rows that would be overwritten straight away
+        first = self.written + skip
+        at = first % self.capacity
+        head = min(n - skip, self.capacity - at)
+        for name, col in self.columns.items():
+            src = getattr(buffer, name)
+            col[at:at + head] = src[skip:skip + head]
+            if head < n - skip:
+                col[:n - skip - head] = src[skip + head:]
+        for row, mask in getattr(buffer, "wide", {}).items():
+            if row >= skip:
+                self.wide[self.written + row] = mask
+        self.overwritten += max(0, self.written + n - self.capacity) - max(0, self.written - self.capacity)
+        self.written += n
+        if self.wide:
+            oldest = self.written - len(self)
+            self.wide = {row: mask for row, mask in self.wide.items() if row >= oldest}
+
+    def rows(self) -> ColumnBuffer:
+        """Every row held, oldest first, as a fresh buffer."""
+        out = self.factory()
+        size = len(self)
+        first = self.written - size
+        at = first % self.capacity
+        for name, col in self.columns.items():
+            part = col[at:at + size]
+            if len(part) < size:
+                part += col[:size - len(part)]
+            setattr(out, name, part)
+        if self.wide:
+            out.wide = {row - first: mask for row, mask in self.wide.items()}
+        return out
+
+
+def since(buffer: ColumnBuffer, cutoff: float) -> ColumnBuffer:
+    """Rows of ``buffer`` (timestamps ascending) at or after ``cutoff``."""
+    start = bisect.bisect_left(buffer.timestamp, cutoff)
+    if not start:
+        return buffer
+    out = buffer.__class__()
+    for name, _ in buffer.COLUMNS:
+        setattr(out, name, getattr(buffer, name)[start:])
+    if getattr(buffer, "wide", None):
+        out.wide = {row - start: mask for row, mask in buffer.wide.items() if row >= start}
+    return out
+
+
+def shift_timestamps(buffer: ColumnBuffer, seconds: float) -> ColumnBuffer:
+    """Move every timestamp of ``buffer`` by ``seconds``, in place."""
+    if seconds and len(buffer):
+        buffer.timestamp = array("d", [ts + seconds for ts in buffer.timestamp])
+    return buffer
+
+
+def shift_frames(positions: MousePositionBuffer, frames: int, rate: float) -> MousePositionBuffer:
+    """Renumber sampler rows by ``frames``, in place; timestamps stay ``frame_index / rate``."""
+    if len(positions):
+        positions.frame_index = array("q", [frame + frames for frame in positions.frame_index])
+        positions.timestamp = array("d", [frame / rate for frame in positions.frame_index])
+    return positions
+
+
+class PreRoll:
+    def __init__(
+        self,
+        window: float = WINDOW_SECONDS,
+        sample_rate: float = 30.0,
+        mouse_events_per_second: int = MOUSE_EVENTS_PER_SECOND,
+        keys_per_second: int = KEYS_PER_SECOND,
+    ) -> None:
+        self.window = window
+        # One spare frame: the window's edges rarely fall on frame boundaries.
+        self.positions = ColumnRing(MousePositionBuffer, math.ceil(window * sample_rate) + 1)
+        self.mouse = ColumnRing(MouseEventBuffer, math.ceil(window * mouse_events_per_second))
+        self.keyboard = ColumnRing(KeyboardEventBuffer, math.ceil(window * keys_per_second))
+        self.capturing = False
+
+    def add(self, keyboard: KeyboardEventBuffer, mouse: MouseEventBuffer, positions: MousePositionBuffer) -> None:
+        self.keyboard.extend(keyboard)
+        self.mouse.extend(mouse)
+        self.positions.extend(positions)
+
+    def window_buffers(self, event_cutoff: float, sampler_cutoff: float) -> Tuple[KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer]:
+        """Rows inside the window. Clicks and keys are cut on the capture clock, sampler rows on the sampler's."""
+        return (
+            since(self.keyboard.rows(), event_cutoff),
+            since(self.mouse.rows(), event_cutoff),
+            since(self.positions.rows(), sampler_cutoff),
+        )
+
+    def clear(self) -> None:
+        self.keyboard.clear()
+        self.mouse.clear()
+        self.positions.clear()
+
+    def nbytes(self) -> int:
+        return self.keyboard.nbytes() + self.mouse.nbytes() + self.positions.nbytes()
+
+    @property
+    def overwritten(self) -> int:
+        return self.keyboard.overwritten + self.mouse.overwritten + self.positions.overwritten
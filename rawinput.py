@@ -0,0 +1,185 @@
+"""
+Batch decoder for packed Win32 ``RAWINPUT`` mouse records.
+
+``GetRawInputBuffer`` fills one buffer with many ``RAWINPUT`` records, each
+starting on an 8-byte boundary. ``RawMouseDecoder`` reads a large batch
+through a NumPy structured-array view, and a small one with ``struct``. It
+returns the summed relative motion plus the few records that carry button
+or wheel flags, and ``dispatch`` turns those into the backend's click and
+wheel callbacks.
+
+Nothing here calls Win32, so it can be fed packed byte streams
+(``pack_mouse_records``) and benchmarked on any OS.
+"""
+
+import ctypes
+import struct
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+RIM_TYPEMOUSE = 0
+MOUSE_MOVE_ABSOLUTE = 0x0001
+WHEEL_DELTA = 120
+RECORD_ALIGN = 8
+# Below this many records a struct walk beats NumPy's fixed per-call cost
+# (~12 us); see benchmarks/bench_rawinput.py.
+NUMPY_MIN_BATCH = 32
+
+RI_MOUSE_LEFT_BUTTON_DOWN   = 0x0001
+RI_MOUSE_LEFT_BUTTON_UP     = 0x0002
+RI_MOUSE_RIGHT_BUTTON_DOWN  = 0x0004
+RI_MOUSE_RIGHT_BUTTON_UP    = 0x0008
+RI_MOUSE_MIDDLE_BUTTON_DOWN = 0x0010
+RI_MOUSE_MIDDLE_BUTTON_UP   = 0x0020
+RI_MOUSE_WHEEL              = 0x0400
+
+# (flag, button, action) in the order the original per-message handler emitted them.
+BUTTON_FLAGS = (
+    (RI_MOUSE_LEFT_BUTTON_DOWN, "left", "press"),
+    (RI_MOUSE_LEFT_BUTTON_UP, "left", "release"),
+    (RI_MOUSE_RIGHT_BUTTON_DOWN, "right", "press"),
+    (RI_MOUSE_RIGHT_BUTTON_UP, "right", "release"),
+    (RI_MOUSE_MIDDLE_BUTTON_DOWN, "middle", "press"),
+    (RI_MOUSE_MIDDLE_BUTTON_UP, "middle", "release"),
+)
+
+
+def _align(n: int) -> int:
+    return (n + RECORD_ALIGN - 1) & ~(RECORD_ALIGN - 1)
+
+
+def record_layout(pointer_size: int = ctypes.sizeof(ctypes.c_void_p), wow64: bool = False) -> Tuple[int, np.dtype]:
+    """``(header_size, dtype)`` of one mouse RAWINPUT for the given ABI.
+
+    The header is DWORD dwType, DWORD dwSize, HANDLE hDevice, WPARAM wParam.
+    A 32-bit process on 64-bit Windows (``wow64``) gets 64-bit-sized headers
+    from GetRawInputBuffer.
+    """
+    header = 24 if pointer_size == 8 or wow64 else 16
+    size = header + 24
+    dtype = np.dtype({
+        "names": ["type", "size", "flags", "buttons", "data", "x", "y"],
+        "formats": ["<u4", "<u4", "<u2", "<u2", "<u2", "<i4", "<i4"],
+        # RAWMOUSE: usFlags, 2 bytes padding, usButtonFlags, usButtonData,
+        # ulRawButtons, lLastX, lLastY, ulExtraInformation.
+        "offsets": [0, 4, header, header + 4, header + 6, header + 12, header + 16],
+        "itemsize": _align(size),
+    })
+    return header, dtype
+
+
+class MouseBatch(NamedTuple):
+    dx: int
+    dy: int
+    records: int
+    # (usButtonFlags, usButtonData) of each record with any button/wheel flag, in order.
+    buttons: List[Tuple[int, int]]
+
+
+class RawMouseDecoder:
+    def __init__(self, pointer_size: int = ctypes.sizeof(ctypes.c_void_p), wow64: bool = False) -> None:
+        self.header_size, self.dtype = record_layout(pointer_size, wow64)
+        self.record_size = self.header_size + 24
+        self._header = struct.Struct("<II")
+        self._mouse = struct.Struct("<HxxHHxxxxiixxxx")
+
+    def decode(self, buf, count: int) -> MouseBatch:
+        """Decode ``count`` records from the start of ``buf`` (bytes-like)."""
+        if not count:
+            return MouseBatch(0, 0, 0, [])
+        if count < NUMPY_MIN_BATCH:
+            return self._decode_walk(buf, count)
+        recs = np.frombuffer(buf, dtype=self.dtype, count=count)
+        if (recs["size"] != self.record_size).any() or (recs["type"] != RIM_TYPEMOUSE).any():
+            return self._decode_walk(buf, count)
+        relative = (recs["flags"] & MOUSE_MOVE_ABSOLUTE) == 0
+        if relative.all():
+            dx, dy = int(recs["x"].sum()), int(recs["y"].sum())
+        else:
+            dx, dy = int(recs["x"][relative].sum()), int(recs["y"][relative].sum())
+        flags = recs["buttons"]
+        hit = np.flatnonzero(flags)
+        buttons = list(zip(flags[hit].tolist(), recs["data"][hit].tolist())) if len(hit) else []
+        return MouseBatch(dx, dy, count, buttons)
+
+    def decode_one(self, buf) -> MouseBatch:
+        """Single record (the GetRawInputData path), without NumPy overhead."""
+        kind, _size = self._header.unpack_from(buf, 0)
+        if kind != RIM_TYPEMOUSE:
+            return MouseBatch(0, 0, 1, [])
+        flags, bf, bd, x, y = self._mouse.unpack_from(buf, self.header_size)
+        if flags & MOUSE_MOVE_ABSOLUTE:
+            x = y = 0
+        return MouseBatch(x, y, 1, [(bf, bd)] if bf else [])
+
+    def _decode_walk(self, buf, count: int) -> MouseBatch:
+        """Small or mixed batches: follow each dwSize to the next record."""
+        view = memoryview(buf)
+        dx = dy = 0
+        buttons = []
+        offset = 0
+        for _ in range(count):
+            kind, size = self._header.unpack_from(view, offset)
+            if kind == RIM_TYPEMOUSE:
+                flags, bf, bd, x, y = self._mouse.unpack_from(view, offset + self.header_size)
+                if not flags & MOUSE_MOVE_ABSOLUTE:
+                    dx += x
+                    dy += y
+                if bf:
+                    buttons.append((bf, bd))
+            offset += _align(size)
+        return MouseBatch(dx, dy, count, buttons)
+
+
+def dispatch(
+    batch: MouseBatch,
+    on_delta: Callable[[int, int], None],
+    on_click: Callable[[str, str, int, int], None],
+    on_wheel: Callable[[str, float, int], None],
+    cursor_pos: Callable[[], Tuple[int, int]],
+) -> None:
+    """Deliver a decoded batch: one summed delta, then clicks/wheel in order.
+
+    ``cursor_pos`` is called at most once per batch.
+    """
+    if batch.dx or batch.dy:
+        on_delta(batch.dx, batch.dy)
+    if not batch.buttons:
+        return
+    x = y = None
+    for bf, bd in batch.buttons:
+        for flag, button, action in BUTTON_FLAGS:
+            if bf & flag:
+                if x is None:
+                    x, y = cursor_pos()
+                on_click(button, action, x, y)
+        if bf & RI_MOUSE_WHEEL:
+            wheel = bd - 0x10000 if bd & 0x8000 else bd
+            on_wheel("vertical", wheel / WHEEL_DELTA, wheel)
+
+
+def pack_mouse_records(
+    rows: Sequence[Tuple[int, int, int, int, int]],
+    pointer_size: int = ctypes.sizeof(ctypes.c_void_p),
+    wow64: bool = False,
+    out: Optional[bytearray] = None,
+) -> bytearray:
+    """Pack ``(usFlags, usButtonFlags, usButtonData, lLastX, lLastY)`` rows
+    the way GetRawInputBuffer lays them out."""
+    header, dtype = record_layout(pointer_size, wow64)
+    recs = np.zeros(len(rows), dtype=dtype)
+    if len(rows):
+        cols = np.asarray(rows, dtype=np.int64)
+        recs["type"] = RIM_TYPEMOUSE
+        recs["size"] = header + 24
+        recs["flags"] = cols[:, 0]
+        recs["buttons"] = cols[:, 1]
+        recs["data"] = cols[:, 2] & 0xFFFF
+        recs["x"] = cols[:, 3]
+        recs["y"] = cols[:, 4]
+    data = recs.tobytes()
+    if out is None:
+        return bytearray(data)
+    out[:len(data)] = data
+    return out
@@ -0,0 +1,87 @@
+"""
+The recorder's single asyncio event loop.
+
+OBS requests and events, periodic log flushes, the clock sampler, and
+status updates for the UI all run as tasks on one loop. That loop runs on
+one daemon thread, "recorder-core". Only the real-time capture stays on
+dedicated threads: the raw mouse loop, the sampler, and the keyboard hook.
+Blocking disk I/O runs in the loop's default executor, one flush at a time.
+
+Synchronous callers such as OBSRecorder, obs.py and the benchmarks use
+``run(coro)``. The Tk UI uses ``submit(coro)`` and gets its result through
+the returned future. The loop is started on first use. ``shutdown()`` closes
+the pooled OBS connections and stops the loop.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+import obs_connection
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def loop() -> asyncio.AbstractEventLoop:
+    """The running recorder loop, started on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="recorder-core", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def on_loop() -> bool:
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def submit(coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+    """Schedule ``coro`` on the loop from any thread."""
+    return asyncio.run_coroutine_threadsafe(coro, loop())
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run ``coro`` on the loop and block until it finishes. Not callable from the loop itself."""
+    if on_loop():
+        coro.close()
+        raise RuntimeError("recorder_core.run() would deadlock on the recorder loop; await instead")
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"recorder loop did not finish within {timeout}s") from None
+
+
+async def _drain() -> None:
+    await obs_connection.close_all()
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def shutdown(timeout: float = 2.0) -> None:
+    """Close pooled OBS connections, cancel remaining tasks and stop the loop."""
+    global _loop, _thread
+    with _lock:
+        current, thread = _loop, _thread
+        _loop = _thread = None
+    if current is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_drain(), current).result(timeout)
+    except Exception:
+        pass
+    current.call_soon_threadsafe(current.stop)
+    thread.join(timeout)
+    if not thread.is_alive():
+        current.run_until_complete(current.shutdown_default_executor())
+        current.close()
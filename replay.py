@@ -0,0 +1,278 @@
+"""
+Replay a recorded session log on its original timing.
+
+``merged_events`` streams a session's ``*_log.manifest.json`` (the
+segmented log the recorder writes; a single ``*_log.jsonl`` or binary
+``*_log.gmlb`` also works) and merges its ``keyboard_events``,
+``mouse_events`` and ``mouse_positions`` into a single time-ordered stream
+of ``ReplayEvent``s, using a heap.
+
+Each stream is in time order, but streams are not in step across records.
+A sampler row that came due just before a flush can be drained into the
+next record, next to key presses that are older than it. So an event only
+leaves the heap once a record flushed ``reorder`` seconds after it has
+been read. The heap holds about that many seconds of events, whatever the
+log's length, and only one record is decoded at a time.
+
+``Replayer`` sends each event to its sinks on the event's relative
+timestamp, scaled by ``speed`` (1 = real time, N = N times faster,
+None = as fast as possible). It waits with a sampler ``SleepPolicy`` and
+records how late each event went out in a ``LatencyHistogram``. A sink is
+any callable taking a ``ReplayEvent``. Built-in sinks:
+
+    print_sink      one line per event
+    LiveStreamSink  publishes into a ``live_stream.LiveStream``
+    RecorderSink    calls backend_legacy's capture callbacks, as
+                    benchmarks/loadgen does, to load-test the recorder
+
+Key presses are logged with the whole set of held keys, so the sinks
+recover the key that went down with ``HeldKeys``.
+
+CLI:
+    python replay.py session_log.manifest.json [--speed N | --fast] [--start S] [--end S] [--sink print|live|none]
+"""
+
+import argparse
+import heapq
+import threading
+import time
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import backend_legacy as legacy
+import binlog
+import event_buffers as eb
+import live_stream as ls
+import log_segments
+from sampler import POLICIES, SYSTEM_CLOCK
+from telemetry import LatencyHistogram
+
+STREAMS = (("keyboard", "keyboard_events"), ("mouse", "mouse_events"), ("positions", "mouse_positions"))
+REORDER_SECONDS = 1.0
+# Events later than this count as "late" in the stats.
+LATE_SECONDS = 0.001
+
+
+class ReplayEvent(NamedTuple):
+    t: float  # session seconds, as logged
+    stream: str  # "keyboard", "mouse" or "positions"
+    event: dict  # the logged event, as in a JSONL record
+
+
+class KeyEvent(NamedTuple):
+    """The attributes on_keyboard_event reads from keyboard.KeyboardEvent."""
+
+    event_type: str
+    name: str
+    scan_code: int = 0
+
+
+def _records(path: Path, start: Optional[float], end: Optional[float]) -> Iterator[dict]:
+    path = Path(path)
+    if log_segments.is_manifest(path):
+        return log_segments.iter_records(path, start, end)
+    return binlog.iter_log_records(path)
+
+
+def merged_events(
+    path: Path, start: Optional[float] = None, end: Optional[float] = None, reorder: float = REORDER_SECONDS
+) -> Iterator[ReplayEvent]:
+    """Every event of the log with ``start <= t <= end``, in time order (ties keep log order)."""
+    heap: List[Tuple[float, int, str, dict]] = []
+    seq = count()
+    for record in _records(path, start, end):
+        for stream, key in STREAMS:
+            for event in record.get(key, ()):
+                t = event["timestamp"]
+                if (start is None or t >= start) and (end is None or t <= end):
+                    heapq.heappush(heap, (t, next(seq), stream, event))
+        flushed = record.get("relative_timestamp")
+        if flushed is None:
+            continue
+        horizon = flushed - reorder
+        while heap and heap[0][0] <= horizon:
+            t, _, stream, event = heapq.heappop(heap)
+            yield ReplayEvent(t, stream, event)
+        if end is not None and horizon > end:
+            break
+    while heap:
+        t, _, stream, event = heapq.heappop(heap)
+        yield ReplayEvent(t, stream, event)
+
+
+class HeldKeys:
+    """Turns logged presses (the set of held keys) back into one event per key."""
+
+    def __init__(self) -> None:
+        self.held = set()
+
+    def changes(self, event: dict) -> List[Tuple[str, str]]:
+        """``("down"|"up", key)`` pairs for a logged keyboard event."""
+        if event["type"] == "press":
+            keys = set(event["keys"])
+            pressed = sorted(keys - self.held)
+            self.held = keys
+            return [("down", key) for key in pressed]
+        self.held.discard(event["key"])
+        return [("up", event["key"])]
+
+
+def print_sink(event: ReplayEvent) -> None:
+    data = {k: v for k, v in event.event.items() if k != "timestamp"}
+    print(f"{event.t:12.6f} {event.stream:9s} {data}")
+
+
+class LiveStreamSink:
+    """Publishes replayed events into a live stream, stamped with the time they go out."""
+
+    def __init__(self, stream: ls.LiveStream) -> None:
+        self.stream = stream
+        self.keys = HeldKeys()
+
+    def __call__(self, event: ReplayEvent) -> None:
+        data = event.event
+        now = time.perf_counter()
+        if event.stream == "positions":
+            self.stream.frame(data["frame_index"], data["delta"]["dx"], data["delta"]["dy"])
+        elif event.stream == "keyboard":
+            for kind, key in self.keys.changes(data):
+                self.stream.key(now, ls.KEY_DOWN if kind == "down" else ls.KEY_UP, eb.KEYS.code(key))
+        elif data["type"] == "click":
+            position = data.get("position") or {}
+            self.stream.click(now, eb.BUTTONS.code(data["button"]), eb.ACTIONS.code(data["action"]), position.get("x", 0), position.get("y", 0))
+        else:
+            self.stream.scroll(now, eb.AXES.code(data["axis"]), data["steps"], data.get("raw_delta", 0))
+
+
+class RecorderSink:
+    """Feeds replayed events to backend_legacy's capture callbacks.
+
+    Each sampler row becomes one raw delta, so the recorder's own sampler
+    sees the same motion per frame. Calls come from the replay thread,
+    which is then the only producer for every capture buffer.
+    """
+
+    def __init__(self) -> None:
+        self.keys = HeldKeys()
+
+    def __call__(self, event: ReplayEvent) -> None:
+        data = event.event
+        if event.stream == "positions":
+            legacy.raw_on_delta(data["delta"]["dx"], data["delta"]["dy"])
+        elif event.stream == "keyboard":
+            for kind, key in self.keys.changes(data):
+                legacy.on_keyboard_event(KeyEvent(kind, key))
+        elif data["type"] == "click":
+            position = data.get("position") or {}
+            legacy.raw_on_click(data["button"], data["action"], position.get("x", 0), position.get("y", 0))
+        else:
+            legacy.raw_on_wheel(data["axis"], data["steps"], data.get("raw_delta", 0))
+
+
+class Replayer:
+    """Plays a log into ``sinks`` at ``speed`` times real time (None: as fast as possible)."""
+
+    def __init__(
+        self,
+        path: Path,
+        sinks: Sequence[Callable[[ReplayEvent], None]],
+        speed: Optional[float] = 1.0,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        policy: str = "balanced",
+        clock=SYSTEM_CLOCK,
+        stop_event: Optional[threading.Event] = None,
+    ) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for as fast as possible")
+        self.path = Path(path)
+        self.sinks = list(sinks)
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.policy = POLICIES[policy]
+        self.clock = clock
+        self.stop_event = stop_event or threading.Event()
+        self.jitter = LatencyHistogram()
+        self.events = 0
+        self.counts: Dict[str, int] = {stream: 0 for stream, _ in STREAMS}
+        self.out_of_order = 0  # events older than one already sent (beyond ``reorder``)
+
+    def run(self) -> Dict:
+        clock, sinks, speed = self.clock, self.sinks, self.speed
+        first = last = None
+        began = clock.now()
+        for event in merged_events(self.path, self.start, self.end):
+            if self.stop_event.is_set():
+                break
+            if first is None:
+                first = event.t
+            if last is not None and event.t < last:
+                self.out_of_order += 1
+            last = event.t if last is None else max(last, event.t)
+            if speed is not None:
+                due = began + (event.t - first) / speed
+                self.policy.wait_until(due, clock, self.stop_event)
+                if self.stop_event.is_set():
+                    break
+                self.jitter.record(max(0.0, clock.now() - due))
+            for sink in sinks:
+                sink(event)
+            self.events += 1
+            self.counts[event.stream] += 1
+        return self.stats(clock.now() - began, (last - first) if first is not None else 0.0)
+
+    def stats(self, wall_seconds: float, log_seconds: float) -> Dict:
+        jitter = self.jitter.snapshot()
+        return {
+            "events": self.events,
+            "counts": dict(self.counts),
+            "log_seconds": log_seconds,
+            "wall_seconds": wall_seconds,
+            "events_per_sec": self.events / wall_seconds if wall_seconds > 0 else 0.0,
+            "jitter_p50_ms": jitter["p50"] * 1e3,
+            "jitter_p99_ms": jitter["p99"] * 1e3,
+            "jitter_max_ms": jitter["max"] * 1e3,
+            "late_events": self.jitter.count_above(LATE_SECONDS),
+            "out_of_order": self.out_of_order,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("log", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="playback rate; 2 = twice real time")
+    parser.add_argument("--fast", action="store_true", help="as fast as possible, ignoring timestamps")
+    parser.add_argument("--start", type=float, help="session seconds to start at")
+    parser.add_argument("--end", type=float, help="session seconds to stop at")
+    parser.add_argument("--sink", choices=["print", "live", "none"], default="print")
+    parser.add_argument("--live-name", default=ls.DEFAULT_NAME, help="shared-memory name for --sink live")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="balanced", help="how to wait for each event")
+    args = parser.parse_args()
+
+    stream = None
+    sinks: List[Callable[[ReplayEvent], None]] = []
+    if args.sink == "print":
+        sinks.append(print_sink)
+    elif args.sink == "live":
+        stream = ls.LiveStream(args.live_name)
+        sinks.append(LiveStreamSink(stream))
+    replayer = Replayer(args.log, sinks, None if args.fast else args.speed, args.start, args.end, args.policy)
+    try:
+        stats = replayer.run()
+    except KeyboardInterrupt:
+        stats = replayer.stats(0.0, 0.0)
+    finally:
+        if stream is not None:
+            stream.close()
+    print(
+        f"{stats['events']} events ({', '.join(f'{k} {n}' for k, n in stats['counts'].items())})"
+        f" over {stats['log_seconds']:.1f} s of log in {stats['wall_seconds']:.1f} s;"
+        f" jitter ms p50 {stats['jitter_p50_ms']:.2f} p99 {stats['jitter_p99_ms']:.2f} max {stats['jitter_max_ms']:.2f},"
+        f" {stats['late_events']} late (> {LATE_SECONDS * 1e3:g} ms), {stats['out_of_order']} out of order"
+    )
+
+
+if __name__ == "__main__":
+    main()
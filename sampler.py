@@ -0,0 +1,166 @@
+"""
+Fixed-rate frame scheduler used by the mouse delta sampler.
+
+``FrameScheduler`` calls ``on_frame(frame_index, timestamp)`` once per
+interval, aligned to a monotonic start time. How it waits for each deadline
+is a ``SleepPolicy`` (trading CPU for jitter), and the clock is injectable so
+the loop can be driven deterministically by ``FakeClock`` in benchmarks.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from telemetry import LatencyHistogram
+
+SAMPLE_RATES = (30, 60, 120, 240)
+
+
+class SystemClock:
+    now = staticmethod(time.perf_counter)
+    sleep = staticmethod(time.sleep)
+
+
+class FakeClock:
+    """Deterministic clock: time only moves when the scheduler sleeps or polls.
+
+    ``oversleep`` is the mean extra time a sleep takes (exponentially
+    distributed), modelling OS timer granularity; ``poll_cost`` is how much
+    each ``now()`` call advances time, so spin loops terminate.
+    """
+
+    def __init__(self, start: float = 0.0, oversleep: float = 0.0005, poll_cost: float = 1e-6, seed: int = 0) -> None:
+        self.t = start
+        self.oversleep = oversleep
+        self.poll_cost = poll_cost
+        self.slept = 0.0
+        self.polls = 0
+        self._rng = random.Random(seed)
+
+    def now(self) -> float:
+        self.polls += 1
+        self.t += self.poll_cost
+        return self.t
+
+    def sleep(self, seconds: float) -> None:
+        extra = self._rng.expovariate(1.0 / self.oversleep) if self.oversleep else 0.0
+        self.t += max(seconds, 0.0) + extra
+        self.slept += max(seconds, 0.0) + extra
+
+    def stall(self, seconds: float) -> None:
+        """Simulate the sampler thread being descheduled."""
+        self.t += seconds
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class SleepPolicy:
+    """Sleep in ``quantum`` steps until ``spin`` seconds remain, then busy-wait.
+
+    ``quantum=None`` sleeps the whole remaining time minus ``spin`` in one call.
+    """
+
+    def __init__(self, name: str, spin: float, quantum: Optional[float]) -> None:
+        self.name = name
+        self.spin = spin
+        self.quantum = quantum
+
+    def wait_until(self, deadline: float, clock, stop_event: Optional[threading.Event] = None) -> None:
+        """Return at ``deadline``, or at the next wake-up once ``stop_event`` is set."""
+        while stop_event is None or not stop_event.is_set():
+            remaining = deadline - clock.now()
+            if remaining <= 0:
+                return
+            if remaining > self.spin:
+                sleep_for = remaining - self.spin
+                clock.sleep(sleep_for if self.quantum is None else min(self.quantum, sleep_for))
+
+
+POLICIES: Dict[str, SleepPolicy] = {
+    # The original loop: 1 ms sleeps, spin for the final 2 ms.
+    "precise": SleepPolicy("precise", spin=0.002, quantum=0.001),
+    # One long sleep, then spin for the final 1 ms.
+    "balanced": SleepPolicy("balanced", spin=0.001, quantum=None),
+    # Sleep only; lowest CPU, jitter bounded by the OS timer.
+    "sleep": SleepPolicy("sleep", spin=0.0, quantum=None),
+    # Never sleep; lowest jitter, one core pinned.
+    "spin": SleepPolicy("spin", spin=float("inf"), quantum=None),
+}
+
+
+class FrameScheduler:
+    def __init__(
+        self,
+        on_frame: Callable[[int, float], None],
+        rate_hz: float = 30.0,
+        policy: str = "precise",
+        clock=SYSTEM_CLOCK,
+        stop_event: Optional[threading.Event] = None,
+        lateness: Optional[LatencyHistogram] = None,
+    ) -> None:
+        if rate_hz <= 0:
+            raise ValueError(f"Invalid sample rate: {rate_hz}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown sleep policy: {policy}")
+        self.on_frame = on_frame
+        self.rate_hz = rate_hz
+        self.frame_interval = 1.0 / rate_hz
+        self.policy = POLICIES[policy]
+        self.clock = clock
+        self.stop_event = stop_event or threading.Event()
+
+        self.frames = 0
+        self.skipped_frames = 0
+        self.resyncs = 0
+        self.lateness = lateness if lateness is not None else LatencyHistogram()
+
+    def run(self, start_perf: float, max_frames: Optional[int] = None, first_frame: int = 0) -> None:
+        """Emit frames until ``stop_event`` is set (or ``max_frames`` were emitted).
+
+        Frame N is due at ``start_perf + N / rate``; the first one emitted is
+        ``first_frame`` (or the current frame, if that one is already past).
+        """
+        clock = self.clock
+        interval = self.frame_interval
+        frame_index = first_frame
+        next_time = start_perf + (frame_index * interval)
+
+        while not self.stop_event.is_set():
+            self.policy.wait_until(next_time, clock, self.stop_event)
+            if self.stop_event.is_set():
+                break
+
+            now = clock.now()
+            late = now - next_time
+            if late > interval:
+                # Fell more than a frame behind: jump to the current frame and
+                # account for every frame that will never be emitted.
+                target = int((now - start_perf) / interval)
+                self.skipped_frames += target - frame_index
+                self.resyncs += 1
+                frame_index = target
+                next_time = start_perf + (frame_index * interval)
+                late = now - next_time
+            self.lateness.record(late)
+
+            self.on_frame(frame_index, frame_index * interval)
+            self.frames += 1
+            if max_frames is not None and self.frames >= max_frames:
+                return
+
+            frame_index += 1
+            next_time = start_perf + (frame_index * interval)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate_hz": self.rate_hz,
+            "policy": self.policy.name,
+            "frames": self.frames,
+            "skipped_frames": self.skipped_frames,
+            "resyncs": self.resyncs,
+            "lateness_p50": self.lateness.percentile(50),
+            "lateness_p99": self.lateness.percentile(99),
+            "lateness_max": self.lateness.max_ns / 1e9,
+        }
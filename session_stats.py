@@ -0,0 +1,173 @@
+"""
+Running session aggregates, folded in once per event as batches are written.
+
+The log writer passes every batch to ``SessionStats.add`` just before
+writing it. Each event is looked at exactly once, so the totals cost O(1)
+per event and nothing is rescanned. The writer also takes the per-record
+click/scroll counts from ``add``. Every record carries the running totals
+(``"session"``). When the log is closed, a last record with empty event
+lists carries the final ``"summary"``, which also goes into the manifest.
+``batch.py stats`` then reads it from the manifest instead of scanning the
+whole log; logs without one are scanned through ``SessionStats`` too, so
+both paths give the same numbers.
+
+Totals:
+
+    duration          session seconds up to the latest record
+    key_presses       key press events; ``key_histogram`` splits them by key
+    clicks            click events (press and release); ``click_histogram``
+                      counts presses by button
+    scrolls           wheel events; ``scroll_steps`` sums steps per axis
+    apm               (key presses + button presses) per minute
+    frames            sampler frames; ``missing_frames`` = frame indices absent
+                      between the first and last frame
+    mouse_travel      sum over frames of the raw delta's length, in mouse counts
+    idle_periods      gaps of at least ``idle_seconds`` with no key, button,
+                      wheel or mouse motion; ``idle_total``/``longest_idle`` in s
+
+The idle gap still open at the end only counts in the final summary.
+"""
+
+import math
+from bisect import bisect_right
+from collections import Counter
+from itertools import chain, compress
+from operator import or_, sub
+from typing import Dict, List, Sequence, Tuple
+
+import event_buffers as eb
+
+IDLE_SECONDS = 5.0
+
+_PRESS = eb.ACTIONS.code("press")
+
+
+class SessionStats:
+    def __init__(self, idle_seconds: float = IDLE_SECONDS) -> None:
+        self.idle_seconds = idle_seconds
+        self.duration = 0.0
+        self.key_presses = 0
+        self.key_counts: Counter = Counter()  # eb.KEYS code -> presses
+        self.clicks = 0
+        self.button_counts: Counter = Counter()  # eb.BUTTONS code -> presses
+        self.scrolls = 0
+        self.scroll_steps = [0.0] * len(eb.AXES)
+        self.frames = 0
+        self.first_frame = None
+        self.last_frame = None
+        self.mouse_travel = 0.0
+        self.idle_periods = 0
+        self.idle_total = 0.0
+        self.longest_idle = 0.0
+        self.last_active = 0.0
+        self._last = None  # the batch most recently added, and its counts
+        self._last_counts = (0, 0)
+
+    def add(self, batch) -> Tuple[int, int]:
+        """Fold in a ``spill.Batch``; returns its (clicks, scrolls).
+
+        A batch retried after a failed write is the same object, so it is
+        only counted once.
+        """
+        if batch is self._last:
+            return self._last_counts
+        keyboard, mouse, positions = batch.keyboard, batch.mouse, batch.positions
+        self.duration = max(self.duration, batch.relative_timestamp)
+
+        presses = [kind == eb.PRESS for kind in keyboard.kind]
+        self.key_counts.update(compress(keyboard.key, presses))
+        self.key_presses += sum(presses)
+
+        clicks = scrolls = 0
+        button_counts = self.button_counts
+        steps = self.scroll_steps
+        for kind, label, action, step in zip(mouse.kind, mouse.label, mouse.action, mouse.steps):
+            if kind == eb.CLICK:
+                clicks += 1
+                if action == _PRESS:
+                    button_counts[label] += 1
+            else:
+                scrolls += 1
+                steps[label] += step
+        self.clicks += clicks
+        self.scrolls += scrolls
+
+        if len(positions):
+            self.frames += len(positions)
+            first, last = positions.frame_index[0], positions.frame_index[-1]
+            self.first_frame = first if self.first_frame is None else min(self.first_frame, first)
+            self.last_frame = last if self.last_frame is None else max(self.last_frame, last)
+            self.mouse_travel += sum(map(math.hypot, positions.dx, positions.dy))
+
+        # An idle gap in the merged timeline is where every stream is quiet
+        # for idle_seconds: intersect each stream's long gaps, no merge needed.
+        moving = list(compress(positions.timestamp, map(or_, positions.dx, positions.dy)))
+        quiet = None
+        for times in (keyboard.timestamp, mouse.timestamp, moving):
+            gaps = self._quiet(times)
+            quiet = gaps if quiet is None else self._overlap(quiet, gaps)
+        for start, end in quiet[:-1]:
+            self._idle(end - start)
+        self.last_active = quiet[-1][0]
+
+        self._last, self._last_counts = batch, (clicks, scrolls)
+        return clicks, scrolls
+
+    def snapshot(self, final: bool = False) -> Dict:
+        """The totals so far. ``final`` closes the idle gap that runs to ``duration``."""
+        idle_periods, idle_total, longest = self.idle_periods, self.idle_total, self.longest_idle
+        tail = self.duration - self.last_active
+        if final and tail >= self.idle_seconds:
+            idle_periods, idle_total, longest = idle_periods + 1, idle_total + tail, max(longest, tail)
+        minutes = self.duration / 60.0
+        actions = self.key_presses + sum(self.button_counts.values())
+        span = self.last_frame - self.first_frame + 1 if self.frames else 0
+        return {
+            "duration": self.duration,
+            "frames": self.frames,
+            "missing_frames": max(0, span - self.frames),
+            "key_presses": self.key_presses,
+            "clicks": self.clicks,
+            "scrolls": self.scrolls,
+            "scroll_steps": dict(zip(eb.AXES.names, self.scroll_steps)),
+            "apm": actions / minutes if minutes else 0.0,
+            "mouse_travel": self.mouse_travel,
+            "idle_periods": idle_periods,
+            "idle_total": idle_total,
+            "longest_idle": longest,
+            "key_histogram": {eb.KEYS.name(code): n for code, n in self.key_counts.most_common()},
+            "click_histogram": {eb.BUTTONS.name(code): n for code, n in self.button_counts.most_common()},
+        }
+
+    def summary(self) -> Dict:
+        return self.snapshot(final=True)
+
+    def _quiet(self, times: Sequence[float]) -> List[Tuple[float, float]]:
+        """Gaps of at least ``idle_seconds`` in ``times`` (ascending) after ``last_active``; the last one is open-ended."""
+        times = times[bisect_right(times, self.last_active):]
+        if not len(times):
+            return [(self.last_active, math.inf)]
+        previous = chain((self.last_active,), times)
+        long = map(self.idle_seconds.__le__, map(sub, times, chain((self.last_active,), times)))
+        gaps = list(compress(zip(previous, times), long))
+        gaps.append((times[-1], math.inf))
+        return gaps
+
+    def _overlap(self, a: List[Tuple[float, float]], b: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """Intersections of two ascending gap lists that are still ``idle_seconds`` long."""
+        out = []
+        i = j = 0
+        while i < len(a) and j < len(b):
+            start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if end - start >= self.idle_seconds or end == math.inf:
+                out.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return out
+
+    def _idle(self, gap: float) -> None:
+        self.idle_periods += 1
+        self.idle_total += gap
+        self.longest_idle = max(self.longest_idle, gap)
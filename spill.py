@@ -0,0 +1,176 @@
+"""
+Bounded queue of drained event batches between capture and the log writer.
+
+Normally each flush drains the capture buffers into one batch and writes it
+straight away. When the writer stalls (slow or full disk), the drain ticker
+keeps cutting batches, so the capture buffers stay small. Those batches wait
+here instead:
+
+    memory   up to ``memory_bytes`` of batches stay in RAM
+    spill    older batches are pickled to an anonymous temporary file (in
+             ``spill_dir``, default the system temp dir), up to ``spill_bytes``
+    drop     beyond that, or if the spill file cannot be written, ``policy``
+             decides: ``oldest`` discards the oldest waiting batch,
+             ``newest`` discards the incoming one
+
+Spilled batches are always older than the ones in RAM, so ``peek``/``pop``
+hand them back in capture order. The batch ``peek`` handed to the writer is
+held aside until ``pop`` and is never spilled or dropped. Every drop is
+counted (``spill.dropped_*``).
+Capture callbacks never touch this queue; only the drain ticker and the
+writer do, under one lock.
+"""
+
+import pickle
+import struct
+import tempfile
+import threading
+from collections import deque
+from typing import BinaryIO, Deque, NamedTuple, Optional
+
+from event_buffers import KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer
+from telemetry import METRICS
+
+MEMORY_BYTES = 32 << 20
+SPILL_BYTES = 1 << 30
+POLICIES = ("oldest", "newest")
+LENGTH = struct.Struct("<I")
+
+spilled_batches = METRICS.counter("spill.batches")
+spilled_bytes = METRICS.counter("spill.bytes")
+dropped_batches = METRICS.counter("spill.dropped_batches")
+dropped_events = METRICS.counter("spill.dropped_events")
+
+
+class Batch(NamedTuple):
+    """Events drained at one instant: one log record once written."""
+
+    timestamp: str  # wall clock, ISO format
+    relative_timestamp: float
+    keyboard: KeyboardEventBuffer
+    mouse: MouseEventBuffer
+    positions: MousePositionBuffer
+
+    def events(self) -> int:
+        return len(self.keyboard) + len(self.mouse) + len(self.positions)
+
+    def nbytes(self) -> int:
+        return self.keyboard.nbytes() + self.mouse.nbytes() + self.positions.nbytes()
+
+
+class SpillQueue:
+    def __init__(
+        self,
+        memory_bytes: int = MEMORY_BYTES,
+        spill_bytes: int = SPILL_BYTES,
+        policy: str = "oldest",
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.memory_bytes = memory_bytes
+        self.spill_bytes = spill_bytes
+        self.policy = policy
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._memory: Deque[Batch] = deque()
+        self._memory_used = 0
+        self._file: Optional[BinaryIO] = None
+        self._read_at = 0  # next spilled record
+        self._write_at = 0
+        self._spilled = 0  # batches in the file past _read_at
+        self._inflight: Optional[Batch] = None  # handed out by peek(), not yet written
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._memory) + (self._inflight is not None)
+
+    @property
+    def memory_used(self) -> int:
+        return self._memory_used
+
+    @property
+    def spill_used(self) -> int:
+        return self._write_at - self._read_at
+
+    def put(self, batch: Batch) -> None:
+        with self._lock:
+            self._memory.append(batch)
+            self._memory_used += batch.nbytes()
+            while self._memory_used > self.memory_bytes and self._memory:
+                if not self._spill_oldest():
+                    self._drop()
+
+    def peek(self) -> Optional[Batch]:
+        """The oldest waiting batch; ``peek`` returns it again until ``pop``."""
+        with self._lock:
+            if self._inflight is None:
+                if self._spilled:
+                    self._inflight = self._take_spilled()
+                elif self._memory:
+                    self._inflight = self._memory.popleft()
+                    self._memory_used -= self._inflight.nbytes()
+            return self._inflight
+
+    def pop(self) -> None:
+        """Forget the batch ``peek`` returned, once it has been written."""
+        with self._lock:
+            self._inflight = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._spilled = self._read_at = self._write_at = 0
+            self._inflight = None
+
+    # Internals (lock held) ----------------------------------------------------
+    def _spill_oldest(self) -> bool:
+        batch = self._memory[0]
+        data = pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)
+        if self.spill_used + LENGTH.size + len(data) > self.spill_bytes:
+            return False
+        try:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="game_monitor_spill_", dir=self.spill_dir)
+            self._file.seek(self._write_at)
+            self._file.write(LENGTH.pack(len(data)) + data)
+            self._file.flush()
+            self._write_at = self._file.tell()
+        except OSError as exc:
+            # The spill disk is full or gone too: fall back to the drop policy.
+            print(f"Event spill failed: {exc}")
+            return False
+        self._memory.popleft()
+        self._memory_used -= batch.nbytes()
+        self._spilled += 1
+        spilled_batches.add()
+        spilled_bytes.add(len(data))
+        return True
+
+    def _drop(self) -> None:
+        if self.policy == "newest":
+            batch = self._memory.pop()
+            self._memory_used -= batch.nbytes()
+        elif self._spilled:
+            batch = self._take_spilled()
+        else:
+            batch = self._memory.popleft()
+            self._memory_used -= batch.nbytes()
+        dropped_batches.add()
+        dropped_events.add(batch.events())
+
+    def _take_spilled(self) -> Batch:
+        self._file.seek(self._read_at)
+        (length,) = LENGTH.unpack(self._file.read(LENGTH.size))
+        batch = pickle.loads(self._file.read(length))
+        self._read_at += LENGTH.size + length
+        self._spilled -= 1
+        if not self._spilled:
+            # Drained: reuse the file from the start.
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_at = self._write_at = 0
+        return batch
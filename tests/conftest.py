@@ -0,0 +1,29 @@
+from pathlib import Path
+from typing import Iterable, Optional
+
+import backend_legacy as legacy
+import binlog
+import log_segments
+import spill
+from benchmarks.synthetic_log import session_records
+from session_stats import SessionStats
+
+
+def record_session(
+    directory: Path, log_format: str = "jsonl", seconds: float = 300.0, max_seconds: float = 60.0, records: Optional[Iterable[dict]] = None
+) -> Path:
+    """A closed segmented log written the way the recorder writes it; returns its manifest.
+
+    ``records`` (JSONL-shaped) default to a synthetic session of ``seconds``.
+    """
+    stem = f"game_recording_{log_format}"
+    manifest = directory / f"{stem}_log{log_segments.MANIFEST_SUFFIX}"
+    log = log_segments.SegmentedLog(manifest, log_format, {"video_file": f"{stem}.mkv"}, "gzip", max_seconds=max_seconds)
+    stats = SessionStats()
+    for record in records if records is not None else session_records(seconds, video_file=f"{stem}.mkv"):
+        positions, mouse, keyboard = binlog.buffers_from_record(record)
+        batch = spill.Batch(record["timestamp"], record["relative_timestamp"], keyboard, mouse, positions)
+        legacy._write_batch(batch, log, f"{stem}.mkv", stats)
+    legacy._close_with_summary(log, f"{stem}.mkv", stats, stats.duration)
+    (directory / f"{stem}.mkv").touch()
+    return manifest
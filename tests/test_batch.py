@@ -0,0 +1,42 @@
+import pytest
+
+import batch
+import binlog
+import log_segments
+from tests.conftest import record_session
+
+
+def events(records):
+    """Per-record event counts and frame indices: what a format conversion must keep."""
+    return [
+        (
+            [evt["type"] for evt in record["keyboard_events"]],
+            [evt["type"] for evt in record["mouse_events"]],
+            [row["frame_index"] for row in record["mouse_positions"]],
+        )
+        for record in records
+    ]
+
+
+@pytest.mark.parametrize("log_format, to, suffix", [("jsonl", "binary", binlog.SUFFIX), ("binary", "jsonl", ".jsonl")])
+def test_convert_segmented_log(tmp_path, log_format, to, suffix):
+    manifest = record_session(tmp_path, log_format)
+    assert len(log_segments.read_manifest(manifest)["segments"]) > 1
+
+    result = batch.convert_log(manifest, None, to)
+
+    out = tmp_path / f"game_recording_{log_format}_log{suffix}"
+    assert result["output"] == str(out)
+    assert events(binlog.iter_log_records(out)) == events(log_segments.iter_records(manifest))
+
+
+def test_convert_segmented_log_already_in_target_format(tmp_path):
+    manifest = record_session(tmp_path, "binary")
+    assert batch.convert_log(manifest, None, "binary") == {"skipped": "already binary"}
+
+
+def test_convert_job_over_directory(tmp_path):
+    record_session(tmp_path, "jsonl")
+    results = batch.run_batch(tmp_path, "convert", workers=1, options={"to": "binary"}, progress=False)
+    assert [r.get("skipped") for r in results] == [None]
+    assert (tmp_path / f"game_recording_jsonl_log{binlog.SUFFIX}").exists()
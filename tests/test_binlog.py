@@ -0,0 +1,36 @@
+import json
+
+import binlog
+from benchmarks.synthetic_log import session_records
+
+
+def odd_session(rate: float = 60.0):
+    """A synthetic session at ``rate`` Hz with sub-microsecond event times and a high-resolution wheel."""
+    interval = 1.0 / rate
+    records = list(session_records(60.0))
+    for record in records:
+        for row in record["mouse_positions"]:
+            row["timestamp"] = row["frame_index"] * interval
+        for event in record["keyboard_events"] + record["mouse_events"]:
+            event["timestamp"] += 3.3e-8
+        for event in record["mouse_events"]:
+            if event["type"] == "scroll":
+                event["steps"] = event["raw_delta"] / 96
+    return records
+
+
+def test_jsonl_to_binary_round_trips_exactly(tmp_path):
+    records = odd_session()
+    src = tmp_path / "session_log.jsonl"
+    src.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    assert any(event["type"] == "scroll" for record in records for event in record["mouse_events"])
+
+    dst = binlog.jsonl_to_binary(src, tmp_path / "session_log.gmlb")
+
+    with dst.open("rb") as handle:
+        reader = binlog.BinaryLogReader(handle)
+        assert reader.header["frame_interval"] == 1.0 / 60.0
+        assert all(chunk.meta.get("on_grid") for chunk in reader if len(chunk.positions))
+    assert list(binlog.iter_records(dst)) == records
+    back = binlog.binary_to_jsonl(dst, tmp_path / "back.jsonl")
+    assert back.read_text(encoding="utf-8") == src.read_text(encoding="utf-8")
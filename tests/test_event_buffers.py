@@ -0,0 +1,58 @@
+import json
+import random
+
+import event_buffers as eb
+
+
+# The shapes backend_legacy appended to log_data before the columnar buffers.
+def legacy_position(frame_index, dx, dy, timestamp):
+    return {"delta": {"dx": dx, "dy": dy}, "timestamp": timestamp, "frame_index": frame_index}
+
+
+def legacy_click(button, action, x, y, timestamp):
+    return {"type": "click", "action": action, "button": button, "position": {"x": x, "y": y}, "timestamp": timestamp}
+
+
+def legacy_scroll(axis, steps, raw_delta, timestamp):
+    return {"type": "scroll", "axis": axis, "steps": steps, "raw_delta": raw_delta, "timestamp": timestamp}
+
+
+def test_to_dicts_matches_the_legacy_log_data():
+    rng = random.Random(1234)
+    # More than MASK_BITS keys, so some held-key masks only fit in ``wide``.
+    key_names = [f"key_{i}" for i in range(eb.MASK_BITS + 8)]
+    legacy = {"mouse_positions": [], "mouse_events": [], "keyboard_events": []}
+    positions, mouse, keyboard = eb.MousePositionBuffer(), eb.MouseEventBuffer(), eb.KeyboardEventBuffer()
+    pressed = set()
+    for i in range(2000):
+        t = i / 30.0 + rng.random() / 1e6
+        dx, dy = rng.randint(-500, 500), rng.randint(-500, 500)
+        legacy["mouse_positions"].append(legacy_position(i, dx, dy, i / 30.0))
+        positions.append(i, dx, dy, i / 30.0)
+
+        if rng.random() < 0.5:
+            button, action = rng.choice(eb.BUTTONS.names), rng.choice(("press", "release"))
+            x, y = rng.randint(0, 2559), rng.randint(0, 1439)
+            legacy["mouse_events"].append(legacy_click(button, action, x, y, t))
+            mouse.append_click(eb.BUTTONS.code(button), eb.ACTIONS.code(action), x, y, t)
+        else:
+            axis, raw_delta = rng.choice(("vertical", "horizontal")), rng.choice((-240, -120, 30, 120))
+            legacy["mouse_events"].append(legacy_scroll(axis, raw_delta / 120, raw_delta, t))
+            mouse.append_scroll(eb.AXES.code(axis), raw_delta / 120, raw_delta, t)
+
+        # Every key goes down once first, so the held set outgrows MASK_BITS.
+        key = key_names[i] if i < len(key_names) else rng.choice(key_names)
+        if key not in pressed:
+            pressed.add(key)
+            legacy["keyboard_events"].append({"type": "press", "keys": sorted(list(pressed)), "timestamp": t})
+            keyboard.append_press(eb.KEYS.code(key), eb.codes_mask(eb.KEYS.code(name) for name in pressed), t)
+        else:
+            pressed.discard(key)
+            legacy["keyboard_events"].append({"type": "release", "key": key, "timestamp": t})
+            keyboard.append_release(eb.KEYS.code(key), t)
+
+    assert keyboard.wide
+    # Byte for byte, key order included: logs from both keep the same JSON.
+    assert json.dumps(positions.to_dicts()) == json.dumps(legacy["mouse_positions"])
+    assert json.dumps(mouse.to_dicts()) == json.dumps(legacy["mouse_events"])
+    assert json.dumps(keyboard.to_dicts()) == json.dumps(legacy["keyboard_events"])
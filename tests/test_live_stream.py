@@ -0,0 +1,119 @@
+import itertools
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import event_buffers as eb
+import live_stream as ls
+
+SLOTS = 8
+_names = itertools.count()
+
+# Follows a stream from another process: one read() per line on stdin, key labels out as JSON.
+CHILD = """
+import json, sys
+import live_stream as ls
+with ls.LiveReader(sys.argv[1]) as reader:
+    print("ready", flush=True)
+    for _ in sys.stdin:
+        print(json.dumps([event.label for event in reader.read()]), flush=True)
+"""
+
+
+@pytest.fixture
+def stream():
+    live = ls.LiveStream(f"game_monitor_test_{os.getpid()}_{next(_names)}", slots=SLOTS)
+    try:
+        yield live
+    finally:
+        live.close()
+
+
+def deltas(events):
+    return [event.a for event in events if event.kind == "delta"]
+
+
+def test_lagging_reader_skips_to_the_oldest_record(stream):
+    with ls.LiveReader(stream.name) as reader:
+        for i in range(5):
+            stream.delta(i, 0)
+        assert deltas(reader.read()) == [0, 1, 2, 3, 4]
+        # Lapped: records 5..24 went into an 8-slot ring, so only the last 8 are left.
+        for i in range(5, 25):
+            stream.delta(i, 0)
+        assert deltas(reader.read()) == list(range(17, 25))
+        assert reader.overruns == 12
+        assert reader.read() == []
+        stream.delta(25, 0)
+        assert deltas(reader.read()) == [25]
+        assert reader.overruns == 12
+
+
+def test_from_start_begins_at_the_oldest_record_left(stream):
+    for i in range(20):
+        stream.delta(i, 0)
+    with ls.LiveReader(stream.name, from_start=True) as reader:
+        assert deltas(reader.read()) == list(range(12, 20))
+        assert reader.overruns == 0
+
+
+def test_record_still_being_written_is_not_read(stream):
+    with ls.LiveReader(stream.name) as reader:
+        stream.delta(1, 0)
+        # The writer has stored record 2 but not yet its seq.
+        ch = stream.mouse
+        off = ch.base + ((ch.seq + 1) & ch.mask) * ls.RECORD_BYTES
+        ls.RECORD.pack_into(stream.buf, off, 0, 0.0, 0, 2, 0, 0, ls.DELTA, 0, 0.0)
+        assert deltas(reader.read()) == [1]
+        ls.SEQ.pack_into(stream.buf, off, ch.seq + 1)
+        ch.seq += 1
+        assert deltas(reader.read()) == [2]
+        assert reader.overruns == 0
+
+
+def test_record_overwritten_during_the_copy_is_dropped(stream, monkeypatch):
+    with ls.LiveReader(stream.name) as reader:
+        stream.delta(1, 0)
+        real = ls.RECORD
+
+        class LappedDuringCopy:
+            """Copies the slot, then lets the writer lap the ring before the reader rechecks seq."""
+
+            def unpack_from(self, buf, offset):
+                record = real.unpack_from(buf, offset)
+                monkeypatch.setattr(ls, "RECORD", real)
+                for i in range(2, 2 + SLOTS):
+                    stream.delta(i, 0)
+                return record
+
+        monkeypatch.setattr(ls, "RECORD", LappedDuringCopy())
+        # The copy of record 1 is stale, so it is counted as overrun, not returned.
+        assert deltas(reader.read()) == list(range(2, 2 + SLOTS))
+        assert reader.overruns == 1
+
+
+def test_names_refresh_across_processes(stream):
+    root = Path(__file__).resolve().parents[1]
+    child = subprocess.Popen(
+        [sys.executable, "-c", CHILD, stream.name], cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert child.stdout.readline().strip() == "ready"
+
+        def read_in_child():
+            child.stdin.write("\n")
+            child.stdin.flush()
+            return json.loads(child.stdout.readline())
+
+        # Names first seen after the reader attached, so its copy of the tables is stale each time.
+        for n in range(3):
+            name = f"test_key_{stream.name}_{n}"
+            stream.key(0.0, ls.KEY_DOWN, eb.KEYS.code(name))
+            assert read_in_child() == [name]
+    finally:
+        child.stdin.close()
+        child.wait(10)
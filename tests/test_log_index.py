@@ -0,0 +1,75 @@
+import pytest
+
+import log_index
+import log_segments
+from tests.conftest import record_session
+
+# Segments rotate every 60 s of the 300 s session; several windows straddle a boundary.
+TIME_WINDOWS = [(-1.0, 0.5), (0.0, 5.0), (55.0, 65.0), (119.9, 120.1), (59.0, 181.0), (123.4, 123.4), (290.0, 400.0), (500.0, 600.0)]
+FRAME_WINDOWS = [(0, 0), (0, 30), (1790, 1810), (3599, 3601), (4000, 6000), (8990, 9100), (20000, 20010)]
+
+
+@pytest.fixture(scope="module", params=["jsonl", "binary"])
+def session(request, tmp_path_factory):
+    """A rotated segmented log, its records in order and the index it was written with."""
+    manifest = record_session(tmp_path_factory.mktemp(request.param), request.param)
+    assert len(log_segments.read_manifest(manifest)["segments"]) > 1
+    return manifest, list(log_segments.iter_records(manifest))
+
+
+@pytest.fixture(params=["written", "built"])
+def index(request, session):
+    manifest, _ = session
+    path = log_segments.index_path_for(manifest)
+    if request.param == "built":
+        path = log_index.build(manifest, path.with_name("rebuilt.idx"))
+    with log_index.LogIndex(path) as opened:
+        yield opened
+
+
+def events_in(records, key, keep):
+    return [event for record in records for event in record[key] if keep(event)]
+
+
+def test_entries_match_records(session, index):
+    _, records = session
+    assert len(index) == len(records)
+    assert [index.record(i) for i in range(len(index))] == records
+
+
+@pytest.mark.parametrize("start, end", TIME_WINDOWS)
+def test_find_time_matches_a_linear_scan(session, index, start, end):
+    _, records = session
+    flushed = [record["relative_timestamp"] for record in records]
+    # First record flushed at or after ``start`` through the first one flushed after ``end``.
+    first = next((i for i, t in enumerate(flushed) if t >= start), len(flushed))
+    last = next((i for i, t in enumerate(flushed) if t > end), len(flushed) - 1)
+    expected = range(first, last + 1) if first < len(flushed) else range(first, first)
+    assert list(index.find_time(start, end)) == list(expected)
+
+    found = index.query_time(start, end)
+    for key in log_index.EVENT_KEYS:
+        assert found[key] == events_in(records, key, lambda event: start <= event["timestamp"] <= end)
+
+
+@pytest.mark.parametrize("first_frame, last_frame", FRAME_WINDOWS)
+def test_find_frames_matches_a_linear_scan(session, index, first_frame, last_frame):
+    _, records = session
+    holding = [
+        i for i, record in enumerate(records) if any(first_frame <= row["frame_index"] <= last_frame for row in record["mouse_positions"])
+    ]
+    found = index.find_frames(first_frame, last_frame)
+    assert set(holding) <= set(found)
+    assert len(found) <= len(holding) + 1
+
+    positions = events_in(records, "mouse_positions", lambda row: first_frame <= row["frame_index"] <= last_frame)
+    result = index.query_frames(first_frame, last_frame)
+    assert result["mouse_positions"] == positions
+    if index.frame_interval:
+        start, end = first_frame * index.frame_interval, (last_frame + 1) * index.frame_interval
+    elif positions:
+        start, end = positions[0]["timestamp"], positions[-1]["timestamp"]
+    else:
+        start, end = 0.0, -1.0
+    for key in ("keyboard_events", "mouse_events"):
+        assert result[key] == events_in(records, key, lambda event: start <= event["timestamp"] < end)
@@ -0,0 +1,32 @@
+import pytest
+
+import backend_legacy as legacy
+import binlog
+import log_segments
+import spill
+from benchmarks.synthetic_log import session_records
+from session_stats import SessionStats
+
+
+@pytest.mark.parametrize("log_format", ["jsonl", "binary"])
+def test_open_log_reads_back_every_record(tmp_path, log_format):
+    """A log cut off mid-session (never closed) still reads in full, and lists every name it used."""
+    manifest = tmp_path / f"game_recording_log{log_segments.MANIFEST_SUFFIX}"
+    log = log_segments.SegmentedLog(manifest, log_format, {"video_file": "game_recording.mkv"}, "gzip", max_seconds=60.0)
+    stats = SessionStats()
+    records = list(session_records(300.0))
+    # A key first seen mid-segment, after the manifest last listed the segment.
+    # Names are interned per process, so each case needs its own.
+    key = f"new_key_{log_format}"
+    t = records[-2]["relative_timestamp"] - 1.0
+    records[-2]["keyboard_events"].append({"type": "press", "keys": [key], "timestamp": t})
+    for record in records:
+        positions, mouse, keyboard = binlog.buffers_from_record(record)
+        batch = spill.Batch(record["timestamp"], record["relative_timestamp"], keyboard, mouse, positions)
+        legacy._write_batch(batch, log, "game_recording.mkv", stats)
+
+    written = log_segments.read_manifest(manifest)
+    assert not written["complete"]
+    assert [r["relative_timestamp"] for r in log_segments.iter_records(manifest)] == [r["relative_timestamp"] for r in records]
+    if log_format == "binary":
+        assert key in written["segments"][-1]["names"]["keys"]
@@ -0,0 +1,26 @@
+import pytest
+
+import backend_legacy as legacy
+import recorder_core
+from benchmarks.bench_obs_events import IdleInput
+from benchmarks.obs_standin import StandInOBS
+from obs_control import RecorderController
+
+
+@pytest.mark.parametrize("sample_rate, sampled_at, video_fps", [(30.0, 30.0, 30), ("video", 60.0, 60)])
+def test_sampler_rate(tmp_path, monkeypatch, sample_rate, sampled_at, video_fps):
+    """A fixed rate forces OBS to 30 fps CFR; "video" samples at the fps OBS was set to and leaves it."""
+    monkeypatch.setattr(legacy, "_input_backend", IdleInput)
+    with StandInOBS(start_delay=0.0, stop_delay=0.0, fps=60) as server:
+        recorder = RecorderController(
+            server.host, server.port, "", "", str(tmp_path), log_interval_seconds=0.1, sample_rate=sample_rate, catalog_sessions=False
+        )
+        recorder_core.run(recorder.connect())
+        try:
+            recorder_core.run(recorder.start_recording())
+            assert legacy.sample_rate_hz == sampled_at
+            recorder_core.run(recorder.stop_recording())
+        finally:
+            recorder_core.run(recorder.disconnect())
+            recorder_core.shutdown()
+        assert server.video["fpsNumerator"] == video_fps
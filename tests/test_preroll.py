@@ -0,0 +1,32 @@
+import time
+
+import backend_legacy as legacy
+import log_segments
+from benchmarks.bench_obs_events import IdleInput
+
+
+def test_hand_over_keeps_frames_increasing(tmp_path, monkeypatch):
+    """arm -> tick -> start -> stop: the pre-roll rows and the session's own rows never share a frame."""
+    monkeypatch.setattr(legacy, "_input_backend", IdleInput)
+    legacy.arm_preroll(1.0, 30.0)
+    try:
+        time.sleep(0.5)
+        legacy.preroll_tick()
+        time.sleep(0.2)
+        legacy.start_recording()
+        # OBS reports the start a little after it happened, so frames since
+        # then are already in the pre-roll when the session takes it over.
+        legacy.start_input_threads(time.perf_counter() - 0.1, time.time())
+        legacy.save_log(str(tmp_path / "session.mkv"), "jsonl", "none")
+        time.sleep(0.3)
+        legacy.stop_input_threads()
+        legacy.save_log()
+        manifest = legacy.log_file_path
+        legacy.close_log()
+    finally:
+        legacy.disarm_preroll()
+
+    records = list(log_segments.iter_records(manifest))
+    frames = [row["frame_index"] for record in records for row in record["mouse_positions"]]
+    assert frames[0] < 0 < frames[-1]
+    assert all(a < b for a, b in zip(frames, frames[1:]))
@@ -0,0 +1,27 @@
+import threading
+import time
+
+from replay import Replayer
+from tests.conftest import record_session
+
+
+def _record(relative: float, keyboard_event: dict) -> dict:
+    return {"timestamp": "2024-01-01T12:00:00", "relative_timestamp": relative, "keyboard_events": [keyboard_event], "mouse_events": [], "mouse_positions": []}
+
+
+def test_stop_interrupts_a_wait(tmp_path):
+    """Setting stop_event ends a real-time replay mid-wait, without sending the event it was waiting for."""
+    # Nothing happens for 29 s after the first event.
+    records = [
+        _record(1.0, {"type": "press", "keys": ["w"], "timestamp": 0.0}),
+        _record(30.0, {"type": "release", "key": "w", "timestamp": 29.0}),
+    ]
+    manifest = record_session(tmp_path, records=records)
+    sent = []
+    stop = threading.Event()
+    replayer = Replayer(manifest, [sent.append], speed=1.0, policy="precise", stop_event=stop)
+    threading.Timer(0.2, stop.set).start()
+    start = time.perf_counter()
+    stats = replayer.run()
+    assert time.perf_counter() - start < 5.0
+    assert stats["events"] == len(sent) == 1
@@ -0,0 +1,49 @@
+from sampler import FakeClock, FrameScheduler
+
+
+def run(stall_at=None, stall=0.0, first_frame=0, start=0.0, frames=30):
+    clock = FakeClock(oversleep=0.0)
+    emitted = []
+
+    def on_frame(index, t):
+        emitted.append((index, t))
+        if index == stall_at:
+            clock.stall(stall)
+
+    scheduler = FrameScheduler(on_frame, 30.0, "sleep", clock=clock)
+    scheduler.run(start, max_frames=frames, first_frame=first_frame)
+    return scheduler, emitted
+
+
+def test_frames_on_time():
+    scheduler, emitted = run()
+    assert [index for index, _ in emitted] == list(range(30))
+    assert all(t == index * (1.0 / 30.0) for index, t in emitted)
+    assert (scheduler.skipped_frames, scheduler.resyncs) == (0, 0)
+
+
+def test_stall_skips_and_resyncs():
+    """Falling more than a frame behind jumps to the current frame and counts the ones never emitted."""
+    scheduler, emitted = run(stall_at=10, stall=0.2)
+    indices = [index for index, _ in emitted]
+    assert indices[:11] == list(range(11))
+    assert indices[11] == 16  # 10/30 s + 0.2 s is frame 16
+    assert indices[11:] == list(range(16, 16 + len(indices) - 11))
+    assert scheduler.skipped_frames == 5
+    assert scheduler.resyncs == 1
+    assert all(t == index * (1.0 / 30.0) for index, t in emitted)
+
+
+def test_stall_shorter_than_a_frame_catches_up():
+    scheduler, emitted = run(stall_at=10, stall=0.5 / 30.0)
+    assert [index for index, _ in emitted] == list(range(30))
+    assert (scheduler.skipped_frames, scheduler.resyncs) == (0, 0)
+
+
+def test_first_frame():
+    scheduler, emitted = run(first_frame=5, frames=3)
+    assert [index for index, _ in emitted] == [5, 6, 7]
+    # A first frame already in the past resyncs to the current one.
+    scheduler, emitted = run(first_frame=5, start=-1.0, frames=3)
+    assert [index for index, _ in emitted] == [30, 31, 32]
+    assert scheduler.skipped_frames == 25
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import batch
+import log_segments
+from benchmarks.synthetic_log import session_records
+from tests.conftest import record_session
+
+
+def preroll_session_with_a_break(seconds=300.0, first_frame=-90, quiet=(100.0, 130.0)):
+    """Synthetic records whose frames start before 0, as after a pre-roll, and with no input during ``quiet``."""
+    for record in session_records(seconds):
+        for row in record["mouse_positions"]:
+            row["frame_index"] += first_frame
+            if quiet[0] <= row["timestamp"] < quiet[1]:
+                row["delta"] = {"dx": 0, "dy": 0}
+        for stream in ("keyboard_events", "mouse_events"):
+            record[stream] = [evt for evt in record[stream] if not quiet[0] <= evt["timestamp"] < quiet[1]]
+        yield record
+
+
+def without_summary(manifest):
+    plain = log_segments.read_manifest(manifest)
+    del plain["summary"]
+    scan = manifest.with_name(f"scan_log{log_segments.MANIFEST_SUFFIX}")
+    scan.write_text(json.dumps(plain), encoding="utf-8")
+    return scan
+
+
+@pytest.mark.parametrize("log_format", ["jsonl", "binary"])
+def test_manifest_summary_matches_full_scan(tmp_path, log_format):
+    manifest = record_session(tmp_path, log_format, records=preroll_session_with_a_break())
+
+    summary = batch.summarize_log(manifest, None)
+    scanned = batch.summarize_log(without_summary(manifest), None)
+
+    assert summary["idle_periods"] >= 1 and summary["key_histogram"]
+    assert scanned.keys() == summary.keys()
+    for field, value in summary.items():
+        assert scanned[field] == pytest.approx(value, abs=1e-5), field
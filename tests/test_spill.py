@@ -0,0 +1,99 @@
+import pickle
+
+import pytest
+
+import spill
+from event_buffers import KeyboardEventBuffer, MouseEventBuffer, MousePositionBuffer
+
+ROWS = 10
+
+
+def make_batch(i: int) -> spill.Batch:
+    positions = MousePositionBuffer()
+    for row in range(ROWS):
+        positions.append(i * ROWS + row, i, -i, float(i * ROWS + row))
+    return spill.Batch(f"2024-01-01T12:00:{i:02d}", float(i), KeyboardEventBuffer(), MouseEventBuffer(), positions)
+
+
+BATCH_BYTES = make_batch(0).nbytes()
+SPILLED_BYTES = spill.LENGTH.size + len(pickle.dumps(make_batch(0), pickle.HIGHEST_PROTOCOL))
+
+
+def queue(memory: int, spilled: int, **kwargs) -> spill.SpillQueue:
+    """A queue that keeps ``memory`` batches in RAM and ``spilled`` in its spill file."""
+    return spill.SpillQueue(memory_bytes=memory * BATCH_BYTES, spill_bytes=spilled * SPILLED_BYTES, **kwargs)
+
+
+def drain(q: spill.SpillQueue) -> list:
+    out = []
+    while (batch := q.peek()) is not None:
+        out.append(batch.relative_timestamp)
+        q.pop()
+    return out
+
+
+def test_memory_then_spill_then_drop(tmp_path):
+    q = queue(2, 2, spill_dir=str(tmp_path))
+    batches, events = spill.dropped_batches.value, spill.dropped_events.value
+    for i in range(2):
+        q.put(make_batch(i))
+    assert (q.memory_used, q.spill_used) == (2 * BATCH_BYTES, 0)
+    for i in range(2, 4):
+        q.put(make_batch(i))
+    assert (q.memory_used, q.spill_used) == (2 * BATCH_BYTES, 2 * SPILLED_BYTES)
+    assert spill.dropped_batches.value == batches
+    for i in range(4, 6):
+        q.put(make_batch(i))
+    assert len(q) == 4
+    assert (spill.dropped_batches.value - batches, spill.dropped_events.value - events) == (2, 2 * ROWS)
+    assert drain(q) == [2.0, 3.0, 4.0, 5.0]
+    assert (q.memory_used, q.spill_used) == (0, 0)
+    q.close()
+
+
+def test_order_kept_across_a_spill(tmp_path):
+    q = queue(3, 100, spill_dir=str(tmp_path))
+    for i in range(10):
+        q.put(make_batch(i))
+    assert q.spill_used == 7 * SPILLED_BYTES
+    first = q.peek()
+    q.pop()
+    # Batches put while older ones are still spilled queue up behind them.
+    for i in range(10, 15):
+        q.put(make_batch(i))
+    rest = drain(q)
+    assert [first.relative_timestamp] + rest == [float(i) for i in range(15)]
+    assert first.positions.frame_index.tolist() == list(range(ROWS))
+    q.close()
+
+
+@pytest.mark.parametrize("policy, kept", [("oldest", [2.0, 3.0, 4.0, 5.0]), ("newest", [0.0, 1.0, 2.0, 3.0])])
+def test_drop_policy(tmp_path, policy, kept):
+    q = queue(2, 2, policy=policy, spill_dir=str(tmp_path))
+    for i in range(6):
+        q.put(make_batch(i))
+    assert drain(q) == kept
+    q.close()
+
+
+def test_unwritable_spill_file_drops(tmp_path):
+    q = queue(2, 100, spill_dir=str(tmp_path / "missing"))
+    for i in range(5):
+        q.put(make_batch(i))
+    assert q.spill_used == 0
+    assert drain(q) == [3.0, 4.0]
+    q.close()
+
+
+def test_inflight_batch_survives_a_failed_write(tmp_path):
+    q = queue(1, 1, spill_dir=str(tmp_path))
+    q.put(make_batch(0))
+    inflight = q.peek()
+    # The write failed, so the writer does not pop; the drain ticker keeps cutting batches.
+    for i in range(1, 6):
+        q.put(make_batch(i))
+    assert len(q) == 3
+    assert q.peek() is inflight
+    q.pop()
+    assert drain(q) == [4.0, 5.0]
+    q.close()